@@ -0,0 +1,415 @@
+import json
+import os
+import os.path
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from batch import MISSING
+
+# Detección en línea de ráfagas de actividad sospechosa durante la ingesta. Las filas se recorren una sola vez, en orden
+# de timestamp, agrupadas en intervalos de una hora, con tres detectores:
+#
+#   - Ritmo por aplicación (y del total de filas): media y varianza con suavizado exponencial (EWMA) del número de filas
+#     por intervalo de cada app_name. Un intervalo es anómalo si su recuento supera la media en Z_THRESHOLD
+#     desviaciones y es al menos MIN_RATIO veces la media. El estado ocupa unos pocos números por aplicación.
+#   - Picos por host y por IP de origen: hay demasiados valores distintos (clientes de Squid, IPs de los ataques a
+#     sshd) para guardar una media por cada uno, así que la línea base de todos ellos se guarda en un count-min sketch
+#     de tamaño fijo cuyas celdas son medias EWMA. Los recuentos del intervalo en curso son exactos; la línea base de
+#     cada clave es el mínimo de sus celdas, que puede sobrestimarla pero nunca subestimarla.
+#
+# Los intervalos anómalos consecutivos de una misma clave forman una ventana de ráfaga, con su inicio, su fin y su
+# intervalo de mayor recuento. Una ventana se abre con un intervalo que supera a la vez Z_THRESHOLD, MIN_COUNT y
+# MIN_RATIO, sigue abierta mientras los intervalos superan Z_CLOSE y solo se registra si dura MIN_BUCKETS intervalos.
+#
+# El estado de los detectores y las ventanas se guardan en el almacén (véase LogStore.append), de forma que la ingesta
+# incremental continúa el recorrido donde lo dejó la anterior. El último intervalo con filas no se evalúa hasta que
+# llegan filas de uno posterior; las filas de intervalos ya evaluados (por ejemplo, de un fichero rotado que se procesa
+# tarde) se cuentan en late_rows, pero no se evalúan.
+
+ANOMALY_DIR = 'anomaly'
+
+# Duración de cada intervalo, en nanosegundos.
+BUCKET = 3600 * 10 ** 9
+
+# Peso del último intervalo en las medias EWMA (alrededor de un día de memoria con intervalos de una hora).
+ALPHA = 0.05
+
+# Desviaciones sobre la media a partir de las cuales un intervalo abre una ventana de ráfaga, y desviaciones que deben
+# mantener los intervalos siguientes para prolongarla (histéresis: una ráfaga que oscila alrededor del umbral forma
+# una sola ventana, no una por cada cruce).
+Z_THRESHOLD = 5.0
+Z_CLOSE = 2.0
+
+# Proporción mínima entre el recuento de un intervalo anómalo y lo esperado. En las claves con mucha actividad la
+# desviación de Poisson es pequeña y variaciones normales de un 10 o 20 % superan Z_THRESHOLD.
+MIN_RATIO = 3.0
+
+# Recuento mínimo de un intervalo anómalo, para no marcar variaciones de claves con muy poca actividad.
+MIN_COUNT = {'app': 50, 'host': 200, 'source_ip': 50}
+
+# Duración mínima, en intervalos, de las ventanas que se registran. Los picos de una sola hora de una aplicación o de un
+# host son casi siempre tareas periódicas (cron.daily, rotación de logs); los de una IP de origen, no.
+MIN_BUCKETS = {'app': 2, 'host': 2, 'source_ip': 1}
+
+# Intervalos que debe haber visto el detector de ritmo de una aplicación antes de evaluarla.
+WARMUP = 24
+
+# Número de intervalos vacíos tras el que las medias se consideran nulas, en lugar de seguir decayendo uno a uno.
+MAX_GAP = 500
+
+# Dimensiones del count-min sketch: funciones hash (filas) y celdas por fila.
+SKETCH_DEPTH = 4
+SKETCH_BITS = 14
+SKETCH_WIDTH = 1 << SKETCH_BITS
+
+# Clave del ritmo total de filas en el detector por aplicación.
+TOTAL = '*'
+
+# IP de origen en los mensajes de sshd, ftpd, etc. ('from 1.2.3.4', 'from ::ffff:1.2.3.4', 'rhost=1.2.3.4').
+SOURCE_IP = r'(?:from|rhost=)\s*(?:::ffff:)?(\d{1,3}(?:\.\d{1,3}){3})\b'
+
+
+def is_anomalous(counts: np.ndarray, baseline: np.ndarray, z: np.ndarray, open_window: np.ndarray,
+                 kind: str) -> np.ndarray:
+    """
+    :param counts: Recuento del intervalo de cada clave.
+    :param baseline: Recuento esperado de cada clave.
+    :param z: Desviación del recuento respecto a lo esperado.
+    :param open_window: Si cada clave tiene una ventana de ráfaga abierta.
+    :param kind: Tipo de detector.
+    :return: Si el intervalo de cada clave abre o prolonga una ventana de ráfaga.
+    """
+    opening = (counts >= MIN_COUNT[kind]) & (counts >= MIN_RATIO * baseline) & (z >= Z_THRESHOLD)
+    return opening | open_window & (z >= Z_CLOSE)
+
+
+def is_long_enough(window: list) -> bool:
+    """
+    :param window: Ventana de ráfaga con los campos de WindowLog.fields.
+    :return: Si la ventana dura al menos MIN_BUCKETS intervalos.
+    """
+    kind, _, start, end = window[:4]
+    return end - start >= MIN_BUCKETS[kind]
+
+
+class RateDetector:
+    # Media y varianza EWMA del recuento por intervalo de cada clave, con la ventana de ráfaga abierta de cada una.
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.mean = np.zeros(0)
+        self.variance = np.zeros(0)
+        self.seen = np.zeros(0, dtype=np.int64)
+        self.window_start = np.zeros(0, dtype=np.int64)
+        self.window_peak = np.zeros(0, dtype=np.int64)
+        self.window_peak_bucket = np.zeros(0, dtype=np.int64)
+        self.window_z = np.zeros(0)
+
+    def index(self, keys: List[str]) -> np.ndarray:
+        """
+        :return: Posición de cada clave en los arrays de estado, que se amplían con las claves nuevas.
+        """
+        positions = {key: position for position, key in enumerate(self.keys)}
+        result = np.array([positions.setdefault(key, len(positions)) for key in keys], dtype=np.int64)
+        added = len(positions) - len(self.keys)
+        if added:
+            self.keys = list(positions)
+            for name in ('mean', 'variance', 'seen', 'window_peak', 'window_peak_bucket', 'window_z'):
+                setattr(self, name, np.concatenate([getattr(self, name), np.zeros(added, getattr(self, name).dtype)]))
+            self.window_start = np.concatenate([self.window_start, np.full(added, MISSING, dtype=np.int64)])
+        return result
+
+    def decay(self, buckets: int):
+        """
+        :param buckets: Número de intervalos vacíos, sin filas de ninguna clave.
+
+        Tras MAX_GAP intervalos vacíos las medias se anulan y las aplicaciones vuelven al periodo de WARMUP.
+        """
+        if buckets >= MAX_GAP:
+            self.mean[:] = 0.0
+            self.variance[:] = 0.0
+            self.seen[:] = 0
+            return
+        for _ in range(buckets):
+            self.variance = (1 - ALPHA) * (self.variance + ALPHA * self.mean ** 2)
+            self.mean = (1 - ALPHA) * self.mean
+        self.seen += buckets
+
+    def observe(self, bucket: int, counts: np.ndarray, windows: 'WindowLog', kind: str):
+        """
+        :param bucket: Intervalo evaluado.
+        :param counts: Recuento del intervalo para cada clave (0 para las que no aparecen).
+        :param windows: Registro en el que se guardan las ventanas de ráfaga cerradas.
+        :param kind: Tipo de detector con el que se registran las ventanas.
+        """
+        # La desviación nunca se toma menor que la de un proceso de Poisson con la misma media.
+        deviation = np.sqrt(np.maximum(self.variance, self.mean) + 1)
+        z = (counts - self.mean) / deviation
+        anomalous = is_anomalous(counts, self.mean, z, self.window_start != MISSING, kind) & (self.seen >= WARMUP)
+        difference = counts - self.mean
+        self.mean = self.mean + ALPHA * difference
+        self.variance = (1 - ALPHA) * (self.variance + ALPHA * difference ** 2)
+        self.seen += 1
+
+        opening = anomalous & (self.window_start == MISSING)
+        self.window_start[opening] = bucket
+        self.window_peak[opening] = 0
+        higher = anomalous & (counts > self.window_peak)
+        self.window_peak[higher] = counts[higher]
+        self.window_peak_bucket[higher] = bucket
+        self.window_z[higher] = z[higher]
+        for position in np.flatnonzero(~anomalous & (self.window_start != MISSING)):
+            windows.add(kind, self.keys[position], int(self.window_start[position]), bucket,
+                        int(self.window_peak[position]), int(self.window_peak_bucket[position]),
+                        float(self.window_z[position]))
+            self.window_start[position] = MISSING
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in ('mean', 'variance', 'seen', 'window_start', 'window_peak',
+                                                        'window_peak_bucket', 'window_z')}
+
+    def restore(self, keys: List[str], state: Dict[str, np.ndarray]):
+        self.keys = list(keys)
+        for name, values in state.items():
+            setattr(self, name, np.array(values))
+
+
+class SketchDetector:
+    # Línea base EWMA de los recuentos por intervalo de un número no acotado de claves en un count-min sketch de
+    # SKETCH_DEPTH x SKETCH_WIDTH celdas. Las ventanas de ráfaga abiertas se guardan por clave, pero solo existen
+    # mientras dura la ráfaga.
+
+    # Multiplicadores impares y desplazamientos de las funciones hash multiply-shift de cada fila, fijos para que el
+    # sketch guardado siga siendo válido entre ejecuciones.
+    multipliers = np.array([0x9e3779b97f4a7c15, 0xbf58476d1ce4e5b9, 0x94d049bb133111eb, 0xd6e8feb86659fd93],
+                           dtype=np.uint64)
+    offsets = np.array([0x632be59bd9b4e019, 0x85ebca77c2b2ae63, 0x27d4eb2f165667c5, 0x1b873593cc9e2d51],
+                       dtype=np.uint64)
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.baseline = np.zeros((SKETCH_DEPTH, SKETCH_WIDTH))
+        self.open: Dict[str, list] = {}
+
+    def cells(self, keys: List[str]) -> np.ndarray:
+        """
+        :return: Matriz (SKETCH_DEPTH, claves) con la celda de cada clave en cada fila del sketch.
+        """
+        hashes = np.array([zlib.crc32(key.encode('utf8')) for key in keys], dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            mixed = hashes * self.multipliers[:SKETCH_DEPTH, None] + self.offsets[:SKETCH_DEPTH, None]
+        return (mixed >> np.uint64(64 - SKETCH_BITS)).astype(np.int64)
+
+    def decay(self, buckets: int):
+        self.baseline *= 0.0 if buckets >= MAX_GAP else (1 - ALPHA) ** buckets
+
+    def observe(self, bucket: int, keys: List[str], counts: np.ndarray, windows: 'WindowLog'):
+        """
+        :param bucket: Intervalo evaluado.
+        :param keys: Claves con filas en el intervalo.
+        :param counts: Recuento exacto de cada clave en el intervalo.
+        :param windows: Registro en el que se guardan las ventanas de ráfaga cerradas.
+        """
+        cells = self.cells(keys)
+        depth = np.arange(SKETCH_DEPTH)[:, None]
+        baseline = self.baseline[depth, cells].min(axis=0)
+        z = (counts - baseline) / np.sqrt(baseline + 1)
+        anomalous = is_anomalous(counts, baseline, z, np.array([key in self.open for key in keys], dtype=bool),
+                                 self.kind)
+        self.decay(1)
+        np.add.at(self.baseline, (np.broadcast_to(depth, cells.shape), cells), ALPHA * counts)
+
+        current = set()
+        for position in np.flatnonzero(anomalous):
+            key, count = keys[position], int(counts[position])
+            current.add(key)
+            window = self.open.setdefault(key, [bucket, 0, bucket, 0.0])
+            if count > window[1]:
+                window[1:] = [count, bucket, float(z[position])]
+        for key in [key for key in self.open if key not in current]:
+            start, peak, peak_bucket, peak_z = self.open.pop(key)
+            windows.add(self.kind, key, start, bucket, peak, peak_bucket, peak_z)
+
+
+class WindowLog:
+    # Ventanas de ráfaga detectadas: tipo de detector, clave, primer intervalo, intervalo siguiente al último,
+    # recuento máximo, intervalo de ese máximo y su desviación (z).
+
+    fields = ['kind', 'key', 'start', 'end', 'peak', 'peak_bucket', 'z']
+
+    def __init__(self, windows: List[list] = ()):
+        self.windows = list(windows)
+
+    def add(self, *window):
+        if is_long_enough(window):
+            self.windows.append(list(window))
+
+    def to_frame(self, open_windows: List[list] = ()) -> pd.DataFrame:
+        """
+        :param open_windows: Ventanas que siguen abiertas al final de los datos.
+        :return: Dataframe con una fila por ventana y los intervalos como timestamps UTC, ordenado por inicio.
+        """
+        frame = pd.DataFrame(self.windows + [window for window in open_windows if is_long_enough(window)],
+                             columns=self.fields)
+        for column in ('start', 'end', 'peak_bucket'):
+            frame[column] = pd.to_datetime(frame[column].astype(np.int64) * BUCKET, utc=True)
+        return frame.sort_values(['start', 'kind', 'key'], kind='stable', ignore_index=True)
+
+
+class AnomalyDetector:
+    # Conjunto de detectores de un almacén, con el último intervalo evaluado.
+
+    def __init__(self):
+        self.last_bucket: Optional[int] = None
+        self.late_rows = 0
+        # Intervalo aún sin evaluar: [intervalo, filas, {tipo: {clave: recuento}}].
+        self.pending: Optional[list] = None
+        self.apps = RateDetector()
+        self.sketches = {kind: SketchDetector(kind) for kind in ('host', 'source_ip')}
+        self.windows = WindowLog()
+
+    def observe(self, timestamp: np.ndarray, app_name: pd.Series, host_name: pd.Series, message: pd.Series):
+        """
+        :param timestamp: Nanosegundos UTC de las filas, en orden.
+        :param app_name: Aplicación de cada fila.
+        :param host_name: Host de cada fila.
+        :param message: Mensaje de cada fila, del que se extrae la IP de origen.
+
+        Recorrido de un lote de filas ordenadas por timestamp, intervalo a intervalo. El último intervalo del lote queda
+        pendiente, porque el lote siguiente puede traer más filas suyas, y se evalúa al llegar filas de uno posterior.
+        """
+        bucket = timestamp // BUCKET
+        valid = timestamp != np.iinfo(np.int64).min
+        # Solo se admiten filas del intervalo pendiente o posteriores.
+        first = self.pending[0] if self.pending is not None else self.last_bucket + 1 if self.last_bucket is not None \
+            else None
+        if first is not None:
+            late = bucket < first
+            self.late_rows += int((late & valid).sum())
+            valid &= ~late
+        if not valid.any():
+            return
+        keys = {
+            'app': app_name.astype(object).where(app_name.notna(), None),
+            'host': host_name.astype(object).where(host_name.notna(), None),
+            'source_ip': message.str.extract(SOURCE_IP, expand=False),
+        }
+        grouped = {kind: count_keys(bucket[valid], values[valid]) for kind, values in keys.items()}
+        buckets, totals = np.unique(bucket[valid], return_counts=True)
+        for current, total in zip(buckets.tolist(), totals.tolist()):
+            counts = {kind: dict(zip(*grouped[kind].get(current, ([], [])))) for kind in grouped}
+            if self.pending is not None:
+                pending_bucket, pending_total, pending_counts = self.pending
+                if pending_bucket == current:
+                    total += pending_total
+                    for kind, values in pending_counts.items():
+                        for key, count in values.items():
+                            counts[kind][key] = counts[kind].get(key, 0) + count
+                else:
+                    self.evaluate(pending_bucket, pending_total, pending_counts)
+            self.pending = [current, total, counts]
+
+    def evaluate(self, current: int, total: int, counts: Dict[str, Dict[str, int]]):
+        """
+        :param current: Intervalo completo que se evalúa, posterior a last_bucket.
+        :param total: Número de filas del intervalo.
+        :param counts: Recuento de cada clave del intervalo, por tipo de detector.
+        """
+        if self.last_bucket is not None and current > self.last_bucket + 1:
+            # El primer intervalo vacío cierra las ventanas abiertas; el resto solo hace decaer las medias.
+            empty = self.last_bucket + 1
+            self.apps.observe(empty, np.zeros(len(self.apps.keys)), self.windows, 'app')
+            self.apps.decay(current - empty - 1)
+            for sketch in self.sketches.values():
+                sketch.observe(empty, [], np.zeros(0), self.windows)
+                sketch.decay(current - empty - 1)
+        positions = self.apps.index(list(counts['app']) + [TOTAL])
+        observed = np.zeros(len(self.apps.keys))
+        observed[positions] = list(counts['app'].values()) + [total]
+        self.apps.observe(current, observed, self.windows, 'app')
+        for kind, sketch in self.sketches.items():
+            sketch.observe(current, list(counts[kind]), np.array(list(counts[kind].values()), dtype=float),
+                           self.windows)
+        self.last_bucket = current
+
+    def open_windows(self) -> List[list]:
+        """
+        :return: Ventanas que siguen abiertas, con el intervalo siguiente al último evaluado como fin.
+        """
+        end = (self.last_bucket or 0) + 1
+        windows = [['app', self.apps.keys[position], int(self.apps.window_start[position]), end,
+                    int(self.apps.window_peak[position]), int(self.apps.window_peak_bucket[position]),
+                    float(self.apps.window_z[position])]
+                   for position in np.flatnonzero(self.apps.window_start != MISSING)]
+        for kind, sketch in self.sketches.items():
+            windows += [[kind, key, start, end, peak, peak_bucket, z]
+                        for key, (start, peak, peak_bucket, z) in sketch.open.items()]
+        return windows
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.windows.to_frame(self.open_windows())
+
+    def save(self, store_path: str):
+        # Los arrays de estado van en un .npz sin objetos y el resto en JSON; ambos con escritura atómica.
+        directory = os.path.join(store_path, ANOMALY_DIR)
+        os.makedirs(directory, exist_ok=True)
+        arrays = {f'apps_{name}': values for name, values in self.apps.state().items()}
+        arrays.update({f'{kind}_baseline': sketch.baseline for kind, sketch in self.sketches.items()})
+        with open(os.path.join(directory, 'state.npz.tmp'), 'wb') as f:
+            np.savez(f, **arrays)
+        state = {
+            'last_bucket': self.last_bucket,
+            'late_rows': self.late_rows,
+            'pending': self.pending,
+            'app_keys': self.apps.keys,
+            'open': {kind: sketch.open for kind, sketch in self.sketches.items()},
+            'windows': self.windows.windows,
+        }
+        with open(os.path.join(directory, 'state.json.tmp'), 'w', encoding='utf8') as f:
+            json.dump(state, f)
+        for name in ('state.npz', 'state.json'):
+            os.replace(os.path.join(directory, name + '.tmp'), os.path.join(directory, name))
+
+    @classmethod
+    def load(cls, store_path: str) -> 'AnomalyDetector':
+        """
+        :return: Detectores guardados en el almacén, o unos nuevos si no hay ninguno.
+        """
+        detector = cls()
+        directory = os.path.join(store_path, ANOMALY_DIR)
+        if not os.path.exists(os.path.join(directory, 'state.json')):
+            return detector
+        with open(os.path.join(directory, 'state.json'), encoding='utf8') as f:
+            state = json.load(f)
+        with np.load(os.path.join(directory, 'state.npz')) as arrays:
+            detector.apps.restore(state['app_keys'], {name[len('apps_'):]: arrays[name] for name in arrays.files
+                                                      if name.startswith('apps_')})
+            for kind, sketch in detector.sketches.items():
+                sketch.baseline = arrays[f'{kind}_baseline'].copy()
+                sketch.open = state['open'][kind]
+        detector.last_bucket = state['last_bucket']
+        detector.late_rows = state['late_rows']
+        detector.pending = state['pending']
+        detector.windows = WindowLog(state['windows'])
+        return detector
+
+
+def count_keys(bucket: np.ndarray, keys: pd.Series) -> Dict[int, tuple]:
+    """
+    :param bucket: Intervalo de cada fila.
+    :param keys: Clave de cada fila, o None/NaN si no tiene.
+    :return: Para cada intervalo, par (claves, recuento de cada una) de las filas con clave.
+    """
+    present = keys.notna().to_numpy()
+    if not present.any():
+        return {}
+    counts = pd.Series(1, index=pd.MultiIndex.from_arrays([bucket[present], keys.to_numpy()[present]])) \
+        .groupby(level=[0, 1], sort=True).sum()
+    buckets = counts.index.get_level_values(0).to_numpy()
+    values = counts.index.get_level_values(1).to_numpy()
+    bounds = np.flatnonzero(np.diff(buckets)) + 1
+    return {int(group_buckets[0]): (group_keys.tolist(), group_counts.tolist()) for group_buckets, group_keys, group_counts in
+            zip(np.split(buckets, bounds), np.split(values, bounds), np.split(counts.to_numpy(), bounds))}
@@ -0,0 +1,420 @@
+import array
+import datetime
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from templates import TemplateMiner
+
+# Columnas del dataframe estándar. Cada una se corresponde con un atributo de la clase Logs.
+COLUMNS = ['priority', 'protocol_ver', 'timestamp', 'host_name', 'app_name', 'process_id', 'message_id', 'struct_data', 'message']
+
+# Origen de tiempos para la conversión de timestamps a enteros de nanosegundos.
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Valor que representa un entero ausente (None) en las columnas numéricas.
+MISSING = -1
+
+# Tipo de los arrays de cada columna numérica, con la notación del módulo array y su equivalente en NumPy.
+NUMERIC_COLUMNS = {
+    'timestamp': ('q', np.int64),
+    'priority': ('h', np.int16),
+    'protocol_ver': ('b', np.int8),
+    'process_id': ('i', np.int32),
+}
+
+# Máximo de los pids. Los negativos o mayores, que solo aparecen en líneas corruptas o manipuladas, se guardan como
+# MISSING en lugar de interrumpir el procesamiento.
+PROCESS_ID_LIMIT = int(np.iinfo(np.int32).max)
+
+# Columnas de texto codificadas como diccionario: cada valor se guarda como un código int32 que indexa la lista de
+# valores distintos de la columna. El código MISSING representa None.
+ENCODED_COLUMNS = ['host_name', 'app_name', 'message_id']
+
+# Campos tipados que solo tienen las filas de algunos formatos (los de Squid, véase squid.py). Columnas numéricas, con
+# su tipo como en NUMERIC_COLUMNS, y columnas de texto codificadas como diccionario: estado HTTP, código de resultado de
+# Squid o acción de store.log, método HTTP, host de la URL y agente de usuario de useragent_log.
+FIELD_COLUMNS = {
+    'elapsed_ms': ('i', np.int32),
+    'bytes': ('q', np.int64),
+}
+FIELD_ENCODED_COLUMNS = ['status', 'result', 'method', 'url_host', 'user_agent']
+FIELDS = list(FIELD_COLUMNS) + FIELD_ENCODED_COLUMNS
+
+# Máximo de cada columna numérica de los campos. Los valores negativos o mayores se guardan como MISSING.
+FIELD_LIMITS = {column: int(np.iinfo(dtype).max) for column, (_, dtype) in FIELD_COLUMNS.items()}
+
+UTC = pd.DatetimeTZDtype('ns', 'UTC')
+
+
+def timestamp_array(nanoseconds: np.ndarray) -> pd.arrays.DatetimeArray:
+    """
+    :param nanoseconds: Array int64 de nanosegundos desde la época (UTC).
+    :return: Array de pandas con los timestamps en UTC.
+
+    Construcción del array de timestamps de un dataframe con la API pública de pandas: la vista datetime64[ns] se
+    interpreta directamente en UTC, sin conversión de zona horaria. pandas copia los datos una vez (8 bytes por fila).
+    """
+    return pd.array(nanoseconds.view('M8[ns]'), dtype=UTC)
+
+
+def recode(values: Dict[str, int], other: Iterable[str], codes: np.ndarray) -> np.ndarray:
+    """
+    :param values: Diccionario de destino (valor -> código), que se amplía con los valores nuevos.
+    :param other: Valores del diccionario de origen, en el orden de sus códigos.
+    :param codes: Códigos en el diccionario de origen, con MISSING para los valores ausentes.
+    :return: Códigos int32 de los mismos valores en el diccionario de destino.
+    """
+    mapping = np.array([values.setdefault(value, len(values)) for value in other] + [MISSING], dtype=np.int32)
+    # El código MISSING (-1) selecciona el último elemento de mapping, que es el propio MISSING.
+    return mapping[codes]
+
+
+class SparseFields:
+    # Campos tipados (véase FIELDS) de las filas de un lote que los tienen. Como struct_data, solo se guardan para esas
+    # filas: su posición en el lote y, para cada una, una columna por campo, numérica o de diccionario como las del
+    # propio lote.
+
+    def __init__(self):
+        self.rows = array.array('q')
+        self.numeric: Dict[str, array.array] = {column: array.array(code) for column, (code, _) in FIELD_COLUMNS.items()}
+        self.codes: Dict[str, array.array] = {column: array.array('i') for column in FIELD_ENCODED_COLUMNS}
+        self.values: Dict[str, Dict[str, int]] = {column: {} for column in FIELD_ENCODED_COLUMNS}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, row: int, fields: Dict):
+        """
+        :param row: Posición de la fila en el lote, posterior a las de las filas ya incluidas.
+        :param fields: Valores de los campos de la fila. Los que no se indican quedan ausentes.
+        """
+        self.rows.append(row)
+        for column, values in self.numeric.items():
+            value = fields.get(column)
+            values.append(value if value is not None and 0 <= value <= FIELD_LIMITS[column] else MISSING)
+        for column, codes in self.codes.items():
+            value = fields.get(column)
+            if value is None:
+                codes.append(MISSING)
+            else:
+                values = self.values[column]
+                codes.append(values.setdefault(value, len(values)))
+
+    def add_columns(self, rows: np.ndarray, **columns):
+        """
+        :param rows: Posiciones de las filas en el lote, en orden y posteriores a las de las filas ya incluidas.
+        :param columns: Columnas de los campos, como en LogBatch.from_columns: arrays de enteros para las de
+            FIELD_COLUMNS, con MISSING para los valores ausentes, y secuencias de textos (o None) para las de
+            FIELD_ENCODED_COLUMNS. Las columnas que no se indican quedan ausentes.
+        """
+        count = len(rows)
+        self.rows.frombytes(np.asarray(rows, dtype=np.int64).tobytes())
+        for column, (_, dtype) in FIELD_COLUMNS.items():
+            values = columns.get(column)
+            values = np.full(count, MISSING) if values is None else values
+            self.numeric[column].frombytes(np.asarray(values, dtype=dtype).tobytes())
+        for column in FIELD_ENCODED_COLUMNS:
+            values = columns.get(column)
+            if values is None:
+                codes = np.full(count, MISSING, dtype=np.int32)
+            else:
+                codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+                codes = recode(self.values[column], uniques, codes)
+            self.codes[column].frombytes(codes.tobytes())
+
+    def extend(self, other: 'SparseFields', offset: int):
+        """
+        :param other: Campos de las filas de otro lote.
+        :param offset: Posición de la primera fila del otro lote en este.
+        """
+        self.rows.frombytes((other.rows_array() + offset).tobytes())
+        for column, values in self.numeric.items():
+            values.extend(other.numeric[column])
+        for column in FIELD_ENCODED_COLUMNS:
+            self.codes[column].frombytes(recode(self.values[column], other.values[column],
+                                                other.column_array(column)).tobytes())
+
+    def sort(self):
+        # Ordenación por posición de las filas, tras unir los campos de filas intercaladas.
+        order = np.argsort(self.rows_array(), kind='stable')
+        if np.all(order[1:] > order[:-1]):
+            return
+        self.rows = array.array('q', self.rows_array()[order].tobytes())
+        for column, values in self.numeric.items():
+            self.numeric[column] = array.array(values.typecode, self.column_array(column)[order].tobytes())
+        for column, codes in self.codes.items():
+            self.codes[column] = array.array('i', self.column_array(column)[order].tobytes())
+
+    def rows_array(self) -> np.ndarray:
+        """
+        :return: Vista NumPy, sin copia, de las posiciones de las filas con campos.
+        """
+        return np.frombuffer(self.rows, dtype=np.int64)
+
+    def column_array(self, column: str) -> np.ndarray:
+        """
+        :param column: Nombre de uno de los campos de FIELDS.
+        :return: Vista NumPy, sin copia, de los valores de la columna, o de sus códigos si es de texto.
+        """
+        if column in FIELD_COLUMNS:
+            return np.frombuffer(self.numeric[column], dtype=FIELD_COLUMNS[column][1])
+        return np.frombuffer(self.codes[column], dtype=np.int32)
+
+    def nbytes(self) -> int:
+        size = self.rows.itemsize * len(self.rows)
+        size += sum(values.itemsize * len(values) for values in self.numeric.values())
+        size += sum(codes.itemsize * len(codes) for codes in self.codes.values())
+        return size + sum(len(value) for values in self.values.values() for value in values)
+
+    def columns(self, rows: int = None) -> Dict[str, pd.api.extensions.ExtensionArray]:
+        """
+        :param rows: Número de filas del lote. Si se indica, las columnas tienen una posición por fila del lote, con
+            valores ausentes en las que no tienen campos; si no, una por fila con campos.
+        :return: Columnas de pandas de los campos: enteros con valores ausentes y categóricas.
+        """
+        positions = self.rows_array() if rows is not None else slice(None)
+        count = len(self) if rows is None else rows
+        data = {}
+        for column in FIELDS:
+            values = np.full(count, MISSING, dtype=FIELD_COLUMNS[column][1] if column in FIELD_COLUMNS else np.int32)
+            values[positions] = self.column_array(column)
+            if column in FIELD_COLUMNS:
+                data[column] = pd.arrays.IntegerArray(values, values == MISSING)
+            else:
+                data[column] = pd.Categorical.from_codes(values, list(self.values[column]))
+        return data
+
+
+class LogBatch:
+    # Contenedor columnar de logs procesados. Sustituye a las listas de instancias de Logs: los procesadores escriben
+    # los campos de cada línea directamente en arrays tipados (timestamps en nanosegundos UTC, prioridad y pid) y en
+    # columnas codificadas como diccionario (host_name, app_name y message_id), por lo que el coste por línea se reduce
+    # a unos pocos bytes más el texto del mensaje.
+
+    def __init__(self):
+        self.numeric: Dict[str, array.array] = {column: array.array(code) for column, (code, _) in NUMERIC_COLUMNS.items()}
+        self.codes: Dict[str, array.array] = {column: array.array('i') for column in ENCODED_COLUMNS}
+        self.values: Dict[str, Dict[str, int]] = {column: {} for column in ENCODED_COLUMNS}
+        self.message: List[str] = []
+        # Los datos estructurados casi siempre están vacíos, por lo que solo se guardan los de las filas que los tienen.
+        self.struct_data: Dict[int, Dict] = {}
+        # Igual con los campos tipados, que solo tienen las filas de algunos formatos.
+        self.fields = SparseFields()
+        # Código de plantilla y parámetros del mensaje de cada fila, una vez minado el lote (véase mine).
+        self.template: Optional[array.array] = None
+        self.params: Optional[List[str]] = None
+        # Número de registros que no encajaban con el formato y se han omitido al construir el lote.
+        self.failures = 0
+
+    def __len__(self):
+        return len(self.message)
+
+    def append(self, timestamp: datetime.datetime, message: str = None, priority: int = None, protocol_ver: int = 1,
+               host_name: str = None, app_name: str = None, process_id: int = None, message_id: str = None,
+               struct_data: Dict = None, typed_fields: Dict = None):
+        """
+        :param timestamp: Instante del log, con zona horaria.
+        :param message: Mensaje del log.
+        :param typed_fields: Valores de los campos tipados de FIELDS de la línea, si los tiene.
+
+        Incorporación de una línea procesada al lote. Los argumentos son los campos de la clase Logs, de forma que el
+        diccionario que devuelve Logs.fields puede pasarse directamente con append(**fields).
+        """
+        if struct_data:
+            self.struct_data[len(self.message)] = struct_data
+        if typed_fields:
+            self.fields.append(len(self.message), typed_fields)
+        numeric = self.numeric
+        numeric['timestamp'].append((timestamp - EPOCH) // MICROSECOND * 1000)
+        numeric['priority'].append(MISSING if priority is None else int(priority))
+        numeric['protocol_ver'].append(MISSING if protocol_ver is None else int(protocol_ver))
+        process_id = MISSING if process_id is None else int(process_id)
+        numeric['process_id'].append(process_id if 0 <= process_id <= PROCESS_ID_LIMIT else MISSING)
+        for column, value in (('host_name', host_name), ('app_name', app_name), ('message_id', message_id)):
+            if value is None:
+                self.codes[column].append(MISSING)
+            else:
+                values = self.values[column]
+                self.codes[column].append(values.setdefault(value, len(values)))
+        self.message.append(message)
+
+    def extend(self, other: 'LogBatch'):
+        """
+        :param other: Lote cuyas filas se añaden al final de este.
+
+        Unión de dos lotes, recodificando las columnas de diccionario de other con los códigos de este lote.
+        """
+        offset = len(self)
+        for column, values in self.numeric.items():
+            values.extend(other.numeric[column])
+        for column in ENCODED_COLUMNS:
+            self.codes[column].frombytes(recode(self.values[column], other.values[column],
+                                                other.codes_array(column)).tobytes())
+        self.message.extend(other.message)
+        self.struct_data.update({offset + row: value for row, value in other.struct_data.items()})
+        self.fields.extend(other.fields, offset)
+        # Las plantillas solo se conservan si están minadas todas las filas.
+        if other.template is not None and (self.template is not None or not offset):
+            if self.template is None:
+                self.template, self.params = array.array('i'), []
+            self.template.extend(other.template)
+            self.params.extend(other.params)
+        elif len(other):
+            self.template = self.params = None
+        self.failures += other.failures
+
+    @classmethod
+    def from_columns(cls, timestamp: np.ndarray, message: List[str], typed_fields: SparseFields = None,
+                     **columns) -> 'LogBatch':
+        """
+        :param timestamp: Nanosegundos UTC de cada fila.
+        :param message: Mensaje de cada fila.
+        :param typed_fields: Campos tipados de las filas que los tienen, con sus posiciones en el lote.
+        :param columns: Resto de columnas. Las de NUMERIC_COLUMNS son arrays de enteros, con MISSING para los valores
+            ausentes; las de ENCODED_COLUMNS son secuencias de textos (o None) o un único texto común a todas las filas.
+            Las columnas que no se indican quedan ausentes, salvo protocol_ver, que vale 1 como en Logs.
+        :return: Lote con las filas indicadas.
+
+        Construcción de un lote a partir de columnas completas, sin pasar fila a fila por append. La usan los
+        procesadores que decodifican sus ficheros en bloque.
+        """
+        batch = cls()
+        rows = len(message)
+        for column, (_, dtype) in NUMERIC_COLUMNS.items():
+            if column == 'timestamp':
+                values = timestamp
+            else:
+                values = columns.get(column, np.full(rows, 1 if column == 'protocol_ver' else MISSING))
+            batch.numeric[column].frombytes(np.asarray(values, dtype=dtype).tobytes())
+        for column in ENCODED_COLUMNS:
+            values = columns.get(column)
+            if values is None:
+                codes = np.full(rows, MISSING, dtype=np.int32)
+            elif isinstance(values, str):
+                batch.values[column][values] = 0
+                codes = np.zeros(rows, dtype=np.int32)
+            else:
+                # factorize asigna el código -1 (MISSING) a los valores ausentes.
+                codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+                batch.values[column].update((value, code) for code, value in enumerate(uniques))
+            batch.codes[column].frombytes(np.asarray(codes, dtype=np.int32).tobytes())
+        batch.message.extend(message)
+        if typed_fields is not None:
+            batch.fields = typed_fields
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Iterable['LogBatch']) -> 'LogBatch':
+        """
+        :param batches: Lotes que se quieren unir.
+        :return: Lote con las filas de todos los lotes, en orden.
+        """
+        result = cls()
+        for batch in batches:
+            result.extend(batch)
+        return result
+
+    def mine(self, miner: 'TemplateMiner'):
+        """
+        :param miner: Minado de plantillas del almacén al que van destinadas las filas.
+
+        Codificación de los mensajes del lote como plantilla y parámetros (véase templates.py). Se hace al procesar
+        cada lote, de forma que el almacén recibe los mensajes ya codificados y no tiene que minarlos al escribirlos.
+        """
+        if self.template is None:
+            templates, self.params = miner.encode(self.message)
+            self.template = array.array('i', templates.tobytes())
+
+    def column_array(self, column: str) -> np.ndarray:
+        """
+        :param column: Nombre de una de las columnas de NUMERIC_COLUMNS.
+        :return: Vista NumPy, sin copia, del array de la columna.
+        """
+        return np.frombuffer(self.numeric[column], dtype=NUMERIC_COLUMNS[column][1])
+
+    def codes_array(self, column: str) -> np.ndarray:
+        """
+        :param column: Nombre de una de las columnas de ENCODED_COLUMNS.
+        :return: Vista NumPy, sin copia, de los códigos de la columna.
+        """
+        return np.frombuffer(self.codes[column], dtype=np.int32)
+
+    def categories(self, column: str) -> List[str]:
+        """
+        :param column: Nombre de una de las columnas de ENCODED_COLUMNS.
+        :return: Valores distintos de la columna, en el orden de sus códigos.
+        """
+        return list(self.values[column])
+
+    def nbytes(self) -> int:
+        """
+        :return: Tamaño aproximado en bytes del lote, incluidos los textos de los mensajes y de los diccionarios.
+        """
+        size = sum(values.itemsize * len(values) for values in self.numeric.values())
+        size += sum(codes.itemsize * len(codes) for codes in self.codes.values())
+        size += sum(len(value) for values in self.values.values() for value in values)
+        size += sum(len(message) for message in self.message if message is not None)
+        if self.template is not None:
+            size += self.template.itemsize * len(self.template) + sum(len(params) for params in self.params)
+        return size + self.fields.nbytes()
+
+    def to_frame(self, struct_data: bool = True) -> pd.DataFrame:
+        """
+        :param struct_data: Si se incluye la columna struct_data, que se reconstruye como un diccionario por fila.
+        :return: Dataframe con las columnas de COLUMNS y las de los campos tipados de FIELDS, más template y params si
+            el lote está minado.
+
+        Conversión del lote a un dataframe. Los enteros se exponen sobre los propios arrays del lote, sin copiarlos, y
+        los timestamps con una única copia (timestamp_array); las columnas de diccionario se convierten en categóricas,
+        cuyos códigos pandas reduce al tipo entero más pequeño posible. Los campos tipados se expanden a una posición
+        por fila, con valores ausentes en las filas que no los tienen.
+        """
+        data = {}
+        for column in COLUMNS:
+            if column == 'timestamp':
+                # Array de pandas sobre los nanosegundos del lote, sin conversión de zona horaria.
+                data[column] = timestamp_array(self.column_array(column))
+            elif column in NUMERIC_COLUMNS:
+                values = self.column_array(column)
+                data[column] = pd.arrays.IntegerArray(values, values == MISSING)
+            elif column in ENCODED_COLUMNS:
+                data[column] = pd.Categorical.from_codes(self.codes_array(column), self.categories(column))
+            elif column == 'struct_data':
+                if struct_data:
+                    data[column] = pd.Series([self.struct_data.get(row, {}) for row in range(len(self))], dtype=object)
+            else:
+                data[column] = pd.Series(self.message, dtype=object)
+        data.update(self.fields.columns(len(self)))
+        if self.template is not None:
+            data['template'] = np.frombuffer(self.template, dtype=np.int32)
+            data['params'] = pd.Series(self.params, dtype=object)
+        return pd.DataFrame(data, copy=False)
+
+
+def parse_batches(logs: Iterable[str], fields: Callable[[str], Dict], batch_size: int) -> Iterator[LogBatch]:
+    """
+    :param logs: Iterable con las líneas de un fichero fuente de log.
+    :param fields: Función que convierte una línea en el diccionario de sus campos (véase Logs.fields_for_file).
+    :param batch_size: Número máximo de líneas por lote.
+    :return: Iterador de lotes columnares de, como mucho, batch_size líneas.
+
+    Procesamiento de un flujo de líneas escribiendo sus campos directamente en lotes columnares, sin crear instancias
+    de Logs. Las líneas que no encajan con el formato se omiten, igual que en parse_logs, y se cuentan en el atributo
+    failures del lote en curso. Si las últimas líneas no encajan, se entrega un lote vacío con su recuento.
+    """
+    batch = LogBatch()
+    for log in logs:
+        try:
+            batch.append(**fields(log))
+        except AttributeError:
+            batch.failures += 1
+            continue
+        if len(batch) >= batch_size:
+            yield batch
+            batch = LogBatch()
+    if len(batch) or batch.failures:
+        yield batch
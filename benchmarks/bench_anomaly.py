@@ -0,0 +1,51 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from anomaly import ANOMALY_DIR, AnomalyDetector
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+
+# Benchmark de los detectores de ráfagas de anomaly.py con el conjunto de datos original y con copias desplazadas en el
+# tiempo (véase bench_query.py), recorridas en lotes como en la ingesta incremental. Muestra las filas por segundo, el
+# tamaño del estado guardado, que depende del número de aplicaciones y no del de filas, hosts o IPs, y las ventanas
+# detectadas.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_anomaly [--scales 1,4] [--batch-rows 100000]
+
+
+def state_size(store_path: str) -> int:
+    directory = os.path.join(store_path, ANOMALY_DIR)
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Detectores de ráfagas sobre los datos originales y desplazados.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--scales', default='1,4')
+    parser.add_argument('--batch-rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir))
+    period = frame['timestamp'].max() - frame['timestamp'].min() + pd.Timedelta(days=1)
+    print(f'{"escala":>7} {"filas":>10} {"filas/s":>10} {"estado (KiB)":>13} {"ventanas":>9}')
+    for scale in map(int, args.scales.split(',')):
+        with tempfile.TemporaryDirectory() as directory:
+            detector = AnomalyDetector()
+            seconds = 0.0
+            for copy in range(scale):
+                shifted = frame if copy == 0 else frame.assign(timestamp=frame['timestamp'] + copy * period)
+                for start in range(0, len(shifted), args.batch_rows):
+                    batch = shifted.iloc[start:start + args.batch_rows]
+                    begin = time.perf_counter()
+                    detector.observe(batch['timestamp'].array.asi8, batch['app_name'], batch['host_name'],
+                                     batch['message'])
+                    seconds += time.perf_counter() - begin
+            detector.save(directory)
+            # Los arrays de estado no crecen con las filas; solo la lista de ventanas detectadas.
+            windows = len(detector.to_frame())
+            rows = len(frame) * scale
+            print(f'{scale:>7} {rows:>10} {rows / seconds:>10.0f} {state_size(directory) / 1024:>13.1f} '
+                  f'{windows:>9}')
@@ -0,0 +1,85 @@
+import argparse
+import itertools
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from correlate import SOURCES, CorrelationJoin, normalize_key
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from store import save_store
+
+# Benchmark de la correlación por clave y ventana de tiempo de correlate.py (mezcla ordenada de los flujos de cada
+# fuente, con y sin la pasada previa de claves compartidas) frente a un merge de pandas por clave de cada par de fuentes
+# filtrado después por la diferencia de tiempo, con el conjunto de datos original. Ambos deben encontrar el mismo
+# número de pares. Muestra el tiempo, el pico de memoria de Python (tracemalloc, en una segunda ejecución, porque su
+# coste por objeto falsearía el tiempo del recorrido evento a evento) y, en la correlación, el máximo de eventos
+# conservados en la ventana.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_correlate [--window 60]
+
+DEFAULT_SOURCES = ['sshd', 'squid', 'httpd', 'mod_security']
+
+
+def measured(function) -> tuple:
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def source_frame(data: pd.DataFrame, name: str) -> pd.DataFrame:
+    # Eventos de una fuente con sus claves, obtenidos de la tabla completa como se haría sin el almacén.
+    source = SOURCES[name]
+    rows = data[data['app_name'].isin(source.app_name)]
+    if source.pattern is None:
+        keys = rows['host_name'].astype(object)
+    else:
+        keys = rows['message'].str.extract(source.pattern)[0]
+    rows = pd.DataFrame({'key': keys, 'timestamp': rows['timestamp']}).dropna(subset=['key'])
+    rows['key'] = rows['key'].map(normalize_key)
+    return rows
+
+
+def merge_pairs(data: pd.DataFrame, names: list, window: float) -> int:
+    frames = {name: source_frame(data, name) for name in names}
+    total = 0
+    for left, right in itertools.combinations(names, 2):
+        merged = frames[left].merge(frames[right], on='key')
+        delta = (merged['timestamp_x'] - merged['timestamp_y']).abs()
+        total += int((delta <= pd.Timedelta(seconds=window)).sum())
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Correlación por ventana de tiempo frente a merge de pandas.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--window', type=float, default=60.0)
+    parser.add_argument('--source', action='append', default=None)
+    args = parser.parse_args()
+    names = args.source or DEFAULT_SOURCES
+
+    frame = build_frame(ingest_logs(args.log_dir))
+    with tempfile.TemporaryDirectory() as directory:
+        store = save_store(frame, os.path.join(directory, 'store'))
+        data = store.to_frame(columns=['timestamp', 'host_name', 'app_name', 'message'])
+        events = {name: len(source_frame(data, name)) for name in names}
+        print(f'filas: {len(store)}, ventana: {args.window:g} s, eventos por fuente: '
+              f'{", ".join(f"{name} {count}" for name, count in events.items())}')
+
+        print(f'{"método":>36} {"pares":>8} {"tiempo (s)":>11} {"pico (MiB)":>11} {"ventana máx.":>13}')
+        expected, seconds, peak = measured(lambda: merge_pairs(data, names, args.window))
+        print(f'{"merge de pandas por clave":>36} {expected:>8} {seconds:>11.2f} {peak / 2 ** 20:>11.1f} {"-":>13}')
+        for prefilter in (False, True):
+            join = CorrelationJoin(store, names, args.window)
+            pairs, seconds, peak = measured(lambda: sum(1 for _ in join.pairs(prefilter=prefilter)))
+            label = 'mezcla ordenada' + (' (claves compartidas)' if prefilter else '')
+            print(f'{label:>36} {pairs:>8} {seconds:>11.2f} {peak / 2 ** 20:>11.1f} {join.max_buffered:>13}')
+            if pairs != expected:
+                raise AssertionError(f'{label}: {pairs} pares frente a {expected} con merge')
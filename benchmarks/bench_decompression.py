@@ -0,0 +1,57 @@
+import argparse
+import gzip
+import os.path
+import shutil
+import tempfile
+import time
+
+from main import LOG_DIR, read_logs, read_many
+
+# Benchmark de la lectura de los logs comprimidos de Squid: descompresión en streaming con read_many frente a la
+# descompresión previa a un directorio descomprimidos, como hacían los primeros scripts del proyecto.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_decompression [--max-workers N]
+
+SQUID_DIR = os.path.join(LOG_DIR, 'squid')
+
+
+def streaming(log_files, workers):
+    return sum(1 for _, lines in read_many(log_files, workers) for _ in lines)
+
+
+def predecompressed(log_files, tmp_dir):
+    target_dir = os.path.join(tmp_dir, 'descomprimidos')
+    os.makedirs(target_dir)
+    targets = []
+    for log_file in log_files:
+        target = os.path.join(target_dir, os.path.basename(log_file)[:-len('.gz')])
+        with gzip.open(log_file, 'rb') as src, open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        targets.append(target)
+    lines = sum(1 for target in targets for _ in read_logs(target))
+    disk = sum(os.path.getsize(target) for target in targets)
+    return lines, disk
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Descompresión en streaming frente a descompresión previa.')
+    parser.add_argument('--max-workers', type=int, default=max(os.cpu_count(), 4))
+    args = parser.parse_args()
+
+    log_files = sorted(os.path.join(SQUID_DIR, file) for file in os.listdir(SQUID_DIR) if file.endswith('.gz'))
+    compressed = sum(os.path.getsize(log_file) for log_file in log_files)
+    print(f'{len(log_files)} ficheros, {compressed / 2 ** 20:.1f} MiB comprimidos')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        (lines, disk), elapsed = timed(predecompressed, log_files, tmp_dir)
+    print(f'{"descomprimidos":>22}: {elapsed:7.3f} s, {lines} líneas, {disk / 2 ** 20:.1f} MiB extra en disco')
+
+    for workers in range(1, args.max_workers + 1):
+        streamed, elapsed = timed(streaming, log_files, workers)
+        assert streamed == lines
+        print(f'{f"streaming ({workers} hilos)":>22}: {elapsed:7.3f} s, {streamed} líneas, 0.0 MiB extra en disco')
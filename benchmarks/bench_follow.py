@@ -0,0 +1,156 @@
+import argparse
+import multiprocessing
+import os
+import os.path
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from batch import LogBatch
+from follow import FLUSH_INTERVAL, Follower, StoreSink
+from store import LogStore
+
+# Benchmark del seguimiento continuo: un proceso escritor añade líneas syslog a un fichero a un ritmo fijo, con el
+# instante de escritura en el mensaje, y lo rota (renombrado y creación de uno nuevo) a mitad de la prueba. El seguidor
+# entrega microlotes a un destino que mide el retraso de cada fila. Se comparan inotify y sondeo y, con inotify, el
+# destino real StoreSink con distintos intervalos de escritura: número de escrituras y de bloques, tiempo de cada
+# escritura y retraso hasta que cada fila queda en el almacén.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_follow
+
+LINE = '{timestamp} bench writer[{pid}]: seq={seq} written={written:.6f}\n'
+
+
+def write_lines(path: str, rate: int, duration: float):
+    """
+    :param path: Fichero en el que se escriben las líneas.
+    :param rate: Líneas por segundo.
+    :param duration: Duración de la escritura en segundos.
+
+    Escritor sintético. Escribe en ráfagas de 10 ms para mantener el ritmo sin una llamada al sistema por línea y rota
+    el fichero cuando ha pasado la mitad del tiempo.
+    """
+    start = time.monotonic()
+    total = int(rate * duration)
+    seq, rotated = 0, False
+    file = open(path, 'a')
+    while seq < total:
+        elapsed = time.monotonic() - start
+        if not rotated and elapsed >= duration / 2:
+            file.close()
+            os.rename(path, path + '.1')
+            file = open(path, 'a')
+            rotated = True
+        target = min(total, int(elapsed * rate))
+        now = time.time()
+        timestamp = time.strftime('%b %d %H:%M:%S', time.localtime(now))
+        file.write(''.join(LINE.format(timestamp=timestamp, pid=os.getpid(), seq=i, written=now)
+                           for i in range(seq, target)))
+        file.flush()
+        seq = max(seq, target)
+        time.sleep(0.01)
+    file.close()
+
+
+class LatencySink:
+    # Destino que calcula, para cada fila recibida, el tiempo transcurrido desde su escritura.
+
+    def __init__(self):
+        self.latencies = []
+        self.sequences = []
+
+    def __call__(self, batch: LogBatch):
+        now = time.time()
+        for message in batch.message:
+            seq, written = message.split()
+            self.sequences.append(int(seq[4:]))
+            self.latencies.append(now - float(written[8:]))
+
+
+class MeasuredStoreSink(StoreSink):
+    # StoreSink que además mide el retraso de entrega de cada fila, el tiempo de cada escritura y el retraso de cada
+    # fila hasta que queda escrita en el almacén.
+
+    def __init__(self, path: str, flush_interval: float):
+        super().__init__(path, flush_interval)
+        self.delivery = LatencySink()
+        self.flush_seconds = []
+        self.stored_latencies = []
+
+    def __call__(self, batch: LogBatch):
+        self.delivery(batch)
+        super().__call__(batch)
+
+    def flush(self):
+        messages = self.builder.batch.message
+        start = time.perf_counter()
+        super().flush()
+        if messages:
+            self.flush_seconds.append(time.perf_counter() - start)
+            now = time.time()
+            self.stored_latencies.extend(now - float(message.split()[1][8:]) for message in messages)
+
+
+def follow(sink, polling: bool, rate: int, duration: float, path: str) -> Follower:
+    """
+    :return: Seguidor ya terminado, tras seguir path mientras el escritor sintético escribe en él.
+    """
+    open(path, 'w').close()
+    follower = Follower([path], sink, polling=polling)
+    thread = threading.Thread(target=follower.run)
+    thread.start()
+    writer = multiprocessing.Process(target=write_lines, args=(path, rate, duration))
+    writer.start()
+    writer.join()
+    # Margen para que el seguidor entregue las últimas líneas.
+    time.sleep(1.0)
+    follower.stop()
+    thread.join()
+    return follower
+
+
+def run(polling: bool, rate: int, duration: float):
+    with tempfile.TemporaryDirectory() as directory:
+        # El nombre del fichero determina su procesador: cron se procesa con UnixLogs.
+        path = os.path.join(directory, 'cron')
+        sink = LatencySink()
+        start = time.perf_counter()
+        follower = follow(sink, polling, rate, duration, path)
+        seconds = time.perf_counter() - start
+        latencies = np.array(sink.latencies)
+        missing = int(rate * duration) - len(set(sink.sequences))
+        print(f'{type(follower.watcher).__name__:>15} {len(latencies):>8} {missing:>9} {len(latencies) / seconds:>10.0f} '
+              f'{follower.stats["batches"]:>9} {np.percentile(latencies, 50) * 1000:>9.1f} '
+              f'{np.percentile(latencies, 99) * 1000:>9.1f} {latencies.max() * 1000:>9.1f}')
+
+
+def run_store(flush_interval: float, rate: int, duration: float):
+    with tempfile.TemporaryDirectory() as directory:
+        sink = MeasuredStoreSink(os.path.join(directory, 'store'), flush_interval)
+        follow(sink, False, rate, duration, os.path.join(directory, 'cron'))
+        sink.flush()
+        store = LogStore(sink.store.path)
+        assert len(store) == len(sink.delivery.latencies)
+        delivery, stored = np.array(sink.delivery.latencies), np.array(sink.stored_latencies)
+        print(f'{flush_interval:>13.1f} {len(store):>8} {len(sink.flush_seconds):>10} {len(store.blocks):>8} '
+              f'{np.mean(sink.flush_seconds) * 1000:>13.1f} {np.percentile(delivery, 99) * 1000:>16.1f} '
+              f'{np.percentile(stored, 50):>15.2f} {stored.max():>15.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Retraso y ritmo del seguimiento continuo.')
+    parser.add_argument('--rate', type=int, default=5000, help='Líneas por segundo del escritor.')
+    parser.add_argument('--duration', type=float, default=10.0, help='Duración de la escritura en segundos.')
+    args = parser.parse_args()
+
+    print(f'{"mecanismo":>15} {"filas":>8} {"perdidas":>9} {"filas/s":>10} {"microlotes":>9} {"p50 (ms)":>9} '
+          f'{"p99 (ms)":>9} {"máx (ms)":>9}')
+    for polling in (False, True):
+        run(polling, args.rate, args.duration)
+
+    print(f'\n{"escritura (s)":>13} {"filas":>8} {"escrituras":>10} {"bloques":>8} {"ms/escritura":>13} '
+          f'{"p99 entrega (ms)":>16} {"p50 almacén (s)":>15} {"máx almacén (s)":>15}')
+    # Intervalo de StoreSink frente a uno más largo, con menos escrituras y bloques pero más retraso hasta el almacén.
+    for flush_interval in (FLUSH_INTERVAL, 5.0):
+        run_store(flush_interval, args.rate, args.duration)
@@ -0,0 +1,46 @@
+import argparse
+import time
+import warnings
+
+import pandas as pd
+
+from batch import COLUMNS
+from frames import build_frame
+from main import LOG_DIR
+from parallel import list_log_files, parse_file
+
+# Benchmark del tiempo de construcción del dataframe global según el número de ficheros: concatenación acumulada con
+# pd.concat y ordenación final (camino anterior de main.py) frente a FrameBuilder.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_frames [--counts 10 50 100 ...]
+
+
+def concat_build(batches):
+    global_df = pd.DataFrame(columns=COLUMNS)
+    for batch in batches:
+        global_df = pd.concat([global_df, batch.to_frame()], ignore_index=True)
+    return global_df.sort_values(by='timestamp', kind='stable')
+
+
+def timed(function, batches):
+    start = time.perf_counter()
+    df = function(batches)
+    return df, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Construcción del dataframe global según el número de ficheros.')
+    parser.add_argument('--counts', type=int, nargs='*', default=[10, 25, 50, 100, 200, 400])
+    args = parser.parse_args()
+    warnings.simplefilter('ignore', FutureWarning)
+
+    # Los ficheros se procesan una sola vez; para los tamaños mayores que el dataset se repiten sus lotes.
+    batches = [batch for batch in map(parse_file, list_log_files(LOG_DIR)) if batch is not None and len(batch)]
+
+    print(f'{"ficheros":>8} {"filas":>9} {"pd.concat (s)":>13} {"FrameBuilder (s)":>16}')
+    for count in args.counts:
+        selected = [batches[i % len(batches)] for i in range(count)]
+        concat_df, concat_time = timed(concat_build, selected)
+        built_df, built_time = timed(build_frame, selected)
+        assert len(concat_df) == len(built_df)
+        assert (concat_df['timestamp'].to_numpy() == built_df['timestamp'].to_numpy()).all()
+        print(f'{count:>8} {len(built_df):>9} {concat_time:>13.3f} {built_time:>16.3f}')
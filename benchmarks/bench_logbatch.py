@@ -0,0 +1,56 @@
+import argparse
+import os.path
+import time
+import tracemalloc
+
+import pandas as pd
+
+from batch import COLUMNS, LogBatch, parse_batches
+from main import LOG_DIR, find_parser, parse_logs, read_logs
+
+# Benchmark de LogBatch frente a la construcción anterior del dataframe a partir de instancias de Logs: bytes por
+# registro (pico de memoria durante la construcción y tamaño del dataframe final) y tiempo de construcción.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_logbatch [ficheros...]
+
+DEFAULT_FILES = ['cron.3', 'squid/access.log.1.gz', 'squid/store.log.1.gz', 'cups/error_log.1']
+
+
+def build_from_instances(lines, parser_class, path):
+    # Camino anterior: una instancia de Logs por línea y una lista por columna.
+    logs = list(parse_logs(lines, parser_class.for_file(path)))
+    return pd.DataFrame({column: [getattr(log, column) for log in logs] for column in COLUMNS})
+
+
+def build_from_batch(lines, parser_class, path):
+    batch = LogBatch.concat(parse_batches(lines, parser_class.fields_for_file(path), len(lines)))
+    return batch.to_frame()
+
+
+def measure(build, lines, parser_class, path):
+    # El tiempo se mide sin tracemalloc activo, que ralentiza cada reserva de memoria.
+    start = time.perf_counter()
+    build(lines, parser_class, path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    df = build(lines, parser_class, path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LogBatch frente a instancias de Logs.')
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help='Ficheros relativos a LOG_DIR.')
+    args = parser.parse_args()
+
+    print(f'{"fichero":>22} {"camino":>10} {"líneas":>8} {"tiempo (s)":>10} {"pico B/reg":>11} {"df B/reg":>9}')
+    for file in args.files:
+        path = os.path.join(LOG_DIR, file)
+        parser_class = find_parser(os.path.basename(path))
+        lines = list(read_logs(path))
+        for name, build in (('Logs', build_from_instances), ('LogBatch', build_from_batch)):
+            df, elapsed, peak = measure(build, lines, parser_class, path)
+            records = len(df)
+            frame_bytes = df.memory_usage(deep=True).sum()
+            print(f'{file:>22} {name:>10} {records:>8} {elapsed:>10.3f} {peak / records:>11.0f} {frame_bytes / records:>9.0f}')
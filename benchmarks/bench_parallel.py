@@ -0,0 +1,36 @@
+import argparse
+import os
+import time
+
+from main import LOG_DIR
+from parallel import ingest_parallel
+
+# Benchmark de escalabilidad del procesamiento en paralelo de LOG_DIR con 1 a N procesos trabajadores.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_parallel [--max-workers N] [--repeat R]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Escalabilidad del procesamiento en paralelo de LOG_DIR.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    reference = None
+    baseline = None
+    print(f'{"workers":>7} {"best (s)":>9} {"speedup":>8} {"filas":>9}')
+    for workers in range(1, args.max_workers + 1):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            df = ingest_parallel(args.log_dir, workers)
+            times.append(time.perf_counter() - start)
+
+        # El resultado debe ser idéntico para cualquier número de trabajadores.
+        if reference is None:
+            reference = df
+        elif not reference.equals(df):
+            raise AssertionError(f'El resultado con {workers} trabajadores difiere del obtenido con 1')
+
+        best = min(times)
+        baseline = baseline or best
+        print(f'{workers:>7} {best:>9.3f} {baseline / best:>8.2f} {len(df):>9}')
@@ -0,0 +1,40 @@
+import argparse
+import os
+import time
+
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from pipeline import PipelineMetrics, ingest_pipeline
+
+# Benchmark del flujo por etapas frente a la ingesta secuencial de LOG_DIR. Para cada configuración se muestra el
+# tiempo total junto con la suma de los tiempos de trabajo de todas las etapas: en la ingesta secuencial el tiempo total
+# es esa suma, mientras que en el flujo por etapas se acerca al de la etapa más lenta.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_pipeline [--max-parse-workers N]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Flujo por etapas frente a ingesta secuencial.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--max-parse-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--year', type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    reference = build_frame(ingest_logs(args.log_dir, year=args.year))
+    sequential = time.perf_counter() - start
+
+    print(f'{"configuración":>22} {"total (s)":>10} {"suma etapas (s)":>16} {"etapa más lenta":>16} {"filas":>9}')
+    print(f'{"secuencial":>22} {sequential:>10.3f} {sequential:>16.3f} {"-":>16} {len(reference):>9}')
+    for parse_workers in range(0, args.max_parse_workers + 1):
+        metrics = PipelineMetrics()
+        start = time.perf_counter()
+        frame = ingest_pipeline(args.log_dir, year=args.year, parse_workers=parse_workers, metrics=metrics)
+        total = time.perf_counter() - start
+
+        # El resultado debe ser idéntico al de la ingesta secuencial.
+        if not reference.equals(frame):
+            raise AssertionError(f'El resultado con {parse_workers} procesos de procesamiento difiere del secuencial')
+
+        busy = sum(stats.busy for stats in metrics.stages.values()) + metrics.build_seconds
+        name = f'etapas, parse={parse_workers or "hilo"}'
+        print(f'{name:>22} {total:>10.3f} {busy:>16.3f} {metrics.bottleneck:>16} {len(frame):>9}')
+        print(metrics.to_frame().to_string(index=False, float_format=lambda value: f'{value:.3f}'))
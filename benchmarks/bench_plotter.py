@@ -0,0 +1,72 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from plotter import MAX_POINTS, downsample, render, render_figure
+from store import save_store
+
+# Benchmark de la generación de gráficas en ficheros de plotter.py. Con el conjunto de datos original compara render en
+# el propio proceso y en un pool de procesos, con la serie por minuto reducida y completa. Después dibuja series por
+# minuto sintéticas de longitud creciente (de días a años) con y sin reducción: con ella, el tiempo de dibujo debe
+# mantenerse constante.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_plotter [--workers 4]
+
+# Longitudes, en minutos, de las series sintéticas, que se guardan en PNG y en SVG.
+LENGTHS = [10_000, 100_000, 1_000_000, 4_000_000]
+
+
+def timed(function, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def synthetic_series(minutes: int) -> pd.Series:
+    # Recuento por minuto con ruido de Poisson y ráfagas ocasionales.
+    generator = np.random.default_rng(0)
+    counts = generator.poisson(20, minutes)
+    bursts = generator.integers(0, minutes, max(1, minutes // 10_000))
+    counts[bursts] += generator.integers(500, 5000, len(bursts))
+    index = pd.date_range('2005-01-01', periods=minutes, freq='min', tz='UTC')
+    return pd.Series(counts, index=index, name='count')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generación de gráficas en ficheros con reducción de series largas.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--year', type=int, default=None, help='Año de los timestamps que no lo incluyen.')
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir, year=args.year))
+    with tempfile.TemporaryDirectory() as directory:
+        store = save_store(frame, os.path.join(directory, 'store'))
+        output = os.path.join(directory, 'plots')
+        print(f'filas: {len(store)}, CPUs: {os.cpu_count()}')
+        print(f'{"modo":>40} {"ficheros":>9} {"tiempo (s)":>11}')
+        for label, options in (('en proceso, serie completa', dict(workers=0, points=None)),
+                               ('en proceso, min/max', dict(workers=0)),
+                               ('en proceso, LTTB', dict(workers=0, method='lttb')),
+                               ('pool de procesos, min/max', dict(workers=args.workers)),
+                               ('pool de procesos, min/max, PNG y SVG', dict(workers=args.workers,
+                                                                             formats=['png', 'svg']))):
+            paths, seconds = timed(render, store.path, output, **options)
+            print(f'{label:>40} {len(paths):>9} {seconds:>11.2f}')
+
+        print(f'\n{"minutos":>10} {"completa (s)":>13} {"min/max (s)":>12} {"LTTB (s)":>9}')
+        path = [os.path.join(output, 'synthetic.png'), os.path.join(output, 'synthetic.svg')]
+        for minutes in LENGTHS:
+            series = synthetic_series(minutes)
+            times = []
+            for points, method in ((None, None), (MAX_POINTS, 'minmax'), (MAX_POINTS, 'lttb')):
+                # La reducción forma parte del tiempo medido: es lo que cuesta cada gráfica en render.
+                _, seconds = timed(lambda: render_figure('per_minute',
+                                                         {'per_minute': downsample(series, points, method)}, path))
+                times.append(seconds)
+            print(f'{minutes:>10} {times[0]:>13.2f} {times[1]:>12.2f} {times[2]:>9.2f}')
@@ -0,0 +1,96 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from query import LogIndex
+from store import LogStore, create_store
+
+# Benchmark de las consultas indexadas sobre el almacén columnar, con el conjunto de datos original (escala 1) y con
+# copias desplazadas en el tiempo para simular un almacén mayor (escala 100 por defecto). A escala 1 se compara además
+# con la consulta equivalente sobre el dataframe completo cargado desde el almacén.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_query [--scales 1,100]
+
+QUERIES = {
+    'errores de CUPS en junio de 2005': dict(start='2005-06-01', end='2005-07-01', app_name='CUPS', max_severity=3),
+    'Squid durante un día': dict(start='2006-02-01', end='2006-02-02', app_name='Squid'),
+    'todo durante una hora': dict(start='2006-02-01 12:00', end='2006-02-01 13:00'),
+    'un host': dict(host_name='38.114.38.130', columns=['timestamp', 'app_name', 'message']),
+}
+
+
+def build_store(frame, path, scale):
+    """
+    Almacén con scale copias de frame, cada una desplazada en el tiempo para que no se solapen con las anteriores.
+    """
+    store = create_store(path)
+    period = frame['timestamp'].max() - frame['timestamp'].min() + pd.Timedelta(days=1)
+    for copy in range(scale):
+        shifted = frame if copy == 0 else frame.assign(timestamp=frame['timestamp'] + copy * period)
+        store.append(shifted)
+    return store
+
+
+def timed(function, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def scan(frame, start=None, end=None, app_name=None, host_name=None, max_severity=None, columns=None):
+    mask = pd.Series(True, index=frame.index)
+    if start is not None:
+        mask &= frame['timestamp'] >= pd.Timestamp(start, tz='UTC')
+    if end is not None:
+        mask &= frame['timestamp'] < pd.Timestamp(end, tz='UTC')
+    if app_name is not None:
+        mask &= frame['app_name'] == app_name
+    if host_name is not None:
+        mask &= frame['host_name'] == host_name
+    if max_severity is not None:
+        mask &= (frame['priority'] % 8 <= max_severity).fillna(False)
+    return frame.loc[mask, columns or frame.columns]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Latencia de las consultas indexadas sobre el almacén.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--year', type=int, default=2006,
+                        help='Año de los timestamps sin año. Con el de modificación de los ficheros, el periodo que '
+                             'cubren los logs es tan largo que las copias desplazadas no caben en datetime64[ns].')
+    parser.add_argument('--scales', default='1,100', help='Escalas del conjunto de datos, separadas por comas.')
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir, year=args.year))
+    print(f'{len(frame)} filas')
+
+    for scale in [int(scale) for scale in args.scales.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'logs.store')
+            _, build = timed(lambda: build_store(frame, path, scale), repeat=1)
+            _, open_index = timed(lambda: LogIndex(path))
+            index = LogIndex(path)
+            print(f'\nescala {scale}: {len(index.store)} filas, {len(index.store.blocks)} bloques, '
+                  f'escritura {build:.1f} s, apertura del índice {open_index * 1000:.1f} ms')
+            if scale == 1:
+                full, load = timed(lambda: LogStore(path).to_frame(), repeat=1)
+                print(f'carga completa del almacén para el recorrido secuencial: {load:.3f} s')
+
+            print(f'{"consulta":>32} {"filas":>9} {"bloques":>8} {"índice (ms)":>12} {"recorrido (ms)":>15}')
+            for name, filters in QUERIES.items():
+                result, indexed = timed(lambda: index.query(**filters))
+                start, end = (pd.Timestamp(filters[key], tz='UTC').value if key in filters else None
+                              for key in ('start', 'end'))
+                codes = {column: index.lookup(column, filters[column]) for column in ('app_name', 'host_name')
+                         if column in filters}
+                blocks = len(index.candidates(start, end, codes))
+                sequential = f'{timed(lambda: scan(full, **filters))[1] * 1000:>15.1f}' if scale == 1 else f'{"":>15}'
+                print(f'{name:>32} {len(result):>9} {blocks:>8} {indexed * 1000:>12.1f} {sequential}')
@@ -0,0 +1,78 @@
+import argparse
+import os
+import os.path
+import re
+import time
+
+from batch import parse_batches
+from main import BATCH_SIZE, DATE, LOG_DIR, MONTH, TIME, UnixLogs, find_parser, read_logs
+from timestamps import decode_syslog, reference_year
+
+# Benchmark del registro de procesadores: enrutado de nombres de fichero con la expresión combinada frente a la lista
+# de reglas anterior, y procesador syslog precompilado frente a la expresión anterior (que se construía en cada línea
+# y exigía el pid) sobre los ficheros syslog más grandes.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_registry
+
+SYSLOG_SAMPLES = ['maillog.23', 'messages.9', 'secure']
+
+# Reglas anteriores, que solo cubrían parte de los ficheros.
+LEGACY_RULES = {
+    r'boot.log(\.\d+)?': 'UnixLogs',
+    r'cron(\.\d+)?': 'UnixLogs',
+    r'access.log(\.\d+)?': 'SquidLogs',
+    r'cache.log(\.\d+)?': 'SquidLogs',
+    r'referer_log.log(\.\d+)?': 'SquidLogs',
+    r'store.log(\.\d+)?': 'SquidLogs',
+    r'useragent_log.log(\.\d+)?': 'SquidLogs',
+    r'logfile': 'PrivoxyLogs',
+    r'error_log(\.\d+)?': 'CupsLogs',
+    r'ssl_access_log(\.\d+)?': 'HttpdLogs',
+}
+
+
+def legacy_find_parser(file):
+    for key in LEGACY_RULES:
+        if re.match(key, file):
+            return LEGACY_RULES[key]
+    return None
+
+
+def legacy_fields(raw, year=None):
+    attributes = re.match(f'^(?P<timestamp>{MONTH} {DATE} {TIME}) (?P<host_name>\S+) (?:(?P<app_name>\S+)(?:\[(?P<process_id>\d+)\]): )?(?P<message>.*)$', raw).groupdict()
+    attributes['timestamp'] = decode_syslog(attributes['timestamp'], year or reference_year())
+    return attributes
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Registro de procesadores y procesador syslog.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--repeat', type=int, default=100, help='Repeticiones del enrutado de todos los ficheros.')
+    args = parser.parse_args()
+
+    files = [file for root, dirs, names in os.walk(args.log_dir) for file in names]
+    routed, legacy_time = timed(lambda: [legacy_find_parser(file) for _ in range(args.repeat) for file in files])
+    routed, router_time = timed(lambda: [find_parser(file) for _ in range(args.repeat) for file in files])
+    legacy_count = sum(legacy_find_parser(file) is not None for file in files)
+    router_count = sum(find_parser(file) is not None for file in files)
+    print(f'enrutado de {len(files)} ficheros x {args.repeat}: reglas {legacy_time * 1000:.1f} ms '
+          f'({legacy_count} reconocidos), expresión combinada {router_time * 1000:.1f} ms ({router_count} reconocidos)')
+
+    print(f'{"fichero":>12} {"líneas":>8} {"anterior (líneas/s)":>20} {"filas":>8} {"nuevo (líneas/s)":>17} {"filas":>8}')
+    for name in SYSLOG_SAMPLES:
+        path = os.path.join(args.log_dir, name)
+        lines = list(read_logs(path))
+        year = reference_year(path)
+
+        def rows(fields):
+            return sum(len(batch) for batch in parse_batches(lines, fields, BATCH_SIZE))
+
+        legacy_rows, legacy = timed(rows, lambda raw: legacy_fields(raw, year))
+        new_rows, new = timed(rows, UnixLogs.fields_for_file(path))
+        print(f'{name:>12} {len(lines):>8} {len(lines) / legacy:>20.0f} {legacy_rows:>8} {len(lines) / new:>17.0f} '
+              f'{new_rows:>8}')
@@ -0,0 +1,60 @@
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from store import LogStore, create_store
+
+# Benchmark de los datos de plotter.py (recuento por día y por día y aplicación) calculados desde las filas del
+# almacén, como antes, y desde la tabla de recuento diaria de rollup.py, con el conjunto de datos original y con copias
+# desplazadas en el tiempo (véase bench_query.py). Muestra también el coste que añade a la escritura el mantenimiento
+# de las tablas de recuento.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_rollup [--scales 1,10]
+
+
+def from_rows(store: LogStore) -> pd.Series:
+    data = store.to_frame(columns=['timestamp', 'app_name'])
+    data['timestamp'].groupby(data['timestamp'].dt.date).count()
+    return data['timestamp'].groupby([data['timestamp'].dt.date, data['app_name']], observed=True).count()
+
+
+def from_rollup(store: LogStore) -> pd.Series:
+    data = store.rollup('day')
+    data['timestamp'] = data['timestamp'].dt.date
+    data.groupby('timestamp')['count'].sum()
+    return data.groupby(['timestamp', 'app_name'], observed=True)['count'].sum()
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Datos de plotter.py desde las filas y desde las tablas de recuento.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    parser.add_argument('--scales', default='1,10')
+    parser.add_argument('--year', type=int, default=None, help='Año de los timestamps que no lo incluyen.')
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir, year=args.year))
+    period = frame['timestamp'].max() - frame['timestamp'].min() + pd.Timedelta(days=1)
+    print(f'{"escala":>7} {"filas":>10} {"escritura (s)":>14} {"desde filas (s)":>16} {"desde rollup (s)":>17}')
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in map(int, args.scales.split(',')):
+            store = create_store(os.path.join(directory, f'scale-{scale}'))
+            write_seconds = 0.0
+            for copy in range(scale):
+                shifted = frame if copy == 0 else frame.assign(timestamp=frame['timestamp'] + copy * period)
+                write_seconds += timed(store.append, shifted)[1]
+            rows, rows_seconds = timed(from_rows, store)
+            rollup, rollup_seconds = timed(from_rollup, store)
+            # Las dos formas deben dar los mismos recuentos.
+            if not rows.sort_index().equals(rollup.sort_index()):
+                raise AssertionError(f'Los recuentos a escala {scale} difieren')
+            print(f'{scale:>7} {len(store):>10} {write_seconds:>14.3f} {rows_seconds:>16.3f} {rollup_seconds:>17.3f}')
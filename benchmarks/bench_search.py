@@ -0,0 +1,71 @@
+import argparse
+import os
+import re
+import tempfile
+import time
+
+import pandas as pd
+
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from search import SearchIndex
+from store import save_store
+
+# Benchmark de la búsqueda de texto completo con los índices invertidos de fulltext.py frente a un str.contains de pandas
+# sobre la columna message completa, con el conjunto de datos original. Cada búsqueda se compara con una expresión
+# regular equivalente (palabras completas, sin distinguir mayúsculas); ambas deben encontrar las mismas filas. Muestra
+# también el tiempo que añade el índice a la escritura y lo que ocupa.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_search
+
+# Consulta del índice, expresión regular equivalente para str.contains y rango de tiempo opcional.
+SEARCHES = [
+    ('203.71.234.22', r'(?<![\w.])203\.71\.234\.22(?![\w]|\.\w)', None),
+    ('"Deferred: Connection refused"', r'\bdeferred\W+connection\W+refused\b', None),
+    ('"Failed password" root', r'\bfailed\W+password\b.*\broot\b|\broot\b.*\bfailed\W+password\b', None),
+    ('"Did not receive identification string"', r'\bdid\W+not\W+receive\W+identification\W+string\b', None),
+    ('"Did not receive identification string"', r'\bdid\W+not\W+receive\W+identification\W+string\b',
+     ('2023-01-15', '2023-03-01')),
+]
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def directory_size(path: str, prefix: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(path) for file in files
+               if file.startswith(prefix))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Búsqueda con índice invertido frente a str.contains.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir))
+    with tempfile.TemporaryDirectory() as directory:
+        store, write_seconds = timed(save_store, frame, os.path.join(directory, 'store'))
+        print(f'filas: {len(store)}, escritura del almacén: {write_seconds:.2f} s, '
+              f'índice: {directory_size(store.path, "index.") / 2 ** 20:.1f} MiB')
+        data = store.to_frame(columns=['timestamp', 'message'])
+        index = SearchIndex(store.path)
+
+        print(f'{"consulta":>62} {"filas":>7} {"índice (ms)":>12} {"str.contains (ms)":>18}')
+        for text, pattern, bounds in SEARCHES:
+            start, end = bounds or (None, None)
+            found, search_seconds = timed(lambda: index.search(text, start=start, end=end, columns=['timestamp']))
+
+            def scan():
+                rows = data
+                if bounds:
+                    rows = rows[(rows['timestamp'] >= pd.Timestamp(start, tz='UTC')) &
+                                (rows['timestamp'] < pd.Timestamp(end, tz='UTC'))]
+                return rows[rows['message'].str.contains(pattern, flags=re.IGNORECASE, na=False)]
+
+            scanned, scan_seconds = timed(scan)
+            if len(found) != len(scanned):
+                raise AssertionError(f'{text}: {len(found)} filas con el índice y {len(scanned)} con str.contains')
+            label = text if not bounds else f'{text} [{start}, {end})'
+            print(f'{label:>62} {len(found):>7} {search_seconds * 1000:>12.1f} {scan_seconds * 1000:>18.1f}')
@@ -0,0 +1,92 @@
+import argparse
+import datetime
+import functools
+import gzip
+import itertools
+import os.path
+import re
+import time
+from datetime import timezone
+
+from main import LOG_DIR, Logs, SquidLogs, parse_logs
+
+# Benchmark de rendimiento por formato de SquidLogs frente a la implementación anterior, que evaluaba hasta dos
+# expresiones regulares sin precompilar por cada formato probado.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_squid [--lines N]
+
+SQUID_DIR = os.path.join(LOG_DIR, 'squid')
+
+# Fichero de muestra de cada formato. El dataset no incluye ningún useragent_log, por lo que se usa una línea sintética.
+SAMPLES = {
+    'access': 'access.log.11',
+    'cache': 'cache.log.1.gz',
+    'referer': 'referer_log.log',
+    'store': 'store.log.1.gz',
+}
+USERAGENT_LINE = '192.168.1.10 [15/Jan/2006:04:17:29 -0500] "Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1)"\n'
+
+
+class LegacySquidLogs(Logs):
+    # Copia de la implementación original de SquidLogs, usada como referencia.
+
+    def __init__(self, raw: str):
+        accessExpresion = r'^(?P<timestamp>\d+\.\d+)\s+(?P<time>\d+)\s+(?P<host_name>\S+)\s+(?P<message>.*)$'
+        cacheExpresion = r'^(?P<timestamp>^\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})\|\s(?P<message>.*)$'
+        refererExpresion = r'^(?P<timestamp>\d+\.\d+)\s(?P<host_name>\S+)\s(?P<message>(http|https).*)$'
+        useragentExpresion = r'^(?P<host_name>\S+)\s+\[(?P<timestamp>.*)\]\s\"(?P<message>.*)\"$'
+        storeExpresion = r'^(?P<timestamp>\d+\.\d+)\s+(?P<message>.*)$'
+
+        if((re.search(accessExpresion, raw)) != None):
+            attributes = re.match(accessExpresion, raw).groupdict()
+            attributes['message'] = attributes['time'] + " " + attributes['message']
+            del attributes['time']
+            attributes['timestamp'] = datetime.datetime.utcfromtimestamp(float(attributes['timestamp']))
+        elif((re.search(cacheExpresion, raw)) != None):
+            attributes = re.match(cacheExpresion, raw).groupdict()
+            attributes['timestamp'] = datetime.datetime.strptime(attributes['timestamp'], '%Y/%m/%d %H:%M:%S')
+        elif((re.search(refererExpresion, raw)) != None):
+            attributes = re.match(refererExpresion, raw).groupdict()
+            attributes['timestamp'] = datetime.datetime.utcfromtimestamp(float(attributes['timestamp']))
+        elif((re.search(useragentExpresion, raw)) != None):
+            attributes = re.match(useragentExpresion, raw).groupdict()
+            attributes['timestamp'] = datetime.datetime.strptime(attributes['timestamp'], '%d/%b/%Y:%H:%M:%S %z')
+            attributes['timestamp'] = attributes['timestamp'].astimezone(timezone.utc)
+        elif((re.search(storeExpresion, raw)) != None):
+            attributes = re.match(storeExpresion, raw).groupdict()
+            attributes['timestamp'] = datetime.datetime.utcfromtimestamp(float(attributes['timestamp']))
+
+        attributes['timestamp'] = attributes['timestamp'].astimezone(timezone.utc)
+        attributes['app_name'] = "Squid"
+        super().__init__(**attributes, raw=raw)
+
+
+def load_sample(fmt: str, lines: int):
+    if fmt == 'useragent':
+        return [USERAGENT_LINE] * lines
+
+    path = os.path.join(SQUID_DIR, SAMPLES[fmt])
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf8') as f:
+        sample = list(itertools.islice(f, lines))
+    # Se repite la muestra hasta alcanzar el número de líneas pedido.
+    return list(itertools.islice(itertools.cycle(sample), lines))
+
+
+def throughput(parser, sample):
+    start = time.perf_counter()
+    parsed = sum(1 for _ in parse_logs(sample, parser))
+    return parsed, len(sample) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rendimiento por formato de SquidLogs.')
+    parser.add_argument('--lines', type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f'{"formato":>10} {"anterior (l/s)":>15} {"actual (l/s)":>13} {"mejora":>7}')
+    for fmt in ['access', 'cache', 'referer', 'useragent', 'store']:
+        sample = load_sample(fmt, args.lines)
+        legacy_parsed, legacy = throughput(LegacySquidLogs, sample)
+        parsed, current = throughput(functools.partial(SquidLogs, fmt=fmt), sample)
+        assert parsed == legacy_parsed, fmt
+        print(f'{fmt:>10} {legacy:>15,.0f} {current:>13,.0f} {current / legacy:>6.1f}x')
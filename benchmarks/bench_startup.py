@@ -0,0 +1,59 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from benchmarks.synthetic import write_log
+
+# Benchmark del tiempo de arranque de la línea de comandos (cli.py): tiempo total de cada orden, ejecutada en un proceso
+# nuevo, y módulos pesados (NumPy, pandas, matplotlib) que llega a importar. Las órdenes de consulta se ejecutan sobre
+# un almacén pequeño creado con la propia orden ingest a partir de un fichero syslog sintético.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_startup [--repeat 10]
+
+HEAVY_MODULES = ['numpy', 'pandas', 'matplotlib']
+
+
+def run(command: List[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def heavy_imports(command: List[str]) -> List[str]:
+    """
+    :return: Módulos de HEAVY_MODULES que importa la orden, según -X importtime.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command, check=True, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE, text=True)
+    imported = {line.rsplit('|', 1)[-1].strip() for line in result.stderr.splitlines() if '|' in line}
+    return [module for module in HEAVY_MODULES if module in imported]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tiempo de arranque de las órdenes de cli.py.')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_dir = os.path.join(directory, 'logs')
+        os.makedirs(log_dir)
+        write_log(log_dir, 'syslog', 1 << 20)
+        store = os.path.join(directory, 'store')
+        commands = {
+            'python -c pass': ['-c', 'pass'],
+            'cli --help': ['-m', 'cli', '--help'],
+            'cli ingest --help': ['-m', 'cli', 'ingest', '--help'],
+            'cli ingest (1 MiB)': ['-m', 'cli', 'ingest', '--log-dir', log_dir, '--store', store],
+            'cli query (1 hora)': ['-m', 'cli', 'query', '--store', store, '--start', '2006-02-28 00:00',
+                                   '--end', '2006-02-28 01:00'],
+            'cli query --help': ['-m', 'cli', 'query', '--help'],
+        }
+        print(f'{"orden":>20} {"mediana (ms)":>13} {"mínimo (ms)":>12}  módulos pesados')
+        for name, command in commands.items():
+            seconds = [run(command) for _ in range(args.repeat)]
+            print(f'{name:>20} {statistics.median(seconds) * 1000:>13.1f} {min(seconds) * 1000:>12.1f}  '
+                  f'{", ".join(heavy_imports(command)) or "-"}')
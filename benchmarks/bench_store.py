@@ -0,0 +1,54 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch import COLUMNS
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from store import LogStore, save_store
+
+# Benchmark del almacén columnar frente al volcado anterior en logs.npy (array de objetos serializado con pickle):
+# tamaño en disco, tiempo de escritura y tiempo de carga completa y de las columnas que usa plotter.py.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_store
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, file)) for root, dirs, files in os.walk(path) for file in files)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def load_npy(path):
+    return pd.DataFrame(np.load(path, allow_pickle=True), columns=COLUMNS)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Almacén columnar frente a logs.npy.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir))
+    print(f'{len(frame)} filas')
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        npy_path = os.path.join(tmp_dir, 'logs.npy')
+        store_path = os.path.join(tmp_dir, 'logs.store')
+
+        _, npy_write = timed(frame.to_numpy().dump, npy_path)
+        _, npy_load = timed(load_npy, npy_path)
+        _, store_write = timed(save_store, frame, store_path)
+        _, store_load = timed(lambda: LogStore(store_path).to_frame())
+        _, store_plot = timed(lambda: LogStore(store_path).to_frame(columns=['timestamp', 'app_name']))
+
+        print(f'{"formato":>30} {"tamaño (MiB)":>12} {"escritura (s)":>13} {"carga (s)":>9}')
+        print(f'{"logs.npy":>30} {os.path.getsize(npy_path) / 2 ** 20:>12.1f} {npy_write:>13.3f} {npy_load:>9.3f}')
+        print(f'{"logs.store":>30} {directory_size(store_path) / 2 ** 20:>12.1f} {store_write:>13.3f} {store_load:>9.3f}')
+        print(f'{"logs.store (timestamp, app)":>30} {"":>12} {"":>13} {store_plot:>9.3f}')
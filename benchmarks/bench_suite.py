@@ -0,0 +1,198 @@
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import os.path
+import platform
+import resource
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Dict, Optional
+
+from benchmarks.synthetic import FORMATS, write_log
+
+# Batería de benchmarks reproducible sobre logs sintéticos de cada formato (véase benchmarks/synthetic.py), con un
+# tamaño configurable hasta varios gigabytes. Para cada formato se mide, en un proceso nuevo para que las medidas de
+# memoria no se mezclen:
+#   - parse: lectura y procesamiento del fichero en lotes (ingest_file), en líneas y bytes por segundo.
+#   - frame: construcción del dataframe ordenado (build_frame).
+#   - save y load: escritura del almacén columnar y carga completa desde él.
+#   - peak_rss: máximo de memoria residente del proceso, y su aumento respecto al proceso recién iniciado.
+# Los resultados se guardan en benchmarks/results/<commit>.json y pueden compararse con los de otro commit.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_suite [--size-mb 256] [--compare <commit>]
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Variación relativa a partir de la cual una comparación se marca como regresión.
+REGRESSION_THRESHOLD = 0.10
+
+# Métricas que se comparan entre commits y si un valor mayor es mejor.
+COMPARED = {'lines_per_second': True, 'frame_seconds': False, 'save_seconds': False, 'load_seconds': False,
+            'peak_rss_mb': False}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss está en KiB en Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_format(path: str, year: int, store_path: str) -> Dict:
+    """
+    :param path: Fichero sintético de un formato.
+    :param year: Año de referencia para los timestamps que no lo incluyen.
+    :param store_path: Directorio temporal para el almacén.
+    :return: Medidas del formato. Se ejecuta en un proceso nuevo.
+    """
+    from frames import build_frame
+    from main import ingest_file, find_parser
+    from store import LogStore, save_store
+
+    baseline = peak_rss_mb()
+    parser_class = find_parser(os.path.basename(path))
+
+    start = time.perf_counter()
+    batches = list(ingest_file(path, parser_class, year=year))
+    parse_seconds = time.perf_counter() - start
+    lines = sum(len(batch) + batch.failures for batch in batches)
+
+    start = time.perf_counter()
+    frame = build_frame(batches)
+    frame_seconds = time.perf_counter() - start
+    del batches
+
+    start = time.perf_counter()
+    save_store(frame, store_path)
+    save_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loaded = LogStore(store_path).to_frame()
+    load_seconds = time.perf_counter() - start
+    if len(loaded) != len(frame):
+        raise AssertionError(f'{path}: se han cargado {len(loaded)} filas de {len(frame)}')
+    shutil.rmtree(store_path)
+
+    size = os.path.getsize(path)
+    return {
+        'parser': parser_class.__name__,
+        'file_bytes': size,
+        'lines': lines,
+        'rows': len(frame),
+        'parse_seconds': parse_seconds,
+        'lines_per_second': lines / parse_seconds,
+        'bytes_per_second': size / parse_seconds,
+        'frame_seconds': frame_seconds,
+        'save_seconds': save_seconds,
+        'load_seconds': load_seconds,
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_increase_mb': peak_rss_mb() - baseline,
+    }
+
+
+def current_commit() -> str:
+    """
+    :return: Hash abreviado del commit actual, con el sufijo -dirty si hay cambios sin confirmar en ficheros seguidos.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+def load_results(commit: str) -> Optional[Dict]:
+    """
+    :param commit: Hash (o prefijo del hash) de un commit con resultados guardados.
+    :return: Resultados guardados de ese commit o None si no hay ninguno.
+    """
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    names = sorted(name for name in os.listdir(RESULTS_DIR) if name.startswith(commit) and name.endswith('.json'))
+    if not names:
+        return None
+    with open(os.path.join(RESULTS_DIR, names[0]), encoding='utf8') as f:
+        return json.load(f)
+
+
+def compare(previous: Dict, current: Dict):
+    # Variación de cada métrica respecto al commit anterior. Las regresiones superiores al umbral se marcan con '!'.
+    print(f'\nComparación con {previous["commit"]} ({previous["size_mb"]} MB por formato):')
+    print(f'{"formato":>16} ' + ' '.join(f'{metric:>17}' for metric in COMPARED))
+    for fmt, result in current['results'].items():
+        before = previous['results'].get(fmt)
+        if before is None:
+            continue
+        cells = []
+        for metric, higher_is_better in COMPARED.items():
+            change = result[metric] / before[metric] - 1 if before[metric] else 0.0
+            worse = -change if higher_is_better else change
+            cells.append(f'{change:>+15.1%}{" !" if worse > REGRESSION_THRESHOLD else "  "}')
+        print(f'{fmt:>16} ' + ' '.join(cells))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Batería de benchmarks sobre logs sintéticos.')
+    parser.add_argument('--size-mb', type=int, default=64, help='Tamaño sin comprimir del fichero de cada formato.')
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compress', action='store_true', help='Generar los ficheros comprimidos con gzip.')
+    parser.add_argument('--data-dir', default=None,
+                        help='Directorio en el que se generan y conservan los ficheros sintéticos (por defecto, uno '
+                             'temporal que se borra al terminar).')
+    parser.add_argument('--compare', metavar='COMMIT', default=None,
+                        help='Commit con resultados guardados con el que comparar.')
+    parser.add_argument('--no-save', action='store_true', help='No guardar los resultados.')
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='bench-suite-')
+    work_dir = tempfile.mkdtemp(prefix='bench-suite-store-')
+    size = args.size_mb << 20
+    results = {}
+    # Cada formato se mide en un proceso nuevo (spawn), con la memoria y las cachés en su estado inicial.
+    context = multiprocessing.get_context('spawn')
+    try:
+        print(f'{"formato":>16} {"clase":>16} {"líneas":>10} {"MB/s":>7} {"líneas/s":>10} {"frame (s)":>10} '
+              f'{"save (s)":>9} {"load (s)":>9} {"pico (MB)":>10}')
+        for fmt in args.formats:
+            path = write_log(data_dir, fmt, size, args.seed, args.compress)
+            with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_format, path, 2006, os.path.join(work_dir, fmt)).result()
+            results[fmt] = result
+            print(f'{fmt:>16} {result["parser"]:>16} {result["lines"]:>10} {result["bytes_per_second"] / 1e6:>7.1f} '
+                  f'{result["lines_per_second"]:>10.0f} {result["frame_seconds"]:>10.3f} {result["save_seconds"]:>9.3f} '
+                  f'{result["load_seconds"]:>9.3f} {result["peak_rss_mb"]:>10.0f}')
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    current = {
+        'commit': current_commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'size_mb': args.size_mb,
+        'seed': args.seed,
+        'compress': args.compress,
+        'results': results,
+    }
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f'{current["commit"]}.json')
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump(current, f, indent=2)
+        print(f'\nResultados guardados en {path}')
+
+    if args.compare:
+        previous = load_results(args.compare)
+        if previous is None:
+            print(f'\nNo hay resultados guardados del commit {args.compare}')
+        else:
+            compare(previous, current)
@@ -0,0 +1,60 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from store import LogStore, save_store, write_strings
+
+# Benchmark del almacenamiento de los mensajes como plantilla y parámetros (templates.py) frente a los mensajes
+# completos: tamaño en disco, tiempo de escritura y de lectura del almacén, y recuento de filas por tipo de evento con
+# un bincount de los códigos de plantilla frente a un recuento de los mensajes como texto.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_templates
+
+
+def directory_size(path: str, suffixes: tuple) -> int:
+    return sum(os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(path) for file in files
+               if file.endswith(suffixes))
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mensajes como plantilla y parámetros frente a mensajes completos.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir))
+    with tempfile.TemporaryDirectory() as directory:
+        store, write_seconds = timed(save_store, frame, os.path.join(directory, 'store'))
+        messages, read_seconds = timed(lambda: store.to_frame(columns=['message'])['message'])
+        if not messages.equals(frame['message']):
+            raise AssertionError('Los mensajes reconstruidos difieren de los originales')
+
+        # Mensajes completos, con el formato de los bloques anteriores a las plantillas.
+        full_dir = os.path.join(directory, 'full')
+        os.makedirs(full_dir)
+        write_strings(full_dir, 'message', [message or '' for message in frame['message'].tolist()])
+        full_size = directory_size(full_dir, ('.bin', '.npy'))
+        template_size = directory_size(store.path, ('params.bin', 'params.offsets.npy', 'template.npy')) + \
+            os.path.getsize(os.path.join(store.path, 'templates.json'))
+
+        templates, bincount_seconds = timed(LogStore(store.path).templates)
+        _, text_seconds = timed(lambda: store.to_frame(columns=['message'])['message'].value_counts())
+
+    print(f'filas: {len(frame)}, mensajes distintos: {frame["message"].nunique()}, tipos de evento: {len(templates)}')
+    print(f'escritura del almacén: {write_seconds:.2f} s, lectura de los mensajes: {read_seconds:.2f} s')
+    print(f'mensajes completos: {full_size / 2 ** 20:.1f} MiB, plantillas y parámetros: {template_size / 2 ** 20:.1f} '
+          f'MiB ({template_size / full_size:.0%})')
+    print(f'recuento por tipo de evento: {bincount_seconds * 1000:.1f} ms, '
+          f'recuento por mensaje como texto: {text_seconds * 1000:.1f} ms')
+    top = templates.sort_values('count', ascending=False).head(10)
+    print('\n'.join(f'{count:>10} {template}' for count, template in zip(top['count'], top['template'])))
+    assert np.sum(templates['count']) == frame['message'].notna().sum()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from frames import build_frame
+from main import LOG_DIR, ingest_logs
+from squid import FIELDS, parse_fields
+from store import save_store
+from traffic import bandwidth_by_client, latency_by_domain
+
+# Benchmark de los informes de tráfico de Squid (traffic.py) sobre los campos tipados del almacén frente a los mismos
+# informes calculados volviendo a procesar los mensajes con str.extract de pandas, con el conjunto de datos original.
+# Ambos deben dar el mismo número de peticiones, bytes y tiempos de respuesta por cliente y por dominio. Muestra también
+# lo que ocupan los campos y lo que costaría obtenerlos de nuevo de los mensajes con las expresiones regulares de
+# squid.py, que es lo que evitan los procesadores al entregarlos ya en el lote.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_traffic
+
+ACCESS = r'^(?P<elapsed_ms>\d+) [^ /]+/\d+ (?P<bytes>\d+) (?P<method>\S+) (?P<url>\S+)'
+
+
+def timed(function, *args) -> tuple:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def directory_size(path: str, prefix: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, file)) for root, _, files in os.walk(path) for file in files
+               if file.startswith(prefix))
+
+
+def parse_messages(data: pd.DataFrame) -> pd.DataFrame:
+    # Análisis de los mensajes de access.log en cada informe, que es lo que había que hacer sin los campos tipados.
+    squid = data[data['app_name'] == 'Squid']
+    fields = squid['message'].str.extract(ACCESS)
+    rows = fields['elapsed_ms'].notna()
+    url = fields['url'][rows]
+    host = url.str.replace(r'^[A-Za-z][A-Za-z0-9+.-]*://', '', regex=True) \
+        .str.extract(r'^(?:[^/?#]*@)?([^/:?#]*)')[0].str.lower()
+    has_host = url.str.contains('://', regex=False) | (fields['method'][rows] == 'CONNECT')
+    return pd.DataFrame({
+        'client': squid['host_name'][rows].astype(object),
+        'elapsed_ms': fields['elapsed_ms'][rows].astype(np.int64),
+        'bytes': fields['bytes'][rows].astype(np.int64),
+        'url_host': host.where(has_host & (host != '')),
+    })
+
+
+def bandwidth_from_messages(data: pd.DataFrame) -> pd.DataFrame:
+    return parse_messages(data).groupby('client').agg(requests=('bytes', 'size'), bytes=('bytes', 'sum'),
+                                                      elapsed_ms=('elapsed_ms', 'sum'))
+
+
+def latency_from_messages(data: pd.DataFrame) -> pd.DataFrame:
+    return parse_messages(data).dropna(subset=['url_host']).groupby('url_host').agg(
+        requests=('elapsed_ms', 'size'), mean_ms=('elapsed_ms', 'mean'), max_ms=('elapsed_ms', 'max'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Informes de tráfico con campos tipados frente a str.extract.')
+    parser.add_argument('--log-dir', default=LOG_DIR)
+    args = parser.parse_args()
+
+    frame = build_frame(ingest_logs(args.log_dir))
+    squid_messages = frame.loc[frame['app_name'] == 'Squid', 'message'].tolist()
+    typed = int(frame[FIELDS].notna().any(axis=1).sum())
+    _, parse_seconds = timed(parse_fields, squid_messages)
+    with tempfile.TemporaryDirectory() as directory:
+        store, write_seconds = timed(save_store, frame, os.path.join(directory, 'store'))
+        print(f'filas: {len(store)}, filas de Squid: {len(squid_messages)}, con campos tipados: {typed}')
+        print(f'escritura del almacén: {write_seconds:.2f} s, campos con expresiones regulares: {parse_seconds:.2f} s, '
+              f'campos: {directory_size(store.path, "squid.") / 2 ** 20:.1f} MiB')
+        data = store.to_frame(columns=['app_name', 'host_name', 'message'])
+
+        bandwidth, bandwidth_seconds = timed(bandwidth_by_client, store.path)
+        expected, bandwidth_text_seconds = timed(bandwidth_from_messages, data)
+        found = bandwidth.set_index('client')[['requests', 'bytes', 'elapsed_ms']].sort_index()
+        if not found.equals(expected.sort_index().astype(found.dtypes.to_dict())):
+            raise AssertionError('El ancho de banda por cliente difiere del calculado con los mensajes')
+
+        latency, latency_seconds = timed(latency_by_domain, store.path)
+        expected, latency_text_seconds = timed(latency_from_messages, data)
+        found = latency.set_index('url_host').sort_index()
+        expected = expected.sort_index()
+        if not (found.index.equals(expected.index) and (found['requests'] == expected['requests']).all() and
+                np.allclose(found['mean_ms'], expected['mean_ms']) and (found['max_ms'] == expected['max_ms']).all()):
+            raise AssertionError('La latencia por dominio difiere de la calculada con los mensajes')
+
+    print(f'{"informe":>22} {"campos tipados (ms)":>20} {"str.extract (ms)":>17}')
+    print(f'{"ancho de banda":>22} {bandwidth_seconds * 1000:>20.1f} {bandwidth_text_seconds * 1000:>17.1f}')
+    print(f'{"latencia por dominio":>22} {latency_seconds * 1000:>20.1f} {latency_text_seconds * 1000:>17.1f}')
+    print(bandwidth.head(5).to_string())
+    print(latency.sort_values('requests', ascending=False).head(5).to_string())
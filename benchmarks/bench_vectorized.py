@@ -0,0 +1,53 @@
+import argparse
+import os.path
+import shutil
+import tempfile
+import time
+
+from batch import LogBatch
+from benchmarks.synthetic import write_log
+from main import Logs, find_parser, read_blocks
+
+# Benchmark del procesamiento vectorizado por bloques (vectorized.py) frente al procesamiento línea a línea con
+# expresiones regulares, sobre ficheros sintéticos de access.log y store.log de Squid y de syslog. Ambos caminos
+# reciben los mismos bloques ya leídos y descomprimidos, de forma que solo se mide el procesamiento, y se comprueba que
+# el lote resultante es idéntico.
+# Uso (desde la raíz del repositorio): python -m benchmarks.bench_vectorized [--size-mb 64]
+
+FORMATS = ['squid-access', 'squid-store', 'syslog']
+
+
+def measure(function, blocks) -> tuple:
+    start = time.perf_counter()
+    batch = LogBatch.concat([function(block) for block in blocks])
+    return batch, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Procesamiento vectorizado frente a expresiones regulares.')
+    parser.add_argument('--size-mb', type=int, default=64, help='Tamaño del fichero sintético de cada formato.')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--year', type=int, default=2006)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix='bench-vectorized-')
+    try:
+        print(f'{"formato":>14} {"líneas":>10} {"regex (líneas/s)":>17} {"vectorizado (líneas/s)":>23} '
+              f'{"aceleración":>12}')
+        for fmt in args.formats:
+            path = write_log(data_dir, fmt, args.size_mb << 20)
+            parser_class = find_parser(os.path.basename(path))
+            options = parser_class.file_options(path, args.year)
+            blocks = list(read_blocks(path))
+
+            regex, regex_seconds = measure(lambda block: Logs.parse_block.__func__(parser_class, block, **options),
+                                           blocks)
+            vectorized, vectorized_seconds = measure(lambda block: parser_class.parse_block(block, **options), blocks)
+            if not regex.to_frame().equals(vectorized.to_frame()):
+                raise AssertionError(f'{fmt}: el resultado vectorizado difiere del de las expresiones regulares')
+
+            lines = len(regex) + regex.failures
+            print(f'{fmt:>14} {lines:>10} {lines / regex_seconds:>17.0f} {lines / vectorized_seconds:>23.0f} '
+                  f'{regex_seconds / vectorized_seconds:>11.1f}x')
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
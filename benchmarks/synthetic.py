@@ -0,0 +1,176 @@
+import calendar
+import gzip
+import os.path
+import random
+import time
+from typing import Callable, Dict, Iterator, List
+
+# Generadores de logs sintéticos para cada formato que reconocen las clases de main.py. Las líneas se generan de forma
+# reproducible a partir de una semilla, con timestamps crecientes y valores (hosts, aplicaciones, URLs, etc.) tomados de
+# conjuntos pequeños, como en los logs reales, de forma que los diccionarios de las columnas codificadas tienen un
+# tamaño realista. Cada formato se escribe en un fichero con el nombre que find_parser asocia a su clase.
+# Uso: write_log(directorio, 'squid-access', 1 << 30) genera un fichero access.log de 1 GiB.
+
+# Instante inicial de los logs generados (28 de febrero de 2006 a las 00:00 UTC, como el conjunto de datos original).
+START = calendar.timegm((2006, 2, 28, 0, 0, 0))
+
+# Número de líneas que se generan y escriben de cada vez.
+CHUNK_LINES = 10000
+
+HOSTS = ['hnet-hon', 'mail', 'proxy', 'printer', 'web01', 'web02']
+CLIENTS = [f'192.168.{i // 250}.{i % 250 + 1}' for i in range(500)]
+APPS = [('crond', True), ('sshd', True), ('sendmail', True), ('kernel', False), ('named', True), ('syslogd 1.4.1', False)]
+PATHS = ['/', '/index.html', '/images/logo.png', '/cgi-bin/search', '/favicon.ico', '/docs/manual.pdf', '/login']
+DOMAINS = ['www.google.com', 'news.bbc.co.uk', 'slashdot.org', 'www.wikipedia.org', 'ad.doubleclick.net']
+AGENTS = ['Mozilla/5.0 (Windows; U; Windows NT 5.1; en-US; rv:1.8.0.1) Gecko/20060111 Firefox/1.5.0.1',
+          'Mozilla/4.0 (compatible; MSIE 6.0; Windows NT 5.1; SV1)', 'Wget/1.10.2', 'msnbot/1.0']
+SQUID_CODES = ['TCP_MISS/200', 'TCP_HIT/200', 'TCP_MEM_HIT/200', 'TCP_DENIED/403', 'TCP_MISS/404']
+CUPS_LEVELS = ['I', 'I', 'I', 'D', 'W', 'E']
+APACHE_LEVELS = ['error', 'error', 'warn', 'notice', 'info']
+
+
+class Clock:
+    # Reloj sintético: avanza un intervalo aleatorio en cada línea y guarda el formateo del último segundo, que se
+    # repite en muchas líneas consecutivas.
+
+    def __init__(self, rng: random.Random, start: float = START, mean_step: float = 0.05):
+        self.rng = rng
+        self.now = start
+        self.mean_step = mean_step
+        self.formatted: Dict[str, tuple] = {}
+
+    def tick(self) -> float:
+        self.now += self.rng.expovariate(1 / self.mean_step)
+        return self.now
+
+    def format(self, pattern: str) -> str:
+        second = int(self.now)
+        cached = self.formatted.get(pattern)
+        if cached is None or cached[0] != second:
+            cached = (second, time.strftime(pattern, time.gmtime(second)))
+            self.formatted[pattern] = cached
+        return cached[1]
+
+
+def url(rng: random.Random) -> str:
+    return f'http://{rng.choice(DOMAINS)}{rng.choice(PATHS)}'
+
+
+def syslog(rng: random.Random, clock: Clock) -> str:
+    clock.tick()
+    app, pid = rng.choice(APPS)
+    tag = f'{app}[{rng.randint(100, 32000)}]' if pid else app
+    return f'{clock.format("%b %e %H:%M:%S")} {rng.choice(HOSTS)} {tag}: session opened for user root by (uid={rng.randint(0, 999)})\n'
+
+
+def squid_access(rng: random.Random, clock: Clock) -> str:
+    now = clock.tick()
+    return (f'{now:.3f} {rng.randint(1, 5000):>6} {rng.choice(CLIENTS)} {rng.choice(SQUID_CODES)} '
+            f'{rng.randint(200, 200000)} GET {url(rng)} - DIRECT/{rng.choice(CLIENTS)} text/html\n')
+
+
+def squid_cache(rng: random.Random, clock: Clock) -> str:
+    clock.tick()
+    return f'{clock.format("%Y/%m/%d %H:%M:%S")}| storeDirWriteCleanLogs: Starting... ({rng.randint(0, 99999)} entries)\n'
+
+
+def squid_store(rng: random.Random, clock: Clock) -> str:
+    now = clock.tick()
+    return (f'{now:.3f} RELEASE -1 FFFFFFFF {rng.getrandbits(128):032X} 200 {int(now)} -1 -1 text/html '
+            f'{rng.randint(200, 20000)}/{rng.randint(200, 20000)} GET {url(rng)}\n')
+
+
+def squid_referer(rng: random.Random, clock: Clock) -> str:
+    now = clock.tick()
+    return f'{now:.3f} {rng.choice(CLIENTS)} {url(rng)} {url(rng)}\n'
+
+
+def squid_useragent(rng: random.Random, clock: Clock) -> str:
+    clock.tick()
+    return f'{rng.choice(CLIENTS)} [{clock.format("%d/%b/%Y:%H:%M:%S")} +0000] "{rng.choice(AGENTS)}"\n'
+
+
+def cups(rng: random.Random, clock: Clock) -> str:
+    clock.tick()
+    return (f'{rng.choice(CUPS_LEVELS)} [{clock.format("%d/%b/%Y:%H:%M:%S")} -0000] Job {rng.randint(1, 9999)} '
+            f'queued on "laserjet" by "user{rng.randint(1, 50)}".\n')
+
+
+def httpd_access(rng: random.Random, clock: Clock) -> str:
+    clock.tick()
+    return (f'{rng.choice(CLIENTS)} - - [{clock.format("%d/%b/%Y:%H:%M:%S")} +0000] "GET {rng.choice(PATHS)} '
+            f'HTTP/1.1" {rng.choice([200, 200, 304, 404])} {rng.randint(200, 50000)}\n')
+
+
+def httpd_request(rng: random.Random, clock: Clock) -> str:
+    clock.tick()
+    return (f'[{clock.format("%d/%b/%Y:%H:%M:%S")} +0000] {rng.choice(CLIENTS)} TLSv1 DHE-RSA-AES256-SHA '
+            f'"GET {rng.choice(PATHS)} HTTP/1.1" {rng.randint(200, 50000)}\n')
+
+
+def httpd_error(rng: random.Random, clock: Clock) -> str:
+    clock.tick()
+    return (f'[{clock.format("%a %b %d %H:%M:%S %Y")}] [{rng.choice(APACHE_LEVELS)}] [client {rng.choice(CLIENTS)}] '
+            f'File does not exist: /var/www/html{rng.choice(PATHS)}\n')
+
+
+# Formatos disponibles: nombre del fichero que se genera (que determina su clase de procesamiento) y generador de
+# líneas.
+FORMATS: Dict[str, tuple] = {
+    'syslog': ('messages', syslog),
+    'squid-access': ('access.log', squid_access),
+    'squid-cache': ('cache.log', squid_cache),
+    'squid-store': ('store.log', squid_store),
+    'squid-referer': ('referer_log.log', squid_referer),
+    'squid-useragent': ('useragent_log.log', squid_useragent),
+    'cups': ('error_log', cups),
+    'httpd-access': ('ssl_access_log', httpd_access),
+    'httpd-request': ('ssl_request_log', httpd_request),
+    'httpd-error': ('ssl_error_log', httpd_error),
+}
+
+
+def generate_lines(fmt: str, seed: int = 0) -> Iterator[List[str]]:
+    """
+    :param fmt: Nombre de uno de los formatos de FORMATS.
+    :param seed: Semilla del generador aleatorio.
+    :return: Iterador infinito de bloques de CHUNK_LINES líneas del formato.
+    """
+    generator: Callable = FORMATS[fmt][1]
+    rng = random.Random(f'{fmt}:{seed}')
+    clock = Clock(rng)
+    while True:
+        yield [generator(rng, clock) for _ in range(CHUNK_LINES)]
+
+
+def write_log(directory: str, fmt: str, size: int, seed: int = 0, compress: bool = False) -> str:
+    """
+    :param directory: Directorio en el que se escribe el fichero.
+    :param fmt: Nombre de uno de los formatos de FORMATS.
+    :param size: Tamaño aproximado, en bytes sin comprimir, del fichero.
+    :param seed: Semilla del generador aleatorio.
+    :param compress: Si el fichero se comprime con gzip, como las rotaciones de Squid.
+    :return: Ruta del fichero. Si ya existe un fichero generado con los mismos parámetros, se reutiliza.
+
+    Generación de un fichero de log sintético. Las líneas se escriben por bloques, por lo que el tamaño no está
+    limitado por la memoria. La ruta incluye el formato, el tamaño y la semilla para poder conservar los ficheros entre
+    ejecuciones; el nombre del fichero es el que find_parser asocia a la clase del formato.
+    """
+    name = FORMATS[fmt][0] + ('.gz' if compress else '')
+    path = os.path.join(directory, f'{fmt}-{size}-{seed}', name)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.partial'
+    opener = gzip.open if compress else open
+    written = 0
+    with opener(partial, 'wt', encoding='utf8') as f:
+        for chunk in generate_lines(fmt, seed):
+            data = ''.join(chunk)
+            f.write(data)
+            written += len(data)
+            if written >= size:
+                break
+    # El fichero solo toma su nombre definitivo cuando está completo, para no reutilizar una generación interrumpida.
+    os.replace(partial, path)
+    return path
@@ -0,0 +1,195 @@
+import argparse
+import sys
+from typing import List
+
+from config import BATCH_SIZE, FLUSH_INTERVAL, LOG_DIR, MAX_DELAY, READ_WORKERS, STORE_PATH
+
+# Punto de entrada de línea de comandos con los subcomandos ingest, follow, query, search, traffic, correlate y plot.
+# Este módulo solo importa la biblioteca estándar y config.py: cada subcomando importa los módulos que necesita (y con
+# ellos NumPy, pandas o matplotlib) al ejecutarse, de forma que la ayuda y los errores de argumentos se muestran sin
+# cargarlos.
+# Uso (desde la raíz del repositorio): python -m cli {ingest,follow,query,search,traffic,correlate,plot} [opciones]
+
+
+def ingest_command(args: argparse.Namespace):
+    from main import run_ingest
+
+    run_ingest(args)
+
+
+def follow_command(args: argparse.Namespace):
+    from follow import run_follow
+
+    run_follow(args)
+
+
+def query_command(args: argparse.Namespace):
+    from query import query
+
+    result = query(args.store, start=args.start, end=args.end, app_name=args.app, host_name=args.host,
+                   max_severity=args.max_severity)
+    print(result)
+    print(len(result), 'filas')
+
+
+def search_command(args: argparse.Namespace):
+    from search import search
+
+    result = search(args.store, args.text, start=args.start, end=args.end, app_name=args.app, host_name=args.host,
+                    max_severity=args.max_severity)
+    print(result)
+    print(len(result), 'filas')
+
+
+def traffic_command(args: argparse.Namespace):
+    from traffic import bandwidth_by_client, latency_by_domain
+
+    report = bandwidth_by_client if args.by == 'client' else latency_by_domain
+    print(report(args.store, start=args.start, end=args.end).head(args.top).to_string())
+
+
+def correlate_command(args: argparse.Namespace):
+    from correlate import correlate
+
+    result = correlate(args.store, args.source, args.window, start=args.start, end=args.end)
+    print(result)
+    print(len(result), 'pares')
+
+
+def plot_command(args: argparse.Namespace):
+    if args.output is None:
+        from plotter import plot
+
+        plot(args.store)
+        return
+    from plotter import render
+
+    for path in render(args.store, args.output, args.format, workers=args.workers, points=args.points or None,
+                       method=args.downsampling):
+        print(path)
+
+
+def add_filter_arguments(parser: argparse.ArgumentParser):
+    # Almacén y filtros de las filas, comunes a query y search.
+    parser.add_argument('--store', default=STORE_PATH, help='Directorio del almacén columnar.')
+    parser.add_argument('--start', help='Inicio del rango de tiempo, incluido (UTC si no indica la zona).')
+    parser.add_argument('--end', help='Fin del rango de tiempo, excluido (UTC si no indica la zona).')
+    parser.add_argument('--app', action='append', help='Aplicación buscada. Puede repetirse.')
+    parser.add_argument('--host', action='append', help='Host buscado. Puede repetirse.')
+    parser.add_argument('--max-severity', type=int, help='Severidad syslog máxima (3 para errores).')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='cli', description='Análisis de logs: ingesta, consulta y visualización.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Normalización de los logs al almacén columnar.',
+                                          description='Normalización de los logs de LOG_DIR al formato estándar.')
+    ingest_parser.add_argument('--log-dir', default=LOG_DIR, help='Directorio que contiene los ficheros de log.')
+    ingest_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                               help='Número máximo de líneas procesadas que se mantienen en memoria a la vez.')
+    ingest_parser.add_argument('--read-workers', type=int, default=READ_WORKERS,
+                               help='Número de hilos que leen y descomprimen ficheros por adelantado.')
+    ingest_parser.add_argument('--year', type=int, default=None,
+                               help='Año de los timestamps que no lo incluyen (por defecto, el de modificación de cada '
+                                    'fichero).')
+    ingest_parser.add_argument('--store', default=STORE_PATH, help='Directorio del almacén columnar de salida.')
+    ingest_parser.add_argument('--incremental', action='store_true',
+                               help='Procesar solo los ficheros nuevos o modificados desde la ejecución anterior.')
+    ingest_parser.add_argument('--workers', type=int, default=0,
+                               help='Número de procesos para el procesamiento en paralelo de los ficheros (0: '
+                                    'secuencial).')
+    ingest_parser.add_argument('--report', action='store_true',
+                               help='Mostrar la velocidad y la cobertura de cada fuente de logs (solo en modo '
+                                    'secuencial).')
+    ingest_parser.add_argument('--pipeline', action='store_true',
+                               help='Procesar con el flujo por etapas de pipeline.py y mostrar las métricas de cada '
+                                    'etapa.')
+    ingest_parser.add_argument('--instrument', metavar='FICHERO', default=None,
+                               help='Medir el tiempo de cada etapa y de cada fuente y guardar el informe JSON en '
+                                    'FICHERO.')
+    ingest_parser.add_argument('--sample-profile', action='store_true',
+                               help='Incluir en el informe de --instrument un perfil por muestreo del hilo principal.')
+    ingest_parser.set_defaults(handler=ingest_command)
+
+    follow_parser = subparsers.add_parser('follow', help='Seguimiento continuo de los logs hacia el almacén.',
+                                          description='Seguimiento continuo de los logs de LOG_DIR, como tail -f, '
+                                                      'con escritura periódica en el almacén columnar.')
+    follow_parser.add_argument('--log-dir', default=LOG_DIR, help='Directorio que contiene los ficheros de log.')
+    follow_parser.add_argument('--store', default=STORE_PATH, help='Directorio del almacén columnar.')
+    follow_parser.add_argument('--max-delay', type=float, default=MAX_DELAY,
+                               help='Retraso máximo en segundos entre la escritura de una línea y su entrega.')
+    follow_parser.add_argument('--flush-interval', type=float, default=FLUSH_INTERVAL,
+                               help='Intervalo máximo en segundos entre escrituras en el almacén.')
+    follow_parser.add_argument('--polling', action='store_true', help='Usar sondeo en lugar de inotify.')
+    follow_parser.add_argument('--from-start', action='store_true',
+                               help='Procesar también el contenido actual de los ficheros.')
+    follow_parser.add_argument('--year', type=int, default=None, help='Año de los timestamps que no lo incluyen.')
+    follow_parser.set_defaults(handler=follow_command)
+
+    query_parser = subparsers.add_parser('query', help='Consulta del almacén por tiempo, aplicación y host.',
+                                         description='Consulta del almacén de logs por tiempo, aplicación y host.')
+    add_filter_arguments(query_parser)
+    query_parser.set_defaults(handler=query_command)
+
+    search_parser = subparsers.add_parser('search', help='Búsqueda de texto completo en los mensajes.',
+                                          description='Búsqueda de palabras, IPs y frases en los mensajes del almacén.')
+    search_parser.add_argument('text', help='Consulta: palabras, frases entre comillas, OR, NOT o - y paréntesis.')
+    add_filter_arguments(search_parser)
+    search_parser.set_defaults(handler=search_command)
+
+    traffic_parser = subparsers.add_parser('traffic', help='Informes de tráfico del proxy Squid.',
+                                           description='Ancho de banda por cliente o latencia por dominio de las '
+                                                       'peticiones de access.log de Squid.')
+    traffic_parser.add_argument('--by', choices=['client', 'domain'], default='client',
+                                help='Agrupación: bytes por cliente (client) o tiempo de respuesta por dominio '
+                                     '(domain).')
+    traffic_parser.add_argument('--store', default=STORE_PATH, help='Directorio del almacén columnar.')
+    traffic_parser.add_argument('--start', help='Inicio del rango de tiempo, incluido (UTC si no indica la zona).')
+    traffic_parser.add_argument('--end', help='Fin del rango de tiempo, excluido (UTC si no indica la zona).')
+    traffic_parser.add_argument('--top', type=int, default=20, help='Número de filas que se muestran.')
+    traffic_parser.set_defaults(handler=traffic_command)
+
+    correlate_parser = subparsers.add_parser('correlate', help='Correlación de fuentes por IP dentro de una ventana.',
+                                             description='Pares de eventos de fuentes distintas con la misma IP o host '
+                                                         'separados como mucho por la ventana indicada.')
+    correlate_parser.add_argument('--source', action='append',
+                                  help='Fuente: sshd, squid, httpd o mod_security. Puede repetirse (por defecto, sshd, '
+                                       'squid y httpd).')
+    correlate_parser.add_argument('--window', type=float, default=5.0,
+                                  help='Diferencia máxima en segundos entre los dos eventos de un par.')
+    correlate_parser.add_argument('--store', default=STORE_PATH, help='Directorio del almacén columnar.')
+    correlate_parser.add_argument('--start', help='Inicio del rango de tiempo, incluido (UTC si no indica la zona).')
+    correlate_parser.add_argument('--end', help='Fin del rango de tiempo, excluido (UTC si no indica la zona).')
+    correlate_parser.set_defaults(handler=correlate_command)
+
+    plot_parser = subparsers.add_parser('plot', help='Gráficas de actividad del almacén.',
+                                        description='Gráficas de actividad a partir de las tablas de recuento del '
+                                                    'almacén.')
+    plot_parser.add_argument('--store', default=STORE_PATH, help='Directorio del almacén columnar.')
+    plot_parser.add_argument('--output', metavar='DIRECTORIO', default=None,
+                             help='Guardar las gráficas como ficheros en DIRECTORIO, sin mostrarlas (no necesita '
+                                  'entorno gráfico).')
+    plot_parser.add_argument('--format', action='append', choices=['png', 'svg'],
+                             help='Formato de los ficheros de --output. Puede repetirse (por defecto, png).')
+    plot_parser.add_argument('--workers', type=int, default=None,
+                             help='Número de procesos que dibujan las gráficas de --output (por defecto, uno por CPU; '
+                                  '0: en el propio proceso).')
+    plot_parser.add_argument('--points', type=int, default=2000,
+                             help='Número máximo de puntos de la serie por minuto (0: sin reducir).')
+    plot_parser.add_argument('--downsampling', choices=['minmax', 'lttb'], default='minmax',
+                             help='Método de reducción de la serie por minuto: mínimo y máximo por tramo o LTTB.')
+    plot_parser.set_defaults(handler=plot_command)
+    return parser
+
+
+def main(argv: List[str] = None):
+    """
+    :param argv: Argumentos de la línea de comandos, sin el nombre del programa. Por defecto, los de sys.argv.
+    """
+    args = build_parser().parse_args(sys.argv[1:] if argv is None else argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
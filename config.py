@@ -0,0 +1,15 @@
+# Valores por defecto compartidos por la biblioteca y por la línea de comandos (cli.py). Este módulo no importa nada,
+# para que cli.py pueda mostrar la ayuda y validar los argumentos sin cargar NumPy ni pandas.
+
+# Directorio de los logs de entrada.
+LOG_DIR = 'hnet-hon-var-log-02282006/var/log/'
+# Directorio del almacén columnar (véase store.py).
+STORE_PATH = 'logs.store'
+BATCH_SIZE = 10000
+READ_WORKERS = 4
+# Retraso máximo entre la llegada de una línea seguida y su entrega en un microlote (véase follow.py).
+MAX_DELAY = 0.2
+# Intervalo máximo entre escrituras del seguimiento en el almacén. Cada escritura crea al menos un bloque y actualiza
+# meta.json, las plantillas, los recuentos y los detectores, así que se agrupan los microlotes de ese intervalo; junto
+# con MAX_DELAY, mantiene el retraso hasta el almacén por debajo de un segundo.
+FLUSH_INTERVAL = 0.5
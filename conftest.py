@@ -0,0 +1,65 @@
+import gzip
+import itertools
+import os.path
+from typing import List
+
+import pytest
+
+from benchmarks.synthetic import FORMATS, generate_lines
+
+# Configuración común de las pruebas. Al estar en la raíz del repositorio, pytest la añade a sys.path y las pruebas de
+# tests/ importan los módulos igual que cli.py. Los logs de las pruebas son pequeños y se generan con los mismos
+# generadores que las pruebas de rendimiento (benchmarks/synthetic.py).
+
+# Año de referencia de las pruebas para los timestamps que no lo incluyen (el de los logs sintéticos).
+YEAR = 2006
+
+# Número de líneas de cada fichero de log_dir.
+LINES = 500
+
+
+def synthetic_lines(fmt: str, count: int = LINES, seed: int = 0) -> List[str]:
+    """
+    :param fmt: Nombre de uno de los formatos de benchmarks.synthetic.FORMATS.
+    :param count: Número de líneas.
+    :param seed: Semilla del generador aleatorio.
+    :return: Primeras líneas sintéticas del formato, con su salto de línea.
+    """
+    return list(itertools.islice(itertools.chain.from_iterable(generate_lines(fmt, seed)), count))
+
+
+def write_lines(path: str, lines: List[str], compress: bool = False) -> str:
+    """
+    :param path: Ruta del fichero.
+    :param lines: Líneas a escribir, con su salto de línea.
+    :param compress: Si el fichero se comprime con gzip.
+    :return: Ruta del fichero.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    opener = gzip.open if compress else open
+    with opener(path, 'wt', encoding='utf8') as f:
+        f.write(''.join(lines))
+    return path
+
+
+@pytest.fixture
+def log_dir(tmp_path) -> str:
+    # Directorio con un fichero pequeño de cada formato sintético, cada uno en su subdirectorio como en hnet-hon-var-log.
+    for fmt, (name, _) in FORMATS.items():
+        write_lines(os.path.join(tmp_path, 'logs', fmt, name), synthetic_lines(fmt))
+    return os.path.join(tmp_path, 'logs')
+
+
+@pytest.fixture
+def log_frame(log_dir):
+    # Tabla normalizada de log_dir.
+    from frames import build_frame
+    from main import ingest_logs
+    return build_frame(ingest_logs(log_dir, year=YEAR))
+
+
+@pytest.fixture
+def log_store(log_frame, tmp_path):
+    # Almacén con la tabla de log_dir repartida en bloques pequeños, para que las consultas recorran varios.
+    from store import save_store
+    return save_store(log_frame, os.path.join(tmp_path, 'store'), block_rows=1000)
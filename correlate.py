@@ -0,0 +1,256 @@
+import collections
+import dataclasses
+import heapq
+import re
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from batch import MISSING, timestamp_array
+from query import LogIndex, TimeBound, to_nanoseconds
+from store import STORE_PATH, LogStore
+
+# Correlación de fuentes de logs por clave (IP o host) dentro de una ventana de tiempo: para seguir a un atacante se
+# buscan, por ejemplo, los fallos de sshd, las peticiones de access.log de Squid y las de ssl_access_log de httpd de la
+# misma IP con pocos segundos de diferencia. Un merge de pandas por clave compara todas las filas de una fuente con
+# todas las de la otra para cada clave (N×M) y solo después filtra por tiempo.
+#
+# Aquí cada fuente se lee del almacén como un flujo ordenado por timestamp, bloque a bloque, y los flujos se mezclan en
+# uno solo (merge de k vías). Recorriendo la mezcla, cada evento se compara únicamente con los eventos de las demás
+# fuentes con su misma clave que siguen dentro de la ventana, que son los únicos que se conservan: la memoria depende
+# del número de eventos de la ventana, no del tamaño de las fuentes.
+#
+# Antes de la mezcla, una primera pasada lee solo las claves de cada fuente y descarta las que no aparecen en al menos
+# dos fuentes, que no pueden formar ningún par. Los mensajes solo se leen para las filas de los pares encontrados.
+
+# Prefijo de las direcciones IPv4 representadas como IPv6 (sshd escribe '::ffff:203.71.234.22').
+IPV4_MAPPED = '::ffff:'
+
+
+@dataclasses.dataclass
+class Source:
+    # Fuente de eventos: filas de unas aplicaciones y clave de cada fila. La clave es host_name o, si se indica pattern,
+    # el primer grupo de la expresión en el mensaje; las filas sin clave no se incluyen.
+
+    name: str
+    app_name: List[str]
+    pattern: Optional[str] = None
+
+    def __post_init__(self):
+        self.expression = re.compile(self.pattern) if self.pattern else None
+
+
+# Fuentes predefinidas para seguir IPs entre servicios. Los fallos de sshd (contraseña incorrecta, usuario inexistente,
+# conexión sin identificación y fallos de autenticación de PAM) llevan la IP en el mensaje.
+SOURCES = {
+    'sshd': Source('sshd', ['sshd', 'sshd(pam_unix)'],
+                   r'(?:Failed password|Illegal user|Invalid user|Did not receive identification string|authentication '
+                   r'failure).*?(?:from |rhost=)(\S+)'),
+    'squid': Source('squid', ['Squid']),
+    'httpd': Source('httpd', ['httpd']),
+    'mod_security': Source('mod_security', ['mod_security']),
+}
+
+# Evento de un flujo: timestamp en nanosegundos, posición de la fuente, clave y fila (bloque y posición en el bloque).
+Event = Tuple[int, int, str, Tuple[int, int]]
+
+
+def normalize_key(key: str) -> str:
+    """
+    :return: Clave comparable entre fuentes: en minúsculas y con las IPv4 representadas como IPv6 en su forma IPv4.
+    """
+    key = key.lower()
+    return key[len(IPV4_MAPPED):] if key.startswith(IPV4_MAPPED) else key
+
+
+class CorrelationJoin:
+    # Unión por clave y ventana de tiempo de dos o más fuentes de un almacén. max_buffered registra el máximo de
+    # eventos que se han llegado a conservar a la vez en la ventana.
+
+    def __init__(self, store: Union[str, LogStore] = STORE_PATH, sources: Iterable[Union[str, Source]] = None,
+                 window: float = 5.0):
+        """
+        :param store: Almacén o directorio del almacén.
+        :param sources: Fuentes, como objetos Source o nombres de SOURCES. Por defecto, sshd, squid y httpd.
+        :param window: Diferencia máxima en segundos entre los timestamps de los dos eventos de un par.
+        """
+        self.index = LogIndex(store)
+        sources = ['sshd', 'squid', 'httpd'] if sources is None else sources
+        self.sources = [SOURCES[source] if isinstance(source, str) else source for source in sources]
+        if len(self.sources) < 2:
+            raise ValueError('La correlación necesita al menos dos fuentes')
+        self.window = int(window * 1e9)
+        self.max_buffered = 0
+
+    def source_blocks(self, source: Source, start: int = None, end: int = None) -> Tuple[Dict, List[List[int]]]:
+        """
+        :return: Filtro de la fuente para LogIndex y tramos de sus bloques candidatos, en orden, dentro de los cuales
+            los bloques no se solapan en el tiempo.
+        """
+        filters = {'app_name': self.index.lookup('app_name', source.app_name)}
+        runs: List[List[int]] = []
+        for block in self.index.candidates(start, end, filters):
+            # Los bloques de escrituras distintas pueden solaparse: cada solapamiento empieza un tramo nuevo.
+            if runs and not self.index.store.overlapping([runs[-1][-1], block]):
+                runs[-1].append(block)
+            else:
+                runs.append([block])
+        return filters, runs
+
+    def block_keys(self, source: Source, block: int, rows: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+        """
+        :return: Posiciones (dentro de rows) de las filas del bloque con clave y clave normalizada de cada una.
+        """
+        store = self.index.store
+        if source.expression is None:
+            codes = store.read_column(block, 'host_name', rows)
+            present = np.flatnonzero(codes != MISSING)
+            dictionary = store.meta['dictionaries']['host_name']
+            keys = {code: normalize_key(dictionary[code]) for code in np.unique(codes[present]).tolist()}
+            return present, [keys[code] for code in codes[present].tolist()]
+        positions, keys = [], []
+        search = source.expression.search
+        for position, message in enumerate(store.read_messages(block, rows)):
+            match = search(message) if message else None
+            if match is not None:
+                positions.append(position)
+                keys.append(normalize_key(match.group(1)))
+        return np.array(positions, dtype=np.int64), keys
+
+    def events(self, position: int, start: int = None, end: int = None,
+               allowed: Set[str] = None) -> Iterator[Event]:
+        """
+        :param position: Posición de la fuente en sources.
+        :param allowed: Claves que se incluyen. Por defecto, todas.
+        :return: Eventos de la fuente en el rango de tiempo, en orden de timestamp.
+        """
+        source = self.sources[position]
+        filters, runs = self.source_blocks(source, start, end)
+
+        def run_events(blocks: List[int]) -> Iterator[Event]:
+            for block in blocks:
+                rows = self.index.select_rows(block, start, end, filters)
+                if not len(rows):
+                    continue
+                present, keys = self.block_keys(source, block, rows)
+                timestamp = self.index.store.read_column(block, 'timestamp', rows[present])
+                for value, key, row in zip(timestamp.tolist(), keys, rows[present].tolist()):
+                    if allowed is None or key in allowed:
+                        yield value, position, key, (block, row)
+
+        # Los eventos de cada tramo ya están ordenados; los tramos solapados se mezclan.
+        if len(runs) == 1:
+            return run_events(runs[0])
+        return heapq.merge(*[run_events(blocks) for blocks in runs])
+
+    def shared_keys(self, start: int = None, end: int = None) -> Set[str]:
+        """
+        :return: Claves que aparecen en al menos dos fuentes en el rango de tiempo.
+        """
+        counts: Dict[str, int] = collections.Counter()
+        for position, source in enumerate(self.sources):
+            keys = set()
+            filters, runs = self.source_blocks(source, start, end)
+            for block in (block for blocks in runs for block in blocks):
+                rows = self.index.select_rows(block, start, end, filters)
+                keys.update(self.block_keys(source, block, rows)[1])
+            counts.update(keys)
+        return {key for key, count in counts.items() if count >= 2}
+
+    def pairs(self, start: TimeBound = None, end: TimeBound = None, prefilter: bool = True) -> Iterator[tuple]:
+        """
+        :param start: Inicio del rango de tiempo, incluido. Por defecto, sin límite.
+        :param end: Fin del rango de tiempo, excluido. Por defecto, sin límite.
+        :param prefilter: Si se descartan antes de la mezcla las claves que solo aparecen en una fuente.
+        :return: Iterador de pares (clave, evento anterior, evento posterior) de fuentes distintas, con la misma clave y
+            como mucho window de diferencia, en orden del evento posterior. Cada evento es (timestamp, fuente, fila).
+
+        La ventana guarda, por clave y fuente, los eventos de los últimos window nanosegundos. Como la mezcla está
+        ordenada, los eventos caducan en el mismo orden en que entran, y una única cola de caducidad basta para
+        retirarlos.
+        """
+        start, end = to_nanoseconds(start), to_nanoseconds(end)
+        allowed = self.shared_keys(start, end) if prefilter else None
+        streams = [self.events(position, start, end, allowed) for position in range(len(self.sources))]
+        recent: Dict[str, Dict[int, Deque]] = {}
+        expiry: Deque[Tuple[int, str, int]] = collections.deque()
+        self.max_buffered = 0
+        for timestamp, position, key, row in heapq.merge(*streams):
+            limit = timestamp - self.window
+            while expiry and expiry[0][0] < limit:
+                _, old_key, old_position = expiry.popleft()
+                buffers = recent[old_key]
+                buffers[old_position].popleft()
+                if not buffers[old_position]:
+                    del buffers[old_position]
+                    if not buffers:
+                        del recent[old_key]
+            buffers = recent.setdefault(key, {})
+            for other, events in buffers.items():
+                if other != position:
+                    for event in events:
+                        yield key, event, (timestamp, position, row)
+            buffers.setdefault(position, collections.deque()).append((timestamp, position, row))
+            expiry.append((timestamp, key, position))
+            if len(expiry) > self.max_buffered:
+                self.max_buffered = len(expiry)
+
+    def correlate(self, start: TimeBound = None, end: TimeBound = None, messages: bool = True,
+                  prefilter: bool = True) -> pd.DataFrame:
+        """
+        :param start: Inicio del rango de tiempo, incluido. Por defecto, sin límite.
+        :param end: Fin del rango de tiempo, excluido. Por defecto, sin límite.
+        :param messages: Si se incluyen los mensajes de los dos eventos de cada par.
+        :param prefilter: Como en pairs.
+        :return: Dataframe con un par por fila: clave (key), fuente, timestamp y mensaje del evento anterior (source_a,
+            timestamp_a, message_a) y del posterior (source_b...), y diferencia en segundos (delta_s).
+        """
+        keys, sources_a, times_a, rows_a, sources_b, times_b, rows_b = [], [], [], [], [], [], []
+        for key, first, second in self.pairs(start, end, prefilter):
+            keys.append(key)
+            for (timestamp, position, row), sources, times, rows in ((first, sources_a, times_a, rows_a),
+                                                                     (second, sources_b, times_b, rows_b)):
+                sources.append(self.sources[position].name)
+                times.append(timestamp)
+                rows.append(row)
+        times_a, times_b = np.array(times_a, dtype=np.int64), np.array(times_b, dtype=np.int64)
+        frame = pd.DataFrame({
+            'key': keys,
+            'source_a': sources_a,
+            'timestamp_a': timestamp_array(times_a),
+            'source_b': sources_b,
+            'timestamp_b': timestamp_array(times_b),
+            'delta_s': (times_b - times_a) / 1e9,
+        })
+        if messages:
+            frame['message_a'] = self.read_messages(rows_a)
+            frame['message_b'] = self.read_messages(rows_b)
+        return frame
+
+    def read_messages(self, rows: List[Tuple[int, int]]) -> List[Optional[str]]:
+        """
+        :param rows: Filas (bloque, posición en el bloque).
+        :return: Mensaje de cada fila. Cada bloque se lee una sola vez, y solo las filas pedidas.
+        """
+        by_block: Dict[int, List[int]] = {}
+        for block, row in rows:
+            by_block.setdefault(block, []).append(row)
+        found = {}
+        for block, positions in by_block.items():
+            positions = np.unique(positions)
+            for row, message in zip(positions.tolist(), self.index.store.read_messages(block, positions)):
+                found[block, row] = message
+        return [found[row] for row in rows]
+
+
+def correlate(store: Union[str, LogStore] = STORE_PATH, sources: Iterable[Union[str, Source]] = None,
+              window: float = 5.0, **filters) -> pd.DataFrame:
+    """
+    :param store: Almacén o directorio del almacén.
+    :param sources: Fuentes que se correlacionan, como en CorrelationJoin.
+    :param window: Diferencia máxima en segundos entre los eventos de un par.
+    :param filters: Argumentos de CorrelationJoin.correlate.
+    :return: Dataframe con los pares de eventos correlacionados.
+    """
+    return CorrelationJoin(store, sources, window).correlate(**filters)
@@ -0,0 +1,342 @@
+import argparse
+import ctypes
+import ctypes.util
+import os
+import os.path
+import re
+import select
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from batch import LogBatch, parse_batches
+from config import FLUSH_INTERVAL, MAX_DELAY
+from frames import FrameBuilder
+from main import BATCH_SIZE, ENCODING_ERRORS, LOG_DIR, find_parser
+from store import BLOCK_ROWS, STORE_PATH, LogStore, create_store
+
+# Seguimiento continuo de ficheros de log, como tail -f. Las líneas nuevas de cada fichero se procesan con su clase de
+# Logs y se entregan en microlotes (LogBatch) a un destino, por ejemplo el almacén columnar. Los cambios se detectan con
+# inotify a través de ctypes y, si no está disponible, consultando los ficheros periódicamente. En ambos casos la
+# detección solo sirve para despertar al seguidor: en cada despertar se lee lo nuevo de todos los ficheros seguidos, por
+# lo que el comportamiento es el mismo con los dos mecanismos.
+#
+# Rotaciones y truncados:
+#   - Si la ruta pasa a ser otro fichero (cron -> cron.1 y se crea un cron nuevo), se termina de leer el fichero
+#     anterior por el descriptor que sigue abierto y se continúa con el nuevo desde el principio.
+#   - Si el fichero se trunca (copytruncate), se vuelve al principio.
+#   - Si la ruta desaparece, se conserva el fichero anterior hasta que vuelva a existir.
+#
+# Solo se siguen las clases de texto que procesan una línea por registro: los ficheros binarios y los formatos de varias
+# líneas (audit_log) no se escriben de forma incremental por líneas.
+#
+# Uso (desde la raíz del repositorio): python -m cli follow [opciones]
+
+# Intervalo entre consultas del mecanismo de sondeo.
+POLL_INTERVAL = 0.1
+
+# Máscara de eventos de inotify sobre los directorios de los ficheros seguidos: escritura, creación, renombrado y
+# borrado de cualquier fichero del directorio.
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+class PollingWatcher:
+    # Detección de cambios por sondeo: simplemente espera el intervalo de sondeo.
+
+    def __init__(self, directories: Iterable[str], interval: float = POLL_INTERVAL):
+        self.interval = interval
+
+    def wait(self, timeout: float) -> bool:
+        """
+        :param timeout: Tiempo máximo de espera en segundos.
+        :return: Si puede haber cambios. Con sondeo siempre se supone que sí.
+        """
+        time.sleep(min(timeout, self.interval))
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    # Detección de cambios con inotify (Linux), sin dependencias externas: las llamadas al sistema se hacen con ctypes
+    # sobre la libc. Se vigilan los directorios, y no los ficheros, para recibir también las creaciones y los
+    # renombrados de las rotaciones.
+
+    def __init__(self, directories: Iterable[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+                errno = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(errno, 'inotify_add_watch', directory)
+
+    def wait(self, timeout: float) -> bool:
+        """
+        :param timeout: Tiempo máximo de espera en segundos.
+        :return: Si se ha recibido algún evento antes de agotar el tiempo.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # Los eventos solo despiertan al seguidor, por lo que basta con vaciar la cola sin interpretarlos.
+        while True:
+            try:
+                if not os.read(self.fd, 1 << 16):
+                    break
+            except BlockingIOError:
+                break
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def create_watcher(directories: Iterable[str], polling: bool = False):
+    """
+    :param directories: Directorios de los ficheros seguidos.
+    :param polling: Si se fuerza el sondeo en lugar de inotify.
+    :return: InotifyWatcher si está disponible y no se fuerza el sondeo; PollingWatcher en otro caso.
+    """
+    directories = list(directories)
+    if not polling:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            # Sin libc, sin inotify (no Linux) o sin descriptores de inotify disponibles.
+            pass
+    return PollingWatcher(directories)
+
+
+class FollowedFile:
+    # Estado de un fichero seguido: descriptor abierto, identidad (dispositivo e inodo) del fichero que se está leyendo,
+    # posición y la última línea incompleta, que se completa en lecturas posteriores.
+
+    def __init__(self, path: str, year: int = None, from_start: bool = False):
+        self.path = path
+        self.parser_class = find_parser(os.path.basename(path))
+        self.year = year
+        self.file = None
+        self.identity = None
+        self.offset = 0
+        self.partial = b''
+        self.fields = None
+        self.reopen(from_start)
+
+    def reopen(self, from_start: bool = True) -> bool:
+        """
+        :param from_start: Si se lee el fichero desde el principio o solo lo que se escriba a partir de ahora.
+        :return: Si la ruta existe y se ha abierto.
+        """
+        try:
+            file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        if self.file is not None:
+            self.file.close()
+        stat = os.fstat(file.fileno())
+        self.file, self.identity, self.partial = file, (stat.st_dev, stat.st_ino), b''
+        self.offset = 0 if from_start else file.seek(0, os.SEEK_END)
+        # Las opciones del fichero (año de referencia, formato de Squid) se calculan de nuevo para cada fichero.
+        self.fields = self.parser_class.fields_for_file(self.path, self.year)
+        return True
+
+    def read_available(self) -> List[str]:
+        """
+        :return: Líneas completas escritas desde la lectura anterior en el fichero abierto.
+        """
+        if self.file is None:
+            return []
+        data = self.file.read()
+        if not data:
+            return []
+        self.offset += len(data)
+        *lines, self.partial = (self.partial + data).split(b'\n')
+        return [line.decode('utf8', ENCODING_ERRORS) + '\n' for line in lines]
+
+    def read_chunks(self) -> List[Tuple[Callable[[str], Dict], List[str]]]:
+        """
+        :return: Pares (función de procesamiento, líneas completas nuevas). Si la ruta ha rotado, el primer par
+            contiene lo que quedaba del fichero anterior, que se procesa con las opciones de ese fichero.
+        """
+        chunks = [(self.fields, self.read_available())]
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return chunks
+        if self.file is None or (stat.st_dev, stat.st_ino) != self.identity:
+            # Rotación: lo que quedaba del fichero anterior ya se ha leído; el nuevo se lee desde el principio.
+            if self.partial:
+                chunks[0][1].append(self.partial.decode('utf8', ENCODING_ERRORS) + '\n')
+            if self.reopen(from_start=True):
+                chunks.append((self.fields, self.read_available()))
+        elif stat.st_size < self.offset:
+            # Truncado: el contenido anterior ya se ha leído y el fichero vuelve a empezar.
+            self.file.seek(0)
+            self.offset, self.partial = 0, b''
+            chunks.append((self.fields, self.read_available()))
+        return [(fields, lines) for fields, lines in chunks if lines]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def live_files(log_dir: str = LOG_DIR) -> List[str]:
+    """
+    :param log_dir: Directorio que contiene los ficheros de log.
+    :return: Rutas de los ficheros que siguen recibiendo escrituras: los reconocidos por find_parser, de texto y de un
+        registro por línea, sin sufijo de rotación (.N) ni de compresión.
+    """
+    paths = []
+    for root, dirs, files in os.walk(log_dir):
+        for file in files:
+            parser_class = find_parser(file)
+            if parser_class is None or not parser_class.line_oriented():
+                continue
+            if re.search(r'\.\d+(\.gz|\.bz2)?$', file) or file.endswith(('.gz', '.bz2')):
+                continue
+            paths.append(os.path.join(root, file))
+    return paths
+
+
+class Follower:
+    # Bucle de seguimiento de un conjunto de ficheros. Las filas se acumulan en un microlote que se entrega al destino
+    # cuando alcanza batch_size filas o cuando su primera fila lleva max_delay segundos esperando.
+
+    def __init__(self, paths: Iterable[str], sink: Callable[[LogBatch], None], batch_size: int = BATCH_SIZE,
+                 max_delay: float = MAX_DELAY, year: int = None, from_start: bool = False, polling: bool = False):
+        self.files = [FollowedFile(path, year, from_start) for path in paths]
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.watcher = create_watcher({os.path.dirname(os.path.abspath(path)) for path in paths}, polling)
+        self.stop_event = threading.Event()
+        self.batch = LogBatch()
+        self.batch_start: Optional[float] = None
+        self.stats: Dict[str, int] = {'lines': 0, 'rows': 0, 'batches': 0}
+
+    def poll(self):
+        # Lectura de lo nuevo de todos los ficheros y entrega de los microlotes que ya deben salir.
+        for followed in self.files:
+            for fields, lines in followed.read_chunks():
+                self.stats['lines'] += len(lines)
+                for batch in parse_batches(lines, fields, self.batch_size):
+                    if self.batch_start is None:
+                        self.batch_start = time.monotonic()
+                    self.batch.extend(batch)
+                    if len(self.batch) >= self.batch_size:
+                        self.flush()
+        if self.batch_start is not None and time.monotonic() - self.batch_start >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        if len(self.batch):
+            self.stats['rows'] += len(self.batch)
+            self.stats['batches'] += 1
+            self.sink(self.batch)
+        self.batch = LogBatch()
+        self.batch_start = None
+
+    def run(self, duration: float = None):
+        """
+        :param duration: Duración máxima del seguimiento en segundos. Por defecto, hasta que se llame a stop.
+
+        Bucle principal. La espera de cada iteración se limita para que un microlote pendiente nunca espere más de
+        max_delay, y tras cada espera se avisa al destino, si tiene método tick, para sus escrituras por tiempo.
+        """
+        deadline = None if duration is None else time.monotonic() + duration
+        # Los destinos que acumulan filas (StoreSink) las escriben por tiempo aunque no lleguen microlotes nuevos.
+        tick = getattr(self.sink, 'tick', None)
+        try:
+            while not self.stop_event.is_set() and (deadline is None or time.monotonic() < deadline):
+                timeout = self.max_delay
+                if self.batch_start is not None:
+                    timeout = max(0.0, self.batch_start + self.max_delay - time.monotonic())
+                self.watcher.wait(timeout)
+                self.poll()
+                if tick is not None:
+                    tick()
+            self.poll()
+            self.flush()
+        finally:
+            self.close()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def close(self):
+        self.watcher.close()
+        for followed in self.files:
+            followed.close()
+
+
+class StoreSink:
+    # Destino que añade los microlotes al almacén columnar. Para no crear un bloque por microlote, las filas se
+    # acumulan y se escriben juntas cuando llenan un bloque (flush_rows filas) o cuando la primera fila pendiente lleva
+    # flush_interval segundos esperando, comprobado en cada microlote y en cada tick del seguidor. Los mensajes se codifican como plantillas al llegar cada microlote, así que la
+    # escritura solo copia columnas.
+
+    def __init__(self, path: str = STORE_PATH, flush_interval: float = FLUSH_INTERVAL, flush_rows: int = BLOCK_ROWS):
+        self.store = LogStore(path) if os.path.exists(os.path.join(path, 'meta.json')) else create_store(path)
+        self.flush_interval = flush_interval
+        self.flush_rows = flush_rows
+        self.builder = FrameBuilder(self.store.miner)
+        self.pending_start: Optional[float] = None
+        self.stats: Dict[str, int] = {'rows': 0, 'flushes': 0}
+
+    def __call__(self, batch: LogBatch):
+        # Un microlote que no cabe en el bloque en curso se deja para el siguiente, de forma que las escrituras por
+        # número de filas no dejan detrás un bloque casi vacío.
+        if len(self.builder) + len(batch) > self.flush_rows:
+            self.flush()
+        if self.pending_start is None:
+            self.pending_start = time.monotonic()
+        self.builder.add(batch)
+        if len(self.builder) >= self.flush_rows:
+            self.flush()
+        else:
+            self.tick()
+
+    def tick(self):
+        # Escritura por tiempo, también sin microlotes nuevos: el seguidor la llama en cada despertar, de forma que las
+        # filas pendientes de un fichero que deja de recibir líneas no esperan a la siguiente entrada.
+        if self.pending_start is not None and time.monotonic() - self.pending_start >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if len(self.builder):
+            self.stats['rows'] += len(self.builder)
+            self.stats['flushes'] += 1
+            self.store.append(self.builder.build())
+            self.builder = FrameBuilder(self.store.miner)
+        self.pending_start = None
+
+
+def run_follow(args: argparse.Namespace):
+    """
+    :param args: Argumentos del subcomando follow de cli.py.
+
+    Seguimiento de los ficheros de log_dir hacia el almacén hasta que se interrumpe con Ctrl+C. Las filas pendientes
+    se escriben al terminar.
+    """
+    sink = StoreSink(args.store, args.flush_interval)
+    follower = Follower(live_files(args.log_dir), sink, max_delay=args.max_delay, year=args.year,
+                        from_start=args.from_start, polling=args.polling)
+    print(f'Siguiendo {len(follower.files)} ficheros con {type(follower.watcher).__name__}')
+    try:
+        follower.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.flush()
+        print(follower.stats)
@@ -0,0 +1,120 @@
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from batch import LogBatch
+from templates import TemplateMiner
+
+
+def sort_run(timestamp: np.ndarray) -> np.ndarray:
+    """
+    :param timestamp: Timestamps de un tramo de logs (normalmente, un fichero o un lote de un fichero).
+    :return: Permutación que ordena el tramo de forma estable.
+
+    Los ficheros de log ya vienen casi siempre ordenados, por lo que antes de ordenar se comprueba si hace falta.
+    """
+    if np.all(timestamp[1:] >= timestamp[:-1]):
+        return np.arange(len(timestamp))
+    return np.argsort(timestamp, kind='stable')
+
+
+def merge_two(left: Tuple[np.ndarray, np.ndarray], right: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param left: Par (timestamps ordenados, posiciones de las filas) del primer tramo.
+    :param right: Par (timestamps ordenados, posiciones de las filas) del segundo tramo.
+    :return: Par (timestamps, posiciones) con la mezcla ordenada de ambos tramos.
+
+    Mezcla estable de dos tramos ordenados en tiempo lineal: a igualdad de timestamp, las filas de left van antes que
+    las de right. La posición final de cada fila es su posición en su tramo más el número de filas del otro tramo que
+    deben quedar delante de ella.
+    """
+    left_timestamp, left_rows = left
+    right_timestamp, right_rows = right
+    size = len(left_timestamp) + len(right_timestamp)
+
+    left_position = np.arange(len(left_timestamp)) + np.searchsorted(right_timestamp, left_timestamp, side='left')
+    right_position = np.arange(len(right_timestamp)) + np.searchsorted(left_timestamp, right_timestamp, side='right')
+
+    timestamp = np.empty(size, dtype=left_timestamp.dtype)
+    rows = np.empty(size, dtype=left_rows.dtype)
+    timestamp[left_position] = left_timestamp
+    timestamp[right_position] = right_timestamp
+    rows[left_position] = left_rows
+    rows[right_position] = right_rows
+    return timestamp, rows
+
+
+def merge_runs(runs: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """
+    :param runs: Pares (timestamps ordenados, posiciones de las filas) de cada tramo, en orden de llegada.
+    :return: Posiciones de todas las filas en orden de timestamp.
+
+    Mezcla de k tramos ordenados por parejas de tramos consecutivos, en log2(k) pasadas de coste lineal. Como cada
+    mezcla es estable y solo combina tramos vecinos, a igualdad de timestamp se conserva el orden de llegada.
+    """
+    if not runs:
+        return np.empty(0, dtype=np.int64)
+    while len(runs) > 1:
+        merged = [merge_two(runs[i], runs[i + 1]) for i in range(0, len(runs) - 1, 2)]
+        if len(runs) % 2:
+            merged.append(runs[-1])
+        runs = merged
+    return runs[0][1]
+
+
+class FrameBuilder:
+    # Ensamblado del dataframe global a partir de los lotes de cada fichero. Sustituye a la concatenación del
+    # dataframe acumulado con el de cada fichero, cuyo coste total crecía de forma cuadrática con el número de
+    # ficheros: los lotes se acumulan en un único LogBatch columnar y el dataframe se construye una sola vez, ordenado
+    # mediante la mezcla de los tramos ya ordenados de cada lote. Si se indica un minado de plantillas, los mensajes de
+    # cada lote se codifican al añadirlo, según van llegando de los procesadores.
+
+    def __init__(self, miner: Optional[TemplateMiner] = None):
+        self.batch = LogBatch()
+        self.runs: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.miner = miner
+
+    def __len__(self):
+        return len(self.batch)
+
+    def add(self, batch: LogBatch):
+        """
+        :param batch: Lote de un único fichero, cuyas líneas forman un tramo casi ordenado.
+        """
+        if self.miner is not None:
+            batch.mine(self.miner)
+        offset = len(self.batch)
+        timestamp = batch.column_array('timestamp')
+        order = sort_run(timestamp)
+        self.runs.append((timestamp[order], order + offset))
+        self.batch.extend(batch)
+
+    def extend(self, batches: Iterable[LogBatch]):
+        """
+        :param batches: Lotes que se añaden, cada uno como un tramo independiente.
+        """
+        for batch in batches:
+            self.add(batch)
+
+    def build(self) -> pd.DataFrame:
+        """
+        :return: Dataframe con todas las filas ordenadas por timestamp, con timestamps datetime64[ns, UTC] y host_name
+            y app_name categóricos.
+
+        Construcción del dataframe global. Tras la construcción el lote acumulado queda expuesto en el dataframe, por
+        lo que no deben añadirse más lotes.
+        """
+        order = merge_runs(self.runs)
+        return self.batch.to_frame().take(order).reset_index(drop=True)
+
+
+def build_frame(batches: Iterable[LogBatch], miner: TemplateMiner = None) -> pd.DataFrame:
+    """
+    :param batches: Lotes de logs, cada uno procedente de un único fichero.
+    :param miner: Minado de plantillas con el que se codifican los mensajes, si se indica (véase FrameBuilder).
+    :return: Dataframe global ordenado por timestamp.
+    """
+    builder = FrameBuilder(miner)
+    builder.extend(batches)
+    return builder.build()
@@ -0,0 +1,231 @@
+import functools
+import hashlib
+import os.path
+import re
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Índice invertido de texto completo de la columna message, para buscar palabras, IPs y frases sin recorrer todos los
+# mensajes. Cada bloque del almacén tiene su propio índice, que se escribe junto con el bloque (véase LogStore.append)
+# y no vuelve a modificarse, de forma que la ingesta incremental solo indexa las filas nuevas:
+#
+#   index.terms.npy   Hash de 64 bits de cada término del bloque, ordenados, para buscarlos con searchsorted.
+#   index.counts.npy  Número de filas en las que aparece cada término.
+#   index.rows.npy    Filas (relativas al bloque, uint16 con BLOCK_ROWS) de los términos poco frecuentes, seguidas.
+#   index.bitmaps.npy Mapa de bits de las filas de los términos frecuentes, una fila de la matriz por término.
+#
+# Un término se guarda como mapa de bits cuando aparece en más de una de cada DENSE_RATIO filas del bloque, que es
+# cuando el mapa ocupa menos que la lista de filas de 16 bits.
+#
+# Los términos son las secuencias de letras, dígitos, '_' y '.' de los mensajes, en minúsculas ASCII y sin puntos al
+# inicio ni al final. Los términos con puntos (IPs, dominios, ficheros) se indexan enteros y también por partes, de
+# forma que '63.126.79.67' y 'mail.yahoo.com' se encuentran completos y '126' o 'yahoo' también.
+#
+# Las consultas admiten palabras (todas deben aparecer), OR, NOT o '-' delante de una palabra, paréntesis y frases
+# entre comillas, cuyos términos deben aparecer seguidos. Las frases se comprueban leyendo solo los mensajes de las
+# filas que contienen todos sus términos.
+
+INDEX_FILES = ['index.terms', 'index.counts', 'index.rows', 'index.bitmaps']
+
+DENSE_RATIO = 16
+
+# Separador de los mensajes al tokenizar un bloque completo de una vez. Los bytes que no forman términos se convierten
+# en espacios, excepto el separador, que se convierte en un token propio.
+SEPARATOR = b'\x01'
+TERM_BYTES = set(b'abcdefghijklmnopqrstuvwxyz0123456789_.') | set(range(128, 256))
+TABLE = bytes(byte if byte in TERM_BYTES or byte == SEPARATOR[0] else ord(' ') for byte in range(256))
+
+QUERY_TOKENS = re.compile(r'"[^"]*"|\(|\)|[^\s()"]+')
+
+
+@functools.lru_cache(maxsize=1 << 20)
+def term_hash(term: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(term, digest_size=8).digest(), 'little')
+
+
+def split_terms(text: str) -> List[bytes]:
+    """
+    :return: Tokens del texto, en orden, sin puntos al inicio ni al final y sin los que quedan vacíos.
+    """
+    tokens = (token.strip(b'.') for token in text.encode('utf8').lower().translate(TABLE).split())
+    return [token for token in tokens if token and token != SEPARATOR]
+
+
+def expand(token: bytes) -> List[bytes]:
+    """
+    :return: Términos con los que se indexa un token: el propio token y, si tiene puntos, cada una de sus partes.
+    """
+    token = token.strip(b'.')
+    if not token:
+        return []
+    if b'.' not in token:
+        return [token]
+    return [token] + [part for part in dict.fromkeys(token.split(b'.')) if part and part != token]
+
+
+def build_index(messages: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    :param messages: Mensajes de las filas de un bloque, o None.
+    :return: Arrays de los ficheros de INDEX_FILES: hashes ordenados de los términos, filas por término, filas de los
+        términos poco frecuentes y mapas de bits de los frecuentes.
+
+    Los mensajes se unen y tokenizan de una vez como bytes; la fila de cada token se obtiene contando los separadores
+    anteriores, y cada token distinto se expande a sus términos una sola vez.
+    """
+    rows = len(messages)
+    texts = [message if isinstance(message, str) else '' for message in messages]
+    separator = ' ' + SEPARATOR.decode() + ' '
+    data = separator.join(texts).encode('utf8')
+    if data.count(SEPARATOR) != rows - 1 and rows:
+        # Algún mensaje contiene el propio separador, que no forma parte de ningún término.
+        data = separator.join(text.replace(SEPARATOR.decode(), ' ') for text in texts).encode('utf8')
+    tokens = np.array(data.lower().translate(TABLE).split(), dtype=object)
+    is_separator = tokens == SEPARATOR
+    token_rows = np.cumsum(is_separator)[~is_separator]
+    codes, uniques = pd.factorize(tokens[~is_separator])
+
+    # Términos de cada token distinto, consecutivos, y posición del primero de cada uno.
+    expansions = [expand(token) for token in uniques]
+    flat = [term for terms in expansions for term in terms]
+    if not flat:
+        return (np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16),
+                np.zeros((0, (rows + 7) // 8), dtype=np.uint8))
+    term_codes, term_values = pd.factorize(np.array(flat, dtype=object))
+    sizes = np.array([len(terms) for terms in expansions], dtype=np.int64)
+    firsts = np.cumsum(sizes) - sizes
+    # Cada aparición de un token se repite una vez por cada uno de sus términos.
+    occurrences = sizes[codes]
+    within = np.arange(int(occurrences.sum())) - np.repeat(np.cumsum(occurrences) - occurrences, occurrences)
+    pair_terms = term_codes[np.repeat(firsts[codes], occurrences) + within]
+    pair_rows = np.repeat(token_rows, occurrences)
+
+    hashes = np.array([term_hash(term) for term in term_values], dtype=np.uint64)
+    order = np.argsort(hashes)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    # Pares (término, fila) distintos, ordenados por término y fila.
+    keys = np.sort(rank[pair_terms] * rows + pair_rows)
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+    key_terms, key_rows = keys // rows, keys % rows
+
+    counts = np.bincount(key_terms, minlength=len(order)).astype(np.int32)
+    dense = counts.astype(np.int64) * DENSE_RATIO > rows
+    sparse_rows = key_rows[~dense[key_terms]].astype(np.uint16 if rows <= 1 << 16 else np.uint32)
+    bitmaps = np.zeros((int(dense.sum()), (rows + 7) // 8), dtype=np.uint8)
+    dense_keys = dense[key_terms]
+    if dense_keys.any():
+        positions = np.cumsum(dense) - 1
+        bits = np.zeros((len(bitmaps), rows), dtype=bool)
+        bits[positions[key_terms[dense_keys]], key_rows[dense_keys]] = True
+        bitmaps = np.packbits(bits, axis=1)
+    return hashes[order], counts, sparse_rows, bitmaps
+
+
+def write_index(block_dir: str, messages: List[Optional[str]]):
+    for name, values in zip(INDEX_FILES, build_index(messages)):
+        np.save(os.path.join(block_dir, name + '.npy'), values)
+
+
+class BlockIndex:
+    # Índice de un bloque, proyectado en memoria, con la posición de las filas de cada término.
+
+    def __init__(self, rows: int, terms: np.ndarray, counts: np.ndarray, sparse_rows: np.ndarray,
+                 bitmaps: np.ndarray):
+        self.rows = rows
+        self.terms = terms
+        self.counts = counts
+        self.sparse_rows = sparse_rows
+        self.bitmaps = bitmaps
+        self.dense = counts.astype(np.int64) * DENSE_RATIO > rows
+        self.starts = np.concatenate([[0], np.cumsum(np.where(self.dense, 0, counts))])
+        self.dense_positions = np.cumsum(self.dense) - 1
+
+    def mask(self, term: bytes) -> np.ndarray:
+        """
+        :return: Máscara de las filas del bloque en las que aparece el término.
+        """
+        result = np.zeros(self.rows, dtype=bool)
+        value = np.uint64(term_hash(term))
+        position = int(np.searchsorted(self.terms, value))
+        if position == len(self.terms) or self.terms[position] != value:
+            return result
+        if self.dense[position]:
+            return np.unpackbits(self.bitmaps[self.dense_positions[position]], count=self.rows).astype(bool)
+        result[self.sparse_rows[self.starts[position]:self.starts[position + 1]]] = True
+        return result
+
+
+def contains_phrase(tokens: List[bytes], terms: List[bytes]) -> bool:
+    """
+    :return: Si los términos aparecen seguidos entre los tokens. Un término coincide con un token igual o con una de
+        las partes de un token con puntos.
+    """
+    for first in range(len(tokens) - len(terms) + 1):
+        if all(term == token or term in token.split(b'.')
+               for term, token in zip(terms, tokens[first:first + len(terms)])):
+            return True
+    return False
+
+
+def parse_query(text: str) -> tuple:
+    """
+    :param text: Consulta de texto.
+    :return: Árbol de la consulta: ('and', [nodos]), ('or', [nodos]), ('not', nodo) o ('terms', [términos]), donde
+        los términos de un mismo nodo deben aparecer seguidos si son más de uno.
+    """
+    tokens = QUERY_TOKENS.findall(text)
+    position = 0
+
+    def peek() -> Optional[str]:
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or() -> tuple:
+        nonlocal position
+        children = [parse_and()]
+        while peek() == 'OR':
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ('or', children)
+
+    def parse_and() -> tuple:
+        nonlocal position
+        children = []
+        while peek() not in (None, ')', 'OR'):
+            if peek() == 'AND':
+                position += 1
+                continue
+            children.append(parse_unary())
+        if not children:
+            raise ValueError(f'Consulta incompleta: {text!r}')
+        return children[0] if len(children) == 1 else ('and', children)
+
+    def parse_unary() -> tuple:
+        nonlocal position
+        token = peek()
+        if token is None:
+            raise ValueError(f'Consulta incompleta: {text!r}')
+        position += 1
+        if token in ('NOT', '-'):
+            return 'not', parse_unary()
+        if token.startswith('-') and len(token) > 1:
+            return 'not', word(token[1:])
+        if token == '(':
+            node = parse_or()
+            if peek() != ')':
+                raise ValueError(f'Falta un paréntesis de cierre: {text!r}')
+            position += 1
+            return node
+        return word(token.strip('"'))
+
+    def word(value: str) -> tuple:
+        terms = split_terms(value)
+        if not terms:
+            raise ValueError(f'Término sin letras ni dígitos en la consulta: {value!r}')
+        return 'terms', terms
+
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError(f'Consulta no válida: {text!r}')
+    return node
@@ -0,0 +1,225 @@
+import collections
+import contextlib
+import datetime
+import json
+import os.path
+import platform
+import signal
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from report import IngestReport
+
+# Instrumentación de la ingesta. Está desactivada por defecto y, mientras lo está, stage devuelve siempre el mismo
+# contexto vacío y timed devuelve el iterable sin envolver, por lo que su coste se reduce a una comprobación por fichero.
+# Activada, registra:
+#   - El tiempo y el número de llamadas de cada etapa (descubrimiento de ficheros, lectura, procesamiento, construcción
+#     del dataframe y escritura del almacén).
+#   - Los totales por clase de procesamiento del IngestReport asociado: registros y bytes por segundo y registros que
+#     no encajan con el formato.
+#   - Opcionalmente, un perfil por muestreo del hilo principal, que indica qué funciones (expresiones regulares,
+#     decodificación de timestamps, etc.) ocupan el tiempo sin necesidad de instrumentarlas una a una.
+# El resultado se exporta como JSON para comparar ejecuciones y detectar regresiones.
+
+# Intervalo entre muestras del perfil, en segundos de CPU.
+SAMPLE_INTERVAL = 0.005
+
+# Número de funciones que se incluyen en las clasificaciones del perfil.
+PROFILE_TOP = 30
+
+NULL_STAGE = contextlib.nullcontext()
+
+
+class StageTimer:
+    # Tiempo acumulado y número de ejecuciones de una etapa.
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def add(self, seconds: float, calls: int = 1):
+        self.calls += calls
+        self.seconds += seconds
+
+    @contextlib.contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(time.perf_counter() - start)
+
+
+class TimedIterator:
+    # Iterador que acumula el tiempo que se espera a cada uno de los elementos que entrega, es decir, el tiempo de
+    # lectura de las líneas sin el de su procesamiento.
+
+    def __init__(self, items: Iterable):
+        self.items = iter(items)
+        self.seconds = 0.0
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self.items)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+class SamplingProfiler:
+    # Perfil por muestreo basado en el temporizador de CPU del proceso (SIGPROF). En cada muestra se recorre la pila
+    # del hilo principal y se cuentan la función en ejecución (tiempo propio), todas las de la pila (tiempo acumulado) y
+    # la pila completa en el formato de una línea por pila de las gráficas de llama. Solo está disponible en sistemas
+    # con setitimer.
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.own = collections.Counter()
+        self.cumulative = collections.Counter()
+        self.stacks = collections.Counter()
+        self.previous_handler = None
+
+    @staticmethod
+    def available() -> bool:
+        return hasattr(signal, 'setitimer')
+
+    @staticmethod
+    def label(frame) -> str:
+        code = frame.f_code
+        return f'{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}'
+
+    def sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            stack.append(self.label(frame))
+            frame = frame.f_back
+        if not stack:
+            return
+        self.samples += 1
+        self.own[stack[0]] += 1
+        self.cumulative.update(set(stack))
+        self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.previous_handler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+
+    def to_dict(self, top: int = PROFILE_TOP) -> Dict:
+        """
+        :param top: Número de funciones de cada clasificación.
+        :return: Número de muestras, funciones con más tiempo propio y acumulado (en muestras) y pilas completas.
+        """
+        return {
+            'interval': self.interval,
+            'samples': self.samples,
+            'own': dict(self.own.most_common(top)),
+            'cumulative': dict(self.cumulative.most_common(top)),
+            'stacks': dict(self.stacks),
+        }
+
+
+class Instrumentation:
+    # Estado de la instrumentación de una ejecución.
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: Dict[str, StageTimer] = {}
+        self.report: Optional[IngestReport] = None
+        self.profiler: Optional[SamplingProfiler] = None
+        self.started: Optional[float] = None
+        self.seconds = 0.0
+
+    def enable(self, report: IngestReport = None, profile: bool = False, interval: float = SAMPLE_INTERVAL):
+        """
+        :param report: Informe en el que la ingesta acumula los totales de cada clase de procesamiento.
+        :param profile: Si se captura además un perfil por muestreo. Se ignora si el sistema no lo permite.
+        :param interval: Intervalo entre muestras del perfil, en segundos de CPU.
+        """
+        self.enabled = True
+        self.report = report
+        self.started = time.perf_counter()
+        if profile and SamplingProfiler.available():
+            self.profiler = SamplingProfiler(interval)
+            self.profiler.start()
+
+    def disable(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.started is not None:
+            self.seconds += time.perf_counter() - self.started
+            self.started = None
+        self.enabled = False
+
+    def stage(self, name: str):
+        """
+        :param name: Nombre de la etapa.
+        :return: Contexto que mide el tiempo de la etapa, o un contexto vacío si la instrumentación está desactivada.
+        """
+        if not self.enabled:
+            return NULL_STAGE
+        return self.stages.setdefault(name, StageTimer()).time()
+
+    def add(self, name: str, seconds: float, calls: int = 1):
+        """
+        :param name: Nombre de la etapa.
+        :param seconds: Tiempo medido fuera de un contexto stage.
+        :param calls: Número de ejecuciones que corresponden a ese tiempo.
+        """
+        if self.enabled:
+            self.stages.setdefault(name, StageTimer()).add(seconds, calls)
+
+    def timed(self, items: Iterable) -> Iterable:
+        """
+        :param items: Iterable cuyo tiempo de espera se quiere medir.
+        :return: TimedIterator sobre items, o el propio items si la instrumentación está desactivada.
+        """
+        return TimedIterator(items) if self.enabled else items
+
+    def to_dict(self) -> Dict:
+        """
+        :return: Informe completo, serializable como JSON.
+        """
+        seconds = self.seconds + (time.perf_counter() - self.started if self.started is not None else 0.0)
+        result = {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'argv': sys.argv,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seconds': seconds,
+            'stages': {name: {'calls': timer.calls, 'seconds': timer.seconds} for name, timer in self.stages.items()},
+        }
+        if self.report is not None:
+            result.update(self.report.to_dict())
+        if self.profiler is not None:
+            result['profile'] = self.profiler.to_dict()
+        return result
+
+    def write_json(self, path: str):
+        """
+        :param path: Fichero en el que se guarda el informe.
+        """
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+    def summary(self) -> List[str]:
+        """
+        :return: Líneas con el tiempo de cada etapa y, si hay perfil, las funciones con más tiempo propio.
+        """
+        lines = [f'{name:>12} {timer.seconds:>9.3f} s {timer.calls:>8} llamadas' for name, timer in self.stages.items()]
+        if self.profiler is not None and self.profiler.samples:
+            for function, samples in self.profiler.own.most_common(10):
+                lines.append(f'{samples / self.profiler.samples:>8.1%} {function}')
+        return lines
+
+
+# Instrumentación global, que consultan las funciones de ingesta.
+INSTRUMENTATION = Instrumentation()
@@ -1,13 +1,34 @@
+import argparse
+import bz2
+import collections
+import concurrent.futures
 import dataclasses
 import datetime 
+import functools
+import gzip
+import io
+import itertools
 import os.path
+import queue
 import re
-import matplotlib.pyplot as plt
-from typing import Union, List, Dict, Type
-from datetime import timezone
+import sys
+import threading
+import time
+import numpy as np
+from typing import Union, List, Dict, Type, Iterable, Iterator, Optional, Callable, Tuple, TextIO, ClassVar
+
+from batch import COLUMNS, LogBatch, parse_batches
+from config import BATCH_SIZE, LOG_DIR, READ_WORKERS
+from frames import FrameBuilder
+from instrument import INSTRUMENTATION
+from report import CountingIterator, IngestReport
+from squid import SQUID_APP, message_fields
+from store import save_store
+from templates import TemplateMiner
+from timestamps import decode_clf, decode_epoch, decode_local, decode_syslog, reference_year
+from vectorized import parse_squid, parse_syslog
 
 # Definición de constantes
-LOG_DIR = 'hnet-hon-var-log-02282006/var/log/'
 MONTH = '(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)'
 DAY = '(Mon|Tue|Wed|Thu|Fri|Sat|Sun)'
 DATE = '([0 ][1-9]|[12][0-9]|3[01])'
@@ -15,6 +36,11 @@ YEAR = '([1][0-9]{3}|[2][0-9]{3})'
 TIME = '([01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]'
 NUMBER = '([0-9]{4})'
 DESCRIPTION = '[a-z0-9\s:\"/\,\.\-]+'
+# Tamaño de los bloques de bytes que se leen de una vez en los procesadores por bloques (véase Logs.parse_block).
+BLOCK_SIZE = 1 << 20
+# Tratamiento de los bytes que no son UTF-8 válido (por ejemplo, los de peticiones maliciosas registradas en messages o
+# en audit_log): se conservan como secuencias de escape \xNN en lugar de descartar el fichero completo.
+ENCODING_ERRORS = 'backslashreplace'
 
 
 @dataclasses.dataclass
@@ -30,11 +56,25 @@ class Logs:
     message_id: str = None
     struct_data: Dict = dataclasses.field(default_factory=dict)
     message: str = None
+    # Campos tipados propios del formato (los de Squid, véase batch.FIELDS), si la línea los tiene.
+    typed_fields: Dict = None
 
     raw: str = None
     creation_time: float = None
     error: bool = False
 
+    # Expresiones regulares de los nombres de fichero (sin directorio ni extensión de compresión) que procesa la clase.
+    # Cada subclase declara las suyas y queda registrada automáticamente en el registro de procesadores.
+    patterns: ClassVar[List[str]] = []
+    registry: ClassVar[List[Type['Logs']]] = []
+
+    # Si la clase procesa ficheros binarios de registros de tamaño fijo (véase BinaryLogs) en lugar de líneas de texto.
+    binary: ClassVar[bool] = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Logs.registry.append(cls)
+
     def __str__(self):
         # Función de impresión por consola.
         if self.struct_data:
@@ -49,198 +89,885 @@ class Logs:
 
         return f'<{self.priority}>{self.protocol_ver} {self.timestamp:%Y-%m-%dT%H:%M:%S.%f+%z} {self.host_name} {self.app_name} {self.process_id} {self.message_id} {struct_data} {self.message}'
 
+    @classmethod
+    def fields(cls, raw: str) -> Dict:
+        """
+        :param raw: Línea de log sin procesar.
+        :return: Diccionario con los campos parseados de la línea, con los nombres de los atributos de la clase.
+
+        Procesamiento de una línea sin crear ninguna instancia. Lo implementa cada subclase y es lo que usan tanto su
+        constructor como los contenedores columnares que reciben los campos directamente.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def file_options(cls, log_file: str, year: int = None) -> Dict:
+        """
+        :param log_file: Fichero fuente del log.
+        :param year: Año de referencia para los timestamps que no lo incluyen. Por defecto, el de la fecha de
+            modificación del fichero.
+        :return: Argumentos adicionales con los que procesar las líneas del fichero.
+
+        Preparación del procesamiento de un fichero concreto. Las subclases que necesitan examinar el fichero antes de
+        procesar sus líneas (por ejemplo, para detectar su formato o su año) redefinen este método.
+        """
+        return {}
+
+    @classmethod
+    def records(cls, lines: Iterable[str]) -> Iterable[str]:
+        """
+        :param lines: Líneas de un fichero fuente del log.
+        :return: Registros del fichero, cada uno de los cuales se procesa con fields.
+
+        Por defecto cada línea es un registro. Las subclases de formatos cuyos registros ocupan varias líneas
+        redefinen este método para agruparlas.
+        """
+        return lines
+
+    @classmethod
+    def parse_block(cls, data: bytes, batch_size: int = BATCH_SIZE, **options) -> 'LogBatch':
+        """
+        :param data: Bloque de líneas completas de un fichero, ya descomprimido.
+        :param batch_size: Número máximo de líneas por lote durante el procesamiento.
+        :param options: Argumentos del fichero, los que devuelve file_options.
+        :return: Lote con los registros del bloque.
+
+        Por defecto el bloque se decodifica como en open_logs y cada registro se procesa con fields. Las subclases de
+        formatos con campos fijos lo redefinen con un procesamiento vectorizado de todo el bloque.
+        """
+        lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf8', errors=ENCODING_ERRORS)
+        return LogBatch.concat(parse_batches(cls.records(lines), functools.partial(cls.fields, **options), batch_size))
+
+    @classmethod
+    def line_oriented(cls) -> bool:
+        """
+        :return: Si la clase procesa texto con un registro por línea, de forma que sus ficheros pueden leerse y
+            procesarse por tramos de líneas independientes.
+        """
+        return not cls.binary and cls.records.__func__ is Logs.records.__func__
+
+    @classmethod
+    def for_file(cls, log_file: str, year: int = None) -> Callable[[str], 'Logs']:
+        """
+        :param log_file: Fichero fuente del log.
+        :param year: Año de referencia para los timestamps que no lo incluyen.
+        :return: Función que convierte una línea del fichero en una instancia de logs.
+        """
+        return functools.partial(cls, **cls.file_options(log_file, year))
+
+    @classmethod
+    def fields_for_file(cls, log_file: str, year: int = None) -> Callable[[str], Dict]:
+        """
+        :param log_file: Fichero fuente del log.
+        :param year: Año de referencia para los timestamps que no lo incluyen.
+        :return: Función que convierte una línea del fichero en el diccionario de sus campos.
+        """
+        return functools.partial(cls.fields, **cls.file_options(log_file, year))
+
 
 class UnixLogs(Logs):
     # Clase que implementa el procesamiento de los logs de Unix. Hereda de la clase Logs, que instancia pasándole los
-    # campos parseados como atributos.
+    # campos parseados como atributos. Es el procesador común de todos los ficheros con formato syslog (RFC3164).
 
-    def __init__(self, raw: str):
-        attributes = re.match(f'^(?P<timestamp>{MONTH} {DATE} {TIME}) (?P<host_name>\S+) (?:(?P<app_name>\S+)(?:\[(?P<process_id>\d+)\]): )?(?P<message>.*)$', raw).groupdict()
-        # parse time
-        attributes['timestamp'] = datetime.datetime.strptime(attributes['timestamp'], '%b %d %H:%M:%S').replace(year=datetime.datetime.now().year).replace(tzinfo=datetime.timezone.utc)
-        super().__init__(**attributes, raw=raw)
+    patterns = [r'boot\.log(\.\d+)?', r'cron(\.\d+)?', r'messages(\.\d+)?', r'secure(\.\d+)?', r'maillog(\.\d+)?',
+                r'spooler(\.\d+)?']
 
-class SquidLogs(Logs):
-    # Clase que implementa el procesamiento de los logs de Squid. Hereda de la clase Logs, que instancia pasándole los
-    # campos parseados como atributos.
+    # Expresion regular precompilada para los logs syslog. La etiqueta (app_name) termina en ': ' y puede llevar el pid
+    # entre corchetes; si la línea no tiene etiqueta, todo lo que sigue al host es el mensaje.
+    expression = re.compile(f'^(?P<timestamp>{MONTH} {DATE} {TIME}) (?P<host_name>\S+) (?:(?P<app_name>[^\s\[:]+)(?:\[(?P<process_id>\d+)\])?: )?(?P<message>.*)$')
 
-    def __init__(self, raw: str):
+    def __init__(self, raw: str, year: int = None):
+        super().__init__(**self.fields(raw, year), raw=raw)
 
-        accessExpresion = r'^(?P<timestamp>\d+\.\d+)\s+(?P<time>\d+)\s+(?P<host_name>\S+)\s+(?P<message>.*)$'  
-        cacheExpresion = r'^(?P<timestamp>^\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})\|\s(?P<message>.*)$'
-        refererExpresion = r'^(?P<timestamp>\d+\.\d+)\s(?P<host_name>\S+)\s(?P<message>(http|https).*)$'
-        useragentExpresion = r'^(?P<host_name>\S+)\s+\[(?P<timestamp>.*)\]\s\"(?P<message>.*)\"$'
-        storeExpresion = r'^(?P<timestamp>\d+\.\d+)\s+(?P<message>.*)$'
+    @classmethod
+    def fields(cls, raw: str, year: int = None) -> Dict:
+        attributes = cls.expression.match(raw).groupdict()
+        # parse time
+        attributes['timestamp'] = decode_syslog(attributes['timestamp'], year or reference_year())
+        return attributes
 
+    @classmethod
+    def file_options(cls, log_file: str, year: int = None) -> Dict:
+        return {'year': reference_year(log_file, year)}
 
-        #Identificamos el tipo de log
-        if((re.search(accessExpresion, raw)) != None):
-            attributes = re.match(accessExpresion, raw).groupdict()
+    @classmethod
+    def parse_block(cls, data: bytes, batch_size: int = BATCH_SIZE, year: int = None) -> 'LogBatch':
+        fallback = functools.partial(super().parse_block, batch_size=batch_size, year=year)
+        return parse_syslog(data, year or reference_year(), ENCODING_ERRORS, fallback)
 
+class SquidLogs(Logs):
+    # Clase que implementa el procesamiento de los logs de Squid. Hereda de la clase Logs, que instancia pasándole los
+    # campos parseados como atributos.
+
+    patterns = [r'access\.log(\.\d+)?', r'cache\.log(\.\d+)?', r'referer_log\.log(\.\d+)?', r'store\.log(\.\d+)?',
+                r'useragent_log\.log(\.\d+)?']
+
+    # Expresiones regulares precompiladas de cada uno de los formatos de Squid, en el orden en que se prueban cuando el
+    # formato de la línea es desconocido.
+    formats = {
+        'access': re.compile(r'^(?P<timestamp>\d+\.\d+)\s+(?P<time>\d+)\s+(?P<host_name>\S+)\s+(?P<message>.*)$'),
+        'cache': re.compile(r'^(?P<timestamp>^\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2})\|\s(?P<message>.*)$'),
+        'referer': re.compile(r'^(?P<timestamp>\d+\.\d+)\s(?P<host_name>\S+)\s(?P<message>(http|https).*)$'),
+        'useragent': re.compile(r'^(?P<host_name>\S+)\s+\[(?P<timestamp>.*)\]\s\"(?P<message>.*)\"$'),
+        'store': re.compile(r'^(?P<timestamp>\d+\.\d+)\s+(?P<message>.*)$'),
+    }
+
+    # Fragmentos del nombre de fichero que identifican cada formato.
+    filenames = {
+        'access.log': 'access',
+        'cache.log': 'cache',
+        'referer': 'referer',
+        'useragent': 'useragent',
+        'store.log': 'store',
+    }
+
+    def __init__(self, raw: str, fmt: str = None):
+        super().__init__(**self.fields(raw, fmt), raw=raw)
+
+    @classmethod
+    def fields(cls, raw: str, fmt: str = None) -> Dict:
+        # Se prueba primero el formato indicado y, solo si la línea no encaja, el resto en orden.
+        match = cls.formats[fmt].match(raw) if fmt else None
+        if match is None:
+            for fmt, expression in cls.formats.items():
+                match = expression.match(raw)
+                if match is not None:
+                    break
+        attributes = match.groupdict()
+
+        if fmt == 'access':
             #Concatenamos el tiempo de procesamiento del proxy con el resto del mensaje del log
-            attributes['message'] = attributes['time'] + " " + attributes['message'] 
-
-            #Borramos el atributo temporal time
-            del attributes['time']
-
-            attributes['timestamp'] = datetime.datetime.utcfromtimestamp(float(attributes['timestamp']))
-
-        elif((re.search(cacheExpresion, raw)) != None):
-            attributes = re.match(cacheExpresion, raw).groupdict()
-            
-            attributes['timestamp'] = datetime.datetime.strptime(attributes['timestamp'], '%Y/%m/%d %H:%M:%S')
-        
-        elif((re.search(refererExpresion, raw)) != None):
-            attributes = re.match(refererExpresion, raw).groupdict()
-            
-            attributes['timestamp'] = datetime.datetime.utcfromtimestamp(float(attributes['timestamp']))
-        
-        elif((re.search(useragentExpresion, raw)) != None):
-            attributes = re.match(useragentExpresion, raw).groupdict()
-            
-            #Pasamos la fecha a UTC
-            attributes['timestamp'] = datetime.datetime.strptime(attributes['timestamp'], '%d/%b/%Y:%H:%M:%S %z')
-            attributes['timestamp'] = attributes['timestamp'].astimezone(timezone.utc)
+            attributes['message'] = attributes.pop('time') + " " + attributes['message']
 
-        elif((re.search(storeExpresion, raw)) != None):
-            attributes = re.match(storeExpresion, raw).groupdict()
-            
-            attributes['timestamp'] = datetime.datetime.utcfromtimestamp(float(attributes['timestamp']))
+        if fmt == 'cache':
+            attributes['timestamp'] = decode_local(attributes['timestamp'], '%Y/%m/%d %H:%M:%S')
+        elif fmt == 'useragent':
+            #Pasamos la fecha a UTC
+            attributes['timestamp'] = decode_clf(attributes['timestamp'])
+        else:
+            attributes['timestamp'] = decode_epoch(attributes['timestamp'])
 
-        attributes['timestamp'] = attributes['timestamp'].astimezone(timezone.utc)
         #Definimos el atributo app_name
-        attributes['app_name'] = "Squid"
-
-        super().__init__(**attributes, raw=raw)
+        attributes['app_name'] = SQUID_APP
+        attributes['typed_fields'] = message_fields(attributes['message'], fmt)
+
+        return attributes
+
+    @classmethod
+    def detect_format(cls, log_file: str, sample_size: int = 10) -> Optional[str]:
+        """
+        :param log_file: Fichero fuente del log.
+        :param sample_size: Número de líneas iniciales que se examinan si el nombre no identifica el formato.
+        :return: Nombre del formato de Squid del fichero o None si no se reconoce ninguno.
+
+        Identificación del formato de un fichero de Squid, primero por su nombre y, si no es posible, por el formato que
+        encaja con más líneas de las primeras sample_size.
+        """
+        name = os.path.basename(log_file)
+        for fragment, fmt in cls.filenames.items():
+            if fragment in name:
+                return fmt
+
+        sample = list(itertools.islice(read_logs(log_file), sample_size))
+        counts = {fmt: sum(expression.match(line) is not None for line in sample) for fmt, expression in cls.formats.items()}
+        fmt = max(counts, key=counts.get)
+        return fmt if counts[fmt] else None
+
+    @classmethod
+    def file_options(cls, log_file: str, year: int = None) -> Dict:
+        return {'fmt': cls.detect_format(log_file)}
+
+    @classmethod
+    def parse_block(cls, data: bytes, batch_size: int = BATCH_SIZE, fmt: str = None) -> 'LogBatch':
+        # Los formatos access y store tienen camino vectorizado; el resto se procesa línea a línea.
+        fallback = functools.partial(super().parse_block, batch_size=batch_size, fmt=fmt)
+        batch = parse_squid(data, fmt, ENCODING_ERRORS, fallback)
+        return fallback(data) if batch is None else batch
 
 class CupsLogs(Logs):
     # Clase que implementa el procesamiento de los logs de Cups. Hereda de la clase Logs, que instancia pasándole los
     # campos parseados como atributos.
 
+    patterns = [r'error_log(\.\d+)?']
+
+    # Severidad syslog de cada letra de nivel de CUPS y facilidad syslog de la impresión (lpr)
+    levels = {'X': 0, 'A': 1, 'C': 2, 'E': 3, 'W': 4, 'N': 5, 'I': 6, 'D': 7}
+    facility = 6
+
     def __init__(self, raw:str):
+        super().__init__(**self.fields(raw), raw=raw)
 
+    @classmethod
+    def fields(cls, raw: str) -> Dict:
         # Expresion regular para los logs cups
-        attributes = re.match(f'^[a-z]+[\s\-]*\[(?P<timestamp>{DATE}/{MONTH}/{YEAR}:{TIME}\s\-{NUMBER})\](?P<message>{DESCRIPTION})', raw, flags=re.IGNORECASE).groupdict()
+        attributes = re.match(f'^(?P<level>[a-z]+)[\s\-]*\[(?P<timestamp>{DATE}/{MONTH}/{YEAR}:{TIME}\s\-{NUMBER})\](?P<message>{DESCRIPTION})', raw, flags=re.IGNORECASE).groupdict()
 
         # Conversion a UTC
-        attributes['timestamp'] = datetime.datetime.strptime(attributes['timestamp'], '%d/%b/%Y:%H:%M:%S %z')
-        attributes['timestamp'] = attributes['timestamp'].astimezone(timezone.utc).replace(tzinfo=datetime.timezone.utc)
+        attributes['timestamp'] = decode_clf(attributes['timestamp'])
+
+        # Prioridad syslog a partir de la letra de nivel de CUPS, con la facilidad lpr
+        severity = cls.levels.get(attributes.pop('level')[0].upper())
+        attributes['priority'] = None if severity is None else cls.facility * 8 + severity
 
         # Definicion del atributo app_name
         attributes['app_name'] = "CUPS"
-        super().__init__(**attributes, raw=raw)
+        return attributes
 
 
 class PrivoxyLogs(Logs):
     # Clase que implementa el procesamiento de los logs de Privoxy. Hereda de la clase Logs, que instancia pasándole los
     # campos parseados como atributos.
 
-    def __init__(self, raw: str):
+    patterns = [r'logfile']
+
+    def __init__(self, raw: str, year: int = None):
+        super().__init__(**self.fields(raw, year), raw=raw)
+
+    @classmethod
+    def fields(cls, raw: str, year: int = None) -> Dict:
         attributes = re.match(f'^(?P<timestamp>{MONTH} {DATE} {TIME}) (?P<host_name>\S+) (?:(?P<app_name>\S+))?(?P<message>.*)$', raw).groupdict()
         # parse time
-        attributes['timestamp'] = datetime.datetime.strptime(attributes['timestamp'], '%b %d %H:%M:%S').replace(year=datetime.datetime.now().year).replace(tzinfo=datetime.timezone.utc)
-        super().__init__(**attributes, raw=raw)
+        attributes['timestamp'] = decode_syslog(attributes['timestamp'], year or reference_year())
+        return attributes
+
+    @classmethod
+    def file_options(cls, log_file: str, year: int = None) -> Dict:
+        return {'year': reference_year(log_file, year)}
 
 class HttpdLogs(Logs):
     # Clase que implementa el procesamiento de los logs de HTTP. Hereda de la clase Logs, que instancia pasándole los
     # campos parseados como atributos.
 
+    patterns = [r'ssl_access_log(\.\d+)?']
+
     def __init__(self, raw: str):
+        super().__init__(**self.fields(raw), raw=raw)
+
+    @classmethod
+    def fields(cls, raw: str) -> Dict:
         attributes = re.match(f'^(?P<host_name>\S+) \S+ \S+ \[(?P<timestamp>{DATE}/{MONTH}/{YEAR}:{TIME} \S+)\] "(?P<message>.*)$', raw).groupdict()
-        # parse time
-        utc_minus_5 = datetime.datetime.strptime(attributes['timestamp'], '%d/%b/%Y:%H:%M:%S %z').replace(year=datetime.datetime.now().year)
-        attributes['timestamp'] =utc_minus_5.astimezone(datetime.timezone.utc)
-        super().__init__(**attributes, raw=raw)
+        # parse time: el formato ya incluye el año, por lo que no se sustituye por ningún año de referencia
+        attributes['timestamp'] = decode_clf(attributes['timestamp'])
+        attributes['app_name'] = "httpd"
+        return attributes
+
+
+class HttpdRequestLogs(Logs):
+    # Clase que implementa el procesamiento de los logs de peticiones SSL de HTTP (ssl_request_log), en los que el
+    # timestamp precede a la IP del cliente.
+
+    patterns = [r'ssl_request_log(\.\d+)?']
+
+    expression = re.compile(f'^\[(?P<timestamp>{DATE}/{MONTH}/{YEAR}:{TIME} \S+)\] (?P<host_name>\S+) (?P<message>.*)$')
+
+    def __init__(self, raw: str):
+        super().__init__(**self.fields(raw), raw=raw)
+
+    @classmethod
+    def fields(cls, raw: str) -> Dict:
+        attributes = cls.expression.match(raw).groupdict()
+        attributes['timestamp'] = decode_clf(attributes['timestamp'])
+        attributes['app_name'] = "httpd"
+        return attributes
+
 
-def read_logs(log_file: str) -> List[str]:
+class HttpdErrorLogs(Logs):
+    # Clase que implementa el procesamiento de los logs de errores de HTTP (ssl_error_log), con el timestamp en hora
+    # local y el nivel entre corchetes.
+
+    patterns = [r'ssl_error_log(\.\d+)?']
+
+    expression = re.compile(f'^\[(?P<timestamp>{DAY} {MONTH} {DATE} {TIME} {YEAR})\] \[(?P<level>[a-z]+)\] (?P<message>.*)$')
+
+    # Severidad syslog de cada nivel de Apache y facilidad syslog con la que Apache escribe por defecto (local7)
+    levels = {'emerg': 0, 'alert': 1, 'crit': 2, 'error': 3, 'warn': 4, 'notice': 5, 'info': 6, 'debug': 7}
+    facility = 23
+
+    def __init__(self, raw: str):
+        super().__init__(**self.fields(raw), raw=raw)
+
+    @classmethod
+    def fields(cls, raw: str) -> Dict:
+        attributes = cls.expression.match(raw).groupdict()
+        attributes['timestamp'] = decode_local(attributes['timestamp'], '%a %b %d %H:%M:%S %Y')
+        severity = cls.levels.get(attributes.pop('level'))
+        attributes['priority'] = None if severity is None else cls.facility * 8 + severity
+        attributes['app_name'] = "httpd"
+        return attributes
+
+
+class HttpdAuditLogs(Logs):
+    # Clase que implementa el procesamiento de los logs de auditoría de mod_security (audit_log). Cada registro ocupa
+    # varias líneas: empieza con una línea de '=' seguida de la petición, el handler y las cabeceras de la petición y de
+    # la respuesta. El mensaje es la petición y las cabeceras de la petición se guardan como datos estructurados.
+
+    patterns = [r'audit_log(\.\d+)?']
+
+    separator = '=' * 40
+    expression = re.compile(r'^Request: (?P<host_name>\S+) \S+ \S+ \[(?P<timestamp>[^\]]+)\] (?P<message>.*)$', re.MULTILINE)
+    header = re.compile(r'^(?P<key>[A-Za-z\-]+): (?P<value>.*)$')
+
+    def __init__(self, raw: str):
+        super().__init__(**self.fields(raw), raw=raw)
+
+    @classmethod
+    def records(cls, lines: Iterable[str]) -> Iterator[str]:
+        record = []
+        for line in lines:
+            if line.startswith(cls.separator) and record:
+                yield ''.join(record)
+                record = []
+            record.append(line)
+        if record:
+            yield ''.join(record)
+
+    @classmethod
+    def fields(cls, raw: str) -> Dict:
+        attributes = cls.expression.search(raw).groupdict()
+        # mod_security escribe el desplazamiento horario con el signo duplicado (--0500)
+        attributes['timestamp'] = decode_clf(attributes['timestamp'].replace(' --', ' -'))
+        attributes['app_name'] = "mod_security"
+
+        # Cabeceras de la petición: desde la línea de separación que sigue al handler hasta la primera línea vacía
+        sections = raw.split('\n' + '-' * 40 + '\n', 1)
+        if len(sections) == 2:
+            request = sections[1].split('\n\n', 1)[0].split('\n')[1:]
+            matches = (cls.header.match(line) for line in request)
+            attributes['struct_data'] = {match['key']: match['value'] for match in matches if match is not None}
+        return attributes
+
+
+class UntimedLogs(Logs):
+    # Clase base de los logs cuyas líneas no incluyen timestamp. Todas las líneas de un fichero reciben como timestamp
+    # la fecha de modificación del fichero, que es el momento de su última escritura.
+
+    # Valor de app_name de todas las líneas, que cada subclase define
+    application: ClassVar[str] = None
+
+    def __init__(self, raw: str, timestamp: datetime.datetime = None):
+        super().__init__(**self.fields(raw, timestamp), raw=raw)
+
+    @classmethod
+    def fields(cls, raw: str, timestamp: datetime.datetime = None) -> Dict:
+        message = raw.rstrip('\n')
+        if not message:
+            # Las líneas vacías no son registros, igual que las que no encajan con el formato en el resto de clases
+            raise AttributeError('línea vacía')
+        return {'timestamp': timestamp or datetime.datetime.now(datetime.timezone.utc), 'message': message,
+                'app_name': cls.application}
+
+    @classmethod
+    def file_options(cls, log_file: str, year: int = None) -> Dict:
+        return {'timestamp': datetime.datetime.fromtimestamp(os.path.getmtime(log_file), datetime.timezone.utc)}
+
+
+class HttpdAgentLogs(UntimedLogs):
+    # Clase que implementa el procesamiento de los logs de agentes de usuario de HTTP (agent_log): un agente por línea.
+
+    patterns = [r'agent_log(\.\d+)?']
+    application = "httpd"
+
+
+class SnmpdLogs(UntimedLogs):
+    # Clase que implementa el procesamiento de los logs de snmpd, formados por mensajes de estado sin timestamp.
+
+    patterns = [r'snmpd\.log(\.\d+)?']
+    application = "snmpd"
+
+
+class BinaryLogs(Logs):
+    # Clase base de los logs binarios formados por registros de tamaño fijo. El fichero se proyecta en memoria como un
+    # array estructurado de NumPy con el formato del registro, por lo que cada campo es una vista sin copia sobre el
+    # fichero, y los registros se convierten en lotes columna a columna, sin crear un objeto por registro.
+
+    binary = True
+
+    # Formato de cada registro, que define cada subclase
+    record_dtype: ClassVar[np.dtype] = None
+
+    @classmethod
+    def read_records(cls, log_file: str, offset: int = 0) -> np.ndarray:
+        """
+        :param log_file: Fichero fuente del log.
+        :param offset: Desplazamiento en bytes desde el que se leen los registros, múltiplo del tamaño del registro.
+        :return: Array estructurado de solo lectura con los registros completos a partir de offset.
+        """
+        count = (os.path.getsize(log_file) - offset) // cls.record_dtype.itemsize
+        if count <= 0:
+            return np.empty(0, dtype=cls.record_dtype)
+        return np.memmap(log_file, dtype=cls.record_dtype, mode='r', offset=offset, shape=(count,))
+
+    @classmethod
+    def to_batch(cls, records: np.ndarray, first: int = 0) -> 'LogBatch':
+        """
+        :param records: Registros consecutivos del fichero.
+        :param first: Posición en el fichero del primer registro de records.
+        :return: Lote con los registros convertidos al formato estándar.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def batches(cls, log_file: str, batch_size: int = BATCH_SIZE, offset: int = 0) -> Iterator['LogBatch']:
+        """
+        :param log_file: Fichero fuente del log.
+        :param batch_size: Número máximo de registros por lote.
+        :param offset: Desplazamiento en bytes desde el que se leen los registros.
+        :return: Iterador de lotes columnares de, como mucho, batch_size registros.
+        """
+        records = cls.read_records(log_file, offset)
+        first = offset // cls.record_dtype.itemsize
+        for start in range(0, len(records), batch_size):
+            batch = cls.to_batch(records[start:start + batch_size], first + start)
+            if len(batch):
+                yield batch
+
+
+def decode_strings(values: np.ndarray) -> np.ndarray:
     """
-    :param log_file: Fichero fuente del log.
-    :return: Líneas contenidas en el fichero en una estructura de lista iterable.
+    :param values: Array de cadenas de bytes de longitud fija, terminadas en nulo.
+    :return: Array de textos decodificados desde UTF-8.
+    """
+    return np.char.decode(values, 'utf8', ENCODING_ERRORS)
 
-    Lectura de un fichero de log línea a línea. Retorna todas las líneas en una lista.
+
+def join_strings(*columns: np.ndarray) -> List[str]:
+    """
+    :param columns: Arrays de textos con el mismo número de elementos.
+    :return: Para cada posición, los textos no vacíos de todas las columnas separados por espacios.
     """
-    with open(log_file, 'r', encoding='utf8') as f:
-        return [line for line in f]
+    return [' '.join(filter(None, values)) for values in zip(*(column.tolist() for column in columns))]
+
+
+class WtmpLogs(BinaryLogs):
+    # Clase que implementa la decodificación de los registros binarios de sesiones (wtmp), con el formato utmp de glibc
+    # de 384 bytes. Cada registro se convierte en un evento cuyo message_id es su tipo: inicio de sesión (login), fin de
+    # sesión (logout), arranque, cambio de nivel de ejecución, etc. En los inicios de sesión, host_name es el host
+    # remoto desde el que se conecta el usuario.
+
+    patterns = [r'wtmp(\.\d+)?']
+
+    record_dtype = np.dtype([
+        ('type', '<i2'), ('padding', 'V2'), ('pid', '<i4'), ('line', 'S32'), ('id', 'S4'), ('user', 'S32'),
+        ('host', 'S256'), ('termination', '<i2'), ('exit', '<i2'), ('session', '<i4'), ('seconds', '<i4'),
+        ('microseconds', '<i4'), ('address', '<u4', (4,)), ('unused', 'V20'),
+    ])
+
+    # Nombre de cada tipo de registro utmp (ut_type), indexado por su valor
+    events = np.array([None, 'runlevel', 'boot', 'new_time', 'old_time', 'init', 'login_process', 'login', 'logout',
+                       'accounting'], dtype=object)
+    user_process = 7
+
+    # Prioridad syslog de todos los eventos: facilidad authpriv, como los de secure, y severidad informativa
+    priority = 10 * 8 + 6
+
+    @classmethod
+    def to_batch(cls, records: np.ndarray, first: int = 0) -> 'LogBatch':
+        timestamp = records['seconds'].astype(np.int64) * 1_000_000_000 + records['microseconds'].astype(np.int64) * 1000
+        types = records['type']
+        message_id = cls.events[np.where((types >= 0) & (types < len(cls.events)), types, 0)]
+        user, line, host = (decode_strings(records[field]) for field in ('user', 'line', 'host'))
+        # Solo los inicios de sesión llevan el host remoto; el resto de registros guardan ahí la versión del núcleo
+        login = types == cls.user_process
+        host_name = np.where(login & (host != ''), host.astype(object), None)
+        return LogBatch.from_columns(timestamp, join_strings(user, line, host), priority=np.full(len(records), cls.priority),
+                                     process_id=records['pid'], host_name=host_name, app_name='wtmp',
+                                     message_id=message_id)
+
+
+class LastlogLogs(BinaryLogs):
+    # Clase que implementa la decodificación del registro binario de últimos accesos (lastlog), con un registro de 292
+    # bytes por uid. Los uid que nunca han iniciado sesión tienen el tiempo a cero y no producen ningún evento.
+
+    patterns = [r'lastlog']
+
+    record_dtype = np.dtype([('time', '<i4'), ('line', 'S32'), ('host', 'S256')])
+
+    @classmethod
+    def to_batch(cls, records: np.ndarray, first: int = 0) -> 'LogBatch':
+        # La posición del registro en el fichero es el uid
+        uid = first + np.arange(len(records))
+        used = records['time'] != 0
+        records, uid = records[used], uid[used]
+        line, host = decode_strings(records['line']), decode_strings(records['host'])
+        message = join_strings(np.char.add('uid=', uid.astype(str)), line, host)
+        host_name = np.where(host != '', host.astype(object), None)
+        return LogBatch.from_columns(records['time'].astype(np.int64) * 1_000_000_000, message, host_name=host_name,
+                                     app_name='lastlog', message_id='lastlog')
+
+# Formatos de compresión reconocidos. Relaciona cada extensión y cada firma inicial (magic bytes) con la función que
+# abre el fichero descomprimiéndolo por bloques a medida que se lee.
+COMPRESSED_EXTENSIONS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+}
+COMPRESSED_MAGIC = {
+    b'\x1f\x8b': gzip.open,
+    b'BZh': bz2.open,
+}
+
 
+def find_opener(log_file: str) -> Callable:
+    """
+    :param log_file: Fichero fuente del log, comprimido o no.
+    :return: Función con la que abrir el fichero: gzip.open, bz2.open u open si no está comprimido.
+
+    Los ficheros comprimidos se detectan por su extensión o, si no la tienen, por sus primeros bytes.
+    """
+    opener = COMPRESSED_EXTENSIONS.get(os.path.splitext(log_file)[1])
+    if opener is None:
+        with open(log_file, 'rb') as f:
+            head = f.read(3)
+        opener = next((opener for magic, opener in COMPRESSED_MAGIC.items() if head.startswith(magic)), open)
+    return opener
+
+
+def open_logs(log_file: str) -> TextIO:
+    """
+    :param log_file: Fichero fuente del log, comprimido o no.
+    :return: Fichero abierto en modo texto.
 
-def parse_logs(logs: List[str], parser_class: Type) -> List[Logs]:
+    Apertura de un fichero de log. Los ficheros comprimidos se descomprimen de forma transparente por bloques a medida
+    que se leen.
+    """
+    return find_opener(log_file)(log_file, 'rt', encoding='utf8', errors=ENCODING_ERRORS)
+
+
+def read_logs(log_file: str) -> Iterator[str]:
+    """
+    :param log_file: Fichero fuente del log, comprimido o no.
+    :return: Iterador perezoso sobre las líneas contenidas en el fichero.
+
+    Lectura de un fichero de log línea a línea. Las líneas se producen bajo demanda, de forma que nunca se mantiene el
+    fichero completo en memoria.
+    """
+    with open_logs(log_file) as f:
+        yield from f
+
+
+def read_blocks(log_file: str, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """
+    :param log_file: Fichero fuente del log, comprimido o no.
+    :param block_size: Tamaño aproximado de cada bloque.
+    :return: Iterador de bloques de bytes ya descomprimidos, cada uno formado por líneas completas.
+
+    Lectura de un fichero de log por bloques para los procesadores que tratan un bloque completo de una vez (véase
+    Logs.parse_block). Cada bloque termina en el último salto de línea leído; el resto pasa al bloque siguiente.
+    """
+    pending = b''
+    with find_opener(log_file)(log_file, 'rb') as f:
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            end = data.rfind(b'\n') + 1
+            if not end:
+                pending += data
+                continue
+            yield pending + data[:end]
+            pending = data[end:]
+    if pending:
+        yield pending
+
+
+def read_many(log_files: List[str], workers: int = READ_WORKERS, chunk_size: int = BATCH_SIZE,
+              max_chunks: int = 4, reader: Callable[[str], Iterator] = read_logs) -> Iterator[Tuple[str, Iterator]]:
     """
-    :param logs: Lista que contiene todas las líneas de un fichero fuente de log.
+    :param log_files: Ficheros fuente de los logs, comprimidos o no.
+    :param workers: Número de hilos que leen y descomprimen ficheros a la vez.
+    :param chunk_size: Número de elementos (líneas, o bloques de bytes con read_blocks) de cada entrega de los hilos
+        al consumidor.
+    :param max_chunks: Número máximo de entregas leídas por adelantado de cada fichero.
+    :param reader: Función de lectura de cada fichero: read_logs (líneas) o read_blocks (bloques de bytes).
+    :return: Iterador de pares (fichero, iterador de sus elementos), en el mismo orden que log_files.
+
+    Lectura de varios ficheros de log con un conjunto de hilos que descomprimen varias rotaciones a la vez mientras se
+    procesan las anteriores. La descompresión de zlib y bz2 libera el GIL, por lo que los hilos avanzan en paralelo.
+    Cada fichero se entrega por bloques a través de una cola acotada, de modo que la memoria ocupada no depende del
+    tamaño de los ficheros. Los errores de lectura se propagan al consumir las líneas del fichero que los produjo.
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=max_chunks) for _ in log_files]
+
+    def put(chunks: queue.Queue, item) -> bool:
+        # Inserción en la cola que se abandona si el consumidor ha dejado de leer.
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(log_file: str, chunks: queue.Queue):
+        try:
+            lines = reader(log_file)
+            while not stop.is_set():
+                chunk = list(itertools.islice(lines, chunk_size))
+                if not chunk or not put(chunks, chunk):
+                    break
+        except Exception as e:
+            put(chunks, e)
+        put(chunks, None)
+
+    def consume(chunks: queue.Queue) -> Iterator[str]:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield from chunk
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for log_file, chunks in zip(log_files, queues):
+                executor.submit(produce, log_file, chunks)
+            for log_file, chunks in zip(log_files, queues):
+                lines = consume(chunks)
+                yield log_file, lines
+                # Las líneas que el consumidor no haya leído se descartan para liberar al hilo de ese fichero.
+                try:
+                    collections.deque(lines, maxlen=0)
+                except Exception:
+                    pass
+        finally:
+            stop.set()
+
+
+def parse_logs(logs: Iterable[str], parser_class: Type) -> Iterator[Logs]:
+    """
+    :param logs: Iterable con las líneas de un fichero fuente de log.
     :param parser_class: Clase relacionada con la aplicación de origen de los logs para el procesamiento.
-    :return: Lista de instancias de la clase correspondiente con los logs.
+    :return: Iterador perezoso de instancias de la clase correspondiente con los logs.
 
     Procesamiento de cada línea procedente de un fichero de log mediante la instanciación de la clase correspondiente
-    con el formato de los logs. Retorna una lista con todas las instancias.
+    con el formato de los logs. Cada instancia se genera en el momento en que se consume.
     """
-    parsed_logs = []
     for log in logs:
         try:
-            parsed_logs.append(parser_class(log))
-        except AttributeError as e:
-            print('AttributeError', e)
+            yield parser_class(log)
+        except AttributeError:
             continue
-    return parsed_logs
-
-
-# Reglas para el parseo de los logs. Relaciona cada formato de nombre de fichero con la clase correspondiente.
-rules = {
-    r'boot.log(\.\d+)?': UnixLogs,
-    r'cron(\.\d+)?': UnixLogs,
-    r'access.log(\.\d+)?': SquidLogs,
-    r'cache.log(\.\d+)?': SquidLogs,
-    r'referer_log.log(\.\d+)?': SquidLogs,
-    r'store.log(\.\d+)?': SquidLogs,
-    r'useragent_log.log(\.\d+)?': SquidLogs,
-    r'logfile': PrivoxyLogs,
-    r'error_log(\.\d+)?': CupsLogs,
-    r'ssl_access_log(\.\d+)?': HttpdLogs,
-}
-
-import pandas as pd
 
-# Dataframe que contendrá las todas las líneas de log convertidas al estándar para futuro procesamiento.
-global_df = pd.DataFrame(columns=['priority', 'protocol_ver', 'timestamp', 'host_name', 'app_name', 'process_id', 'message_id', 'struct_data', 'message'])
 
-# Recorrido del directorio que contiene los ficheros de log. Directorio definido en la constante LOG_DIR.
-for root, dirs, files in os.walk(LOG_DIR):
-    for file in files:
-        # Omisión de ficheros comprimidos con codificación desconocida
-        try:
-            logs = read_logs(os.path.join(root, file))
-        except UnicodeDecodeError:
-            print('UnicodeDecodeError', os.path.join(root, file))
-            continue
-
-        # Determinación de la clase correspondiente con el formato de log
-        for key in rules:
-            if re.match(key, file):
-                logs = parse_logs(logs, rules.get(key))
-                break
-        else:
-            continue
+def batch_logs(logs: Iterable[Logs], batch_size: int) -> Iterator[List[Logs]]:
+    """
+    :param logs: Iterable de instancias de logs ya procesadas.
+    :param batch_size: Número máximo de logs por lote.
+    :return: Iterador de listas con, como mucho, batch_size logs cada una.
 
-        #print(*logs, sep='\n')
+    Agrupación de un flujo de logs en lotes de tamaño acotado. Es el único punto del flujo en el que se materializan
+    instancias, por lo que el consumo de memoria queda limitado por batch_size.
+    """
+    logs = iter(logs)
+    while True:
+        batch = list(itertools.islice(logs, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+class ParserRouter:
+    # Enrutado de nombres de fichero a clases de procesamiento. Los patrones de todas las clases registradas se
+    # combinan en una única expresión regular con un grupo con nombre por patrón, de forma que cada nombre de fichero
+    # se resuelve con una sola búsqueda en lugar de probar las reglas una a una. Los patrones se prueban en el orden de
+    # registro y deben cubrir el nombre completo; las extensiones de compresión se admiten en todos ellos.
+
+    def __init__(self, classes: Iterable[Type[Logs]]):
+        self.classes: Dict[str, Type[Logs]] = {}
+        groups = []
+        for parser_class in classes:
+            for pattern in parser_class.patterns:
+                name = f'pattern{len(self.classes)}'
+                self.classes[name] = parser_class
+                groups.append(f'(?P<{name}>{pattern})')
+        compression = '|'.join(re.escape(extension) for extension in COMPRESSED_EXTENSIONS)
+        self.expression = re.compile(f'(?:{"|".join(groups)})(?:{compression})?')
+
+    def find(self, file: str) -> Optional[Type[Logs]]:
+        match = self.expression.fullmatch(file)
+        return self.classes[match.lastgroup] if match else None
+
+
+@functools.lru_cache(maxsize=None)
+def router(classes: Tuple[Type[Logs], ...]) -> ParserRouter:
+    # El enrutador se compila una sola vez por conjunto de clases registradas.
+    return ParserRouter(classes)
+
+
+def find_parser(file: str) -> Optional[Type]:
+    """
+    :param file: Nombre del fichero de log (sin directorio).
+    :return: Clase con la que procesar el fichero o None si ninguna clase registrada lo reconoce.
 
-        # Generación de un diccionario que asocia toda la información parseada con campos concretos para posteriormente
-        # introducir la información en el dataframe. Cada clave se corresponderá con una columna del dataframe.
-        data = {
-            'priority': [log.priority for log in logs],
-            'protocol_ver': [log.protocol_ver for log in logs],
-            'timestamp': [log.timestamp for log in logs],
-            'host_name': [log.host_name for log in logs],
-            'app_name': [log.app_name for log in logs],
-            'process_id': [log.process_id for log in logs],
-            'message_id': [log.message_id for log in logs],
-            'struct_data': [log.struct_data for log in logs],
-            'message': [log.message for log in logs]
-        }
+    Determinación de la clase correspondiente con el formato de log a partir de los patrones de nombre de fichero que
+    declara cada subclase de Logs.
+    """
+    return router(tuple(Logs.registry)).find(file)
 
-        df = pd.DataFrame(data)
-        global_df = pd.concat([global_df, df], ignore_index=True)
 
-sorted_global_df = global_df.sort_values(by='timestamp')
+def ingest_file(log_file: str, parser_class: Type, batch_size: int = BATCH_SIZE, year: int = None) -> Iterator[LogBatch]:
+    """
+    :param log_file: Fichero fuente del log.
+    :param parser_class: Clase relacionada con la aplicación de origen de los logs para el procesamiento.
+    :param batch_size: Número máximo de líneas por lote.
+    :param year: Año de referencia para los timestamps que no lo incluyen. Por defecto, el de modificación del fichero.
+    :return: Iterador de lotes columnares: uno por bloque leído en los formatos de un registro por línea y de, como
+        mucho, batch_size registros en el resto.
 
-# save dataframe
-sorted_global_df.to_numpy().dump('logs.npy')
+    Flujo completo de lectura, procesamiento y volcado por lotes de un único fichero de log. Los campos de cada línea
+    se escriben directamente en el lote, sin crear instancias de Logs.
+    """
+    if parser_class.binary:
+        yield from parser_class.batches(log_file, batch_size)
+    elif parser_class.line_oriented():
+        options = parser_class.file_options(log_file, year)
+        for block in read_blocks(log_file):
+            yield parser_class.parse_block(block, batch_size, **options)
+    else:
+        yield from parse_batches(parser_class.records(read_logs(log_file)),
+                                 parser_class.fields_for_file(log_file, year), batch_size)
+
+
+def ingest_logs(log_dir: str = LOG_DIR, batch_size: int = BATCH_SIZE, read_workers: int = READ_WORKERS,
+                year: int = None, report: IngestReport = None) -> Iterator[LogBatch]:
+    """
+    :param log_dir: Directorio que contiene los ficheros de log.
+    :param batch_size: Número máximo de líneas por lote.
+    :param read_workers: Número de hilos que leen y descomprimen ficheros por adelantado.
+    :param year: Año de referencia para los timestamps que no lo incluyen. Por defecto, el de modificación de cada
+        fichero.
+    :param report: Informe en el que se acumulan los registros, filas y tiempo de cada fichero, si se indica.
+    :return: Iterador de lotes columnares con los logs de todos los ficheros reconocidos por find_parser.
+
+    Recorrido del directorio de logs aplicando a cada fichero la clase que le corresponde según find_parser. Cada lote
+    se entrega en cuanto se produce, sin esperar al resto del fichero. Los bytes que no pueden decodificarse como texto
+    se conservan escapados (ENCODING_ERRORS).
+    """
+    with INSTRUMENTATION.stage('discover'):
+        log_files = []
+        for root, dirs, files in os.walk(log_dir):
+            for file in files:
+                if find_parser(file) is not None:
+                    log_files.append(os.path.join(root, file))
+                elif report is not None:
+                    report.skip(os.path.join(root, file))
+
+    # Los ficheros de texto se leen por adelantado en otros hilos, por bloques de bytes los de un registro por línea y
+    # por líneas el resto; los binarios se proyectan en memoria al procesarlos.
+    classes = [find_parser(os.path.basename(path)) for path in log_files]
+    block_files = [path for path, parser_class in zip(log_files, classes) if parser_class.line_oriented()]
+    line_files = [path for path, parser_class in zip(log_files, classes)
+                  if not parser_class.binary and not parser_class.line_oriented()]
+    block_streams = read_many(block_files, read_workers, 1, reader=read_blocks)
+    streams = read_many(line_files, read_workers, batch_size)
+
+    try:
+        for path, parser_class in zip(log_files, classes):
+            start = time.perf_counter()
+            seconds = 0.0
+            # Iterador de lectura (bloques o líneas) con el tiempo de espera de los datos, y contador de registros.
+            reader = counter = None
+            if parser_class.binary:
+                batches = parser_class.batches(path, batch_size)
+            elif parser_class.line_oriented():
+                _, blocks = next(block_streams)
+                reader = INSTRUMENTATION.timed(blocks)
+                options = parser_class.file_options(path, year)
+                batches = (parser_class.parse_block(block, batch_size, **options) for block in reader)
+            else:
+                _, lines = next(streams)
+                # Con la instrumentación activada se mide por separado el tiempo de espera de las líneas.
+                reader = INSTRUMENTATION.timed(lines)
+                counter = CountingIterator(parser_class.records(reader))
+                batches = parse_batches(counter, parser_class.fields_for_file(path, year), batch_size)
+
+            # El tiempo del fichero solo incluye el de producir sus lotes, no el que pasa el consumidor con cada uno.
+            rows = failures = 0
+            for batch in batches:
+                seconds += time.perf_counter() - start
+                rows += len(batch)
+                failures += batch.failures
+                yield batch
+                start = time.perf_counter()
+            if parser_class.binary:
+                records = len(parser_class.read_records(path))
+            elif counter is None:
+                records = rows + failures
+            else:
+                records = counter.count
+            seconds += time.perf_counter() - start
+            read_seconds = getattr(reader, 'seconds', 0.0)
+
+            INSTRUMENTATION.add('read', read_seconds)
+            INSTRUMENTATION.add('parse', seconds - read_seconds)
+            if report is not None:
+                report.add(parser_class.__name__, path, records, rows, seconds, failures)
+    finally:
+        block_streams.close()
+        streams.close()
+
+
+def run_ingest(args: argparse.Namespace):
+    """
+    :param args: Argumentos del subcomando ingest de cli.py.
 
-print(sorted_global_df['timestamp'])
+    Normalización de los logs de args.log_dir y almacenamiento en el almacén columnar args.store.
+    """
+    report = IngestReport() if args.report or args.instrument else None
+    if args.instrument:
+        INSTRUMENTATION.enable(report, profile=args.sample_profile)
+
+    def finish_instrumentation():
+        # Cierre de la instrumentación y exportación de su informe, si está activada.
+        if args.instrument:
+            INSTRUMENTATION.disable()
+            INSTRUMENTATION.write_json(args.instrument)
+            print('\n'.join(INSTRUMENTATION.summary()))
+
+    if args.incremental:
+        from manifest import ingest_incremental
+
+        # Solo se procesan los datos nuevos, que se añaden al almacén existente.
+        with INSTRUMENTATION.stage('ingest'):
+            print(ingest_incremental(args.log_dir, args.store, args.batch_size, args.year))
+        finish_instrumentation()
+        return
+
+    # Minado de plantillas del almacén nuevo: los mensajes se codifican según se procesan los lotes.
+    miner = TemplateMiner()
+    if args.workers:
+        from parallel import ingest_parallel
+
+        with INSTRUMENTATION.stage('ingest'):
+            sorted_global_df = ingest_parallel(args.log_dir, args.workers, args.batch_size, args.year, miner)
+    elif args.pipeline:
+        from pipeline import PipelineMetrics, ingest_pipeline
+
+        metrics = PipelineMetrics()
+        with INSTRUMENTATION.stage('ingest'):
+            sorted_global_df = ingest_pipeline(args.log_dir, args.batch_size, args.year, args.read_workers,
+                                               metrics=metrics, miner=miner)
+        print(metrics)
+    else:
+        # Dataframe que contendrá las todas las líneas de log convertidas al estándar para futuro procesamiento. Se
+        # construye una sola vez, ordenado por timestamp, a partir de los lotes de todos los ficheros.
+        builder = FrameBuilder(miner)
+        builder.extend(ingest_logs(args.log_dir, args.batch_size, args.read_workers, args.year, report))
+        with INSTRUMENTATION.stage('frame'):
+            sorted_global_df = builder.build()
+        if args.report:
+            print(report)
+
+    # Almacenamiento del dataframe en el almacén columnar, con columnas tipadas y proyectables en memoria.
+    with INSTRUMENTATION.stage('store'):
+        save_store(sorted_global_df, args.store, miner=miner)
+    finish_instrumentation()
+
+    print(sorted_global_df['timestamp'])
+
+
+if __name__ == '__main__':
+    from cli import main
+
+    main(['ingest'] + sys.argv[1:])
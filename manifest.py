@@ -0,0 +1,244 @@
+import dataclasses
+import hashlib
+import json
+import os
+import os.path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from batch import parse_batches
+from frames import FrameBuilder
+from main import BATCH_SIZE, COMPRESSED_EXTENSIONS, COMPRESSED_MAGIC, ENCODING_ERRORS, LOG_DIR, find_opener, find_parser
+from store import STORE_PATH, LogStore, create_store
+
+# Reingesta incremental de LOG_DIR. El manifiesto (manifest.json, dentro del almacén) registra para cada fichero ya
+# procesado su tamaño, su fecha de modificación, el hash de su contenido procesado y el desplazamiento en bytes hasta el
+# que se ha leído. En cada ejecución:
+#
+#   - Los ficheros con el mismo tamaño y fecha de modificación que en el manifiesto se omiten sin leerlos.
+#   - Los ficheros cuyo contenido procesado sigue intacto al principio (mismo hash hasta el desplazamiento registrado)
+#     son el mismo fichero, aunque haya cambiado de nombre por una rotación (cron -> cron.1). Si además han crecido,
+#     solo se procesan los bytes nuevos.
+#   - El resto de ficheros son nuevos y se procesan completos.
+#
+# En los ficheros comprimidos, el desplazamiento y los hashes se refieren al contenido descomprimido. Así, una rotación
+# que además comprime el fichero (cron.1 -> cron.2.gz) se reconoce como el mismo fichero ya procesado, y si la última
+# línea del fichero sin comprimir estaba incompleta, se procesa solo lo que falta.
+
+MANIFEST_NAME = 'manifest.json'
+
+# Número de bytes iniciales con los que se buscan candidatos a ser el mismo fichero tras una rotación.
+HEAD_BYTES = 4096
+
+# Número de filas acumuladas tras el que se escriben en el almacén y se guarda el manifiesto (punto de control).
+CHECKPOINT_ROWS = 1 << 18
+
+
+@dataclasses.dataclass
+class FileEntry:
+    # Estado de un fichero en el manifiesto.
+
+    path: str
+    size: int
+    mtime: float
+    head_hash: str
+    content_hash: str
+    offset: int
+    compressed: bool = False
+
+
+def prefix_hash(path: str, size: int) -> Tuple[str, bool]:
+    """
+    :param path: Ruta del fichero, comprimido o no.
+    :param size: Número de bytes iniciales del contenido que se incluyen en el hash.
+    :return: Hash SHA-1 en hexadecimal de los primeros size bytes del contenido (descomprimido) del fichero y si el
+        contenido continúa después de ellos.
+    """
+    digest = hashlib.sha1()
+    with find_opener(path)(path, 'rb') as f:
+        while size > 0:
+            chunk = f.read(min(size, 1 << 20))
+            if not chunk:
+                break
+            digest.update(chunk)
+            size -= len(chunk)
+        return digest.hexdigest(), size == 0 and bool(f.read(1))
+
+
+def file_hash(path: str, size: int) -> str:
+    """
+    :param path: Ruta del fichero, comprimido o no.
+    :param size: Número de bytes iniciales del contenido que se incluyen en el hash.
+    :return: Hash SHA-1 en hexadecimal de los primeros size bytes del contenido (descomprimido) del fichero.
+    """
+    return prefix_hash(path, size)[0]
+
+
+def is_compressed(path: str) -> bool:
+    if os.path.splitext(path)[1] in COMPRESSED_EXTENSIONS:
+        return True
+    with open(path, 'rb') as f:
+        head = f.read(3)
+    return any(head.startswith(magic) for magic in COMPRESSED_MAGIC)
+
+
+class FileCursor:
+    # Lectura de un fichero de texto, comprimido o no, desde un desplazamiento en bytes de su contenido. Solo se
+    # entregan líneas completas, de forma que una línea que se está escribiendo en ese momento se procesará entera en la
+    # siguiente ejecución; en los ficheros comprimidos, que ya no crecen, se entrega también la última línea aunque no
+    # termine en salto de línea. Tras consumir las líneas, offset indica el byte siguiente a la última línea entregada.
+
+    def __init__(self, path: str, offset: int = 0, compressed: bool = False):
+        self.path = path
+        self.offset = offset
+        self.compressed = compressed
+
+    def lines(self) -> Iterator[str]:
+        # En los ficheros comprimidos, seek descomprime hasta el desplazamiento sin conservar los datos.
+        with find_opener(self.path)(self.path, 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b'\n') and not self.compressed:
+                    return
+                self.offset += len(line)
+                yield line.decode('utf8', ENCODING_ERRORS)
+
+
+class Manifest:
+    # Conjunto de entradas del manifiesto, indexadas por ruta.
+
+    def __init__(self, entries: List[FileEntry] = ()):
+        self.entries: Dict[str, FileEntry] = {entry.path: entry for entry in entries}
+
+    @classmethod
+    def load(cls, store_path: str = STORE_PATH) -> 'Manifest':
+        path = os.path.join(store_path, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding='utf8') as f:
+            return cls([FileEntry(**entry) for entry in json.load(f)])
+
+    def save(self, store_path: str = STORE_PATH):
+        # Escritura atómica, igual que meta.json en el almacén.
+        path = os.path.join(store_path, MANIFEST_NAME)
+        with open(path + '.tmp', 'w', encoding='utf8') as f:
+            json.dump([dataclasses.asdict(entry) for entry in self.entries.values()], f)
+        os.replace(path + '.tmp', path)
+
+    def find_previous(self, path: str, size: int, compressed: bool) -> Tuple[Optional[FileEntry], bool]:
+        """
+        :param path: Ruta actual del fichero.
+        :param size: Tamaño actual del fichero.
+        :param compressed: Si el fichero está comprimido.
+        :return: Entrada del manifiesto que corresponde al mismo fichero, con su nombre actual o con otro anterior, o
+            None si el fichero es nuevo, y si el fichero tiene contenido después del ya procesado.
+
+        Primero se prueba la entrada con la misma ruta y después las del resto de ficheros con los mismos bytes
+        iniciales. Una entrada corresponde al fichero si su contenido procesado coincide con el principio del contenido
+        del fichero. Los hashes se comparan sobre el contenido descomprimido, de modo que un fichero comprimido puede
+        corresponder a una entrada de cuando no lo estaba.
+        """
+        heads = {}
+        candidates = [self.entries[path]] if path in self.entries else []
+        candidates += [entry for entry in self.entries.values() if entry.path != path]
+        for entry in candidates:
+            # El tamaño de un fichero comprimido no acota el de su contenido.
+            if not compressed and entry.offset > size:
+                continue
+            head_size = min(HEAD_BYTES, entry.offset)
+            if head_size not in heads:
+                heads[head_size] = file_hash(path, head_size)
+            if heads[head_size] != entry.head_hash:
+                continue
+            content_hash, remaining = prefix_hash(path, entry.offset)
+            if content_hash == entry.content_hash:
+                return entry, remaining
+        return None, True
+
+
+def scan(log_dir: str, manifest: Manifest) -> Iterator[tuple]:
+    """
+    :param log_dir: Directorio que contiene los ficheros de log.
+    :param manifest: Manifiesto de la ejecución anterior.
+    :return: Iterador de tuplas (ruta, tamaño, fecha de modificación, comprimido, entrada anterior o None, sin
+        cambios).
+
+    Recorrido del directorio emparejando cada fichero reconocido por find_parser con su entrada del manifiesto.
+    """
+    for root, dirs, files in os.walk(log_dir):
+        for file in files:
+            if find_parser(file) is None:
+                continue
+            path = os.path.join(root, file)
+            stat = os.stat(path)
+            entry = manifest.entries.get(path)
+            if entry is not None and entry.size == stat.st_size and entry.mtime == stat.st_mtime:
+                yield path, stat.st_size, stat.st_mtime, entry.compressed, entry, True
+                continue
+            compressed = is_compressed(path)
+            previous, remaining = manifest.find_previous(path, stat.st_size, compressed)
+            yield path, stat.st_size, stat.st_mtime, compressed, previous, previous is not None and not remaining
+
+
+def ingest_incremental(log_dir: str = LOG_DIR, store_path: str = STORE_PATH, batch_size: int = BATCH_SIZE,
+                       year: int = None, checkpoint_rows: int = CHECKPOINT_ROWS) -> Dict[str, int]:
+    """
+    :param log_dir: Directorio que contiene los ficheros de log.
+    :param store_path: Directorio del almacén columnar. Se crea si no existe.
+    :param batch_size: Número máximo de líneas por lote.
+    :param year: Año de referencia para los timestamps que no lo incluyen.
+    :param checkpoint_rows: Número de filas nuevas tras el que se escribe un punto de control.
+    :return: Número de ficheros omitidos, reanudados y procesados completos, y número de filas nuevas.
+
+    Ingesta de los datos nuevos de log_dir en el almacén. Las filas nuevas se añaden como bloques adicionales y, cada
+    checkpoint_rows filas, se guarda el manifiesto con los ficheros ya incluidos en esos bloques, de modo que una
+    ejecución interrumpida continúa desde el último punto de control.
+    """
+    store = LogStore(store_path) if os.path.exists(os.path.join(store_path, 'meta.json')) else create_store(store_path)
+    manifest = Manifest.load(store_path)
+    current = Manifest()
+    pending: List[FileEntry] = []
+    builder = FrameBuilder(store.miner)
+    report = {'skipped': 0, 'resumed': 0, 'new': 0, 'rows': 0}
+
+    def checkpoint():
+        nonlocal builder
+        if len(builder):
+            report['rows'] += len(builder)
+            store.append(builder.build())
+            builder = FrameBuilder(store.miner)
+        for pending_entry in pending:
+            current.entries[pending_entry.path] = pending_entry
+        pending.clear()
+        # Las entradas de ficheros que aún no se han revisado se conservan hasta que se revisen.
+        Manifest(list(manifest.entries.values()) + list(current.entries.values())).save(store_path)
+
+    for path, size, mtime, compressed, previous, unchanged in scan(log_dir, manifest):
+        if unchanged:
+            # Fichero sin cambios, con el mismo nombre o renombrado por una rotación.
+            report['skipped'] += 1
+            current.entries[path] = dataclasses.replace(previous, path=path, size=size, mtime=mtime)
+            continue
+
+        parser_class = find_parser(os.path.basename(path))
+        start = previous.offset if previous is not None else 0
+        if parser_class.binary:
+            # Los ficheros binarios se reanudan por registros completos, igual que los de texto por líneas completas.
+            records = len(parser_class.read_records(path, start))
+            builder.extend(parser_class.batches(path, batch_size, start))
+            offset = start + records * parser_class.record_dtype.itemsize
+        else:
+            cursor = FileCursor(path, start, compressed)
+            builder.extend(parse_batches(parser_class.records(cursor.lines()), parser_class.fields_for_file(path, year),
+                                         batch_size))
+            offset = cursor.offset
+
+        report['resumed' if previous is not None else 'new'] += 1
+        pending.append(FileEntry(path, size, mtime, file_hash(path, min(HEAD_BYTES, offset)), file_hash(path, offset),
+                                 offset, compressed))
+        if len(builder) >= checkpoint_rows:
+            checkpoint()
+
+    checkpoint()
+    # Manifiesto final: solo los ficheros presentes en esta ejecución.
+    current.save(store_path)
+    return report
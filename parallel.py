@@ -0,0 +1,63 @@
+import concurrent.futures
+import os.path
+from typing import List
+
+import pandas as pd
+
+from batch import LogBatch
+from frames import build_frame
+from main import BATCH_SIZE, LOG_DIR, find_parser, ingest_file
+from templates import TemplateMiner
+
+
+def parse_file(path: str, batch_size: int = BATCH_SIZE, year: int = None) -> LogBatch:
+    """
+    :param path: Ruta del fichero de log.
+    :param batch_size: Número máximo de líneas por lote durante el procesamiento.
+    :param year: Año de referencia para los timestamps que no lo incluyen.
+    :return: Lote columnar con las líneas del fichero.
+
+    Tarea ejecutada por cada proceso trabajador. La clase de procesamiento se determina en el propio trabajador a
+    partir del nombre del fichero, de forma que solo viaja entre procesos la ruta y el lote columnar, cuyos arrays se
+    serializan como bloques de bytes en lugar de como un objeto por línea. Los bytes que no pueden decodificarse como
+    texto se conservan escapados (ENCODING_ERRORS), como en ingest_logs.
+    """
+    return LogBatch.concat(ingest_file(path, find_parser(os.path.basename(path)), batch_size, year))
+
+
+def list_log_files(log_dir: str = LOG_DIR) -> List[str]:
+    """
+    :param log_dir: Directorio que contiene los ficheros de log.
+    :return: Rutas de los ficheros reconocidos por find_parser, en el mismo orden en que los recorre main.py.
+
+    El orden de la lista es el que fija el desempate entre líneas con el mismo timestamp en el resultado final.
+    """
+    return [os.path.join(root, file) for root, dirs, files in os.walk(log_dir) for file in files
+            if find_parser(file) is not None]
+
+
+def ingest_parallel(log_dir: str = LOG_DIR, workers: int = None, batch_size: int = BATCH_SIZE,
+                    year: int = None, miner: TemplateMiner = None) -> pd.DataFrame:
+    """
+    :param log_dir: Directorio que contiene los ficheros de log.
+    :param workers: Número de procesos trabajadores. Por defecto, uno por CPU.
+    :param batch_size: Número máximo de líneas por lote durante el procesamiento en cada trabajador.
+    :param year: Año de referencia para los timestamps que no lo incluyen.
+    :param miner: Minado de plantillas con el que se codifican los mensajes, si se indica.
+    :return: Dataframe con todas las líneas ordenadas por timestamp.
+
+    Procesamiento en paralelo de los ficheros de log, uno por tarea. Los ficheros más grandes se envían primero para
+    equilibrar la carga, pero el resultado se une siempre en el orden de list_log_files, por lo que no depende del
+    número de trabajadores.
+    """
+    paths = list_log_files(log_dir)
+    by_size = sorted(paths, key=os.path.getsize, reverse=True)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {path: executor.submit(parse_file, path, batch_size, year) for path in by_size}
+        results = [futures[path].result() for path in paths]
+
+    # Cada fichero es un tramo de la mezcla: a igualdad de timestamp se conserva el orden de list_log_files y, dentro
+    # de cada fichero, el de las líneas. El minado de plantillas tiene estado, así que se hace aquí, en ese mismo
+    # orden, y no en los trabajadores.
+    return build_frame(results, miner)
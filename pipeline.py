@@ -0,0 +1,415 @@
+import asyncio
+import bz2
+import collections
+import concurrent.futures
+import dataclasses
+import functools
+import gzip
+import os
+import os.path
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from batch import LogBatch
+from frames import FrameBuilder
+from main import BATCH_SIZE, LOG_DIR, READ_WORKERS, find_opener, find_parser
+from parallel import list_log_files
+from templates import TemplateMiner
+
+# Ingesta por etapas con asyncio. Cada fichero atraviesa cuatro etapas conectadas por colas acotadas:
+#   - read: lectura de bloques de bytes del fichero, en hilos.
+#   - decompress: descompresión incremental de los bloques y corte en tramos de líneas completas, en hilos (zlib y bz2
+#     liberan el GIL).
+#   - parse: decodificación y procesamiento de cada tramo con la clase de Logs del fichero, en procesos.
+#   - sink: incorporación de los lotes al FrameBuilder en el orden de list_log_files, de forma que el resultado es el
+#     mismo que el de la ingesta secuencial. Si se indica un minado de plantillas, los mensajes de cada lote se
+#     codifican aquí, en ese mismo orden.
+# Como las colas están acotadas, una etapa lenta detiene a las anteriores en lugar de acumular datos en memoria, y todas
+# las etapas trabajan a la vez sobre ficheros o tramos distintos: el ritmo lo marca la etapa más lenta y no la suma de
+# todas. La reordenación de la etapa sink también está acotada: de los ficheros posteriores al que espera sink solo
+# puede haber queue_size bloques leídos y sin incorporar, y el lector del fichero que espera sink nunca se detiene, de
+# forma que los lotes que se acumulan fuera de orden no dependen del tamaño de los ficheros. Cada etapa registra su tiempo de trabajo, de espera de datos y de espera de espacio en la cola siguiente, y la
+# ocupación de su cola de entrada, para identificar dónde se va el tiempo.
+
+# Tamaño de los bloques que se leen de cada fichero.
+BLOCK_SIZE = 1 << 20
+
+# Capacidad de cada cola entre etapas, en elementos (bloques, tramos o lotes).
+QUEUE_SIZE = 8
+
+DECOMPRESS_WORKERS = 2
+
+# Intervalo de muestreo de la ocupación de las colas.
+SAMPLE_INTERVAL = 0.05
+
+STAGES = ['read', 'decompress', 'parse', 'sink']
+
+# Descompresores incrementales equivalentes a cada función de apertura de find_opener.
+DECOMPRESSORS = {
+    gzip.open: lambda: zlib.decompressobj(zlib.MAX_WBITS | 16),
+    bz2.open: bz2.BZ2Decompressor,
+}
+
+
+class StreamDecompressor:
+    # Descompresión incremental de un fichero por bloques. Admite, como gzip.open y bz2.open, varios miembros
+    # comprimidos concatenados.
+
+    def __init__(self, factory: Callable):
+        self.factory = factory
+        self.decompressor = factory()
+
+    def decompress(self, data: bytes) -> bytes:
+        parts = []
+        while data:
+            parts.append(self.decompressor.decompress(data))
+            if not self.decompressor.eof:
+                break
+            data = self.decompressor.unused_data
+            self.decompressor = self.factory()
+        return b''.join(parts)
+
+
+class FileState:
+    # Estado de un fichero en la etapa de descompresión: su descompresor, la última línea incompleta y el número de
+    # tramos entregados. Cada fichero lo procesa siempre el mismo trabajador, por lo que sus bloques llegan en orden.
+
+    def __init__(self, path: str):
+        self.path = path
+        self.parser_class = find_parser(os.path.basename(path))
+        factory = None if self.parser_class.binary else DECOMPRESSORS.get(find_opener(path))
+        self.decompressor = StreamDecompressor(factory) if factory else None
+        self.pending = b''
+        self.chunks = 0
+
+    def feed(self, data: bytes, last: bool) -> List[bytes]:
+        """
+        :param data: Bloque leído del fichero.
+        :param last: Si es el último bloque del fichero.
+        :return: Tramos de líneas completas listos para procesarse. Los formatos de varias líneas por registro se
+            entregan en un único tramo con el fichero completo, para no cortar ningún registro.
+        """
+        if self.decompressor is not None:
+            data = self.decompressor.decompress(data)
+        self.pending += data
+        if last:
+            chunk, self.pending = self.pending, b''
+            return [chunk]
+        if not self.parser_class.line_oriented():
+            return []
+        end = self.pending.rfind(b'\n') + 1
+        if not end:
+            return []
+        chunk, self.pending = self.pending[:end], self.pending[end:]
+        return [chunk]
+
+
+@functools.lru_cache(maxsize=None)
+def file_options(path: str, year: Optional[int]) -> Dict:
+    # Las opciones de cada fichero se calculan una sola vez por proceso, aunque el fichero llegue en varios tramos.
+    return find_parser(os.path.basename(path)).file_options(path, year)
+
+
+def parse_chunk(path: str, data: bytes, batch_size: int = BATCH_SIZE, year: int = None) -> LogBatch:
+    """
+    :param path: Ruta del fichero de log.
+    :param data: Tramo de líneas completas del fichero, ya descomprimido. Se ignora en los ficheros binarios, que se
+        procesan completos proyectándolos en memoria.
+    :param batch_size: Número máximo de líneas por lote durante el procesamiento.
+    :param year: Año de referencia para los timestamps que no lo incluyen.
+    :return: Lote columnar con los registros del tramo.
+
+    Tarea de la etapa parse, que se ejecuta en un proceso trabajador. El tramo se procesa con Logs.parse_block, que
+    decodifica las líneas igual que open_logs o, en los formatos de campos fijos, procesa el tramo vectorizado.
+    """
+    parser_class = find_parser(os.path.basename(path))
+    if parser_class.binary:
+        return LogBatch.concat(parser_class.batches(path, batch_size))
+    return parser_class.parse_block(data, batch_size, **file_options(path, year))
+
+
+@dataclasses.dataclass
+class StageStats:
+    # Métricas de una etapa. Los tiempos se suman para todos sus trabajadores.
+
+    workers: int = 1
+    items: int = 0
+    busy: float = 0.0
+    starved: float = 0.0
+    blocked: float = 0.0
+    depth_sum: int = 0
+    depth_max: int = 0
+    samples: int = 0
+
+    @property
+    def mean_depth(self) -> float:
+        return self.depth_sum / self.samples if self.samples else 0.0
+
+    def utilization(self, seconds: float) -> float:
+        """
+        :param seconds: Duración total de la ingesta.
+        :return: Fracción del tiempo disponible de los trabajadores de la etapa que se ha dedicado a trabajar.
+        """
+        return self.busy / (seconds * self.workers) if seconds else 0.0
+
+
+class PipelineMetrics:
+    # Métricas de una ejecución del flujo por etapas.
+
+    def __init__(self):
+        self.stages: Dict[str, StageStats] = {stage: StageStats() for stage in STAGES}
+        self.seconds = 0.0
+        self.build_seconds = 0.0
+        self.rows = 0
+        # Máximo de lotes pendientes de reordenar en la etapa sink.
+        self.reorder_max = 0
+        # Registros que no encajan con el formato, por clase de procesamiento.
+        self.failures: Dict[str, int] = collections.Counter()
+
+    @property
+    def bottleneck(self) -> str:
+        """
+        :return: Etapa con mayor ocupación de sus trabajadores, que es la que limita el ritmo del conjunto.
+        """
+        return max(self.stages, key=lambda stage: self.stages[stage].utilization(self.seconds))
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        :return: Dataframe con una fila por etapa.
+        """
+        return pd.DataFrame([{'stage': stage, 'workers': stats.workers, 'items': stats.items, 'busy': stats.busy,
+                              'starved': stats.starved, 'blocked': stats.blocked,
+                              'utilization': stats.utilization(self.seconds), 'mean_depth': stats.mean_depth,
+                              'max_depth': stats.depth_max}
+                             for stage, stats in self.stages.items()])
+
+    def __str__(self):
+        table = self.to_frame().to_string(index=False, float_format=lambda value: f'{value:.3f}')
+        failures = ', '.join(f'{source}: {count}' for source, count in self.failures.items()) or 'ninguno'
+        return (f'{table}\n{self.rows} filas en {self.seconds:.3f} s (+{self.build_seconds:.3f} s de construcción del '
+                f'dataframe); etapa más lenta: {self.bottleneck}; máximo de lotes por reordenar: {self.reorder_max}; '
+                f'registros que no encajan: {failures}')
+
+
+class IngestPipeline:
+    # Ejecución del flujo por etapas sobre una lista de ficheros. Los trabajadores de cada etapa son tareas de asyncio
+    # que esperan su entrada en una cola, delegan el trabajo en un ejecutor y dejan el resultado en la cola siguiente.
+
+    def __init__(self, paths: List[str], batch_size: int = BATCH_SIZE, year: int = None,
+                 read_workers: int = READ_WORKERS, decompress_workers: int = DECOMPRESS_WORKERS,
+                 parse_workers: int = None, queue_size: int = QUEUE_SIZE, metrics: PipelineMetrics = None,
+                 miner: TemplateMiner = None):
+        self.paths = paths
+        self.batch_size = batch_size
+        self.year = year
+        self.read_workers = read_workers
+        self.decompress_workers = decompress_workers
+        self.parse_workers = os.cpu_count() if parse_workers is None else parse_workers
+        self.queue_size = queue_size
+        self.metrics = metrics or PipelineMetrics()
+        self.miner = miner
+        # Fichero que espera la etapa sink y bloques leídos de cada fichero posterior que aún no ha incorporado.
+        self.sink_index = 0
+        self.ahead: Dict[int, int] = collections.Counter()
+        self.sink_moved: Optional[asyncio.Condition] = None
+
+    async def get(self, stage: str, source: asyncio.Queue):
+        start = time.perf_counter()
+        item = await source.get()
+        self.metrics.stages[stage].starved += time.perf_counter() - start
+        return item
+
+    async def put(self, stage: str, target: asyncio.Queue, item):
+        start = time.perf_counter()
+        await target.put(item)
+        self.metrics.stages[stage].blocked += time.perf_counter() - start
+
+    async def work(self, stage: str, executor: Optional[concurrent.futures.Executor], function: Callable, *args):
+        # Ejecución de una unidad de trabajo de la etapa en su ejecutor, o en el propio bucle si no tiene.
+        start = time.perf_counter()
+        if executor is None:
+            result = function(*args)
+        else:
+            result = await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+        stats = self.metrics.stages[stage]
+        stats.busy += time.perf_counter() - start
+        stats.items += 1
+        return result
+
+    async def admit(self, index: int):
+        # Espera hasta que un bloque del fichero index puede leerse sin superar el límite de bloques por reordenar.
+        start = time.perf_counter()
+        async with self.sink_moved:
+            await self.sink_moved.wait_for(
+                lambda: index <= self.sink_index or sum(self.ahead.values()) < self.queue_size)
+            if index > self.sink_index:
+                self.ahead[index] += 1
+        self.metrics.stages['read'].blocked += time.perf_counter() - start
+
+    async def advance(self, index: int):
+        # La etapa sink pasa al fichero index: sus bloques dejan de contar como adelantados.
+        async with self.sink_moved:
+            self.sink_index = index
+            self.ahead.pop(index, None)
+            self.sink_moved.notify_all()
+
+    async def read(self, files: asyncio.Queue, outputs: List[asyncio.Queue], executor: concurrent.futures.Executor):
+        # Cada fichero se envía completo al mismo trabajador de descompresión, que así recibe sus bloques en orden.
+        while not files.empty():
+            index = files.get_nowait()
+            target = outputs[index % len(outputs)]
+            path = self.paths[index]
+            if find_parser(os.path.basename(path)).binary:
+                await self.admit(index)
+                await self.put('read', target, (index, b'', True))
+                continue
+            file = await self.work('read', executor, open, path, 'rb')
+            try:
+                data = await self.work('read', executor, file.read, BLOCK_SIZE)
+                while True:
+                    following = await self.work('read', executor, file.read, BLOCK_SIZE)
+                    await self.admit(index)
+                    await self.put('read', target, (index, data, not following))
+                    if not following:
+                        break
+                    data = following
+            finally:
+                file.close()
+
+    async def decompress(self, source: asyncio.Queue, target: asyncio.Queue, executor: concurrent.futures.Executor):
+        states: Dict[int, FileState] = {}
+        while (item := await self.get('decompress', source)) is not None:
+            index, data, last = item
+            state = states.setdefault(index, FileState(self.paths[index]))
+            for chunk in await self.work('decompress', executor, state.feed, data, last):
+                await self.put('decompress', target, (index, state.chunks, chunk, False))
+                state.chunks += 1
+            if last:
+                # Marca de fin de fichero para que la etapa sink pase al siguiente.
+                await self.put('decompress', target, (index, state.chunks, None, True))
+                del states[index]
+
+    async def parse(self, source: asyncio.Queue, target: asyncio.Queue, executor: concurrent.futures.Executor):
+        while (item := await self.get('parse', source)) is not None:
+            index, number, chunk, last = item
+            batch = None
+            if chunk is not None:
+                batch = await self.work('parse', executor, parse_chunk, self.paths[index], chunk, self.batch_size,
+                                        self.year)
+            await self.put('parse', target, (index, number, batch, last))
+
+    async def sink(self, source: asyncio.Queue, builder: FrameBuilder):
+        # Los lotes llegan desordenados y se reordenan por (fichero, tramo) antes de añadirse, de forma que los tramos
+        # del FrameBuilder quedan en el mismo orden que en la ingesta secuencial.
+        pending: Dict[Tuple[int, int], Tuple[Optional[LogBatch], bool]] = {}
+        index, number = 0, 0
+        while index < len(self.paths):
+            while (index, number) not in pending:
+                item = await self.get('sink', source)
+                pending[item[:2]] = item[2:]
+                self.metrics.reorder_max = max(self.metrics.reorder_max, len(pending))
+            batch, last = pending.pop((index, number))
+            if batch is not None and batch.failures:
+                self.metrics.failures[find_parser(os.path.basename(self.paths[index])).__name__] += batch.failures
+            if batch is not None and len(batch):
+                await self.work('sink', None, builder.add, batch)
+                self.metrics.rows += len(batch)
+            if last:
+                index, number = index + 1, 0
+                await self.advance(index)
+            else:
+                number += 1
+
+    async def sample(self, queues: Dict[str, List[asyncio.Queue]]):
+        while True:
+            for stage, stage_queues in queues.items():
+                depth = sum(stage_queue.qsize() for stage_queue in stage_queues)
+                stats = self.metrics.stages[stage]
+                stats.depth_sum += depth
+                stats.depth_max = max(stats.depth_max, depth)
+                stats.samples += 1
+            await asyncio.sleep(SAMPLE_INTERVAL)
+
+    async def run(self) -> pd.DataFrame:
+        """
+        :return: Dataframe con todas las líneas ordenadas por timestamp.
+        """
+        start = time.perf_counter()
+        files = asyncio.Queue()
+        for index in range(len(self.paths)):
+            files.put_nowait(index)
+        decompress_queues = [asyncio.Queue(self.queue_size) for _ in range(self.decompress_workers)]
+        parse_queue = asyncio.Queue(self.queue_size)
+        sink_queue = asyncio.Queue(self.queue_size)
+        builder = FrameBuilder(self.miner)
+        self.sink_moved = asyncio.Condition()
+
+        stages = self.metrics.stages
+        stages['read'].workers = self.read_workers
+        stages['decompress'].workers = self.decompress_workers
+        stages['parse'].workers = max(1, self.parse_workers)
+
+        async def finish(workers: List[asyncio.Task], targets: List[asyncio.Queue], count: int):
+            # Cuando terminan todos los trabajadores de una etapa, se avisa a los de la siguiente.
+            await asyncio.gather(*workers)
+            for target in targets:
+                for _ in range(count):
+                    await target.put(None)
+
+        # Con parse_workers = 0 el procesamiento se hace en un hilo, sin procesos adicionales.
+        if self.parse_workers:
+            parse_executor = concurrent.futures.ProcessPoolExecutor(self.parse_workers)
+        else:
+            parse_executor = concurrent.futures.ThreadPoolExecutor(1)
+        with concurrent.futures.ThreadPoolExecutor(self.read_workers + self.decompress_workers) as io_executor, \
+                parse_executor:
+            readers = [asyncio.create_task(self.read(files, decompress_queues, io_executor))
+                       for _ in range(self.read_workers)]
+            decompressors = [asyncio.create_task(self.decompress(source, parse_queue, io_executor))
+                             for source in decompress_queues]
+            parsers = [asyncio.create_task(self.parse(parse_queue, sink_queue, parse_executor))
+                       for _ in range(stages['parse'].workers)]
+            tasks = readers + decompressors + parsers + [
+                asyncio.create_task(finish(readers, decompress_queues, 1)),
+                asyncio.create_task(finish(decompressors, [parse_queue], len(parsers))),
+                asyncio.create_task(self.sink(sink_queue, builder)),
+            ]
+            sampler = asyncio.create_task(self.sample({'read': [files], 'decompress': decompress_queues,
+                                                       'parse': [parse_queue], 'sink': [sink_queue]}))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks + [sampler]:
+                    task.cancel()
+                await asyncio.gather(*tasks, sampler, return_exceptions=True)
+
+        self.metrics.seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        frame = builder.build()
+        self.metrics.build_seconds = time.perf_counter() - start
+        return frame
+
+
+def ingest_pipeline(log_dir: str = LOG_DIR, batch_size: int = BATCH_SIZE, year: int = None,
+                    read_workers: int = READ_WORKERS, decompress_workers: int = DECOMPRESS_WORKERS,
+                    parse_workers: int = None, queue_size: int = QUEUE_SIZE,
+                    metrics: PipelineMetrics = None, miner: TemplateMiner = None) -> pd.DataFrame:
+    """
+    :param log_dir: Directorio que contiene los ficheros de log.
+    :param batch_size: Número máximo de líneas por lote durante el procesamiento.
+    :param year: Año de referencia para los timestamps que no lo incluyen.
+    :param read_workers: Número de ficheros que se leen a la vez.
+    :param decompress_workers: Número de hilos de descompresión.
+    :param parse_workers: Número de procesos de procesamiento. Por defecto, uno por CPU; con 0 se procesa en un hilo.
+    :param queue_size: Capacidad de cada cola entre etapas.
+    :param metrics: Métricas en las que se registra el tiempo y la ocupación de cada etapa, si se indican.
+    :param miner: Minado de plantillas con el que se codifican los mensajes en la etapa sink, si se indica.
+    :return: Dataframe con todas las líneas ordenadas por timestamp, idéntico al de la ingesta secuencial.
+    """
+    pipeline = IngestPipeline(list_log_files(log_dir), batch_size, year, read_workers, decompress_workers,
+                              parse_workers, queue_size, metrics, miner)
+    return asyncio.run(pipeline.run())
+
@@ -1,97 +1,296 @@
-import math
-
-import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
-
-# Generación de visualizaciones de la información parseada de los logs.
-
-# load data from file
-data = np.load('logs.npy', allow_pickle=True)
-
-# convert to pandas dataframe
-data = pd.DataFrame(data, columns=['priority', 'protocol_ver', 'timestamp', 'host_name', 'app_name', 'process_id', 'message_id', 'struct_data', 'message'])
-
-# convert 2023 timestamps years to 2006
-data['timestamp'] = data['timestamp'].apply(lambda x: x.replace(year=2006) if x.year == 2023 else x)
-
-
-# line plot of number of logs per day
-plt.figure()
-data['timestamp'].groupby(data['timestamp'].dt.date).count().plot()
-# legend title
-plt.title('Number of logs per day')
-# legend y axis
-plt.ylabel('Number of logs')
-# legend x axis
-plt.xlabel('Date')
-# x labels rotation
-plt.xticks(rotation=45)
-# show plot
-plt.show()
-
-# line plot of number of logs per day
-# add highlighted vertical area between timestamps where log count > 2000
-plt.figure()
-data['timestamp'].groupby(data['timestamp'].dt.date).count().plot()
-plt.axvspan('2006-01-15', '2006-03-01', color='red', alpha=0.5)
-
-# legend title
-plt.title('Number of logs per day')
-# legend y axis
-plt.ylabel('Number of logs')
-# legend x axis
-plt.xlabel('Date')
-# x labels rotation
-plt.xticks(rotation=45)
-# prevent labels from going out of bounds
-plt.tight_layout()
-# legend data labels on top right, legend avxspan label on top left
-plt.legend(['Number of logs', 'Suspicious activity'])
-plt.show()
-
-
-# line plot of number of logs per day per app
-plt.figure()
-data['timestamp'].groupby([data['timestamp'].dt.date, data['app_name']]).count().unstack().plot()
-# legend title
-plt.title('Number of logs per day per app')
-# legend y axis
-plt.ylabel('Number of logs')
-# legend x axis
-plt.xlabel('Date')
-# x labels rotation
-plt.xticks(rotation=45)
-# prevent labels from going out of bounds
-plt.tight_layout()
-# legend data labels on top right
-plt.legend(loc='upper right')
-# show plot
-plt.show()
-
-# same as above but with log scale
-plt.figure()
-data['timestamp'].groupby([data['timestamp'].dt.date, data['app_name']]).count().unstack().plot(logy=True)
-# legend title
-plt.title('Number of logs per day per app (log scale)')
-# legend y axis
-plt.ylabel('Number of logs')
-# legend x axis
-plt.xlabel('Date')
-# x labels rotation
-plt.xticks(rotation=45)
-# prevent labels from going out of bounds
-plt.tight_layout()
-# legend data labels on top right
-plt.legend(loc='upper right')
-# show plot
-plt.show()
-
-# circle plot of distribution of logs per app
-# add percentage to parts of the pie
-plt.figure()
-data['app_name'].value_counts().plot(kind='pie', autopct='%1.1f%%')
-
-# legend title
-plt.title('Distribution of logs per app')
-plt.show()
+import concurrent.futures
+import os
+import os.path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import STORE_PATH
+from rollup import GRANULARITIES, NAT
+from store import LogStore
+
+# Generación de visualizaciones de la información parseada de los logs.
+#
+# Los agregados (recuentos por día, por día y aplicación, por aplicación y por minuto, y ráfagas detectadas) se calculan
+# una sola vez a partir de las tablas de recuento del almacén y los comparten todas las gráficas. plot las muestra en
+# ventanas con pyplot; render las guarda como ficheros PNG o SVG en un pool de procesos, sin pyplot ni pantalla, para
+# generar informes en servidores sin entorno gráfico. La serie por minuto se reduce a MAX_POINTS puntos antes de
+# dibujarla, de forma que el tiempo de dibujo no crece con el rango de tiempo.
+
+# Número máximo de puntos que se dibujan de la serie por minuto.
+MAX_POINTS = 2000
+
+# Métodos de reducción de las series largas: minmax conserva los extremos de cada tramo y LTTB (Largest-Triangle-Three-
+# Buckets) los puntos que mejor conservan la forma de la línea.
+DOWNSAMPLING = ['minmax', 'lttb']
+
+FORMATS = ['png', 'svg']
+
+MINUTE = GRANULARITIES['minute']
+
+
+def minmax(x: np.ndarray, y: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param x: Abscisas de la serie, en orden.
+    :param y: Valores de la serie.
+    :param points: Número máximo de puntos del resultado.
+    :return: Puntos de la serie reducida: el mínimo y el máximo de cada uno de points / 2 tramos consecutivos, en orden.
+    """
+    if len(y) <= points:
+        return x, y
+    edges = np.linspace(0, len(y), points // 2 + 1).astype(np.int64)
+    lengths = np.diff(edges)
+    bucket = np.repeat(np.arange(len(lengths)), lengths)
+    selected = []
+    for reduce in (np.minimum, np.maximum):
+        # Primera posición de cada tramo con su valor extremo.
+        extreme = np.flatnonzero(y == np.repeat(reduce.reduceat(y, edges[:-1]), lengths))
+        selected.append(extreme[np.unique(bucket[extreme], return_index=True)[1]])
+    selected = np.unique(np.concatenate(selected))
+    return x[selected], y[selected]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param x: Abscisas numéricas de la serie, en orden.
+    :param y: Valores de la serie.
+    :param points: Número máximo de puntos del resultado, al menos 3.
+    :return: Puntos de la serie reducida con Largest-Triangle-Three-Buckets: el primero, el último y, de cada uno de
+        points - 2 tramos, el que forma el triángulo de mayor área con el punto elegido en el tramo anterior y la media
+        del tramo siguiente.
+
+    Las medias de los tramos se calculan de una vez; el bucle recorre los tramos, no los puntos.
+    """
+    if len(y) <= points or points < 3:
+        return x, y
+    fx, fy = (x - x[0]).astype(np.float64), y.astype(np.float64)
+    edges = np.linspace(1, len(y) - 1, points - 1).astype(np.int64)
+    lengths = np.diff(edges)
+    mean_x = np.append(np.add.reduceat(fx, edges[:-1]) / lengths, fx[-1])
+    mean_y = np.append(np.add.reduceat(fy, edges[:-1]) / lengths, fy[-1])
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, len(y) - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        ax, ay = fx[previous], fy[previous]
+        bx, by = mean_x[bucket + 1], mean_y[bucket + 1]
+        area = np.abs((ax - bx) * (fy[start:end] - ay) - (ax - fx[start:end]) * (by - ay))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return x[selected], y[selected]
+
+
+def downsample(series: pd.Series, points: int = MAX_POINTS, method: str = 'minmax') -> pd.Series:
+    """
+    :param series: Serie indexada por timestamp, en orden.
+    :param points: Número máximo de puntos. None para no reducir la serie.
+    :param method: Uno de DOWNSAMPLING.
+    :return: Serie con, como mucho, points puntos de la original.
+    """
+    if points is None or len(series) <= points:
+        return series
+    x = series.index.asi8
+    reduce = minmax if method == 'minmax' else lttb
+    x, y = reduce(x, series.to_numpy(), points)
+    return pd.Series(y, index=pd.DatetimeIndex(x.view('M8[ns]'), tz=series.index.tz), name=series.name)
+
+
+def aggregates(store: LogStore, points: int = MAX_POINTS, method: str = 'minmax') -> Dict[str, object]:
+    """
+    :param store: Almacén de logs.
+    :param points: Número máximo de puntos de la serie por minuto, o None para no reducirla.
+    :param method: Método de reducción de la serie por minuto (véase DOWNSAMPLING).
+    :return: Agregados que usan las gráficas: daily, daily_per_app, per_app, burst_days y per_minute.
+    """
+    # Tabla de recuento diaria del almacén (filas por día, aplicación y host, mantenidas durante la ingesta): no se lee
+    # ninguna fila de log y las gráficas tardan lo mismo sea cual sea el volumen de logs. El año de los timestamps que
+    # no lo incluyen se fija en la ingesta (--year), así que aquí no se corrige.
+    data = store.rollup('day')
+    data['timestamp'] = data['timestamp'].dt.date
+
+    # Ráfagas del ritmo total de logs detectadas durante la ingesta (véase anomaly.py), ampliadas a días completos para
+    # coincidir con la gráfica diaria.
+    bursts = store.anomalies()
+    bursts = bursts[(bursts['kind'] == 'app') & (bursts['key'] == '*')]
+    burst_days = pd.DataFrame({
+        'start': bursts['start'].dt.date,
+        'end': (bursts['end'] - pd.Timedelta(1, 'ns')).dt.date + pd.Timedelta(days=1),
+    })
+
+    # Número de logs por minuto a partir de la tabla de recuento por minuto, con ceros en los minutos sin logs.
+    minutes = store.rollup('minute')
+    bucket = minutes['timestamp'].array.asi8
+    valid = bucket != NAT
+    bucket = bucket[valid]
+    first = int(bucket.min()) if len(bucket) else 0
+    counts = np.bincount((bucket - first) // MINUTE, weights=minutes['count'].to_numpy()[valid]).astype(np.int64)
+    index = (first + np.arange(len(counts), dtype=np.int64) * MINUTE).view('M8[ns]')
+    per_minute = pd.Series(counts, index=pd.DatetimeIndex(index, tz='UTC'), name='count')
+
+    # Cada agregado se calcula una sola vez y lo comparten todas las gráficas.
+    return {
+        'daily': data.groupby('timestamp')['count'].sum(),
+        'daily_per_app': data.groupby(['timestamp', 'app_name'], observed=True)['count'].sum().unstack(),
+        'per_app': data.groupby('app_name', observed=True)['count'].sum().sort_values(ascending=False),
+        'burst_days': burst_days,
+        'per_minute': downsample(per_minute, points, method),
+    }
+
+
+def draw_daily(ax, data: Dict):
+    # Gráfica de líneas del número de logs por día.
+    data['daily'].plot(ax=ax)
+    # Título.
+    ax.set_title('Number of logs per day')
+    # Eje y.
+    ax.set_ylabel('Number of logs')
+    # Eje x.
+    ax.set_xlabel('Date')
+    # Rotación de las etiquetas del eje x.
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+def draw_daily_bursts(ax, data: Dict):
+    # Gráfica de líneas del número de logs por día, con las ráfagas detectadas resaltadas como áreas verticales.
+    draw_daily(ax, data)
+    for start, end in data['burst_days'].itertuples(index=False):
+        ax.axvspan(start, end, color='red', alpha=0.5)
+    # Leyenda de la línea y de las áreas resaltadas.
+    ax.legend(['Number of logs', 'Suspicious activity'])
+
+
+def draw_daily_per_app(ax, data: Dict, logy: bool = False):
+    # Gráfica de líneas del número de logs por día y aplicación.
+    data['daily_per_app'].plot(ax=ax, logy=logy)
+    # Título.
+    ax.set_title('Number of logs per day per app' + (' (log scale)' if logy else ''))
+    # Eje y.
+    ax.set_ylabel('Number of logs')
+    # Eje x.
+    ax.set_xlabel('Date')
+    # Rotación de las etiquetas del eje x.
+    ax.tick_params(axis='x', labelrotation=45)
+    # Leyenda arriba a la derecha.
+    ax.legend(loc='upper right')
+
+
+def draw_daily_per_app_log(ax, data: Dict):
+    # La misma gráfica con escala logarítmica.
+    draw_daily_per_app(ax, data, logy=True)
+
+
+def draw_per_app(ax, data: Dict):
+    # Gráfica circular de la distribución de los logs por aplicación, con el porcentaje de cada parte.
+    data['per_app'].plot(ax=ax, kind='pie', autopct='%1.1f%%')
+    # Título.
+    ax.set_title('Distribution of logs per app')
+
+
+def draw_per_minute(ax, data: Dict):
+    # Gráfica de líneas del número de logs por minuto (reducido), dibujada directamente con matplotlib: la serie tiene
+    # como mucho MAX_POINTS puntos sea cual sea el rango de tiempo.
+    series = data['per_minute']
+    ax.plot(series.index.tz_localize(None), series.to_numpy(), linewidth=0.5)
+    ax.set_title('Number of logs per minute')
+    ax.set_ylabel('Number of logs')
+    ax.set_xlabel('Date')
+    ax.tick_params(axis='x', labelrotation=45)
+
+
+# Gráficas en orden de dibujo: nombre, función de dibujo y si se ajusta la composición para que las etiquetas no se
+# salgan.
+FIGURES: Dict[str, Tuple[Callable, bool]] = {
+    'daily': (draw_daily, False),
+    'daily_bursts': (draw_daily_bursts, True),
+    'daily_per_app': (draw_daily_per_app, True),
+    'daily_per_app_log': (draw_daily_per_app_log, True),
+    'per_app': (draw_per_app, False),
+    'per_minute': (draw_per_minute, True),
+}
+
+
+def plot(store_path: str = STORE_PATH):
+    """
+    :param store_path: Directorio del almacén columnar.
+
+    Gráficas de actividad a partir de las tablas de recuento y de las ráfagas detectadas del almacén, mostradas en
+    ventanas una tras otra.
+    """
+    import matplotlib.pyplot as plt
+
+    data = aggregates(LogStore(store_path))
+    for draw, tight in FIGURES.values():
+        plt.figure()
+        draw(plt.gca(), data)
+        if tight:
+            # Evita que las etiquetas se salgan de la figura.
+            plt.tight_layout()
+        # Muestra la gráfica.
+        plt.show()
+
+
+def render_figure(name: str, data: Dict, paths: List[str]) -> List[str]:
+    """
+    :param name: Nombre de una de las gráficas de FIGURES.
+    :param data: Agregados de aggregates.
+    :param paths: Ficheros de salida; el formato se deduce de la extensión.
+    :return: Ficheros escritos.
+
+    Dibujo de una gráfica sobre una figura de matplotlib sin pyplot, que no necesita pantalla ni backend interactivo.
+    Se dibuja una sola vez y se guarda en todos los formatos.
+    """
+    from matplotlib.figure import Figure
+
+    draw, tight = FIGURES[name]
+    figure = Figure()
+    draw(figure.add_subplot(), data)
+    if tight:
+        figure.tight_layout()
+    for path in paths:
+        figure.savefig(path)
+    return paths
+
+
+def headless():
+    # Inicialización de los procesos: nunca se muestra ninguna figura, así que basta con el backend no interactivo.
+    import matplotlib
+
+    matplotlib.use('Agg')
+
+
+def render(store_path: str = STORE_PATH, output_dir: str = 'plots', formats: List[str] = None,
+           figures: List[str] = None, workers: int = None, points: int = MAX_POINTS,
+           method: str = 'minmax') -> List[str]:
+    """
+    :param store_path: Directorio del almacén columnar.
+    :param output_dir: Directorio de salida, que se crea si no existe.
+    :param formats: Formatos de salida (véase FORMATS). Por defecto, PNG.
+    :param figures: Nombres de las gráficas de FIGURES que se generan. Por defecto, todas.
+    :param workers: Número de procesos. Por defecto, uno por CPU; 0 para generarlas en este proceso.
+    :param points: Número máximo de puntos de la serie por minuto, o None para no reducirla.
+    :param method: Método de reducción de la serie por minuto (véase DOWNSAMPLING).
+    :return: Ficheros escritos, en el orden de FIGURES y formats.
+
+    Los agregados se calculan una vez en este proceso y se envían a los procesos ya reducidos, así que su tamaño no
+    depende del rango de tiempo.
+    """
+    data = aggregates(LogStore(store_path), points, method)
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(name, [os.path.join(output_dir, f'{name}.{extension}') for extension in formats or ['png']])
+            for name in figures or FIGURES]
+    if workers == 0 or len(jobs) == 1:
+        headless()
+        return [path for name, paths in jobs for path in render_figure(name, data, paths)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=headless) as pool:
+        futures = [pool.submit(render_figure, name, data, paths) for name, paths in jobs]
+        return [path for future in futures for path in future.result()]
+
+
+if __name__ == '__main__':
+    import sys
+
+    from cli import main
+
+    main(['plot'] + sys.argv[1:])
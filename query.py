@@ -0,0 +1,161 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from batch import MISSING
+from store import POSTING_COLUMNS, STORE_PATH, LogStore
+
+# Consultas sobre el almacén columnar por rango de tiempo, aplicación, host y severidad, leyendo solo los bloques que
+# pueden contener filas de la consulta. El índice tiene dos partes, ambas construidas a partir de meta.json:
+#
+#   - Un índice disperso de tiempo: el timestamp mínimo y máximo de cada bloque.
+#   - Listas invertidas de app_name y host_name: para cada código del diccionario, los bloques en los que aparece.
+#
+# Dentro de cada bloque seleccionado, las filas están ordenadas por timestamp, por lo que el rango de tiempo se
+# resuelve con una búsqueda binaria sobre la columna proyectada en memoria, y solo se leen de disco las filas que
+# cumplen todos los filtros.
+
+# Tipo de los límites de tiempo aceptados: cualquier valor que entienda pd.Timestamp, en UTC si no indica la zona.
+TimeBound = Union[str, pd.Timestamp, np.datetime64, None]
+
+
+def to_nanoseconds(value: TimeBound) -> Optional[int]:
+    """
+    :param value: Instante, con o sin zona horaria. Sin zona horaria se interpreta en UTC.
+    :return: Nanosegundos desde 1970 en UTC, o None si value es None.
+    """
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return timestamp.value
+
+
+class LogIndex:
+    # Índice de bloques de un almacén. Se construye una vez y se reutiliza en todas las consultas.
+
+    def __init__(self, store: Union[str, LogStore] = STORE_PATH):
+        self.store = LogStore(store) if isinstance(store, str) else store
+        blocks = self.store.blocks
+        self.min_timestamp = np.array([block['min_timestamp'] for block in blocks], dtype=np.int64)
+        self.max_timestamp = np.array([block['max_timestamp'] for block in blocks], dtype=np.int64)
+        self.codes: Dict[str, Dict[str, int]] = {
+            column: {value: code for code, value in enumerate(self.store.meta['dictionaries'][column])}
+            for column in POSTING_COLUMNS
+        }
+        self.postings: Dict[str, Dict[int, np.ndarray]] = {column: self.build_postings(column) for column in POSTING_COLUMNS}
+
+    def build_postings(self, column: str) -> Dict[int, np.ndarray]:
+        """
+        :param column: Nombre de una de las columnas de POSTING_COLUMNS.
+        :return: Para cada código de la columna, array ordenado con las posiciones de los bloques en los que aparece.
+        """
+        postings: Dict[int, List[int]] = {}
+        for position, block in enumerate(self.store.blocks):
+            for code in block['postings'][column]:
+                postings.setdefault(code, []).append(position)
+        return {code: np.array(positions, dtype=np.int64) for code, positions in postings.items()}
+
+    def lookup(self, column: str, values: Union[str, Iterable[str]]) -> np.ndarray:
+        """
+        :param column: Nombre de una de las columnas de POSTING_COLUMNS.
+        :param values: Valor o valores buscados. Los que no aparecen en el almacén se ignoran.
+        :return: Códigos de los valores en el diccionario de la columna.
+        """
+        if isinstance(values, str):
+            values = [values]
+        codes = self.codes[column]
+        return np.array([codes[value] for value in values if value in codes], dtype=np.int32)
+
+    def candidates(self, start: int = None, end: int = None, filters: Dict[str, np.ndarray] = None) -> List[int]:
+        """
+        :param start: Inicio del rango de tiempo en nanosegundos, incluido.
+        :param end: Fin del rango de tiempo en nanosegundos, excluido.
+        :param filters: Para cada columna de POSTING_COLUMNS filtrada, los códigos aceptados.
+        :return: Posiciones, en orden, de los bloques que pueden contener filas de la consulta.
+        """
+        selected = np.ones(len(self.min_timestamp), dtype=bool)
+        if start is not None:
+            selected &= self.max_timestamp >= start
+        if end is not None:
+            selected &= self.min_timestamp < end
+        for column, codes in (filters or {}).items():
+            matching = np.zeros(len(selected), dtype=bool)
+            for code in codes.tolist():
+                matching[self.postings[column].get(code, [])] = True
+            selected &= matching
+        return np.flatnonzero(selected).tolist()
+
+    def select_rows(self, block: int, start: int = None, end: int = None, filters: Dict[str, np.ndarray] = None,
+                    max_severity: int = None) -> np.ndarray:
+        """
+        :param block: Posición del bloque en meta.json.
+        :return: Posiciones, en orden, de las filas del bloque que cumplen todos los filtros de la consulta.
+        """
+        store = self.store
+        timestamp = store.read_array(block, 'timestamp')
+        first = 0 if start is None else int(np.searchsorted(timestamp, start, side='left'))
+        last = len(timestamp) if end is None else int(np.searchsorted(timestamp, end, side='left'))
+        if first >= last:
+            return np.empty(0, dtype=np.int64)
+
+        mask = np.ones(last - first, dtype=bool)
+        for column, codes in (filters or {}).items():
+            mask &= np.isin(store.read_array(block, column)[first:last], codes)
+        if max_severity is not None:
+            priority = store.read_array(block, 'priority')[first:last]
+            mask &= (priority != MISSING) & (priority % 8 <= max_severity)
+        return first + np.flatnonzero(mask)
+
+    def query(self, start: TimeBound = None, end: TimeBound = None, app_name: Union[str, Iterable[str]] = None,
+              host_name: Union[str, Iterable[str]] = None, max_severity: int = None,
+              columns: List[str] = None) -> pd.DataFrame:
+        """
+        :param start: Inicio del rango de tiempo, incluido. Por defecto, sin límite.
+        :param end: Fin del rango de tiempo, excluido. Por defecto, sin límite.
+        :param app_name: Aplicación o aplicaciones buscadas. Por defecto, todas.
+        :param host_name: Host o hosts buscados. Por defecto, todos.
+        :param max_severity: Severidad syslog máxima (0 emergencia ... 7 depuración), calculada como prioridad módulo
+            8. Por ejemplo, 3 selecciona los errores y los niveles más graves. Las filas sin prioridad no se incluyen.
+        :param columns: Columnas que se quieren leer. Por defecto, todas las de COLUMNS.
+        :return: Dataframe con las filas que cumplen todos los filtros, ordenadas por timestamp.
+        """
+        start, end = to_nanoseconds(start), to_nanoseconds(end)
+        filters = {}
+        for column, values in (('app_name', app_name), ('host_name', host_name)):
+            if values is not None:
+                filters[column] = self.lookup(column, values)
+
+        blocks, frames = [], []
+        for block in self.candidates(start, end, filters):
+            rows = self.select_rows(block, start, end, filters, max_severity)
+            if len(rows):
+                blocks.append(block)
+                frames.append(self.store.block_frame(block, columns, rows))
+        if not frames:
+            return self.store.empty_frame(columns)
+        frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if self.store.overlapping(blocks) and 'timestamp' in frame:
+            frame = frame.sort_values(by='timestamp', kind='stable', ignore_index=True)
+        return frame
+
+
+def query(store: Union[str, LogStore] = STORE_PATH, **filters) -> pd.DataFrame:
+    """
+    :param store: Almacén o directorio del almacén.
+    :param filters: Filtros de LogIndex.query.
+    :return: Dataframe con las filas que cumplen los filtros.
+
+    Consulta aislada. Para varias consultas sobre el mismo almacén es preferible crear un LogIndex y reutilizarlo.
+    """
+    return LogIndex(store).query(**filters)
+
+
+if __name__ == '__main__':
+    import sys
+
+    from cli import main
+
+    main(['query'] + sys.argv[1:])
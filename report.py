@@ -0,0 +1,110 @@
+import dataclasses
+import os.path
+from typing import Dict, Iterable, Iterator, List
+
+# Informe de ingesta: para cada fuente (clase de procesamiento) registra los ficheros, bytes y registros leídos, las
+# filas obtenidas y el tiempo empleado, de forma que se ve tanto la velocidad de cada procesador como la cobertura
+# (fracción de registros que encajan con su formato). Los ficheros que ningún procesador reconoce se acumulan aparte,
+# para saber qué parte del directorio de logs queda sin procesar.
+
+UNROUTED = '(sin procesador)'
+
+
+@dataclasses.dataclass
+class SourceStats:
+    # Totales de una fuente.
+
+    files: int = 0
+    bytes: int = 0
+    records: int = 0
+    rows: int = 0
+    failures: int = 0
+    seconds: float = 0.0
+
+    @property
+    def coverage(self) -> float:
+        return self.rows / self.records if self.records else 0.0
+
+    @property
+    def lines_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+class CountingIterator:
+    # Iterador que cuenta los elementos que entrega.
+
+    def __init__(self, items: Iterable):
+        self.items = iter(items)
+        self.count = 0
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        item = next(self.items)
+        self.count += 1
+        return item
+
+
+class IngestReport:
+    # Informe acumulado de una ingesta.
+
+    def __init__(self):
+        self.sources: Dict[str, SourceStats] = {}
+        self.unrouted: List[str] = []
+
+    def add(self, source: str, path: str, records: int, rows: int, seconds: float, failures: int = 0):
+        """
+        :param source: Nombre de la clase que ha procesado el fichero.
+        :param path: Ruta del fichero.
+        :param records: Número de registros leídos del fichero.
+        :param rows: Número de filas obtenidas, es decir, de registros que encajan con el formato.
+        :param seconds: Tiempo de lectura y procesamiento del fichero.
+        :param failures: Número de registros que no encajan con el formato (véase LogBatch.failures).
+        """
+        stats = self.sources.setdefault(source, SourceStats())
+        stats.files += 1
+        stats.bytes += os.path.getsize(path)
+        stats.records += records
+        stats.rows += rows
+        stats.failures += failures
+        stats.seconds += seconds
+
+    def skip(self, path: str):
+        """
+        :param path: Ruta de un fichero que ningún procesador reconoce.
+        """
+        self.unrouted.append(path)
+
+    def to_frame(self):
+        """
+        :return: Dataframe con una fila por fuente y una última fila con los ficheros sin procesador.
+        """
+        import pandas as pd
+
+        rows = [{'source': source, 'files': stats.files, 'bytes': stats.bytes, 'records': stats.records,
+                 'rows': stats.rows, 'failures': stats.failures, 'coverage': stats.coverage, 'seconds': stats.seconds,
+                 'lines_per_second': stats.lines_per_second, 'bytes_per_second': stats.bytes_per_second}
+                for source, stats in sorted(self.sources.items(), key=lambda item: -item[1].records)]
+        if self.unrouted:
+            rows.append({'source': UNROUTED, 'files': len(self.unrouted),
+                         'bytes': sum(os.path.getsize(path) for path in self.unrouted)})
+        frame = pd.DataFrame(rows, columns=['source', 'files', 'bytes', 'records', 'rows', 'failures', 'coverage',
+                                            'seconds', 'lines_per_second', 'bytes_per_second'])
+        return frame.astype({'records': 'Int64', 'rows': 'Int64', 'failures': 'Int64'})
+
+    def to_dict(self) -> Dict:
+        """
+        :return: Totales de cada fuente y ficheros sin procesador, serializables como JSON.
+        """
+        sources = {source: dict(dataclasses.asdict(stats), coverage=stats.coverage,
+                                lines_per_second=stats.lines_per_second, bytes_per_second=stats.bytes_per_second)
+                   for source, stats in self.sources.items()}
+        return {'sources': sources, 'unrouted': list(self.unrouted)}
+
+    def __str__(self):
+        return self.to_frame().to_string(index=False, float_format=lambda value: f'{value:.3f}')
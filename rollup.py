@@ -0,0 +1,125 @@
+import os
+import os.path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from batch import timestamp_array
+
+# Tablas de recuento preagregadas (rollups) del almacén: número de filas por intervalo de tiempo (minuto, hora y día),
+# app_name y host_name. Los recuentos se suman, así que las tablas se actualizan con cada lote de filas que se añade al
+# almacén, sea de una ingesta completa o incremental, sin volver a leer las filas anteriores. Su tamaño depende del
+# número de intervalos y de combinaciones de aplicación y host, no del de filas, por lo que las visualizaciones que se
+# construyen a partir de ellas (véase plotter.py) tardan lo mismo con cualquier volumen de logs.
+#
+# Cada tabla se guarda en rollups/<granularidad>.npy dentro del almacén, como array estructurado sin objetos. Las
+# columnas app_name y host_name guardan los códigos de los diccionarios del almacén, que solo crecen.
+
+ROLLUP_DIR = 'rollups'
+
+# Duración en nanosegundos del intervalo de cada granularidad.
+GRANULARITIES = {
+    'minute': 60 * 10 ** 9,
+    'hour': 3600 * 10 ** 9,
+    'day': 86400 * 10 ** 9,
+}
+
+ROLLUP_DTYPE = np.dtype([('bucket', np.int64), ('app_name', np.int32), ('host_name', np.int32), ('count', np.int64)])
+
+# Valor de pandas para los timestamps ausentes (NaT), que forman su propio intervalo.
+NAT = np.iinfo(np.int64).min
+
+
+def aggregate(bucket: np.ndarray, app_name: np.ndarray, host_name: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """
+    :param bucket: Inicio de cada intervalo, en nanosegundos.
+    :param app_name: Código de app_name de cada fila.
+    :param host_name: Código de host_name de cada fila.
+    :param count: Número de filas que representa cada fila.
+    :return: Array estructurado con una fila por combinación distinta, ordenado por intervalo, aplicación y host.
+    """
+    # Las tres columnas se combinan en una única clave entera: posición del intervalo entre los distintos, código de la
+    # aplicación y código del host, desplazados en uno para que MISSING (-1) quede en 0.
+    bucket_codes, buckets = pd.factorize(bucket, sort=True)
+    apps = int(app_name.max(initial=-1)) + 2
+    hosts = int(host_name.max(initial=-1)) + 2
+    key = (bucket_codes.astype(np.int64) * apps + (app_name + 1)) * hosts + (host_name + 1)
+    keys, inverse = np.unique(key, return_inverse=True)
+    result = np.empty(len(keys), dtype=ROLLUP_DTYPE)
+    result['bucket'] = buckets[keys // (apps * hosts)]
+    result['app_name'] = keys // hosts % apps - 1
+    result['host_name'] = keys % hosts - 1
+    result['count'] = np.bincount(inverse.ravel(), weights=count, minlength=len(keys))
+    return result
+
+
+def rollup(timestamp: np.ndarray, app_name: np.ndarray, host_name: np.ndarray, granularity: str) -> np.ndarray:
+    """
+    :param timestamp: Nanosegundos UTC de cada fila.
+    :param app_name: Código de app_name de cada fila.
+    :param host_name: Código de host_name de cada fila.
+    :param granularity: Nombre de una de las granularidades de GRANULARITIES.
+    :return: Recuentos de las filas por intervalo, aplicación y host.
+    """
+    unit = GRANULARITIES[granularity]
+    bucket = np.where(timestamp == NAT, NAT, timestamp // unit * unit)
+    return aggregate(bucket, app_name, host_name, np.ones(len(timestamp), dtype=np.int64))
+
+
+def merge(*rollups: np.ndarray) -> np.ndarray:
+    """
+    :param rollups: Tablas de recuento de la misma granularidad, por ejemplo de distintos ficheros o ejecuciones.
+    :return: Tabla con la suma de los recuentos.
+    """
+    combined = np.concatenate(rollups) if rollups else np.empty(0, dtype=ROLLUP_DTYPE)
+    return aggregate(combined['bucket'], combined['app_name'], combined['host_name'], combined['count'])
+
+
+def rollup_path(store_path: str, granularity: str) -> str:
+    return os.path.join(store_path, ROLLUP_DIR, granularity + '.npy')
+
+
+def load_rollup(store_path: str, granularity: str) -> np.ndarray:
+    """
+    :return: Tabla guardada de la granularidad, o una tabla vacía si no existe.
+    """
+    path = rollup_path(store_path, granularity)
+    return np.load(path) if os.path.exists(path) else np.empty(0, dtype=ROLLUP_DTYPE)
+
+
+def save_rollup(store_path: str, granularity: str, table: np.ndarray):
+    # Escritura atómica, igual que meta.json.
+    path = rollup_path(store_path, granularity)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, table)
+    os.replace(path + '.tmp', path)
+
+
+def update_rollups(store_path: str, timestamp: np.ndarray, app_name: np.ndarray, host_name: np.ndarray):
+    """
+    :param store_path: Directorio del almacén.
+    :param timestamp: Nanosegundos UTC de las filas nuevas.
+    :param app_name: Código de app_name de las filas nuevas.
+    :param host_name: Código de host_name de las filas nuevas.
+
+    Suma las filas nuevas a las tablas guardadas de todas las granularidades.
+    """
+    for granularity in GRANULARITIES:
+        table = rollup(timestamp, app_name, host_name, granularity)
+        save_rollup(store_path, granularity, merge(load_rollup(store_path, granularity), table))
+
+
+def to_frame(table: np.ndarray, dictionaries: Dict[str, List[str]]) -> pd.DataFrame:
+    """
+    :param table: Tabla de recuento.
+    :param dictionaries: Diccionarios de las columnas de texto del almacén.
+    :return: Dataframe con las columnas timestamp (inicio del intervalo), app_name, host_name (categóricas) y count.
+    """
+    return pd.DataFrame({
+        'timestamp': timestamp_array(table['bucket']),
+        'app_name': pd.Categorical.from_codes(table['app_name'], dictionaries['app_name']),
+        'host_name': pd.Categorical.from_codes(table['host_name'], dictionaries['host_name']),
+        'count': table['count'],
+    })
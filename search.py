@@ -0,0 +1,112 @@
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from fulltext import INDEX_FILES, BlockIndex, contains_phrase, parse_query, split_terms
+from query import LogIndex, TimeBound, to_nanoseconds
+from store import STORE_PATH, LogStore
+
+# Búsqueda de texto completo en el almacén con los índices invertidos de los bloques (véase fulltext.py), combinable
+# con los filtros de tiempo, aplicación, host y severidad de query.py.
+# Uso: search('logs.store', '"Deferred: Connection refused" OR 203.71.234.22', start='2006-01-01')
+
+
+class SearchIndex(LogIndex):
+    # Búsqueda de texto completo sobre un almacén, combinable con los filtros de LogIndex. Los índices de los bloques
+    # se abren al usarlos por primera vez.
+
+    def __init__(self, store: Union[str, LogStore] = STORE_PATH):
+        super().__init__(store)
+        self.block_indexes: Dict[int, BlockIndex] = {}
+
+    def block_index(self, block: int) -> BlockIndex:
+        if block not in self.block_indexes:
+            arrays = [self.store.read_array(block, name) for name in INDEX_FILES]
+            self.block_indexes[block] = BlockIndex(self.store.blocks[block]['rows'], *arrays)
+        return self.block_indexes[block]
+
+    def evaluate(self, node: tuple, block: int) -> np.ndarray:
+        """
+        :param node: Nodo de la consulta analizada por parse_query.
+        :return: Máscara de las filas del bloque que cumplen el nodo.
+        """
+        kind = node[0]
+        index = self.block_index(block)
+        if kind == 'and':
+            result = np.ones(index.rows, dtype=bool)
+            for child in node[1]:
+                result &= self.evaluate(child, block)
+                if not result.any():
+                    break
+            return result
+        if kind == 'or':
+            result = np.zeros(index.rows, dtype=bool)
+            for child in node[1]:
+                result |= self.evaluate(child, block)
+            return result
+        if kind == 'not':
+            return ~self.evaluate(node[1], block)
+        terms = node[1]
+        result = np.ones(index.rows, dtype=bool)
+        for term in terms:
+            result &= index.mask(term)
+            if not result.any():
+                return result
+        if len(terms) > 1:
+            # Frase: se comprueba que los términos aparecen seguidos en los mensajes de las filas candidatas.
+            rows = np.flatnonzero(result)
+            for row, message in zip(rows.tolist(), self.store.read_messages(block, rows)):
+                result[row] = contains_phrase(split_terms(message or ''), terms)
+        return result
+
+    def search(self, text: str, start: TimeBound = None, end: TimeBound = None, app_name=None, host_name=None,
+               max_severity: int = None, columns: List[str] = None) -> pd.DataFrame:
+        """
+        :param text: Consulta: palabras, frases entre comillas, OR, NOT o '-' y paréntesis.
+        :param start: Inicio del rango de tiempo, incluido. Por defecto, sin límite.
+        :param end: Fin del rango de tiempo, excluido. Por defecto, sin límite.
+        :param app_name: Aplicación o aplicaciones buscadas. Por defecto, todas.
+        :param host_name: Host o hosts buscados. Por defecto, todos.
+        :param max_severity: Severidad syslog máxima, como en LogIndex.query.
+        :param columns: Columnas que se quieren leer. Por defecto, todas las de COLUMNS.
+        :return: Dataframe con las filas que cumplen la consulta y los filtros, ordenadas por timestamp.
+
+        Los bloques se descartan primero por su rango de tiempo y sus aplicaciones y hosts, y dentro de cada uno solo
+        se leen de disco las filas que cumplen la consulta.
+        """
+        node = parse_query(text)
+        start, end = to_nanoseconds(start), to_nanoseconds(end)
+        filters = {}
+        for column, values in (('app_name', app_name), ('host_name', host_name)):
+            if values is not None:
+                filters[column] = self.lookup(column, values)
+
+        blocks, frames = [], []
+        for block in self.candidates(start, end, filters):
+            mask = self.evaluate(node, block)
+            if not mask.any():
+                continue
+            rows = self.select_rows(block, start, end, filters, max_severity)
+            rows = rows[mask[rows]]
+            if len(rows):
+                blocks.append(block)
+                frames.append(self.store.block_frame(block, columns, rows))
+        if not frames:
+            return self.store.empty_frame(columns)
+        frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if self.store.overlapping(blocks) and 'timestamp' in frame:
+            frame = frame.sort_values(by='timestamp', kind='stable', ignore_index=True)
+        return frame
+
+
+def search(store: Union[str, LogStore] = STORE_PATH, text: str = '', **filters) -> pd.DataFrame:
+    """
+    :param store: Almacén o directorio del almacén.
+    :param text: Consulta de texto.
+    :param filters: Filtros de SearchIndex.search.
+    :return: Dataframe con las filas que cumplen la consulta.
+
+    Búsqueda aislada. Para varias búsquedas sobre el mismo almacén es preferible crear un SearchIndex y reutilizarlo.
+    """
+    return SearchIndex(store).search(text, **filters)
@@ -0,0 +1,109 @@
+import functools
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from batch import FIELD_COLUMNS, FIELD_ENCODED_COLUMNS, FIELD_LIMITS, FIELDS, MISSING, SparseFields
+
+# Campos tipados de los logs de Squid. SquidLogs solo separa el timestamp y el cliente (host_name) de access.log; el
+# resto de la línea (tiempo de respuesta, código de resultado, bytes, método, URL...) queda en el mensaje. Al procesar
+# las líneas, sus campos se obtienen también como columnas tipadas del lote (véase batch.SparseFields), que el almacén
+# guarda tal cual, de forma que los informes de tráfico (véase traffic.py) se calculan sobre arrays sin volver a
+# procesar los textos.
+#
+# Formatos con campos tipados (el mensaje es lo que SquidLogs deja tras el timestamp y, en access.log, el cliente):
+#
+#   access.log     '<ms> <resultado>/<estado> <bytes> <método> <URL> <ident> <jerarquía>/<servidor> <tipo>'
+#   store.log      '<acción> <dir> <fichero> <hash> <estado> <fecha> <lastmod> <expires> <tipo> <esperado>/<real>
+#                   <método> <URL>'
+#   useragent_log  '<agente>'
+#
+# En store.log, el resultado es la acción (RELEASE, SWAPOUT...), los bytes son la longitud real del objeto y no hay
+# tiempo de respuesta. El estado HTTP se guarda como categoría, con su texto. Las líneas de referer_log y cache.log no
+# tienen ninguno de estos campos. Las columnas (FIELD_COLUMNS, FIELD_ENCODED_COLUMNS) se definen en batch.py, que es
+# quien las almacena.
+
+SQUID_APP = 'Squid'
+
+ACCESS = re.compile(r'(\d+) ([^ /]+)/(\d+) (\d+) (\S+) (\S+)')
+STORE = re.compile(r'([A-Z_]+) +-?\d+ +[0-9A-Fa-f]+ +[0-9A-Fa-f]+ +(\d+) +-?\d+ +-?\d+ +-?\d+ +\S+ '
+                   r'+-?\d+/(-?\d+) +(\S+) +(\S+)')
+
+
+# Las URL se repiten mucho (destinos de CONNECT, formularios de los mismos servidores), así que su host se calcula una
+# vez por URL y método.
+@functools.lru_cache(maxsize=1 << 16)
+def url_host(url: str, method: str) -> Optional[str]:
+    """
+    :param url: URL de la petición, o 'host:puerto' en las peticiones CONNECT.
+    :param method: Método de la petición.
+    :return: Host de la URL en minúsculas, o None si no tiene (por ejemplo, 'error:invalid-request').
+    """
+    scheme = url.find('://')
+    if scheme >= 0:
+        authority = url[scheme + 3:]
+    elif method == 'CONNECT':
+        authority = url
+    else:
+        return None
+    for separator in '/?#':
+        authority = authority.split(separator, 1)[0]
+    authority = authority.rsplit('@', 1)[-1]
+    if authority.startswith('['):
+        host = authority[:authority.find(']') + 1]
+    else:
+        host = authority.split(':', 1)[0]
+    return host.lower() or None
+
+
+def message_fields(message: Optional[str], fmt: str = None) -> Optional[Dict]:
+    """
+    :param message: Mensaje de una fila de Squid, o None.
+    :param fmt: Formato del fichero según SquidLogs.detect_format. Si no se indica, el mensaje se prueba con el
+        formato de access.log y, si no encaja, con el de store.log.
+    :return: Valores de los campos tipados del mensaje, o None si no tiene.
+    """
+    if not message:
+        return None
+    if fmt == 'useragent':
+        return {'user_agent': message}
+    match = ACCESS.match(message) if fmt in (None, 'access') else None
+    if match is not None:
+        milliseconds, code, http, length, verb, url = match.groups()
+        elapsed = int(milliseconds)
+    else:
+        match = STORE.match(message) if fmt in (None, 'store') else None
+        if match is None:
+            return None
+        code, http, length, verb, url = match.groups()
+        elapsed = None
+    return {'elapsed_ms': elapsed, 'bytes': int(length), 'status': http, 'result': code, 'method': verb,
+            'url_host': url_host(url, verb)}
+
+
+def parse_fields(messages: List[Optional[str]], fmt: str = None) -> SparseFields:
+    """
+    :param messages: Mensajes de filas de Squid, o None.
+    :param fmt: Formato de los mensajes, como en message_fields.
+    :return: Campos tipados de los mensajes que los tienen, con la posición de cada uno en messages.
+
+    Procesamiento de los mensajes con las expresiones regulares de cada formato. Lo usan las líneas de store.log, las
+    de access.log que no van por el camino vectorizado y los dataframes que llegan al almacén sin los campos. Los
+    valores se acumulan en listas y se añaden al resultado de una vez, por columnas.
+    """
+    positions = []
+    columns = {column: [] for column in FIELDS}
+    for position, message in enumerate(messages):
+        values = message_fields(message, fmt)
+        if values is not None:
+            positions.append(position)
+            for column, found in columns.items():
+                found.append(values.get(column))
+    fields = SparseFields()
+    for column in FIELD_COLUMNS:
+        values = np.array([MISSING if value is None else value for value in columns[column]], dtype=object)
+        inside = (values >= 0) & (values <= FIELD_LIMITS[column]) if len(values) else np.zeros(0, dtype=bool)
+        columns[column] = np.where(inside, values, MISSING).astype(np.int64)
+    fields.add_columns(np.array(positions, dtype=np.int64), **columns)
+    return fields
@@ -0,0 +1,491 @@
+import json
+import os
+import os.path
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from anomaly import ANOMALY_DIR, AnomalyDetector
+from batch import COLUMNS, ENCODED_COLUMNS, MISSING, NUMERIC_COLUMNS, timestamp_array
+from config import STORE_PATH
+from fulltext import write_index
+from rollup import GRANULARITIES, load_rollup, merge, rollup, save_rollup, to_frame, update_rollups
+from squid import FIELD_COLUMNS, FIELD_ENCODED_COLUMNS, FIELDS, SQUID_APP, parse_fields
+from templates import TemplateMiner
+
+# Almacén columnar en disco de la tabla de logs normalizada. Sustituye al volcado de logs.npy, que guardaba un array
+# de objetos serializado con pickle. El almacén es un directorio con:
+#
+#   meta.json                Versión, diccionarios de las columnas de texto y, por bloque, filas y rango de tiempo.
+#   blocks/NNNNNN/<col>.npy  Una columna de un bloque como array NumPy sin objetos, abrible con mmap.
+#   blocks/NNNNNN/template.npy  Código de la plantilla del mensaje de cada fila (véase templates.py).
+#   blocks/NNNNNN/params.*   Parámetros de los mensajes concatenados en UTF-8 (params.bin) y posición de los de cada
+#                            fila (params.offsets.npy).
+#   blocks/NNNNNN/index.*    Índice invertido de texto completo de los mensajes del bloque (véase fulltext.py).
+#   blocks/NNNNNN/squid.*    Campos tipados de las filas de Squid (véase squid.py): posiciones de las filas que los
+#                            tienen (squid.rows.npy) y una columna por campo, solo con los valores de esas filas. Los
+#                            campos de texto guardan códigos de los diccionarios de meta.json.
+#   templates.json           Plantillas de los mensajes.
+#
+# Los mensajes se codifican como plantilla y parámetros al procesar los lotes (FrameBuilder(store.miner)), de modo que
+# append solo los copia; los dataframes que llegan sin codificar se minan en append.
+#
+# Las filas se guardan ordenadas por timestamp y repartidas en bloques de, como mucho, BLOCK_ROWS filas, de forma que
+# cada bloque cubre un intervalo de tiempo contiguo. Los diccionarios solo crecen, así que los códigos de los bloques
+# ya escritos siguen siendo válidos cuando se añaden bloques nuevos. Cada bloque registra además en meta.json los
+# códigos distintos de app_name y host_name que contiene, a partir de los cuales query.py construye su índice.
+#
+# Con cada escritura se actualizan también las tablas de recuento por intervalo de tiempo, aplicación y host de
+# rollup.py, guardadas en rollups/, y el estado de los detectores de ráfagas de anomaly.py, guardado en anomaly/.
+# meta.json registra en rollup_rows y anomaly_rows el número de filas que incluye cada uno.
+
+STORE_VERSION = 1
+BLOCK_ROWS = 1 << 16
+
+# Columnas de diccionario cuyos códigos distintos se registran por bloque.
+POSTING_COLUMNS = ['app_name', 'host_name']
+
+
+class LogStore:
+    # Acceso a un almacén columnar. Las columnas se abren con mmap y solo se leen de disco las páginas que se usan.
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self._miner: Optional[TemplateMiner] = None
+        with open(os.path.join(path, 'meta.json'), encoding='utf8') as f:
+            self.meta = json.load(f)
+        if self.meta['version'] != STORE_VERSION:
+            raise ValueError(f'Versión de almacén no soportada: {self.meta["version"]}')
+
+    def __len__(self):
+        return sum(block['rows'] for block in self.meta['blocks'])
+
+    @property
+    def blocks(self) -> List[Dict]:
+        return self.meta['blocks']
+
+    @property
+    def miner(self) -> TemplateMiner:
+        # Las plantillas solo se cargan si se leen mensajes o tipos de evento.
+        if self._miner is None:
+            self._miner = TemplateMiner.load(self.path)
+        return self._miner
+
+    def block_path(self, block: int) -> str:
+        return os.path.join(self.path, 'blocks', self.blocks[block]['id'])
+
+    def read_array(self, block: int, name: str) -> np.ndarray:
+        """
+        :param block: Posición del bloque en meta.json.
+        :param name: Nombre del fichero de la columna, sin la extensión .npy.
+        :return: Array de solo lectura proyectado en memoria, sin deserializar.
+        """
+        return np.load(os.path.join(self.block_path(block), name + '.npy'), mmap_mode='r')
+
+    def read_column(self, block: int, name: str, rows: np.ndarray = None) -> np.ndarray:
+        """
+        :param block: Posición del bloque en meta.json.
+        :param name: Nombre del fichero de la columna, sin la extensión .npy.
+        :param rows: Posiciones de las filas que se quieren leer. Por defecto, todas.
+        :return: Array en memoria con los valores de las filas indicadas. Solo se leen de disco las páginas que las
+            contienen.
+        """
+        values = self.read_array(block, name)
+        return np.asarray(values) if rows is None else values[rows]
+
+    def read_strings(self, block: int, name: str, rows: np.ndarray = None) -> List[str]:
+        """
+        :param block: Posición del bloque en meta.json.
+        :param name: Nombre de los ficheros de la columna de texto, sin las extensiones .bin y .offsets.npy.
+        :param rows: Posiciones de las filas que se quieren leer. Por defecto, todas.
+        :return: Textos de las filas indicadas, decodificados desde UTF-8.
+        """
+        offsets = self.read_array(block, name + '.offsets')
+        data = np.memmap(os.path.join(self.block_path(block), name + '.bin'), dtype=np.uint8, mode='r') \
+            if offsets[-1] else np.empty(0, dtype=np.uint8)
+        if rows is None:
+            blob = data.tobytes()
+            return [blob[start:end].decode('utf8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+        # Solo se decodifican los textos pedidos, leyendo cada uno directamente de la proyección en memoria.
+        return [data[start:end].tobytes().decode('utf8')
+                for start, end in zip(offsets[rows].tolist(), offsets[rows + 1].tolist())]
+
+    def read_messages(self, block: int, rows: np.ndarray = None) -> List[Optional[str]]:
+        """
+        :param block: Posición del bloque en meta.json.
+        :param rows: Posiciones de las filas que se quieren leer. Por defecto, todas.
+        :return: Mensajes de las filas indicadas, reconstruidos a partir de su plantilla y sus parámetros.
+        """
+        return self.miner.decode(self.read_column(block, 'template', rows), self.read_strings(block, 'params', rows))
+
+    def read_template_ids(self, block: int, rows: np.ndarray = None) -> np.ndarray:
+        """
+        :return: Tipo de evento (template_id) de las filas indicadas, o MISSING en las que no tienen plantilla.
+        """
+        return self.miner.template_ids(self.read_column(block, 'template', rows))
+
+    def read_fields(self, block: int, rows: np.ndarray = None) -> Dict[str, np.ndarray]:
+        """
+        :param block: Posición del bloque en meta.json.
+        :param rows: Posiciones, en orden, de las filas que se quieren leer. Por defecto, todas.
+        :return: Para cada campo de Squid (véase squid.FIELDS), valores de las filas indicadas, con MISSING en las que
+            no lo tienen. Los campos de texto se devuelven como códigos de sus diccionarios.
+        """
+        count = self.blocks[block]['rows'] if rows is None else len(rows)
+        fields = {column: np.full(count, MISSING, dtype=FIELD_COLUMNS[column][1] if column in FIELD_COLUMNS else np.int32)
+                  for column in FIELDS}
+        if not self.blocks[block]['squid']:
+            return fields
+        positions = self.read_column(block, 'squid.rows')
+        if rows is None:
+            targets, sources = positions, slice(None)
+        else:
+            # Filas pedidas que tienen campos y su posición entre las filas del bloque que los tienen.
+            found = np.minimum(np.searchsorted(positions, rows), len(positions) - 1)
+            hits = positions[found] == rows
+            targets, sources = np.flatnonzero(hits), found[hits]
+        for column in FIELDS:
+            fields[column][targets] = self.read_array(block, 'squid.' + column)[sources]
+        return fields
+
+    def encode_fields(self, rows: np.ndarray,
+                      columns: Dict[str, pd.api.extensions.ExtensionArray]) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        :param rows: Posiciones, en orden, de las filas con campos de Squid.
+        :param columns: Columnas de pandas de los campos de esas filas, como las de SparseFields.columns.
+        :return: Posiciones de las filas y valores de sus campos, con los de texto codificados en los diccionarios del
+            almacén, que se amplían con los valores nuevos.
+        """
+        dictionaries = self.meta['dictionaries']
+        fields = {}
+        for column in FIELDS:
+            if column in FIELD_COLUMNS:
+                fields[column] = pd.array(columns[column], dtype=pd.Int64Dtype()).to_numpy(
+                    dtype=np.int64, na_value=MISSING).astype(FIELD_COLUMNS[column][1])
+            else:
+                fields[column] = encode_column(pd.Series(columns[column]), dictionaries.setdefault(column, []))
+        return rows, fields
+
+    def read_struct_data(self, block: int, rows: np.ndarray = None) -> List[Dict]:
+        rows = range(self.blocks[block]['rows']) if rows is None else rows.tolist()
+        path = os.path.join(self.block_path(block), 'struct_data.json')
+        if not os.path.exists(path):
+            return [{} for _ in rows]
+        with open(path, encoding='utf8') as f:
+            sparse = {int(row): value for row, value in json.load(f).items()}
+        return [sparse.get(row, {}) for row in rows]
+
+    def block_frame(self, block: int, columns: List[str] = None, rows: np.ndarray = None) -> pd.DataFrame:
+        """
+        :param block: Posición del bloque en meta.json.
+        :param columns: Columnas que se quieren leer. Por defecto, todas las de COLUMNS. Además de ellas, se puede pedir
+            template_id, el tipo de evento del mensaje, y los campos tipados de Squid de squid.FIELDS.
+        :param rows: Posiciones, en orden, de las filas del bloque que se quieren leer. Por defecto, todas.
+        :return: Dataframe con las filas indicadas del bloque.
+        """
+        data = {}
+        fields = None
+        for column in columns or COLUMNS:
+            if column == 'timestamp':
+                data[column] = timestamp_array(self.read_column(block, column, rows))
+            elif column in NUMERIC_COLUMNS:
+                values = self.read_column(block, column, rows)
+                data[column] = pd.arrays.IntegerArray(values, values == MISSING)
+            elif column in ENCODED_COLUMNS:
+                data[column] = pd.Categorical.from_codes(self.read_column(block, column, rows),
+                                                         self.meta['dictionaries'][column])
+            elif column == 'template_id':
+                values = self.read_template_ids(block, rows)
+                data[column] = pd.arrays.IntegerArray(values, values == MISSING)
+            elif column in FIELDS:
+                fields = fields if fields is not None else self.read_fields(block, rows)
+                if column in FIELD_COLUMNS:
+                    data[column] = pd.arrays.IntegerArray(fields[column], fields[column] == MISSING)
+                else:
+                    data[column] = pd.Categorical.from_codes(fields[column], self.meta['dictionaries'][column])
+            elif column == 'struct_data':
+                data[column] = pd.Series(self.read_struct_data(block, rows), dtype=object)
+            else:
+                data[column] = pd.Series(self.read_messages(block, rows), dtype=object)
+        return pd.DataFrame(data, copy=False)
+
+    def to_frame(self, columns: List[str] = None, blocks: List[int] = None) -> pd.DataFrame:
+        """
+        :param columns: Columnas que se quieren leer. Por defecto, todas las de COLUMNS.
+        :param blocks: Bloques que se quieren leer. Por defecto, todos.
+        :return: Dataframe con las filas de los bloques indicados, en orden.
+
+        Lectura de la tabla o de parte de ella. Las columnas que no se piden no llegan a leerse de disco.
+        """
+        if blocks is None:
+            blocks = range(len(self.blocks))
+        blocks = list(blocks)
+        frames = [self.block_frame(block, columns) for block in blocks]
+        if not frames:
+            return self.empty_frame(columns)
+        frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if self.overlapping(blocks) and 'timestamp' in frame:
+            # Los bloques añadidos por la ingesta incremental pueden solaparse en el tiempo con los anteriores.
+            frame = frame.sort_values(by='timestamp', kind='stable', ignore_index=True)
+        return frame
+
+    def overlapping(self, blocks: List[int]) -> bool:
+        """
+        :param blocks: Posiciones de bloques en meta.json, en orden.
+        :return: Si las filas de los bloques, leídas en ese orden, no quedan ordenadas por timestamp.
+        """
+        return any(self.blocks[current]['min_timestamp'] < self.blocks[previous]['max_timestamp']
+                   for previous, current in zip(blocks, blocks[1:]))
+
+    def empty_frame(self, columns: List[str] = None) -> pd.DataFrame:
+        return pd.DataFrame({column: [] for column in columns or COLUMNS})
+
+    def append(self, frame: pd.DataFrame, block_rows: int = BLOCK_ROWS):
+        """
+        :param frame: Dataframe con las columnas de COLUMNS. Puede incluir las columnas template y params con los mensajes
+            ya codificados por el minado del almacén (FrameBuilder(store.miner)).
+        :param block_rows: Número máximo de filas por bloque.
+
+        Escritura de nuevas filas como bloques adicionales. Las filas se ordenan por timestamp antes de repartirlas
+        en bloques. Los mensajes sin codificar se minan aquí, de una vez.
+        """
+        frame = frame.sort_values(by='timestamp', kind='stable', ignore_index=True)
+        rows = len(self)
+        dictionaries = self.meta['dictionaries']
+        codes = {column: encode_column(frame[column], dictionaries[column]) for column in ENCODED_COLUMNS}
+        miner = self.miner
+        if 'template' in frame.columns:
+            templates, params = frame['template'].to_numpy(np.int32), frame['params'].tolist()
+        else:
+            templates, params = miner.encode(frame['message'])
+        squid_rows, fields = self.encode_fields(*frame_fields(frame))
+
+        for start in range(0, len(frame), block_rows):
+            end = min(start + block_rows, len(frame))
+            block_id = f'{self.meta["next_block"]:06d}'
+            self.meta['next_block'] += 1
+            block_dir = os.path.join(self.path, 'blocks', block_id)
+            os.makedirs(block_dir)
+
+            block = frame.iloc[start:end]
+            timestamp = block['timestamp'].array.asi8
+            np.save(os.path.join(block_dir, 'timestamp.npy'), timestamp)
+            for column in NUMERIC_COLUMNS:
+                if column != 'timestamp':
+                    np.save(os.path.join(block_dir, column + '.npy'), integer_column(block[column], column))
+            for column in ENCODED_COLUMNS:
+                np.save(os.path.join(block_dir, column + '.npy'), codes[column][start:end])
+            np.save(os.path.join(block_dir, 'template.npy'), templates[start:end])
+            write_strings(block_dir, 'params', params[start:end])
+            write_index(block_dir, block['message'].tolist())
+            write_struct_data(block_dir, block['struct_data'])
+            first, last = np.searchsorted(squid_rows, [start, end])
+            write_fields(block_dir, squid_rows[first:last] - start, {column: values[first:last]
+                                                                    for column, values in fields.items()})
+
+            self.blocks.append({
+                'id': block_id,
+                'rows': end - start,
+                'min_timestamp': int(timestamp.min()),
+                'max_timestamp': int(timestamp.max()),
+                'squid': int(last - first),
+                'postings': {column: np.unique(codes[column][start:end]).tolist() for column in POSTING_COLUMNS},
+            })
+        # Las tablas de recuento solo se actualizan si incluían todas las filas anteriores; si no, se reconstruyen
+        # completas la próxima vez que se leen.
+        if self.meta.get('rollup_rows') == rows:
+            update_rollups(self.path, frame['timestamp'].array.asi8, codes['app_name'], codes['host_name'])
+            self.meta['rollup_rows'] = rows + len(frame)
+        # Igual con los detectores de ráfagas, que recorren las filas nuevas en orden de timestamp.
+        if self.meta.get('anomaly_rows') == rows:
+            detector = AnomalyDetector.load(self.path)
+            detector.observe(frame['timestamp'].array.asi8, frame['app_name'], frame['host_name'], frame['message'])
+            detector.save(self.path)
+            self.meta['anomaly_rows'] = rows + len(frame)
+        # Las plantillas nuevas se guardan antes que meta.json, que es el que apunta a los bloques que las usan.
+        miner.save(self.path)
+        self.save_meta()
+
+    def templates(self) -> pd.DataFrame:
+        """
+        :return: Dataframe con una fila por tipo de evento: template_id, plantilla, número de versiones y número de filas
+            (count).
+
+        El recuento es un bincount de los códigos de plantilla de cada bloque, sin leer ningún mensaje.
+        """
+        frame = self.miner.to_frame()
+        count = np.zeros(len(frame), dtype=np.int64)
+        for block in range(len(self.blocks)):
+            values = self.read_template_ids(block)
+            count += np.bincount(values[values != MISSING], minlength=len(frame))
+        frame['count'] = count
+        return frame
+
+    def rollup(self, granularity: str = 'day') -> pd.DataFrame:
+        """
+        :param granularity: Nombre de una de las granularidades de rollup.GRANULARITIES.
+        :return: Dataframe con el número de filas (count) por intervalo (timestamp), app_name y host_name.
+
+        Lectura de una tabla de recuento, sin leer ninguna fila del almacén.
+        """
+        if self.meta.get('rollup_rows') != len(self):
+            self.rebuild_rollups()
+        return to_frame(load_rollup(self.path, granularity), self.meta['dictionaries'])
+
+    def anomalies(self) -> pd.DataFrame:
+        """
+        :return: Dataframe con las ventanas de ráfaga detectadas durante la ingesta (véase anomaly.WindowLog).
+        """
+        if self.meta.get('anomaly_rows') != len(self):
+            self.rebuild_anomalies()
+        return AnomalyDetector.load(self.path).to_frame()
+
+    def rebuild_anomalies(self):
+        # Como rebuild_rollups, para los detectores de ráfagas, que vuelven a recorrer todas las filas en orden.
+        shutil.rmtree(os.path.join(self.path, ANOMALY_DIR), ignore_errors=True)
+        detector = AnomalyDetector()
+        frame = self.to_frame(columns=['timestamp', 'app_name', 'host_name', 'message'])
+        detector.observe(frame['timestamp'].array.asi8, frame['app_name'], frame['host_name'], frame['message'])
+        detector.save(self.path)
+        self.meta['anomaly_rows'] = len(self)
+        self.save_meta()
+
+    def rebuild_rollups(self):
+        # Las tablas de recuento que no incluyen todas las filas, por una escritura interrumpida, se reconstruyen
+        # leyendo solo las columnas que agregan.
+        tables = {granularity: [] for granularity in GRANULARITIES}
+        for block in range(len(self.blocks)):
+            columns = [self.read_column(block, column) for column in ('timestamp', 'app_name', 'host_name')]
+            for granularity in GRANULARITIES:
+                tables[granularity].append(rollup(*columns, granularity))
+        for granularity, parts in tables.items():
+            save_rollup(self.path, granularity, merge(*parts))
+        self.meta['rollup_rows'] = len(self)
+        self.save_meta()
+
+    def save_meta(self):
+        # Escritura atómica: meta.json solo apunta a bloques que ya están completos en disco.
+        path = os.path.join(self.path, 'meta.json')
+        with open(path + '.tmp', 'w', encoding='utf8') as f:
+            json.dump(self.meta, f)
+        os.replace(path + '.tmp', path)
+
+
+def encode_column(values: pd.Series, dictionary: List[str]) -> np.ndarray:
+    """
+    :param values: Columna de texto, categórica o no.
+    :param dictionary: Diccionario global de la columna, que se amplía con los valores nuevos.
+    :return: Códigos int32 de la columna en el diccionario global (MISSING para los valores ausentes).
+    """
+    categorical = pd.Categorical(values)
+    positions = {value: code for code, value in enumerate(dictionary)}
+    mapping = np.array([positions.setdefault(value, len(positions)) for value in categorical.categories] + [MISSING],
+                       dtype=np.int32)
+    dictionary.extend(list(positions)[len(dictionary):])
+    return mapping[categorical.codes]
+
+
+def frame_fields(frame: pd.DataFrame) -> Tuple[np.ndarray, Dict[str, pd.api.extensions.ExtensionArray]]:
+    """
+    :param frame: Dataframe con las columnas de COLUMNS y, si se obtuvieron al procesar las líneas, las de FIELDS.
+    :return: Posiciones, en orden, de las filas con campos de Squid y columnas de sus campos.
+
+    Los campos son las columnas de FIELDS del dataframe, que producen los procesadores de Squid. Solo si el dataframe
+    no las tiene (por ejemplo, si no procede de un LogBatch) se obtienen de los mensajes de las filas de Squid.
+    """
+    if all(column in frame for column in FIELDS):
+        present = np.zeros(len(frame), dtype=bool)
+        for column in FIELDS:
+            present |= frame[column].notna().to_numpy()
+        rows = np.flatnonzero(present)
+        return rows, {column: frame[column].array.take(rows) for column in FIELDS}
+    candidates = np.flatnonzero(np.asarray(frame['app_name'] == SQUID_APP))
+    parsed = parse_fields(frame['message'].take(candidates).tolist())
+    return candidates[parsed.rows_array()], parsed.columns()
+
+
+def integer_column(values: pd.Series, column: str) -> np.ndarray:
+    dtype = NUMERIC_COLUMNS[column][1]
+    return pd.array(values, dtype=pd.Int64Dtype()).to_numpy(dtype=np.int64, na_value=MISSING).astype(dtype)
+
+
+def write_strings(block_dir: str, name: str, values: List[str]):
+    # Textos concatenados en UTF-8 en <name>.bin y posición de cada uno en <name>.offsets.npy, con 32 bits si caben.
+    encoded = [value.encode('utf8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    if offsets[-1] <= np.iinfo(np.int32).max:
+        offsets = offsets.astype(np.int32)
+    with open(os.path.join(block_dir, name + '.bin'), 'wb') as f:
+        f.write(b''.join(encoded))
+    np.save(os.path.join(block_dir, name + '.offsets.npy'), offsets)
+
+
+def write_fields(block_dir: str, rows: np.ndarray, fields: Dict[str, np.ndarray]):
+    # Como struct_data, solo se escriben las filas con campos de Squid: sus posiciones y un array por campo.
+    if len(rows):
+        np.save(os.path.join(block_dir, 'squid.rows.npy'), rows.astype(np.int32))
+        for column in FIELDS:
+            np.save(os.path.join(block_dir, f'squid.{column}.npy'), fields[column])
+
+
+def write_struct_data(block_dir: str, struct_data: pd.Series):
+    # Solo se escriben las filas con datos estructurados, que son la excepción.
+    sparse = {row: value for row, value in enumerate(struct_data.tolist()) if value}
+    if sparse:
+        with open(os.path.join(block_dir, 'struct_data.json'), 'w', encoding='utf8') as f:
+            json.dump(sparse, f)
+
+
+def create_store(path: str = STORE_PATH) -> LogStore:
+    """
+    :param path: Directorio del almacén, que no debe existir o debe estar vacío.
+    :return: Almacén vacío.
+    """
+    os.makedirs(os.path.join(path, 'blocks'), exist_ok=True)
+    meta = {
+        'version': STORE_VERSION,
+        'columns': COLUMNS,
+        'dictionaries': {column: [] for column in ENCODED_COLUMNS + FIELD_ENCODED_COLUMNS},
+        'next_block': 0,
+        'blocks': [],
+        'rollup_rows': 0,
+        'anomaly_rows': 0,
+    }
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf8') as f:
+        json.dump(meta, f)
+    return LogStore(path)
+
+
+def save_store(frame: pd.DataFrame, path: str = STORE_PATH, block_rows: int = BLOCK_ROWS,
+               miner: TemplateMiner = None) -> LogStore:
+    """
+    :param frame: Dataframe con las columnas de COLUMNS.
+    :param path: Directorio del almacén. Si ya existe, se sustituye.
+    :param block_rows: Número máximo de filas por bloque.
+    :param miner: Minado con el que se codificaron las columnas template y params de frame, que pasa a ser el del
+        almacén. Sin él, esas columnas se ignoran y los mensajes se minan al escribirlos.
+    :return: Almacén con las filas de frame.
+    """
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    store = create_store(path)
+    if miner is not None:
+        store._miner = miner
+    else:
+        frame = frame.drop(columns=['template', 'params'], errors='ignore')
+    store.append(frame, block_rows)
+    return store
+
+
+def iter_blocks(path: str = STORE_PATH, columns: List[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    :param path: Directorio del almacén.
+    :param columns: Columnas que se quieren leer. Por defecto, todas las de COLUMNS.
+    :return: Iterador de dataframes, uno por bloque, en orden.
+    """
+    store = LogStore(path)
+    for block in range(len(store.blocks)):
+        yield store.block_frame(block, columns)
@@ -0,0 +1,237 @@
+import json
+import os
+import os.path
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from batch import MISSING
+
+# Minado en línea de plantillas de mensajes, al estilo de Drain. Los mensajes de syslog, cron, maillog, etc. son unas
+# pocas plantillas con campos variables ('Did not receive identification string from <*>'), así que el almacén guarda
+# de cada fila el código de su plantilla y solo los parámetros, en lugar del mensaje completo. El mensaje se reconstruye
+# exactamente al leerlo.
+#
+# Los mensajes se dividen en tokens por cada espacio (sin agrupar espacios, para que la reconstrucción sea exacta) y
+# los tokens con algún dígito se sustituyen por el comodín WILDCARD. El mensaje resultante (su firma) es lo único que
+# usa el minado: se busca en un árbol de prefijos (número de tokens y primeros DEPTH - 2 tokens) el grupo de la hoja
+# más parecido; si comparte al menos SIMILARITY de sus tokens, los tokens distintos de la plantilla del grupo pasan a
+# ser comodines, y si no, se crea un grupo nuevo. Cada firma se mina una sola vez, la primera vez que aparece, y queda
+# asociada a la plantilla que se obtiene en ese momento, por lo que el resultado no depende de cómo se reparten las
+# filas entre escrituras.
+#
+# Cuando la plantilla de un grupo se generaliza se crea una plantilla nueva en lugar de modificarla, de forma que los
+# parámetros ya guardados siguen correspondiendo a los comodines de su plantilla. El grupo (template_id) identifica el
+# tipo de evento y agrupa todas sus versiones. El estado se guarda en templates.json dentro del almacén.
+#
+# La tabla de firmas es solo una caché del minado: cuando supera MAX_SIGNATURES se descarta la mitad más antigua. Una
+# firma descartada que vuelve a aparecer se mina de nuevo; normalmente obtiene la plantilla actual de su grupo, que ya
+# la cubre, y en cualquier caso sus parámetros corresponden a la plantilla obtenida, así que la reconstrucción sigue
+# siendo exacta.
+
+TEMPLATES_FILE = 'templates.json'
+
+WILDCARD = '<*>'
+
+# Profundidad del árbol de prefijos: la raíz, el número de tokens y DEPTH - 2 tokens iniciales.
+DEPTH = 4
+
+# Fracción mínima de tokens iguales (sin contar los comodines de la plantilla) para añadir un mensaje a un grupo.
+SIMILARITY = 0.5
+
+# Número máximo de hijos de cada nodo del árbol. A partir de él, los tokens nuevos se agrupan bajo el comodín.
+MAX_CHILDREN = 100
+
+# Número máximo de firmas recordadas. Los mensajes con campos variables sin dígitos (nombres de usuario, rutas, etc.)
+# generan una firma por valor distinto, por lo que la tabla no puede crecer sin límite.
+MAX_SIGNATURES = 1 << 16
+
+# Tokens con algún dígito, que se tratan siempre como parámetros. Solo se comprueban desde el inicio de cada token.
+DIGITS = re.compile(r'(?<![^ ])[^ 0-9]*[0-9][^ ]*')
+
+
+class TemplateMiner:
+    # Plantillas (versiones inmutables, identificadas por su código), grupos (tipos de evento) y árbol de prefijos.
+
+    def __init__(self):
+        self.templates: List[List[str]] = []
+        # Grupo de cada plantilla y plantilla actual de cada grupo.
+        self.clusters: List[int] = []
+        self.current: List[int] = []
+        # Camino del árbol de cada grupo: número de tokens y tokens de los nodos por los que se llega a su hoja.
+        self.paths: List[list] = []
+        self.signatures: Dict[str, int] = {}
+        self.tree: Dict = {}
+        self.leaves: Dict[tuple, List[int]] = {}
+        self.positions: List[List[int]] = []
+        self.formats: List[str] = []
+
+    def add_template(self, tokens: List[str], cluster: int) -> int:
+        """
+        :return: Código de la plantilla nueva del grupo, que pasa a ser su plantilla actual.
+        """
+        code = len(self.templates)
+        self.templates.append(tokens)
+        self.clusters.append(cluster)
+        if cluster == len(self.current):
+            self.current.append(code)
+        else:
+            self.current[cluster] = code
+        self.positions.append([position for position, token in enumerate(tokens) if token == WILDCARD])
+        # Formato con el que se reconstruyen los mensajes: los comodines son los campos de str.format.
+        self.formats.append(' '.join('{}' if token == WILDCARD else token.replace('{', '{{').replace('}', '}}')
+                                     for token in tokens))
+        return code
+
+    def find_leaf(self, tokens: List[str]) -> Optional[tuple]:
+        """
+        :return: Camino de la hoja en la que se buscan los grupos de los tokens, o None si no existe.
+        """
+        node = self.tree.get(len(tokens))
+        path = [len(tokens)]
+        for token in tokens[:DEPTH - 2]:
+            if node is None:
+                return None
+            key = token if token in node else WILDCARD
+            node = node.get(key)
+            path.append(key)
+        return tuple(path) if node is not None else None
+
+    def insert_leaf(self, path: list) -> List[int]:
+        # Creación de los nodos del camino, que también se usa para reconstruir el árbol al cargar el estado.
+        node = self.tree.setdefault(path[0], {})
+        for key in path[1:]:
+            node = node.setdefault(key, {})
+        return self.leaves.setdefault(tuple(path), [])
+
+    def new_path(self, tokens: List[str]) -> list:
+        node = self.tree.get(len(tokens), {})
+        path = [len(tokens)]
+        for token in tokens[:DEPTH - 2]:
+            if token not in node and len(node) >= MAX_CHILDREN:
+                token = WILDCARD
+            node = node.get(token, {})
+            path.append(token)
+        return path
+
+    def mine(self, signature: str) -> int:
+        """
+        :param signature: Mensaje con los tokens con dígitos sustituidos por WILDCARD.
+        :return: Código de la plantilla a la que queda asociada la firma.
+        """
+        tokens = signature.split(' ')
+        best, best_similarity, best_wildcards = None, -1.0, -1
+        path = self.find_leaf(tokens)
+        for cluster in self.leaves.get(path, []) if path is not None else []:
+            template = self.templates[self.current[cluster]]
+            same = sum(1 for mine, theirs in zip(template, tokens) if mine != WILDCARD and mine == theirs)
+            wildcards = len(self.positions[self.current[cluster]])
+            similarity = same / len(tokens)
+            if similarity > best_similarity or similarity == best_similarity and wildcards > best_wildcards:
+                best, best_similarity, best_wildcards = cluster, similarity, wildcards
+        if best is not None and best_similarity >= SIMILARITY:
+            template = self.templates[self.current[best]]
+            merged = [mine if mine == theirs else WILDCARD for mine, theirs in zip(template, tokens)]
+            return self.add_template(merged, best) if merged != template else self.current[best]
+
+        path = self.new_path(tokens)
+        cluster = len(self.current)
+        self.paths.append(path)
+        self.insert_leaf(path).append(cluster)
+        return self.add_template(tokens, cluster)
+
+    def prune(self):
+        # Los diccionarios conservan el orden de inserción, también al cargarlos de templates.json, así que las firmas
+        # más antiguas son las primeras y el resultado no depende de cuándo se guardó el estado.
+        keep = list(self.signatures.items())[len(self.signatures) - MAX_SIGNATURES // 2:]
+        self.signatures = dict(keep)
+
+    def encode(self, messages: Sequence[Optional[str]]) -> Tuple[np.ndarray, List[str]]:
+        """
+        :param messages: Mensajes de las filas, o None.
+        :return: Código de la plantilla de cada fila (MISSING para los mensajes None) y parámetros de cada fila: los
+            tokens que ocupan los comodines de su plantilla, separados por espacios.
+
+        Cada mensaje distinto se procesa una sola vez, en orden de primera aparición.
+        """
+        codes, uniques = pd.factorize(np.asarray(messages, dtype=object))
+        unique_templates = np.empty(len(uniques) + 1, dtype=np.int32)
+        unique_params = []
+        for position, message in enumerate(uniques.tolist()):
+            signature = DIGITS.sub(WILDCARD, message)
+            template = self.signatures.get(signature)
+            if template is None:
+                template = self.signatures[signature] = self.mine(signature)
+                if len(self.signatures) > MAX_SIGNATURES:
+                    self.prune()
+            unique_templates[position] = template
+            tokens = message.split(' ')
+            unique_params.append(' '.join([tokens[index] for index in self.positions[template]]))
+        # Los mensajes None (código -1 de factorize) toman la última posición.
+        unique_templates[-1] = MISSING
+        unique_params.append('')
+        return unique_templates[codes], [unique_params[code] for code in codes.tolist()]
+
+    def decode(self, templates: np.ndarray, params: List[str]) -> List[Optional[str]]:
+        """
+        :param templates: Código de la plantilla de cada fila.
+        :param params: Parámetros de cada fila.
+        :return: Mensajes reconstruidos, o None para las filas con código MISSING.
+        """
+        formats = self.formats
+        # Los formatos sin campos ignoran el único parámetro vacío que produce split.
+        return [None if template == MISSING else formats[template].format(*values.split(' '))
+                for template, values in zip(templates.tolist(), params)]
+
+    def template_ids(self, templates: np.ndarray) -> np.ndarray:
+        """
+        :return: Grupo (tipo de evento) de cada código de plantilla, o MISSING.
+        """
+        clusters = np.append(np.array(self.clusters, dtype=np.int32), np.int32(MISSING))
+        return clusters[np.where(templates == MISSING, len(self.clusters), templates)]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        :return: Dataframe con una fila por grupo: template_id, plantilla actual (template) y número de versiones.
+        """
+        return pd.DataFrame({
+            'template_id': np.arange(len(self.current), dtype=np.int32),
+            'template': [' '.join(self.templates[code]) for code in self.current],
+            'versions': np.bincount(np.array(self.clusters, dtype=np.int64), minlength=len(self.current)),
+        })
+
+    def save(self, store_path: str):
+        # Escritura atómica, igual que meta.json. Los tokens no contienen espacios, así que cada plantilla se guarda
+        # como texto.
+        path = os.path.join(store_path, TEMPLATES_FILE)
+        state = {
+            'templates': [' '.join(tokens) for tokens in self.templates],
+            'clusters': self.clusters,
+            'paths': self.paths,
+            'signatures': self.signatures,
+        }
+        with open(path + '.tmp', 'w', encoding='utf8') as f:
+            json.dump(state, f)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, store_path: str) -> 'TemplateMiner':
+        """
+        :return: Plantillas guardadas en el almacén, o un minado vacío si no hay ninguna.
+        """
+        miner = cls()
+        path = os.path.join(store_path, TEMPLATES_FILE)
+        if not os.path.exists(path):
+            return miner
+        with open(path, encoding='utf8') as f:
+            state = json.load(f)
+        for template, cluster in zip(state['templates'], state['clusters']):
+            miner.add_template(template.split(' '), cluster)
+        # El árbol se reconstruye insertando los grupos en orden de creación, igual que se crearon sus nodos.
+        for cluster, path in enumerate(state['paths']):
+            miner.paths.append(path)
+            miner.insert_leaf(path).append(cluster)
+        miner.signatures = state['signatures']
+        return miner
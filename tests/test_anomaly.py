@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from anomaly import BUCKET, AnomalyDetector
+
+# Recuento por hora de la aplicación de fondo: estable, con una ráfaga de tres horas (cuya segunda hora baja, pero no
+# lo bastante para cerrarla) y un pico aislado de una hora.
+BASE_HOUR = 1136073600 * 10 ** 9 // BUCKET
+COUNTS = {hour: 100 for hour in range(200)}
+COUNTS.update({100: 1000, 101: 800, 102: 1000, 150: 1000})
+
+
+def synthetic_rows(counts, app, message):
+    timestamp = np.concatenate([(BASE_HOUR + hour) * BUCKET + np.linspace(0, BUCKET - 1, count).astype(np.int64)
+                                for hour, count in counts.items()])
+    return timestamp, [app] * len(timestamp), [message] * len(timestamp)
+
+
+def detect(*parts) -> pd.DataFrame:
+    timestamp, app_name, message = (np.concatenate(values) for values in zip(*parts))
+    order = np.argsort(timestamp, kind='stable')
+    detector = AnomalyDetector()
+    detector.observe(timestamp[order], pd.Series(app_name[order]), pd.Series(['combo'] * len(order)),
+                     pd.Series(message[order]))
+    return detector.to_frame()
+
+
+def hours(windows: pd.DataFrame) -> list:
+    return [(kind, key, (start.value // BUCKET - BASE_HOUR), (end.value // BUCKET - BASE_HOUR))
+            for kind, key, start, end in zip(windows['kind'], windows['key'], windows['start'], windows['end'])]
+
+
+def test_burst_windows():
+    windows = detect(synthetic_rows(COUNTS, 'cron', 'job done'),
+                     synthetic_rows({160: 60}, 'sshd', 'Failed password for root from 10.0.0.1 port 22 ssh2'))
+    # Una sola ventana por la ráfaga en cada detector, ninguna por el pico de una hora de la aplicación y del host, y una
+    # por la IP, cuyos picos de una hora sí se registran.
+    assert hours(windows) == [('app', '*', 100, 103), ('app', 'cron', 100, 103), ('host', 'combo', 100, 103),
+                              ('source_ip', '10.0.0.1', 160, 161)]
+
+
+def test_steady_rate_has_no_windows():
+    assert detect(synthetic_rows({hour: 100 + hour % 7 * 10 for hour in range(500)}, 'cron', 'job done')).empty
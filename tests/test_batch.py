@@ -0,0 +1,50 @@
+import datetime
+
+import pandas as pd
+
+from batch import MISSING, LogBatch, UTC
+
+
+def make_batch() -> LogBatch:
+    batch = LogBatch()
+    batch.append(timestamp=datetime.datetime(2006, 2, 28, 10, 0, tzinfo=datetime.timezone.utc), message='uno',
+                 host_name='hnet-hon', app_name='sshd', process_id=42)
+    batch.append(timestamp=datetime.datetime(2006, 2, 28, 9, 0, tzinfo=datetime.timezone.utc), message='dos',
+                 app_name='sshd', priority=3)
+    return batch
+
+
+def test_to_frame_types():
+    frame = make_batch().to_frame()
+    assert frame['timestamp'].dtype == UTC
+    assert frame['timestamp'][0] == pd.Timestamp('2006-02-28 10:00', tz='UTC')
+    assert list(frame['app_name'].cat.categories) == ['sshd']
+    assert frame['host_name'].isna().tolist() == [False, True]
+    assert frame['process_id'].tolist() == [42, pd.NA]
+    assert frame['priority'].tolist() == [pd.NA, 3]
+
+
+def test_from_columns_round_trip():
+    batch = make_batch()
+    columns = {column: batch.column_array(column) for column in ('timestamp', 'priority', 'process_id')}
+    copy = LogBatch.from_columns(message=batch.message, **columns, app_name='sshd')
+    assert copy.to_frame()['timestamp'].equals(batch.to_frame()['timestamp'])
+    assert copy.codes_array('host_name').tolist() == [MISSING, MISSING]
+
+
+def test_concat_merges_dictionaries():
+    first = make_batch()
+    second = LogBatch()
+    second.append(timestamp=datetime.datetime(2006, 3, 1, tzinfo=datetime.timezone.utc), message='tres',
+                  app_name='crond')
+    frame = LogBatch.concat([first, second]).to_frame()
+    assert frame['app_name'].astype(str).tolist() == ['sshd', 'sshd', 'crond']
+    assert frame['message'].tolist() == ['uno', 'dos', 'tres']
+
+
+def test_out_of_range_process_id():
+    batch = LogBatch()
+    timestamp = datetime.datetime(2006, 2, 28, tzinfo=datetime.timezone.utc)
+    for process_id in (12, 2 ** 31, 10 ** 20, -5):
+        batch.append(timestamp=timestamp, message='pid', process_id=process_id)
+    assert batch.to_frame()['process_id'].tolist() == [12, pd.NA, pd.NA, pd.NA]
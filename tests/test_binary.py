@@ -0,0 +1,65 @@
+import os.path
+
+import numpy as np
+import pandas as pd
+
+from main import LastlogLogs, WtmpLogs, ingest_file, ingest_logs
+
+LOGIN = 1141084800
+
+
+def wtmp_records() -> np.ndarray:
+    # Arranque, inicio de sesión remoto y fin de sesión, con el formato utmp de glibc.
+    records = np.zeros(3, dtype=WtmpLogs.record_dtype)
+    records['type'] = [2, 7, 8]
+    records['pid'] = [0, 4242, 4242]
+    records['line'] = [b'~', b'pts/0', b'pts/0']
+    records['user'] = [b'reboot', b'root', b'']
+    records['host'] = [b'2.6.9-22.EL', b'10.0.0.1', b'']
+    records['seconds'] = [LOGIN - 60, LOGIN, LOGIN + 3600]
+    records['microseconds'] = [0, 500000, 0]
+    return records
+
+
+def test_record_sizes():
+    assert WtmpLogs.record_dtype.itemsize == 384
+    assert LastlogLogs.record_dtype.itemsize == 292
+
+
+def test_wtmp(tmp_path):
+    path = os.path.join(tmp_path, 'wtmp')
+    wtmp_records().tofile(path)
+    frame = next(ingest_file(path, WtmpLogs)).to_frame()
+    assert frame['message_id'].astype(str).tolist() == ['boot', 'login', 'logout']
+    assert frame['message'].tolist() == ['reboot ~ 2.6.9-22.EL', 'root pts/0 10.0.0.1', 'pts/0']
+    # Solo los inicios de sesión llevan el host remoto.
+    assert frame['host_name'].astype(object).where(frame['host_name'].notna(), None).tolist() == [None, '10.0.0.1', None]
+    assert frame['timestamp'][1] == pd.Timestamp(LOGIN * 10 ** 9 + 500000 * 1000, tz='UTC')
+    assert frame['process_id'].tolist() == [0, 4242, 4242]
+    assert set(frame['app_name']) == {'wtmp'} and set(frame['priority']) == {WtmpLogs.priority}
+
+
+def test_wtmp_batches_and_offset(tmp_path):
+    path = os.path.join(tmp_path, 'wtmp')
+    records = np.concatenate([wtmp_records()] * 5)
+    records.tofile(path)
+    assert [len(batch) for batch in WtmpLogs.batches(path, batch_size=4)] == [4, 4, 4, 3]
+    # Desde un desplazamiento solo se leen los registros completos posteriores.
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 100)
+    offset = 12 * WtmpLogs.record_dtype.itemsize
+    assert sum(len(batch) for batch in WtmpLogs.batches(path, offset=offset)) == 3
+
+
+def test_lastlog(tmp_path):
+    records = np.zeros(1001, dtype=LastlogLogs.record_dtype)
+    records[[0, 1000]] = [(LOGIN, b'tty1', b''), (LOGIN + 60, b'pts/1', b'10.0.0.2')]
+    log_dir = os.path.join(tmp_path, 'logs')
+    os.makedirs(log_dir)
+    records.tofile(os.path.join(log_dir, 'lastlog'))
+    frame = pd.concat([batch.to_frame() for batch in ingest_logs(log_dir)], ignore_index=True)
+    # Los uid que nunca han iniciado sesión no producen eventos; la posición del registro es el uid.
+    assert frame['message'].tolist() == ['uid=0 tty1', 'uid=1000 pts/1 10.0.0.2']
+    assert frame['host_name'].astype(object).where(frame['host_name'].notna(), None).tolist() == [None, '10.0.0.2']
+    assert frame['timestamp'].tolist() == [pd.Timestamp(LOGIN, unit='s', tz='UTC'),
+                                           pd.Timestamp(LOGIN + 60, unit='s', tz='UTC')]
@@ -0,0 +1,39 @@
+import os.path
+import subprocess
+import sys
+
+import config
+import follow
+from cli import build_parser, follow_command, main
+from conftest import YEAR, synthetic_lines, write_lines
+from store import LogStore
+
+
+def test_cli_imports_no_heavy_modules():
+    code = 'import sys, cli; cli.build_parser(); print(sorted({"numpy", "pandas", "matplotlib"} & set(sys.modules)))'
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    assert output.strip() == '[]'
+
+
+def test_follow_arguments():
+    args = build_parser().parse_args(['follow', '--polling'])
+    assert args.handler is follow_command
+    assert args.max_delay == config.MAX_DELAY and args.flush_interval == config.FLUSH_INTERVAL
+    assert args.polling and not args.from_start
+
+
+def test_follow_command(tmp_path, monkeypatch):
+    log_dir = os.path.join(tmp_path, 'logs')
+    write_lines(os.path.join(log_dir, 'cron'), synthetic_lines('syslog', 300))
+
+    def run(self, duration=None):
+        # Una sola pasada y después la interrupción con Ctrl+C.
+        self.poll()
+        self.flush()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(follow.Follower, 'run', run)
+    store_path = os.path.join(tmp_path, 'store')
+    main(['follow', '--log-dir', log_dir, '--store', store_path, '--from-start', '--polling', '--year', str(YEAR)])
+    assert len(LogStore(store_path)) == 300
@@ -0,0 +1,75 @@
+import bz2
+import gzip
+import os.path
+import threading
+
+import pytest
+
+from conftest import YEAR, synthetic_lines, write_lines
+from main import find_opener, ingest_logs, read_blocks, read_logs, read_many
+
+
+def compressed_files(directory: str, lines) -> dict:
+    # El mismo log sin comprimir, con gzip y con bz2, con extensión y sin ella.
+    data = ''.join(lines).encode()
+    files = {'plain': write_lines(os.path.join(directory, 'messages'), lines)}
+    for name, module in (('gzip', gzip), ('bz2', bz2)):
+        extension = '.gz' if module is gzip else '.bz2'
+        for path in (os.path.join(directory, f'messages.1{extension}'), os.path.join(directory, f'{name}-sin-extension')):
+            with open(path, 'wb') as f:
+                f.write(module.compress(data))
+            files[os.path.basename(path)] = path
+    return files
+
+
+def test_find_opener(tmp_path):
+    files = compressed_files(str(tmp_path), synthetic_lines('syslog', 10))
+    assert find_opener(files['plain']) is open
+    assert find_opener(files['messages.1.gz']) is find_opener(files['gzip-sin-extension']) is gzip.open
+    assert find_opener(files['messages.1.bz2']) is find_opener(files['bz2-sin-extension']) is bz2.open
+
+
+def test_compressed_reads_match_plain(tmp_path):
+    lines = synthetic_lines('syslog')
+    for path in compressed_files(str(tmp_path), lines).values():
+        assert list(read_logs(path)) == lines, path
+        # Los bloques terminan en un salto de línea y juntos forman el fichero completo.
+        blocks = list(read_blocks(path, block_size=1000))
+        assert len(blocks) > 1 and all(block.endswith(b'\n') for block in blocks)
+        assert b''.join(blocks) == ''.join(lines).encode()
+
+
+def test_ingest_compressed_rotations(tmp_path):
+    lines = synthetic_lines('syslog')
+    log_dir = os.path.join(tmp_path, 'logs')
+    write_lines(os.path.join(log_dir, 'messages'), lines[:200])
+    write_lines(os.path.join(log_dir, 'messages.1.gz'), lines[200:], compress=True)
+    assert sum(len(batch) for batch in ingest_logs(log_dir, year=YEAR)) == len(lines)
+
+
+def test_read_many_keeps_order(tmp_path):
+    paths = [write_lines(os.path.join(tmp_path, f'messages.{position}.gz'), synthetic_lines('syslog', 300, seed=position),
+                         compress=True) for position in range(5)]
+    results = list((path, list(lines)) for path, lines in read_many(paths, workers=3, chunk_size=50))
+    assert results == [(path, list(read_logs(path))) for path in paths]
+
+
+def test_read_many_skips_unread_lines(tmp_path):
+    paths = [write_lines(os.path.join(tmp_path, f'messages.{position}'), synthetic_lines('syslog', 300, seed=position))
+             for position in range(3)]
+    # Las líneas que no se consumen se descartan sin bloquear a los hilos de lectura.
+    threads = threading.active_count()
+    results = [next(lines) for _, lines in read_many(paths, workers=1, chunk_size=10, max_chunks=1)]
+    assert results == [synthetic_lines('syslog', 1, seed=position)[0] for position in range(3)]
+    assert threading.active_count() == threads
+
+
+def test_read_many_propagates_errors(tmp_path):
+    good = write_lines(os.path.join(tmp_path, 'messages'), synthetic_lines('syslog', 10))
+    with open(os.path.join(tmp_path, 'messages.1.gz'), 'wb') as f:
+        f.write(b'\x1f\x8b no es gzip')
+    streams = read_many([good, os.path.join(tmp_path, 'messages.1.gz')])
+    assert len(list(next(streams)[1])) == 10
+    with pytest.raises(OSError):
+        list(next(streams)[1])
+    streams.close()
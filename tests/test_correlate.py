@@ -0,0 +1,47 @@
+import os.path
+
+import pytest
+
+from conftest import YEAR, write_lines
+from correlate import CorrelationJoin, normalize_key
+from frames import build_frame
+from main import ingest_logs
+from store import save_store
+
+
+@pytest.fixture
+def attack_store(tmp_path):
+    # Una IP que aparece en ssl_access_log de httpd y, un segundo después, en access.log de Squid; otra solo en Squid.
+    logs = str(tmp_path / 'logs')
+    write_lines(os.path.join(logs, 'httpd', 'ssl_access_log.4'), [
+        '218.175.172.37 - - [16/Jun/2005:20:57:04 -0400] "GET /" 400 570\n',
+        '218.175.172.37 - - [16/Jun/2005:20:57:05 -0400] "GET /" 400 570\n',
+    ])
+    write_lines(os.path.join(logs, 'squid', 'access.log'), [
+        '1118969826.000    120 218.175.172.37 TCP_MISS/200 512 GET http://www.google.com/ - DIRECT/1.2.3.4 text/html\n',
+        '1118969827.000    120 10.0.0.1 TCP_MISS/200 512 GET http://www.google.com/ - DIRECT/1.2.3.4 text/html\n',
+    ])
+    return save_store(build_frame(ingest_logs(logs, year=YEAR)), str(tmp_path / 'store'))
+
+
+def test_ssl_access_log_rows_are_httpd(attack_store):
+    frame = attack_store.to_frame(['app_name', 'host_name'])
+    assert frame.loc[frame['host_name'] == '218.175.172.37', 'app_name'].astype(str).tolist().count('httpd') == 2
+
+
+def test_httpd_squid_pairs(attack_store):
+    pairs = CorrelationJoin(attack_store, ['httpd', 'squid'], window=5).correlate()
+    assert pairs['key'].tolist() == ['218.175.172.37'] * 2
+    assert pairs['source_a'].tolist() == ['httpd'] * 2 and pairs['source_b'].tolist() == ['squid'] * 2
+    assert sorted(pairs['delta_s'].tolist()) == [1.0, 2.0]
+    assert pairs['message_a'].tolist()[0] == 'GET /" 400 570'
+    assert str(pairs['timestamp_b'].dtype) == 'datetime64[ns, UTC]'
+
+
+def test_window_excludes_distant_events(attack_store):
+    assert CorrelationJoin(attack_store, ['httpd', 'squid'], window=0.5).correlate().empty
+
+
+def test_normalize_key():
+    assert normalize_key('::ffff:203.71.234.22') == '203.71.234.22'
+    assert normalize_key('HNET-Hon') == 'hnet-hon'
@@ -0,0 +1,54 @@
+import os.path
+import time
+
+from batch import parse_batches
+from conftest import YEAR, synthetic_lines, write_lines
+from follow import Follower, StoreSink
+from main import find_parser
+from store import LogStore
+
+
+def micro_batches(count: int, size: int):
+    # Microlotes de syslog como los que entrega Follower.
+    lines = synthetic_lines('syslog', count * size)
+    return list(parse_batches(lines, find_parser('messages').fields_for_file('messages', YEAR), size))
+
+
+def test_flush_by_rows(tmp_path):
+    path = os.path.join(tmp_path, 'store')
+    sink = StoreSink(path, flush_interval=3600, flush_rows=250)
+    batches = micro_batches(10, 100)
+    for batch in batches:
+        sink(batch)
+    # Dos microlotes por escritura: el tercero ya no cabe y se deja para la siguiente.
+    assert [block['rows'] for block in LogStore(path).blocks] == [200] * 4
+    sink.flush()
+    store = LogStore(path)
+    assert [block['rows'] for block in store.blocks] == [200] * 5
+    assert sink.stats == {'rows': 1000, 'flushes': 5}
+    messages = [message for batch in batches for message in batch.message]
+    assert sorted(store.to_frame()['message']) == sorted(messages)
+
+
+def test_flush_by_interval(tmp_path):
+    path = os.path.join(tmp_path, 'store')
+    sink = StoreSink(path, flush_interval=0.2)
+    for batch in micro_batches(5, 100):
+        sink(batch)
+    sink.tick()
+    assert len(LogStore(path)) == 0
+    # Sin ningún microlote nuevo, la escritura la hace tick en cuanto pasa el intervalo.
+    time.sleep(0.25)
+    sink.tick()
+    store = LogStore(path)
+    assert len(store) == 500 and len(store.blocks) == 1
+    assert sink.stats == {'rows': 500, 'flushes': 1}
+
+
+def test_follower_flushes_quiet_files(tmp_path):
+    log_path = write_lines(os.path.join(tmp_path, 'logs', 'cron'), synthetic_lines('syslog', 300))
+    store_path = os.path.join(tmp_path, 'store')
+    sink = StoreSink(store_path, flush_interval=0.2)
+    # El fichero no recibe más líneas: las filas llegan al almacén por tiempo, sin llamar a sink.flush.
+    Follower([log_path], sink, year=YEAR, from_start=True, polling=True).run(duration=1.0)
+    assert len(LogStore(store_path)) == 300
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from batch import LogBatch
+from frames import FrameBuilder, build_frame, merge_runs, merge_two, sort_run
+
+
+def run(timestamp, first_row=0):
+    timestamp = np.array(timestamp, dtype=np.int64)
+    return timestamp, np.arange(first_row, first_row + len(timestamp))
+
+
+def test_sort_run():
+    assert sort_run(np.array([1, 2, 2, 5])).tolist() == [0, 1, 2, 3]
+    # Ordenación estable: a igualdad de timestamp se conserva el orden de las líneas.
+    assert sort_run(np.array([3, 1, 3, 1])).tolist() == [1, 3, 0, 2]
+
+
+def test_merge_two_is_stable():
+    timestamp, rows = merge_two(run([1, 3, 3, 7]), run([0, 3, 8], first_row=4))
+    assert timestamp.tolist() == [0, 1, 3, 3, 3, 7, 8]
+    # Los empates se resuelven a favor del primer tramo.
+    assert rows.tolist() == [4, 0, 1, 2, 5, 3, 6]
+
+
+def test_merge_runs_matches_stable_sort():
+    generator = np.random.default_rng(0)
+    runs, offset = [], 0
+    for size in (5, 0, 17, 1, 40, 9, 3):
+        timestamp = np.sort(generator.integers(0, 20, size))
+        runs.append(run(timestamp, offset))
+        offset += size
+    everything = np.concatenate([timestamp for timestamp, _ in runs])
+    assert merge_runs(runs).tolist() == np.argsort(everything, kind='stable').tolist()
+    assert merge_runs([]).tolist() == []
+
+
+def batch(timestamps, name):
+    return LogBatch.from_columns(np.array(timestamps, dtype=np.int64) * 10 ** 9,
+                                 [f'{name} {position}' for position in range(len(timestamps))], app_name=name)
+
+
+def test_builder_merges_batches_in_arrival_order():
+    # Un lote desordenado y dos que empatan con él: el resultado es el de pd.concat con una ordenación estable.
+    batches = [batch([5, 1, 3], 'a'), batch([1, 2, 5], 'b'), batch([3], 'c')]
+    expected = pd.concat([item.to_frame() for item in batches], ignore_index=True) \
+        .sort_values('timestamp', kind='stable', ignore_index=True)
+    frame = build_frame(batches)
+    assert frame['message'].tolist() == expected['message'].tolist() == \
+        ['a 1', 'b 0', 'b 1', 'a 2', 'c 0', 'a 0', 'b 2']
+    assert frame['app_name'].astype(str).tolist() == expected['app_name'].astype(str).tolist()
+
+
+def test_builder_length():
+    builder = FrameBuilder()
+    builder.extend([batch([1, 2], 'a'), batch([], 'b')])
+    assert len(builder) == 2 and len(builder.build()) == 2
@@ -0,0 +1,56 @@
+import functools
+import os.path
+import types
+
+from conftest import LINES, YEAR, synthetic_lines, write_lines
+from main import UnixLogs, batch_logs, ingest_file, ingest_logs, parse_logs, read_logs
+from report import IngestReport
+
+
+def test_read_logs_is_lazy(tmp_path):
+    path = write_lines(os.path.join(tmp_path, 'messages'), synthetic_lines('syslog', 10))
+    lines = read_logs(path)
+    assert isinstance(lines, types.GeneratorType)
+    assert next(lines) == synthetic_lines('syslog', 1)[0]
+    assert len(list(lines)) == 9
+
+
+def test_parse_logs_skips_malformed_lines():
+    lines = synthetic_lines('syslog', 3)
+    logs = parse_logs(lines[:1] + ['no es syslog\n'] + lines[1:], functools.partial(UnixLogs, year=YEAR))
+    assert isinstance(logs, types.GeneratorType)
+    assert [log.raw for log in logs] == lines
+
+
+def test_batch_logs_sizes():
+    assert [len(batch) for batch in batch_logs(range(25), 10)] == [10, 10, 5]
+    assert list(batch_logs([], 10)) == []
+
+
+def test_ingest_file_yields_per_block(tmp_path):
+    path = write_lines(os.path.join(tmp_path, 'messages'), synthetic_lines('syslog'))
+    batches = ingest_file(path, UnixLogs, batch_size=100, year=YEAR)
+    assert isinstance(batches, types.GeneratorType)
+    assert sum(len(batch) for batch in batches) == LINES
+
+
+def test_ingest_logs_streams_batches(log_dir):
+    report = IngestReport()
+    batches = ingest_logs(log_dir, batch_size=100, year=YEAR, report=report)
+    # El primer lote se entrega antes de haber procesado ningún fichero completo.
+    first = next(batches)
+    assert len(first) and not report.sources
+    rows = len(first) + sum(len(batch) for batch in batches)
+    assert rows == sum(stats.rows for stats in report.sources.values())
+    assert sum(stats.files for stats in report.sources.values()) == len(os.listdir(log_dir))
+
+
+def test_ingest_logs_reports_failures_and_unrouted(tmp_path):
+    log_dir = os.path.join(tmp_path, 'logs')
+    write_lines(os.path.join(log_dir, 'messages'), synthetic_lines('syslog', 10) + ['no es syslog\n'])
+    write_lines(os.path.join(log_dir, 'desconocido.txt'), ['nada\n'])
+    report = IngestReport()
+    assert sum(len(batch) for batch in ingest_logs(log_dir, year=YEAR, report=report)) == 10
+    stats = report.sources['UnixLogs']
+    assert (stats.files, stats.records, stats.rows, stats.failures) == (1, 11, 10, 1)
+    assert report.unrouted == [os.path.join(log_dir, 'desconocido.txt')]
@@ -0,0 +1,50 @@
+import json
+import os.path
+
+import main
+from cli import main as cli_main
+from conftest import YEAR
+from instrument import NULL_STAGE, Instrumentation, SamplingProfiler, TimedIterator
+
+
+def test_disabled_is_free():
+    instrumentation = Instrumentation()
+    items = [1, 2, 3]
+    # Desactivada, no se crea ningún objeto por etapa ni por fichero.
+    assert instrumentation.stage('read') is NULL_STAGE
+    assert instrumentation.timed(items) is items
+    instrumentation.add('parse', 1.0)
+    assert instrumentation.stages == {}
+
+
+def test_enabled_stages():
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    with instrumentation.stage('read'):
+        pass
+    with instrumentation.stage('read'):
+        pass
+    instrumentation.add('parse', 0.5, calls=3)
+    timed = instrumentation.timed(iter(range(5)))
+    assert isinstance(timed, TimedIterator) and list(timed) == list(range(5))
+    instrumentation.disable()
+    stages = instrumentation.to_dict()['stages']
+    assert stages['read']['calls'] == 2 and stages['parse'] == {'calls': 3, 'seconds': 0.5}
+    assert not instrumentation.enabled
+
+
+def test_ingest_report(log_dir, tmp_path, monkeypatch):
+    instrumentation = Instrumentation()
+    monkeypatch.setattr(main, 'INSTRUMENTATION', instrumentation)
+    path = os.path.join(tmp_path, 'informe.json')
+    cli_main(['ingest', '--log-dir', log_dir, '--store', os.path.join(tmp_path, 'store'), '--year', str(YEAR),
+              '--instrument', path, '--sample-profile'])
+    with open(path, encoding='utf8') as f:
+        report = json.load(f)
+    assert {'discover', 'read', 'parse', 'frame', 'store'} <= set(report['stages'])
+    assert report['stages']['parse']['calls'] == len(os.listdir(log_dir))
+    sources = report['sources']
+    assert sum(source['rows'] for source in sources.values()) == sum(source['records'] for source in sources.values())
+    assert all(0 < source['coverage'] <= 1 for source in sources.values())
+    if SamplingProfiler.available():
+        assert set(report['profile']) == {'interval', 'samples', 'own', 'cumulative', 'stacks'}
@@ -0,0 +1,92 @@
+import gzip
+import os
+import shutil
+
+import pytest
+
+from conftest import YEAR, synthetic_lines, write_lines
+from manifest import FileCursor, Manifest, ingest_incremental
+from store import LogStore
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    return str(tmp_path / 'logs'), str(tmp_path / 'store')
+
+
+def ingest(dirs):
+    return ingest_incremental(*dirs, year=YEAR)
+
+
+def rotate(log_dir: str, compress_from: int = None):
+    # Rotación de logrotate: cron.N -> cron.N+1 (comprimido desde compress_from) y cron -> cron.1.
+    names = sorted((name for name in os.listdir(log_dir) if name != 'cron'), reverse=True)
+    for name in names:
+        number = int(name.split('.')[1])
+        target = os.path.join(log_dir, f'cron.{number + 1}')
+        source = os.path.join(log_dir, name)
+        if compress_from is not None and number + 1 >= compress_from and not name.endswith('.gz'):
+            with open(source, 'rb') as f, gzip.open(target + '.gz', 'wb') as out:
+                shutil.copyfileobj(f, out)
+            os.remove(source)
+        else:
+            os.replace(source, target + ('.gz' if name.endswith('.gz') else ''))
+    os.replace(os.path.join(log_dir, 'cron'), os.path.join(log_dir, 'cron.1'))
+
+
+def test_unchanged_files_are_skipped(dirs):
+    write_lines(os.path.join(dirs[0], 'cron'), synthetic_lines('syslog', 100))
+    assert ingest(dirs) == {'skipped': 0, 'resumed': 0, 'new': 1, 'rows': 100}
+    assert ingest(dirs) == {'skipped': 1, 'resumed': 0, 'new': 0, 'rows': 0}
+
+
+def test_appended_lines_are_resumed(dirs):
+    lines = synthetic_lines('syslog', 150)
+    path = write_lines(os.path.join(dirs[0], 'cron'), lines[:100])
+    ingest(dirs)
+    with open(path, 'a', encoding='utf8') as f:
+        f.write(''.join(lines[100:]))
+    assert ingest(dirs) == {'skipped': 0, 'resumed': 1, 'new': 0, 'rows': 50}
+    assert len(LogStore(dirs[1])) == 150
+
+
+def test_rotate_and_compress(dirs):
+    # cron -> cron.1 -> cron.2.gz: los ficheros rotados, comprimidos o no, no se vuelven a procesar.
+    lines = synthetic_lines('syslog', 300)
+    write_lines(os.path.join(dirs[0], 'cron'), lines[:100])
+    ingest(dirs)
+    rotate(dirs[0])
+    write_lines(os.path.join(dirs[0], 'cron'), lines[100:200])
+    assert ingest(dirs) == {'skipped': 1, 'resumed': 0, 'new': 1, 'rows': 100}
+    rotate(dirs[0], compress_from=2)
+    write_lines(os.path.join(dirs[0], 'cron'), lines[200:])
+    assert sorted(os.listdir(dirs[0])) == ['cron', 'cron.1', 'cron.2.gz']
+    assert ingest(dirs) == {'skipped': 2, 'resumed': 0, 'new': 1, 'rows': 100}
+    assert ingest(dirs) == {'skipped': 3, 'resumed': 0, 'new': 0, 'rows': 0}
+    assert len(LogStore(dirs[1])) == 300
+
+
+def test_compressed_rotation_completes_partial_line(dirs):
+    # La última línea estaba a medio escribir al procesar cron; la rotación comprimida la contiene completa.
+    lines = synthetic_lines('syslog', 10)
+    path = write_lines(os.path.join(dirs[0], 'cron'), lines[:9] + [lines[9][:20]])
+    assert ingest(dirs)['rows'] == 9
+    with open(path, 'w', encoding='utf8') as f:
+        f.write(''.join(lines))
+    with open(path, 'rb') as f, gzip.open(os.path.join(dirs[0], 'cron.1.gz'), 'wb') as out:
+        shutil.copyfileobj(f, out)
+    os.remove(path)
+    assert ingest(dirs) == {'skipped': 0, 'resumed': 1, 'new': 0, 'rows': 1}
+    entry = Manifest.load(dirs[1]).entries[os.path.join(dirs[0], 'cron.1.gz')]
+    assert entry.compressed and entry.offset == len(''.join(lines).encode())
+
+
+def test_cursor_stops_at_partial_line(tmp_path):
+    path = tmp_path / 'cron'
+    path.write_bytes(b'uno\ndos\ntr')
+    cursor = FileCursor(str(path))
+    assert list(cursor.lines()) == ['uno\n', 'dos\n'] and cursor.offset == 8
+    compressed = tmp_path / 'cron.1.gz'
+    compressed.write_bytes(gzip.compress(b'uno\ndos\ntres'))
+    cursor = FileCursor(str(compressed), 4, compressed=True)
+    assert list(cursor.lines()) == ['dos\n', 'tres'] and cursor.offset == 12
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from batch import LogBatch
+from conftest import YEAR
+from frames import build_frame
+from main import ingest_logs
+from parallel import ingest_parallel, list_log_files, parse_file
+
+
+def test_parallel_matches_sequential(log_dir):
+    # El resultado no depende del número de trabajadores y coincide con el procesamiento secuencial.
+    sequential = build_frame(ingest_logs(log_dir, year=YEAR))
+    for workers in (1, 3):
+        pd.testing.assert_frame_equal(ingest_parallel(log_dir, workers, year=YEAR), sequential)
+
+
+def test_parse_file_keeps_undecodable_bytes(tmp_path):
+    path = tmp_path / 'messages'
+    path.write_bytes(b'Feb 28 10:00:00 hnet-hon sshd[1]: usuario \xff\xfe\n')
+    batch = parse_file(str(path), year=YEAR)
+    assert isinstance(batch, LogBatch)
+    assert list(batch.to_frame()['message']) == ['usuario \\xff\\xfe']
+
+
+def test_list_log_files_skips_unknown(log_dir, tmp_path):
+    (tmp_path / 'logs' / 'notas.txt').write_text('sin formato\n')
+    assert all(not path.endswith('notas.txt') for path in list_log_files(log_dir))
@@ -0,0 +1,62 @@
+import gzip
+import os.path
+
+import pandas as pd
+
+import pipeline
+from conftest import YEAR, synthetic_lines, write_lines
+from frames import build_frame
+from main import ingest_logs
+from pipeline import FileState, PipelineMetrics, StreamDecompressor, ingest_pipeline
+
+
+def add_rotations(log_dir: str):
+    # Rotaciones comprimidas de syslog y Squid, para que haya ficheros de varios bloques y descompresión.
+    write_lines(os.path.join(log_dir, 'syslog', 'messages.1.gz'), synthetic_lines('syslog', 3000, seed=1),
+                compress=True)
+    write_lines(os.path.join(log_dir, 'squid-access', 'access.log.1.gz'),
+                synthetic_lines('squid-access', 3000, seed=1), compress=True)
+
+
+def test_pipeline_matches_sequential(log_dir, monkeypatch):
+    add_rotations(log_dir)
+    sequential = build_frame(ingest_logs(log_dir, year=YEAR))
+    metrics = PipelineMetrics()
+    # En procesos, y en un hilo con bloques de lectura pequeños que cortan las líneas.
+    pd.testing.assert_frame_equal(ingest_pipeline(log_dir, year=YEAR, parse_workers=2, metrics=metrics), sequential)
+    assert metrics.rows == len(sequential) and metrics.bottleneck in pipeline.STAGES
+    monkeypatch.setattr(pipeline, 'BLOCK_SIZE', 4096)
+    pd.testing.assert_frame_equal(ingest_pipeline(log_dir, year=YEAR, parse_workers=0, queue_size=1), sequential)
+
+
+def test_stream_decompressor_concatenated_members():
+    data = gzip.compress(b'uno\ndos\n') + gzip.compress(b'tres\n')
+    decompressor = StreamDecompressor(pipeline.DECOMPRESSORS[gzip.open])
+    assert b''.join(decompressor.decompress(data[start:start + 7]) for start in range(0, len(data), 7)) == \
+        b'uno\ndos\ntres\n'
+
+
+def test_file_state_cuts_complete_lines(tmp_path):
+    state = FileState(write_lines(os.path.join(tmp_path, 'messages'), []))
+    assert state.feed(b'uno\ndo', False) == [b'uno\n']
+    assert state.feed(b's', False) == []
+    assert state.feed(b'\ntres', True) == [b'dos\ntres']
+    # Los formatos de varias líneas por registro se entregan completos al final del fichero.
+    state = FileState(write_lines(os.path.join(tmp_path, 'audit_log'), []))
+    assert state.feed(b'uno\n', False) == [] and state.feed(b'dos\n', True) == [b'uno\ndos\n']
+
+
+def test_reorder_buffer_is_bounded(tmp_path, monkeypatch):
+    # Varios ficheros de muchos bloques leídos a la vez: los lotes de los ficheros posteriores al que espera sink no se
+    # acumulan más allá del límite de bloques adelantados.
+    for position in range(4):
+        write_lines(os.path.join(tmp_path, f'messages.{position + 1}.gz'),
+                    synthetic_lines('syslog', 5000, seed=position), compress=True)
+        write_lines(os.path.join(tmp_path, f'access.log.{position + 1}'),
+                    synthetic_lines('squid-access', 5000, seed=position))
+    monkeypatch.setattr(pipeline, 'BLOCK_SIZE', 1 << 14)
+    for queue_size in (1, 4):
+        metrics = PipelineMetrics()
+        frame = ingest_pipeline(str(tmp_path), year=YEAR, parse_workers=0, queue_size=queue_size, metrics=metrics)
+        assert len(frame) == 40000 and metrics.stages['sink'].items > 100
+        assert metrics.reorder_max <= 2 * queue_size + 1
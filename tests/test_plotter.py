@@ -0,0 +1,56 @@
+import os.path
+
+import numpy as np
+import pandas as pd
+
+from conftest import YEAR
+from plotter import aggregates, downsample, lttb, minmax, render
+
+
+def noisy_series(size: int = 10000) -> tuple:
+    generator = np.random.default_rng(0)
+    x = np.arange(size, dtype=np.int64) * 60 * 10 ** 9
+    y = generator.poisson(100, size)
+    y[[1234, 7777]] = [5000, 0]
+    return x, y
+
+
+def test_minmax_keeps_extremes():
+    x, y = noisy_series()
+    reduced_x, reduced_y = minmax(x, y, 200)
+    assert len(reduced_x) <= 200 and np.all(np.diff(reduced_x) > 0)
+    assert {5000, 0} <= set(reduced_y.tolist())
+    assert np.array_equal(y[reduced_x // (60 * 10 ** 9)], reduced_y)
+
+
+def test_lttb_points():
+    x, y = noisy_series()
+    reduced_x, reduced_y = lttb(x, y, 200)
+    assert len(reduced_x) == 200 and np.all(np.diff(reduced_x) > 0)
+    assert reduced_x[0] == x[0] and reduced_x[-1] == x[-1]
+    assert 5000 in reduced_y.tolist()
+    # Las series cortas no se reducen.
+    assert len(lttb(x[:100], y[:100], 200)[0]) == 100
+
+
+def test_downsample_keeps_index():
+    x, y = noisy_series()
+    series = pd.Series(y, index=pd.DatetimeIndex(x.view('M8[ns]'), tz='UTC'), name='count')
+    for method in ('minmax', 'lttb'):
+        reduced = downsample(series, 100, method)
+        assert len(reduced) <= 100 and reduced.index.tz is not None
+        assert reduced.equals(series[reduced.index])
+
+
+def test_aggregates(log_store):
+    data = aggregates(log_store, points=50)
+    assert data['daily'].sum() == data['per_minute'].sum() == len(log_store)
+    assert data['daily_per_app'].sum().sum() == data['per_app'].sum()
+    # Los timestamps se usan tal como se ingirieron, sin corregir el año.
+    assert {day.year for day in data['daily'].index} == {YEAR}
+
+
+def test_render(log_store, tmp_path):
+    paths = render(log_store.path, str(tmp_path), ['png', 'svg'], ['daily', 'per_minute'], workers=0, points=50)
+    assert [os.path.basename(path) for path in paths] == ['daily.png', 'daily.svg', 'per_minute.png', 'per_minute.svg']
+    assert all(os.path.getsize(path) > 0 for path in paths)
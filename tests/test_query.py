@@ -0,0 +1,43 @@
+import pandas as pd
+
+from query import LogIndex, query, to_nanoseconds
+
+START, END = '2006-02-28 00:00:06', '2006-02-28 00:00:12'
+
+
+def expected(log_frame: pd.DataFrame, mask) -> list:
+    frame = log_frame.sort_values('timestamp', kind='stable', ignore_index=True)
+    return frame[mask(frame).fillna(False).astype(bool)]['message'].tolist()
+
+
+def test_time_range(log_frame, log_store):
+    index = LogIndex(log_store)
+    # El rango solo abarca algunos de los bloques.
+    blocks = index.candidates(to_nanoseconds(START), to_nanoseconds(END))
+    assert 0 < len(blocks) < len(log_store.blocks)
+    result = index.query(START, END, columns=['timestamp', 'message'])
+    assert result['timestamp'].is_monotonic_increasing
+    assert result['message'].tolist() == expected(
+        log_frame, lambda frame: (frame['timestamp'] >= pd.Timestamp(START, tz='UTC'))
+        & (frame['timestamp'] < pd.Timestamp(END, tz='UTC')))
+
+
+def test_postings_and_severity(log_frame, log_store):
+    index = LogIndex(log_store)
+    result = index.query(app_name=['sshd', 'crond'], host_name='hnet-hon', columns=['message'])
+    assert len(result) and result['message'].tolist() == expected(
+        log_frame, lambda frame: frame['app_name'].isin(['sshd', 'crond']) & (frame['host_name'] == 'hnet-hon'))
+    # Errores de CUPS: prioridad con severidad 3 o más grave.
+    errors = index.query(START, END, app_name='CUPS', max_severity=3, columns=['app_name', 'priority', 'message'])
+    assert len(errors) and set(errors['app_name']) == {'CUPS'} and errors['priority'].mod(8).le(3).all()
+    assert errors['message'].tolist() == expected(
+        log_frame, lambda frame: (frame['timestamp'] >= pd.Timestamp(START, tz='UTC'))
+        & (frame['timestamp'] < pd.Timestamp(END, tz='UTC')) & (frame['app_name'] == 'CUPS')
+        & (frame['priority'] % 8 <= 3))
+
+
+def test_unknown_values_return_empty_frame(log_store):
+    result = query(log_store, app_name='no-existe', columns=['timestamp', 'message'])
+    assert result.empty and list(result.columns) == ['timestamp', 'message']
+    assert query(log_store, start='2007-01-01').empty
+
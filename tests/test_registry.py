@@ -0,0 +1,52 @@
+from typing import Dict
+
+import pytest
+
+from main import (CupsLogs, HttpdAuditLogs, HttpdLogs, LastlogLogs, Logs, ParserRouter, SquidLogs, UnixLogs, WtmpLogs,
+                  find_parser)
+
+
+@pytest.mark.parametrize('file, parser_class', [
+    ('messages', UnixLogs), ('secure.3', UnixLogs), ('access.log', SquidLogs), ('store.log.2.gz', SquidLogs),
+    ('useragent_log.log.bz2', SquidLogs), ('error_log', CupsLogs), ('ssl_access_log', HttpdLogs),
+    ('audit_log.1', HttpdAuditLogs), ('wtmp', WtmpLogs), ('wtmp.1.gz', WtmpLogs), ('lastlog', LastlogLogs),
+])
+def test_find_parser(file, parser_class):
+    assert find_parser(file) is parser_class
+
+
+@pytest.mark.parametrize('file', ['desconocido.txt', 'messages.old', 'access.log.tar', 'xmessages', '.gz'])
+def test_unknown_files(file):
+    assert find_parser(file) is None
+
+
+def test_registry_contains_subclasses():
+    assert {UnixLogs, SquidLogs, CupsLogs, WtmpLogs} <= set(Logs.registry)
+    assert all(issubclass(parser_class, Logs) for parser_class in Logs.registry)
+
+
+def test_router_order():
+    class First(Logs):
+        patterns = [r'app\.log']
+
+        @classmethod
+        def fields(cls, raw: str) -> Dict:
+            return {}
+
+    class Second(Logs):
+        patterns = [r'app\.log(\.\d+)?', r'other']
+
+        @classmethod
+        def fields(cls, raw: str) -> Dict:
+            return {}
+
+    try:
+        # Las clases registradas se incorporan al enrutado sin más cambios, y con patrones solapados gana la primera.
+        assert find_parser('app.log.gz') is First
+        assert find_parser('app.log.1') is Second
+        assert ParserRouter([Second, First]).find('app.log') is Second
+        assert ParserRouter([First, Second]).find('other.bz2') is Second
+    finally:
+        Logs.registry.remove(First)
+        Logs.registry.remove(Second)
+    assert find_parser('app.log') is None
@@ -0,0 +1,33 @@
+import numpy as np
+
+from rollup import merge, rollup
+from store import save_store
+
+
+def test_rollup_matches_groupby(log_frame, log_store):
+    def counts(frame, count):
+        keys = zip(frame['timestamp'], frame['app_name'].astype(object), frame['host_name'].astype(object))
+        return {(timestamp, str(app), str(host)): value for (timestamp, app, host), value in zip(keys, count)}
+
+    table = log_store.rollup('hour')
+    expected = log_frame.assign(timestamp=log_frame['timestamp'].dt.floor('h')) \
+        .groupby(['timestamp', 'app_name', 'host_name'], observed=True, dropna=False).size().reset_index()
+    assert counts(table, table['count']) == counts(expected, expected[0])
+
+
+def test_merge_is_incremental():
+    rng = np.random.default_rng(0)
+    timestamp = np.sort(rng.integers(0, 10 * 3600 * 10 ** 9, 2000))
+    app_name = rng.integers(-1, 4, 2000).astype(np.int32)
+    host_name = rng.integers(-1, 2, 2000).astype(np.int32)
+    whole = rollup(timestamp, app_name, host_name, 'hour')
+    parts = merge(rollup(timestamp[:700], app_name[:700], host_name[:700], 'hour'),
+                  rollup(timestamp[700:], app_name[700:], host_name[700:], 'hour'))
+    assert np.array_equal(whole, parts)
+
+
+def test_append_updates_rollups(log_frame, tmp_path):
+    store = save_store(log_frame.iloc[:3000], str(tmp_path / 'store'))
+    store.append(log_frame.iloc[3000:].reset_index(drop=True))
+    assert store.rollup('day')['count'].sum() == len(log_frame)
+    assert store.meta['rollup_rows'] == len(log_frame)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from fulltext import BlockIndex, build_index, contains_phrase, expand, parse_query, split_terms
+from search import search
+
+QUERIES = ['session', 'session opened root', '"session opened for user root"', '"opened root"',
+           'doubleclick OR slashdot', 'get -doubleclick', 'NOT (crond OR sshd)', '192.168.1.195', '168', 'logo.png',
+           '"ad.doubleclick.net login"', 'no_aparece_nunca']
+
+
+def matches(node: tuple, tokens: list) -> bool:
+    # Evaluación de referencia de una consulta sobre los tokens de un mensaje, sin índice.
+    kind = node[0]
+    if kind == 'and':
+        return all(matches(child, tokens) for child in node[1])
+    if kind == 'or':
+        return any(matches(child, tokens) for child in node[1])
+    if kind == 'not':
+        return not matches(node[1], tokens)
+    terms = {term for token in tokens for term in expand(token)}
+    return all(term in terms for term in node[1]) and contains_phrase(tokens, node[1])
+
+
+def expected(log_store, text: str) -> list:
+    node = parse_query(text)
+    return [message for message in log_store.to_frame(['message'])['message']
+            if matches(node, split_terms(message or ''))]
+
+
+def test_parse_query():
+    assert parse_query('a b') == ('and', [('terms', [b'a']), ('terms', [b'b'])])
+    assert parse_query('"Deferred: Connection refused" OR -x') == \
+        ('or', [('terms', [b'deferred', b'connection', b'refused']), ('not', ('terms', [b'x']))])
+    assert parse_query('NOT (a AND b)') == ('not', ('and', [('terms', [b'a']), ('terms', [b'b'])]))
+    for text in ('', '(a', 'a )', '"..."', 'foo NOT', 'foo -'):
+        with pytest.raises(ValueError):
+            parse_query(text)
+
+
+def test_terms():
+    assert split_terms('Failed password from 63.126.79.67. port 22') == \
+        [b'failed', b'password', b'from', b'63.126.79.67', b'port', b'22']
+    assert expand(b'mail.yahoo.com') == [b'mail.yahoo.com', b'mail', b'yahoo', b'com']
+    assert contains_phrase([b'ad.doubleclick.net', b'login'], [b'doubleclick', b'login'])
+
+
+def test_block_index_masks():
+    # Términos frecuentes (mapa de bits) y poco frecuentes (lista de filas) en el mismo bloque.
+    messages = ['común'] * 40 + ['común raro', None, 'otro.dominio.es']
+    index = BlockIndex(len(messages), *build_index(messages))
+    assert index.mask('común'.encode()).sum() == 41 and index.dense.any() and not index.dense.all()
+    assert np.flatnonzero(index.mask(b'raro')).tolist() == [40]
+    assert np.flatnonzero(index.mask(b'dominio')).tolist() == [42]
+    assert not index.mask(b'nada').any()
+
+
+@pytest.mark.parametrize('text', QUERIES)
+def test_search_matches_scan(log_store, text):
+    result = search(log_store, text, columns=['timestamp', 'message'])
+    assert result['message'].tolist() == expected(log_store, text)
+    assert result['timestamp'].is_monotonic_increasing
+
+
+def test_search_with_filters(log_store):
+    result = search(log_store, 'session', app_name='sshd', start='2006-02-28 00:00:05', columns=['app_name', 'message'])
+    assert len(result) and set(result['app_name']) == {'sshd'}
+    assert search(log_store, 'session', app_name='Squid').empty
@@ -0,0 +1,106 @@
+import io
+import os.path
+
+import pandas as pd
+
+from batch import FIELDS, parse_batches
+from conftest import YEAR, synthetic_lines, write_lines
+from main import SquidLogs, ingest_logs
+from frames import build_frame
+from squid import message_fields, url_host
+from store import save_store
+from traffic import bandwidth_by_client, user_agents
+
+# Líneas de access.log que el camino vectorizado no puede procesar por columnas: URL no ASCII, dos espacios entre
+# campos, estado sin dígitos y tiempo de respuesta que no cabe en int32.
+IRREGULAR = [
+    '1140000000.100    120 10.0.0.1 TCP_MISS/200 512 GET http://ejemplo.es/año - DIRECT/1.2.3.4 text/html\n',
+    '1140000000.200    120 10.0.0.1 TCP_MISS/200  512 GET http://www.google.com/ - DIRECT/1.2.3.4 text/html\n',
+    '1140000000.300    120 10.0.0.1 NONE/- 0 GET error:invalid-request - NONE/- -\n',
+    '1140000000.400 99999999999 10.0.0.1 TCP_MISS/503 0 CONNECT www.paypal.com:443 - DIRECT/1.2.3.4 -\n',
+    '1140000000.500      7 10.0.0.2 TCP_DENIED/403 1400 GET http://User@WWW.Example.com:8080/x - NONE/- text/html\n',
+]
+
+
+def line_frame(lines, fmt):
+    # Camino general: una expresión regular por línea.
+    batches = parse_batches(io.StringIO(''.join(lines)), lambda line: SquidLogs.fields(line, fmt), 100)
+    return pd.concat([batch.to_frame() for batch in batches], ignore_index=True)
+
+
+def test_vectorized_fields_match_regex():
+    samples = {'access': synthetic_lines('squid-access', 300) + IRREGULAR + synthetic_lines('squid-access', 50, seed=1),
+               'store': synthetic_lines('squid-store', 300)}
+    for fmt, lines in samples.items():
+        vectorized = SquidLogs.parse_block(''.join(lines).encode(), fmt=fmt).to_frame()
+        expected = line_frame(lines, fmt)
+        assert len(vectorized) == len(lines)
+        for column in FIELDS:
+            assert vectorized[column].astype(object).equals(expected[column].astype(object)), (fmt, column)
+
+
+SQUID_FORMATS = {'access': 'squid-access', 'cache': 'squid-cache', 'store': 'squid-store', 'referer': 'squid-referer',
+                 'useragent': 'squid-useragent'}
+
+
+def test_format_dispatch():
+    for fmt, name in SQUID_FORMATS.items():
+        line = synthetic_lines(name, 1)[0]
+        # Sin formato se prueban las expresiones en orden y se obtiene lo mismo que con el formato del fichero.
+        expected = SquidLogs.fields(line, fmt)
+        assert SquidLogs.fields(line) == expected, fmt
+        assert expected['app_name'] == 'Squid' and expected['timestamp'].year == YEAR
+    # Si la línea no encaja con el formato indicado, se prueba con el resto.
+    line = synthetic_lines('squid-access', 1)[0]
+    assert SquidLogs.fields(line, 'cache') == SquidLogs.fields(line, 'access')
+    assert SquidLogs.fields(line, 'cache')['typed_fields']['status'] == '200'
+
+
+def test_detect_format(tmp_path):
+    assert SquidLogs.detect_format('/var/log/squid/access.log.3') == 'access'
+    assert SquidLogs.detect_format('referer_log.log') == 'referer'
+    # Si el nombre no identifica el formato, se decide por las primeras líneas.
+    for fmt, name in SQUID_FORMATS.items():
+        path = write_lines(os.path.join(tmp_path, name), synthetic_lines(name, 20))
+        assert SquidLogs.detect_format(path) == fmt
+    path = write_lines(os.path.join(tmp_path, 'otro'), ['no es squid\n'])
+    assert SquidLogs.detect_format(path) is None
+
+
+def test_message_fields():
+    assert message_fields('7 TCP_DENIED/403 1400 GET http://User@WWW.Example.com:8080/x - NONE/- text/html') == {
+        'elapsed_ms': 7, 'bytes': 1400, 'status': '403', 'result': 'TCP_DENIED', 'method': 'GET',
+        'url_host': 'www.example.com'}
+    assert message_fields('Mozilla/4.0 (compatible)', 'useragent') == {'user_agent': 'Mozilla/4.0 (compatible)'}
+    assert message_fields('storeDirWriteCleanLogs: Starting...', 'cache') is None
+    assert url_host('www.paypal.com:443', 'CONNECT') == 'www.paypal.com'
+    assert url_host('error:invalid-request', 'GET') is None
+
+
+def test_irregular_lines_keep_row_order():
+    frame = SquidLogs.parse_block(''.join(IRREGULAR).encode(), fmt='access').to_frame()
+    # Con dos espacios o sin estado numérico, la línea no encaja con squid.ACCESS y no tiene campos.
+    assert frame['status'].astype(object).where(frame['status'].notna(), None).tolist() == \
+        ['200', None, None, '503', '403']
+    assert frame['elapsed_ms'].tolist() == [120, pd.NA, pd.NA, pd.NA, 7]
+    assert isinstance(frame['status'].dtype, pd.CategoricalDtype)
+
+
+def test_store_keeps_typed_fields(log_dir, tmp_path):
+    frame = build_frame(ingest_logs(log_dir, year=YEAR))
+    store = save_store(frame, str(tmp_path / 'store'), block_rows=700)
+    stored = store.to_frame(['app_name'] + FIELDS)
+    expected = frame.sort_values('timestamp', kind='stable', ignore_index=True)
+    for column in FIELDS:
+        assert stored[column].astype(object).equals(expected[column].astype(object)), column
+    assert stored['user_agent'].notna().sum() == 500
+
+    # El ancho de banda por cliente coincide con el de los campos del dataframe.
+    access = expected[expected['elapsed_ms'].notna() & expected['host_name'].notna()]
+    bandwidth = bandwidth_by_client(store).set_index('client')
+    assert bandwidth['bytes'].sum() == access['bytes'].sum()
+    assert bandwidth['requests'].sum() == len(access)
+
+    agents = user_agents(store)
+    assert agents['requests'].sum() == 500
+    assert agents['clients'].le(agents['requests']).all()
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from batch import COLUMNS
+from store import LogStore, iter_blocks, save_store
+
+
+def test_round_trip(log_frame, log_store):
+    assert len(log_store) == len(log_frame)
+    rows = [block['rows'] for block in log_store.blocks]
+    assert sum(rows) == len(log_frame) and set(rows[:-1]) == {1000} and 0 < rows[-1] <= 1000
+    stored = LogStore(log_store.path).to_frame()
+    expected = log_frame.sort_values(by='timestamp', kind='stable', ignore_index=True)
+    for column in COLUMNS:
+        if column == 'struct_data':
+            continue
+        assert stored[column].astype(object).equals(expected[column].astype(object)), column
+
+
+def test_blocks_are_memory_mapped(log_store):
+    values = log_store.read_array(0, 'timestamp')
+    assert isinstance(values, np.memmap) or isinstance(values.base, np.memmap)
+    assert np.all(np.diff(values) >= 0)
+
+
+def test_append_keeps_previous_codes(log_frame, tmp_path):
+    first, second = log_frame.iloc[:1000], log_frame.iloc[1000:]
+    store = save_store(first, str(tmp_path / 'store'))
+    before = store.block_frame(0, ['app_name'])
+    store.append(second.reset_index(drop=True))
+    assert LogStore(store.path).block_frame(0, ['app_name']).equals(before)
+    assert len(LogStore(store.path)) == len(log_frame)
+
+
+def test_column_subset(log_store):
+    frames = list(iter_blocks(log_store.path, ['timestamp', 'app_name']))
+    assert all(list(frame.columns) == ['timestamp', 'app_name'] for frame in frames)
+    assert pd.concat(frames)['timestamp'].is_monotonic_increasing
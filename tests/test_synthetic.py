@@ -0,0 +1,36 @@
+import os.path
+
+import pytest
+
+from benchmarks.synthetic import FORMATS, START, write_log
+from conftest import YEAR, synthetic_lines
+from main import find_parser, ingest_file
+
+
+def test_reproducible_by_seed():
+    for fmt in FORMATS:
+        assert synthetic_lines(fmt, 50) == synthetic_lines(fmt, 50), fmt
+        assert synthetic_lines(fmt, 50) != synthetic_lines(fmt, 50, seed=1), fmt
+
+
+@pytest.mark.parametrize('fmt', list(FORMATS))
+def test_every_line_parses(fmt, tmp_path):
+    # Cada formato se escribe con el nombre de fichero de su clase y todas sus líneas encajan con ella.
+    path = write_log(str(tmp_path), fmt, 50000)
+    parser_class = find_parser(os.path.basename(path))
+    assert parser_class is not None
+    batches = list(ingest_file(path, parser_class, year=YEAR))
+    with open(path, encoding='utf8') as f:
+        lines = sum(1 for _ in f)
+    assert sum(len(batch) for batch in batches) == lines and not sum(batch.failures for batch in batches)
+    timestamp = batches[0].to_frame()['timestamp']
+    assert timestamp.iloc[0].timestamp() >= START and timestamp.is_monotonic_increasing
+
+
+def test_write_log_reuses_files(tmp_path):
+    path = write_log(str(tmp_path), 'syslog', 20000, compress=True)
+    assert path.endswith('messages.gz') and os.path.getsize(path) > 0
+    modified = os.path.getmtime(path)
+    assert write_log(str(tmp_path), 'syslog', 20000, compress=True) == path
+    assert os.path.getmtime(path) == modified
+    assert not os.path.exists(path + '.partial')
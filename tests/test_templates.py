@@ -0,0 +1,63 @@
+import os.path
+
+import numpy as np
+
+import templates
+from batch import MISSING, LogBatch
+from conftest import YEAR
+from frames import build_frame
+from main import ingest_logs
+from store import LogStore, save_store
+from templates import TemplateMiner
+
+
+def test_round_trip(tmp_path):
+    messages = ['session opened for user root by (uid=0)', 'session opened for user alice by (uid=500)',
+                'Did not receive identification string from 10.0.0.1', None, 'llaves {0} y  dos espacios ',
+                '', 'session opened for user root by (uid=0)']
+    miner = TemplateMiner()
+    codes, params = miner.encode(messages)
+    assert codes[3] == MISSING and codes[0] == codes[-1]
+    assert miner.decode(codes, params) == messages
+    # El estado guardado reconstruye los mismos mensajes.
+    miner.save(str(tmp_path))
+    loaded = TemplateMiner.load(str(tmp_path))
+    assert loaded.decode(codes, params) == messages
+    assert loaded.encode(messages)[0].tolist() == codes.tolist()
+
+
+def test_signatures_are_bounded(monkeypatch):
+    monkeypatch.setattr(templates, 'MAX_SIGNATURES', 8)
+    # Campos variables sin dígitos: cada usuario es una firma distinta.
+    messages = [f'session opened for user {chr(97 + i % 26) * (1 + i // 26)} by root' for i in range(100)]
+    miner = TemplateMiner()
+    for start in range(0, len(messages), 10):
+        chunk = messages[start:start + 10]
+        codes, params = miner.encode(chunk)
+        assert miner.decode(codes, params) == chunk
+        assert len(miner.signatures) <= 8
+    assert list(miner.signatures)[-1] == 'session opened for user ' + 'v' * 4 + ' by root'
+
+
+def test_batches_mined_at_parse_time(log_dir, log_frame, tmp_path):
+    miner = TemplateMiner()
+    frame = build_frame(ingest_logs(log_dir, year=YEAR), miner)
+    assert frame['template'].dtype == np.int32
+    assert miner.decode(frame['template'].to_numpy(), frame['params'].tolist()) == log_frame['message'].tolist()
+
+    mined = save_store(frame, os.path.join(tmp_path, 'mined'), block_rows=1000, miner=miner)
+    plain = save_store(log_frame, os.path.join(tmp_path, 'plain'), block_rows=1000)
+    mined, plain = LogStore(mined.path), LogStore(plain.path)
+    assert mined.to_frame()['message'].equals(plain.to_frame()['message'])
+    assert mined.templates()['count'].sum() == plain.templates()['count'].sum() == log_frame['message'].notna().sum()
+
+
+def test_extend_drops_partial_mining():
+    miner = TemplateMiner()
+    first = LogBatch.from_columns(np.zeros(2, dtype=np.int64), ['a 1', 'b 2'])
+    second = LogBatch.from_columns(np.zeros(1, dtype=np.int64), ['a 3'])
+    first.mine(miner)
+    combined = LogBatch.concat([first])
+    assert combined.template is not None and len(combined.params) == 2
+    combined.extend(second)
+    assert combined.template is None and combined.params is None
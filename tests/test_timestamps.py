@@ -0,0 +1,26 @@
+import datetime
+import os
+
+from timestamps import UTC, decode_clf, decode_epoch, decode_syslog, fixed_offset, reference_year
+
+
+def test_decode_syslog():
+    assert decode_syslog('Feb 28 04:15:00', 2006) == datetime.datetime(2006, 2, 28, 4, 15, tzinfo=UTC)
+    assert decode_syslog('Jan  2 00:00:01', 2006) == datetime.datetime(2006, 1, 2, 0, 0, 1, tzinfo=UTC)
+
+
+def test_decode_clf_converts_to_utc():
+    assert decode_clf('16/Jun/2005:20:57:04 -0400') == datetime.datetime(2005, 6, 17, 0, 57, 4, tzinfo=UTC)
+    assert fixed_offset('-0400') is fixed_offset('-0400')
+
+
+def test_decode_epoch():
+    assert decode_epoch('1118969826.250') == datetime.datetime(2005, 6, 17, 0, 57, 6, 250000, tzinfo=UTC)
+
+
+def test_reference_year(tmp_path):
+    path = tmp_path / 'messages'
+    path.write_text('')
+    os.utime(path, (1141084800, 1141084800))
+    assert reference_year(str(path)) == 2006
+    assert reference_year(str(path), 2023) == 2023
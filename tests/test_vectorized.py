@@ -0,0 +1,48 @@
+import io
+
+import pandas as pd
+
+from batch import COLUMNS, LogBatch, parse_batches
+from conftest import YEAR, synthetic_lines
+from main import UnixLogs
+
+# Líneas syslog que el camino vectorizado no puede procesar por columnas o que no encajan con el formato: sin etiqueta,
+# etiqueta sin pid, host no ASCII, pid demasiado largo, día con un solo dígito, mensaje con bytes no UTF-8, línea corta
+# y línea que no es syslog.
+IRREGULAR = [
+    b'Feb 28 10:00:00 hnet-hon -- MARK --\n',
+    b'Feb 28 10:00:01 hnet-hon kernel: eth0: link up\n',
+    b'Feb 28 10:00:02 m\xc3\xa1quina sshd[12]: Accepted publickey for root\n',
+    b'Feb 28 10:00:03 hnet-hon sshd[12345678901234567890]: pid fuera de rango\n',
+    b'Mar  1 00:00:00 hnet-hon crond[7]: (root) CMD (run-parts /etc/cron.hourly)\n',
+    b'Mar  1 00:00:01 hnet-hon sshd[8]: usuario \xff\xfe\n',
+    b'Mar  1 00:00\n',
+    b'no es syslog\n',
+]
+
+
+def line_frame(data: bytes) -> pd.DataFrame:
+    # Camino general: una expresión regular por línea.
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf8', errors='backslashreplace')
+    batches = parse_batches(lines, lambda line: UnixLogs.fields(line, YEAR), 100)
+    return LogBatch.concat(batches).to_frame()
+
+
+def test_vectorized_syslog_matches_regex():
+    lines = [line.encode() for line in synthetic_lines('syslog', 300)]
+    data = b''.join(lines[:100] + IRREGULAR + lines[100:])
+    vectorized = UnixLogs.parse_block(data, year=YEAR)
+    expected = line_frame(data)
+    # Todas las líneas salvo la corta y la que no es syslog, en el orden del bloque.
+    assert len(vectorized) == len(expected) == len(lines) + len(IRREGULAR) - 2 and vectorized.failures == 2
+    frame = vectorized.to_frame()
+    for column in COLUMNS:
+        if column == 'struct_data':
+            continue
+        assert frame[column].astype(object).equals(expected[column].astype(object)), column
+
+
+def test_carriage_returns_use_line_path():
+    data = b'Feb 28 10:00:00 hnet-hon sshd[1]: uno\r\nFeb 28 10:00:01 hnet-hon sshd[1]: dos\r\n'
+    frame = UnixLogs.parse_block(data, year=YEAR).to_frame()
+    assert frame['message'].tolist() == line_frame(data)['message'].tolist()
@@ -0,0 +1,84 @@
+import datetime
+import functools
+import os.path
+
+# Decodificación de timestamps compartida por todas las clases de logs. Los formatos de texto de syslog, CUPS y httpd
+# repiten el mismo segundo en muchas líneas consecutivas, por lo que cada texto distinto se decodifica una sola vez y
+# el resultado se reutiliza a través de una caché. Las zonas horarias de desplazamiento fijo también se crean una sola
+# vez por desplazamiento.
+
+UTC = datetime.timezone.utc
+MONTHS = {month: number for number, month in enumerate(
+    ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'], start=1)}
+
+# Número máximo de textos distintos que conserva la caché de cada formato.
+CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=None)
+def fixed_offset(offset: str) -> datetime.timezone:
+    """
+    :param offset: Desplazamiento respecto a UTC en formato ±HHMM, por ejemplo -0500.
+    :return: Zona horaria de desplazamiento fijo, compartida por todas las líneas con ese desplazamiento.
+    """
+    sign = -1 if offset[0] == '-' else 1
+    return datetime.timezone(sign * datetime.timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5])))
+
+
+def reference_year(log_file: str = None, year: int = None) -> int:
+    """
+    :param log_file: Fichero fuente del log.
+    :param year: Año indicado explícitamente.
+    :return: Año con el que completar los timestamps que no lo incluyen.
+
+    Se usa el año explícito si se indica y, si no, el de la fecha de modificación del fichero. Solo si tampoco hay
+    fichero se recurre al año actual.
+    """
+    if year is not None:
+        return year
+    if log_file is not None:
+        return datetime.datetime.fromtimestamp(os.path.getmtime(log_file), UTC).year
+    return datetime.datetime.now().year
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def decode_syslog(text: str, year: int) -> datetime.datetime:
+    """
+    :param text: Timestamp con el formato de syslog (RFC3164), por ejemplo 'Jan 22 04:15:00'.
+    :param year: Año del timestamp, que el formato no incluye.
+    :return: Instante en UTC.
+    """
+    return datetime.datetime(year, MONTHS[text[:3]], int(text[4:6]), int(text[7:9]), int(text[10:12]),
+                             int(text[13:15]), tzinfo=UTC)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def decode_clf(text: str) -> datetime.datetime:
+    """
+    :param text: Timestamp con el formato de CUPS y httpd (Common Log Format), por ejemplo '22/Jan/2006:04:10:51 -0500'.
+    :return: Instante en UTC.
+    """
+    if len(text) != 26:
+        return datetime.datetime.strptime(text, '%d/%b/%Y:%H:%M:%S %z').astimezone(UTC)
+    return datetime.datetime(int(text[7:11]), MONTHS[text[3:6]], int(text[:2]), int(text[12:14]), int(text[15:17]),
+                             int(text[18:20]), tzinfo=fixed_offset(text[21:])).astimezone(UTC)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def decode_local(text: str, fmt: str) -> datetime.datetime:
+    """
+    :param text: Timestamp en hora local, sin zona horaria.
+    :param fmt: Formato del timestamp, con la notación de strptime.
+    :return: Instante en UTC.
+    """
+    return datetime.datetime.strptime(text, fmt).astimezone(UTC)
+
+
+def decode_epoch(text: str) -> datetime.datetime:
+    """
+    :param text: Segundos desde el 1 de enero de 1970 con decimales, como en los logs de Squid.
+    :return: Instante en UTC.
+
+    Estos timestamps tienen resolución de milisegundos y casi nunca se repiten, por lo que no pasan por ninguna caché.
+    """
+    return datetime.datetime.fromtimestamp(float(text), UTC)
@@ -0,0 +1,130 @@
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+
+from batch import MISSING
+from query import LogIndex, TimeBound, to_nanoseconds
+from squid import FIELDS, SQUID_APP
+from store import STORE_PATH, LogStore
+
+# Informes de tráfico del proxy Squid a partir de los campos tipados del almacén (véase squid.py): ancho de banda por
+# cliente y latencia por dominio. Solo se leen los bloques con filas de Squid en el rango de tiempo pedido, y de ellos
+# solo las columnas que agrega cada informe; los agregados se calculan con bincount sobre los códigos de diccionario.
+# Uso: bandwidth_by_client('logs.store', start='2006-01-01'), latency_by_domain('logs.store'), user_agents('logs.store')
+
+# Cuantiles de la latencia por dominio.
+QUANTILES = {'median_ms': 0.5, 'p95_ms': 0.95}
+
+
+def read_fields(index: LogIndex, columns: List[str], start: TimeBound = None,
+                end: TimeBound = None) -> Dict[str, np.ndarray]:
+    """
+    :param index: Índice del almacén.
+    :param columns: Campos de squid.FIELDS o columnas de diccionario del almacén (como host_name) que se quieren leer.
+    :return: Valores de las columnas en las filas de Squid del rango de tiempo, concatenados. Los campos de texto y las
+        columnas de diccionario se devuelven como códigos.
+    """
+    start, end = to_nanoseconds(start), to_nanoseconds(end)
+    filters = {'app_name': index.lookup('app_name', SQUID_APP)}
+    parts = {column: [] for column in columns}
+    for block in index.candidates(start, end, filters):
+        rows = index.select_rows(block, start, end, filters)
+        fields = index.store.read_fields(block, rows)
+        for column in columns:
+            parts[column].append(fields[column] if column in FIELDS else index.store.read_column(block, column, rows))
+    return {column: np.concatenate(values) if values else np.empty(0, dtype=np.int64)
+            for column, values in parts.items()}
+
+
+def bandwidth_by_client(store: Union[str, LogStore] = STORE_PATH, start: TimeBound = None,
+                        end: TimeBound = None) -> pd.DataFrame:
+    """
+    :param store: Almacén o directorio del almacén.
+    :param start: Inicio del rango de tiempo, incluido. Por defecto, sin límite.
+    :param end: Fin del rango de tiempo, excluido. Por defecto, sin límite.
+    :return: Dataframe con una fila por cliente de access.log (client): número de peticiones, bytes servidos y tiempo de
+        respuesta total (elapsed_ms), ordenado de mayor a menor número de bytes.
+    """
+    index = LogIndex(store)
+    fields = read_fields(index, ['host_name', 'elapsed_ms', 'bytes'], start, end)
+    # Las filas de access.log son las que tienen cliente y tiempo de respuesta.
+    rows = (fields['host_name'] != MISSING) & (fields['elapsed_ms'] != MISSING)
+    client = fields['host_name'][rows]
+    size = np.where(fields['bytes'][rows] == MISSING, 0, fields['bytes'][rows])
+    clients = index.store.meta['dictionaries']['host_name']
+    requests = np.bincount(client, minlength=len(clients))
+    used = np.flatnonzero(requests)
+    frame = pd.DataFrame({
+        'client': [clients[code] for code in used.tolist()],
+        'requests': requests[used],
+        'bytes': np.bincount(client, weights=size, minlength=len(clients))[used].astype(np.int64),
+        'elapsed_ms': np.bincount(client, weights=fields['elapsed_ms'][rows],
+                                  minlength=len(clients))[used].astype(np.int64),
+    })
+    return frame.sort_values('bytes', ascending=False, kind='stable', ignore_index=True)
+
+
+def latency_by_domain(store: Union[str, LogStore] = STORE_PATH, start: TimeBound = None,
+                      end: TimeBound = None) -> pd.DataFrame:
+    """
+    :param store: Almacén o directorio del almacén.
+    :param start: Inicio del rango de tiempo, incluido. Por defecto, sin límite.
+    :param end: Fin del rango de tiempo, excluido. Por defecto, sin límite.
+    :return: Dataframe con una fila por host de destino de access.log (url_host): número de peticiones, tiempo de
+        respuesta medio, mediano, del percentil 95 y máximo en milisegundos, y bytes servidos, ordenado de mayor a menor
+        tiempo medio.
+
+    Los cuantiles son el valor observado en la posición correspondiente, sin interpolar. Se obtienen ordenando las
+    filas por host y tiempo de respuesta y tomando, en el tramo de cada host, la posición del cuantil.
+    """
+    index = LogIndex(store)
+    fields = read_fields(index, ['url_host', 'elapsed_ms', 'bytes'], start, end)
+    rows = (fields['url_host'] != MISSING) & (fields['elapsed_ms'] != MISSING)
+    host = fields['url_host'][rows]
+    elapsed = fields['elapsed_ms'][rows].astype(np.int64)
+    size = np.where(fields['bytes'][rows] == MISSING, 0, fields['bytes'][rows])
+    hosts = index.store.meta['dictionaries']['url_host']
+    requests = np.bincount(host, minlength=len(hosts))
+    used = np.flatnonzero(requests)
+
+    order = np.lexsort((elapsed, host))
+    ordered = elapsed[order]
+    first = np.concatenate([[0], np.cumsum(requests)[:-1]])[used]
+    count = requests[used]
+    frame = pd.DataFrame({
+        'url_host': [hosts[code] for code in used.tolist()],
+        'requests': count,
+        'mean_ms': np.bincount(host, weights=elapsed, minlength=len(hosts))[used] / count,
+    })
+    for column, quantile in QUANTILES.items():
+        frame[column] = ordered[first + np.floor(quantile * (count - 1)).astype(np.int64)]
+    frame['max_ms'] = ordered[first + count - 1]
+    frame['bytes'] = np.bincount(host, weights=size, minlength=len(hosts))[used].astype(np.int64)
+    return frame.sort_values('mean_ms', ascending=False, kind='stable', ignore_index=True)
+
+
+def user_agents(store: Union[str, LogStore] = STORE_PATH, start: TimeBound = None,
+                end: TimeBound = None) -> pd.DataFrame:
+    """
+    :param store: Almacén o directorio del almacén.
+    :param start: Inicio del rango de tiempo, incluido. Por defecto, sin límite.
+    :param end: Fin del rango de tiempo, excluido. Por defecto, sin límite.
+    :return: Dataframe con una fila por agente de usuario de useragent_log (user_agent): número de peticiones y de
+        clientes distintos, ordenado de mayor a menor número de peticiones.
+    """
+    index = LogIndex(store)
+    fields = read_fields(index, ['user_agent', 'host_name'], start, end)
+    rows = fields['user_agent'] != MISSING
+    agent = fields['user_agent'][rows]
+    agents = index.store.meta['dictionaries']['user_agent']
+    requests = np.bincount(agent, minlength=len(agents))
+    used = np.flatnonzero(requests)
+    # Clientes distintos: pares (agente, cliente) únicos, contados por agente.
+    pairs = np.unique(np.stack([agent, fields['host_name'][rows]]), axis=1)
+    frame = pd.DataFrame({
+        'user_agent': [agents[code] for code in used.tolist()],
+        'requests': requests[used],
+        'clients': np.bincount(pairs[0], minlength=len(agents))[used],
+    })
+    return frame.sort_values('requests', ascending=False, kind='stable', ignore_index=True)
@@ -0,0 +1,433 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from batch import FIELD_LIMITS, MISSING, LogBatch, SparseFields
+from squid import SQUID_APP, parse_fields, url_host
+
+# Procesamiento vectorizado de bloques de líneas de los formatos de columnas fijas (syslog y los access.log y store.log
+# de Squid). En lugar de aplicar una expresión regular a cada línea, el bloque completo se trata como un array de bytes:
+# los separadores, los campos y los timestamps se obtienen columna a columna con operaciones de NumPy, y los textos
+# (mensajes, hosts y aplicaciones) se reúnen en un único buffer que se decodifica y se divide de una vez.
+#
+# El resultado es idéntico al de las expresiones regulares de main.py. Las líneas en las que el camino vectorizado no
+# puede garantizarlo (formato distinto, caracteres no ASCII antes del mensaje, pid o timestamps fuera de rango) se
+# procesan con el camino general, línea a línea, conservando el orden de las líneas del bloque.
+
+# Caracteres ASCII que la clase \s de las expresiones regulares de Python considera espacios. El salto de línea separa
+# además las líneas del bloque.
+WHITESPACE = np.zeros(256, dtype=bool)
+WHITESPACE[[0x09, 0x0a, 0x0b, 0x0c, 0x0d, 0x1c, 0x1d, 0x1e, 0x1f, 0x20]] = True
+DIGIT = np.zeros(256, dtype=bool)
+DIGIT[ord('0'):ord('9') + 1] = True
+NON_ASCII = np.arange(256) >= 0x80
+SLASH = np.zeros(256, dtype=bool)
+SLASH[ord('/')] = True
+# Caracteres que terminan la etiqueta (app_name) de una línea syslog.
+TAG_END = WHITESPACE.copy()
+TAG_END[[ord('['), ord(':')]] = True
+
+MONTHS = [b'Jan', b'Feb', b'Mar', b'Apr', b'May', b'Jun', b'Jul', b'Aug', b'Sep', b'Oct', b'Nov', b'Dec']
+
+NANOSECONDS = 10 ** 9
+POWERS = 10 ** np.arange(19, dtype=np.int64)
+
+# Número máximo de dígitos de las partes entera y decimal de los timestamps de Squid en el camino vectorizado. Con seis
+# decimales o menos y menos de 4e9 segundos (hasta el año 2096), el error de la conversión a float de decode_epoch queda
+# por debajo de medio microsegundo y su redondeo a microsegundos coincide con la conversión exacta.
+EPOCH_DIGITS = 10
+FRACTION_DIGITS = 6
+
+# Número máximo de dígitos del tiempo de respuesta de access.log en el camino vectorizado.
+TIME_DIGITS = 12
+
+# Número máximo de dígitos de los bytes y del estado HTTP de access.log en el camino vectorizado (los bytes caben en
+# int64).
+FIELD_DIGITS = 18
+
+# Número máximo de dígitos de un pid que cabe en la columna int32.
+PID_DIGITS = 9
+
+# Número máximo de caracteres imprimibles de una tabla para que Block.mask la resuelva con comparaciones.
+MASK_COMPARISONS = 8
+
+# Longitud media a partir de la cual Block.strings copia los tramos como cortes de bytes en lugar de con un índice de
+# NumPy por byte.
+SLICE_BYTES = 32
+
+# Longitud mínima de una línea syslog: timestamp de 15 caracteres, espacio, host de al menos un carácter y espacio.
+SYSLOG_MIN_LENGTH = 18
+
+
+class Block:
+    # Bloque de líneas completas como array de bytes, con la posición de inicio y de fin (el salto de línea) de cada
+    # línea. Si la última línea no termina en salto de línea, el array lo añade, pero data conserva el bloque original.
+    # Al final del array se añaden un espacio y un salto de línea, que sirven de separadores al reunir textos.
+
+    def __init__(self, data: bytes):
+        self.data = data
+        if not data.endswith(b'\n'):
+            data += b'\n'
+        self.size = len(data)
+        self.padded = data + b' \n'
+        self.bytes = np.frombuffer(self.padded, dtype=np.uint8)
+        self.found: Dict[bytes, np.ndarray] = {}
+        self.special: Optional[np.ndarray] = None
+        self.ends = np.flatnonzero(self.bytes[:self.size] == ord('\n'))
+        self.starts = np.empty_like(self.ends)
+        self.starts[:1] = 0
+        self.starts[1:] = self.ends[:-1] + 1
+
+    def __len__(self):
+        return len(self.ends)
+
+    def positions(self, table: np.ndarray) -> np.ndarray:
+        """
+        :param table: Tabla de 256 booleanos con los bytes que se buscan.
+        :return: Posiciones de los bytes de table en el array, terminadas con la del último byte del array. Se calculan
+            una sola vez por tabla.
+        """
+        key = table.tobytes()
+        if key not in self.found:
+            self.found[key] = np.append(np.flatnonzero(self.mask(table)), len(self.bytes) - 1)
+        return self.found[key]
+
+    def mask(self, table: np.ndarray) -> np.ndarray:
+        """
+        :param table: Tabla de 256 booleanos.
+        :return: Si cada byte del array pertenece a table.
+
+        Los logs son casi por completo ASCII imprimible. Si table contiene pocos caracteres imprimibles, se comparan el
+        array con cada uno de ellos y solo se consulta la tabla en las posiciones de los bytes de control y no ASCII
+        (los saltos de línea y poco más), lo que es mucho más rápido que indexar la tabla con el array completo.
+        """
+        printable = np.flatnonzero(table[0x20:0x7f]) + 0x20
+        if len(printable) > MASK_COMPARISONS:
+            return np.take(table, self.bytes)
+        mask = np.zeros(len(self.bytes), dtype=bool)
+        for value in printable:
+            mask |= self.bytes == value
+        if self.special is None:
+            self.special = np.flatnonzero((self.bytes < 0x20) | (self.bytes >= 0x7f))
+        mask[self.special] = table[self.bytes[self.special]]
+        return mask
+
+    def window(self, start: np.ndarray, width: int) -> np.ndarray:
+        """
+        :return: Matriz (tramos, width) con los width bytes que siguen a cada posición de start.
+        """
+        return self.bytes[np.minimum(start[:, None] + np.arange(width), len(self.bytes) - 1)]
+
+    def matches(self, table: np.ndarray, start: np.ndarray, end: np.ndarray, width: int) -> np.ndarray:
+        """
+        :param width: Longitud máxima de los tramos.
+        :return: Si los tramos [start, end) no están vacíos, no superan width bytes y solo contienen bytes de table.
+        """
+        length = end - start
+        inside = np.arange(width) < length[:, None]
+        return (length > 0) & (length <= width) & (table[self.window(start, width)] | ~inside).all(axis=1)
+
+    def ascii(self, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+        """
+        :return: Si los tramos [start, end) solo contienen caracteres ASCII.
+        """
+        return self.next(NON_ASCII, start) >= end
+
+    def next(self, table: np.ndarray, start: np.ndarray) -> np.ndarray:
+        """
+        :param table: Tabla de 256 booleanos con los bytes que se buscan.
+        :return: Posición del primer byte de table a partir de cada posición de start, o la del último byte del array
+            si no hay ninguno.
+        """
+        positions = self.positions(table)
+        return positions[np.minimum(np.searchsorted(positions, start), len(positions) - 1)]
+
+    def tokens(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param count: Número de campos separados por espacios que se quieren localizar al principio de cada línea.
+        :return: Arrays (líneas, count) con el inicio y el fin de cada campo, o -1 si la línea tiene menos campos.
+        """
+        # Los cambios entre espacio y no espacio alternan inicio y fin de campo. El array termina en un salto de línea,
+        # por lo que todo campo tiene fin.
+        filled = ~self.mask(WHITESPACE)
+        changes = np.flatnonzero(filled[1:] != filled[:-1]) + 1
+        if filled[0]:
+            changes = np.concatenate([[0], changes])
+        token_starts = np.append(changes[0::2], self.size)
+        token_ends = np.append(changes[1::2], self.size)
+        # Los campos de cada línea son los count siguientes a su inicio, si empiezan antes de su salto de línea.
+        index = np.searchsorted(token_starts, self.starts)[:, None] + np.arange(count)
+        index = np.minimum(index, len(token_starts) - 1)
+        starts = token_starts[index]
+        inside = starts < self.ends[:, None]
+        starts = np.where(inside, starts, -1)
+        ends = np.where(inside, token_ends[index], -1)
+        return starts, ends
+
+    def number(self, start: np.ndarray, end: np.ndarray, width: int) -> np.ndarray:
+        """
+        :param width: Número máximo de dígitos de los tramos.
+        :return: Valor de los tramos [start, end) de dígitos decimales, de como mucho width dígitos.
+        """
+        positions = end[:, None] - width + np.arange(width)
+        digits = self.bytes[np.clip(positions, 0, self.size - 1)].astype(np.int64) - ord('0')
+        digits[positions < start[:, None]] = 0
+        return digits @ (10 ** np.arange(width - 1, -1, -1, dtype=np.int64))
+
+    def strings(self, parts: List[Tuple[np.ndarray, np.ndarray]], errors: str) -> List[str]:
+        """
+        :param parts: Tramos [start, end) que forman el texto de cada fila, en orden. El tramo (size, size + 1) inserta
+            un espacio.
+        :param errors: Tratamiento de los bytes que no son UTF-8 válido.
+        :return: Texto de cada fila, con todos los textos decodificados a la vez.
+
+        Los tramos se copian, con un salto de línea tras cada fila, en un único buffer que se decodifica y se divide con
+        str.split. Los tramos no contienen saltos de línea ni cortan ningún carácter multibyte, porque sus extremos son
+        siempre caracteres ASCII o el final de la línea. Los separadores (espacio o salto de línea) que en el bloque ya
+        siguen al tramo anterior en todas las filas se copian junto con él, de forma que cada fila suele necesitar una
+        sola copia.
+        """
+        rows = len(parts[0][0])
+        if not rows:
+            return []
+        newline = np.full(rows, self.size + 1)
+        merged = [parts[0]]
+        for start, end in parts[1:] + [(newline, newline + 1)]:
+            previous_start, previous_end = merged[-1]
+            if (start[0] >= self.size) and (self.bytes[previous_end] == self.bytes[start[0]]).all():
+                merged[-1] = (previous_start, previous_end + 1)
+            else:
+                merged.append((start, end))
+        starts = np.stack([start for start, _ in merged], axis=1).ravel()
+        lengths = np.stack([end - start for start, end in merged], axis=1).ravel()
+        if lengths.mean() < SLICE_BYTES:
+            # Tramos cortos: se reúnen con un único índice sobre el array.
+            offsets = np.cumsum(lengths) - lengths
+            data = self.bytes[np.arange(offsets[-1] + lengths[-1]) + np.repeat(starts - offsets, lengths)].tobytes()
+        else:
+            data = b''.join([self.padded[start:start + length]
+                             for start, length in zip(starts.tolist(), lengths.tolist())])
+        return data.decode('utf8', errors).split('\n')[:-1]
+
+
+def by_runs(block: Block, fast: np.ndarray, vectorized: Callable[[np.ndarray], LogBatch],
+            fallback: Callable[[bytes], LogBatch]) -> LogBatch:
+    """
+    :param block: Bloque de líneas.
+    :param fast: Si cada línea puede procesarse por el camino vectorizado.
+    :param vectorized: Función que construye el lote de las líneas indicadas (array de índices) por el camino
+        vectorizado.
+    :param fallback: Función que procesa por el camino general un tramo de líneas en bytes.
+    :return: Lote con todas las líneas del bloque, en orden.
+
+    Las líneas se agrupan en tramos consecutivos del mismo camino, de forma que el lote final conserva el orden del
+    bloque.
+    """
+    if fast.all():
+        return vectorized(np.arange(len(block)))
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(fast.astype(np.int8))) + 1, [len(block)]])
+    batches = []
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        if fast[first]:
+            batches.append(vectorized(np.arange(first, last)))
+        else:
+            batches.append(fallback(block.data[block.starts[first]:block.ends[last - 1] + 1]))
+    return LogBatch.concat(batches)
+
+
+def epoch_nanoseconds(block: Block, start: np.ndarray, end: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :return: Par (válido, nanosegundos) de los timestamps de Squid en los tramos [start, end), con formato \\d+\\.\\d+.
+    """
+    # Todo se calcula sobre una única matriz con los bytes de cada timestamp. Cada dígito vale 10 ** (9 + punto -
+    # columna) nanosegundos si está tras el punto y la décima parte si está antes.
+    width = EPOCH_DIGITS + 1 + FRACTION_DIGITS
+    length = end - start
+    text = block.window(start, width)
+    window = text - np.uint8(ord('0'))
+    column = np.arange(width)
+    inside = column < length[:, None]
+    digits = (window < 10) & inside
+    dots = (text == ord('.')) & inside
+    point = np.argmax(dots, axis=1)
+    valid = (start >= 0) & (length <= width) & (dots.sum(axis=1) == 1) & (digits.sum(axis=1) == length - 1)
+    valid &= (point > 0) & (point < length - 1) & (point <= EPOCH_DIGITS) & (length - point - 1 <= FRACTION_DIGITS)
+    # Con diez dígitos de segundos, el primero no puede pasar de 3 (véase EPOCH_DIGITS).
+    valid &= (point < EPOCH_DIGITS) | (window[:, 0] <= 3)
+    exponent = 9 + point[:, None] - column - (column < point[:, None])
+    values = np.where(digits, window, 0) * POWERS[np.clip(exponent, 0, len(POWERS) - 1)]
+    return valid, values.sum(axis=1)
+
+
+def access_fields(block: Block, rows: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                  message: List[str]) -> SparseFields:
+    """
+    :param block: Bloque de líneas de access.log.
+    :param rows: Líneas del bloque que se procesan.
+    :param starts: Inicio de los siete primeros campos de cada línea del bloque (véase Block.tokens).
+    :param ends: Fin de esos campos.
+    :param message: Mensaje de cada una de las líneas de rows.
+    :return: Campos tipados de las líneas, con su posición en rows.
+
+    Los campos del mensaje ('<ms> <resultado>/<estado> <bytes> <método> <URL>') son los campos 1 y 3 a 6 de la línea.
+    Se obtienen por columnas si la línea cumple la expresión squid.ACCESS: campos ASCII separados por un único espacio,
+    resultado y estado separados por la primera barra, y estado y bytes con solo dígitos. El resto de líneas se procesan
+    con la expresión regular.
+    """
+    starts, ends = starts[rows], ends[rows]
+    slash = block.next(SLASH, starts[:, 3])
+    fast = (starts[:, 6] >= 0) & block.ascii(starts[:, 3], np.where(starts[:, 6] >= 0, ends[:, 6], starts[:, 3]))
+    for token in (3, 4, 5):
+        fast &= (ends[:, token] + 1 == starts[:, token + 1]) & (block.bytes[np.maximum(ends[:, token], 0)] == ord(' '))
+    fast &= (slash > starts[:, 3]) & block.matches(DIGIT, slash + 1, ends[:, 3], FIELD_DIGITS)
+    fast &= block.matches(DIGIT, starts[:, 4], ends[:, 4], FIELD_DIGITS)
+
+    fields = SparseFields()
+    selected = np.flatnonzero(fast)
+    if len(selected):
+        starts, ends, slash = starts[selected], ends[selected], slash[selected]
+        elapsed = block.number(starts[:, 1], ends[:, 1], TIME_DIGITS)
+        method = block.strings([(starts[:, 5], ends[:, 5])], 'strict')
+        url = block.strings([(starts[:, 6], ends[:, 6])], 'strict')
+        fields.add_columns(selected,
+                           elapsed_ms=np.where(elapsed <= FIELD_LIMITS['elapsed_ms'], elapsed, MISSING),
+                           bytes=block.number(starts[:, 4], ends[:, 4], FIELD_DIGITS),
+                           status=block.strings([(slash + 1, ends[:, 3])], 'strict'),
+                           result=block.strings([(starts[:, 3], slash)], 'strict'),
+                           method=method,
+                           url_host=[url_host(*key) for key in zip(url, method)])
+    if not fast.all():
+        # Pocas líneas, de formato irregular: se procesan con la expresión regular y se intercalan en orden.
+        irregular = [None if regular else text for regular, text in zip(fast.tolist(), message)]
+        fields.extend(parse_fields(irregular, 'access'), 0)
+        fields.sort()
+    return fields
+
+
+def parse_squid(data: bytes, fmt: str, errors: str, fallback: Callable[[bytes], LogBatch]) -> Optional[LogBatch]:
+    """
+    :param data: Bloque de líneas completas de un fichero de Squid.
+    :param fmt: Formato del fichero según SquidLogs.detect_format.
+    :param errors: Tratamiento de los bytes que no son UTF-8 válido en los mensajes.
+    :param fallback: Procesamiento general de un tramo de líneas, usado con las que no encajan en el camino vectorizado.
+    :return: Lote con las líneas del bloque, o None si el formato no tiene camino vectorizado.
+
+    Formatos access (timestamp, tiempo de respuesta, cliente y resto) y store (timestamp y resto). El mensaje de access
+    es el tiempo de respuesta seguido del resto de la línea, como en SquidLogs.fields. Los campos tipados de los
+    mensajes (véase squid.py) se obtienen por columnas en access y con su expresión regular en store.
+    """
+    if fmt not in ('access', 'store'):
+        return None
+    if b'\r' in data:
+        # La lectura en modo texto también separa las líneas en los retornos de carro: el bloque va entero por el camino
+        # general para que las líneas sean las mismas.
+        return fallback(data)
+    block = Block(data)
+    starts, ends = block.tokens(7 if fmt == 'access' else 2)
+    rest = starts[:, 3 if fmt == 'access' else 1]
+    fast, timestamp = epoch_nanoseconds(block, starts[:, 0], ends[:, 0])
+    fast &= (starts[:, 0] == block.starts) & (rest >= 0)
+    fast &= block.ascii(block.starts, np.where(fast, rest, block.starts))
+    if fmt == 'access':
+        fast &= block.matches(DIGIT, starts[:, 1], ends[:, 1], TIME_DIGITS)
+
+    def vectorized(rows: np.ndarray) -> LogBatch:
+        if fmt == 'access':
+            space = np.full(len(rows), block.size)
+            message = block.strings([(starts[rows, 1], ends[rows, 1]), (space, space + 1),
+                                     (rest[rows], block.ends[rows])], errors)
+            host_name = block.strings([(starts[rows, 2], ends[rows, 2])], 'strict')
+            return LogBatch.from_columns(timestamp[rows], message, access_fields(block, rows, starts, ends, message),
+                                         host_name=host_name, app_name=SQUID_APP)
+        message = block.strings([(rest[rows], block.ends[rows])], errors)
+        return LogBatch.from_columns(timestamp[rows], message, parse_fields(message, 'store'), app_name=SQUID_APP)
+
+    return by_runs(block, fast, vectorized, fallback)
+
+
+def month_days(year: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :return: Par (día de inicio de cada mes desde 1970, número de días de cada mes) para un año.
+    """
+    starts = np.arange(f'{year}-01', f'{year + 1}-02', dtype='datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    return starts[:-1], np.diff(starts)
+
+
+def parse_syslog(data: bytes, year: int, errors: str, fallback: Callable[[bytes], LogBatch]) -> LogBatch:
+    """
+    :param data: Bloque de líneas completas de un fichero syslog.
+    :param year: Año de los timestamps.
+    :param errors: Tratamiento de los bytes que no son UTF-8 válido en los mensajes.
+    :param fallback: Procesamiento general de un tramo de líneas, usado con las que no encajan en el camino vectorizado.
+    :return: Lote con las líneas del bloque.
+
+    Las líneas syslog empiezan con un timestamp de ancho fijo ('Mon DD HH:MM:SS'), que se comprueba y se convierte
+    posición a posición sobre una matriz con los primeros bytes de cada línea. Siguen el host, un espacio y, si
+    existe, la etiqueta 'app[pid]: ' o 'app: ', igual que en la expresión regular de UnixLogs.
+    """
+    if b'\r' in data:
+        return fallback(data)
+    block = Block(data)
+    lines = len(block)
+    fast = block.ends - block.starts >= SYSLOG_MIN_LENGTH
+    head = block.bytes[np.minimum(np.where(fast, block.starts, 0)[:, None] + np.arange(16), block.size)].astype(np.int64)
+
+    def digits(*columns):
+        return [head[:, column] - ord('0') for column in columns]
+
+    month = np.zeros(lines, dtype=np.int64)
+    code = head[:, 0] << 16 | head[:, 1] << 8 | head[:, 2]
+    for number, name in enumerate(MONTHS, start=1):
+        month[code == (name[0] << 16 | name[1] << 8 | name[2])] = number
+    day_tens, day_units, hour_tens, hour_units, minute_tens, minute_units, second_tens, second_units = \
+        digits(4, 5, 7, 8, 10, 11, 13, 14)
+    is_digit = DIGIT[head]
+    fast &= month > 0
+    fast &= (head[:, 3] == ord(' ')) & (head[:, 6] == ord(' ')) & (head[:, 15] == ord(' '))
+    fast &= (head[:, 9] == ord(':')) & (head[:, 12] == ord(':'))
+    fast &= is_digit[:, [5, 7, 8, 10, 11, 13, 14]].all(axis=1) & ((head[:, 4] == ord(' ')) | is_digit[:, 4])
+    day_tens = np.where(head[:, 4] == ord(' '), 0, day_tens)
+    day = day_tens * 10 + day_units
+    hour = hour_tens * 10 + hour_units
+    fast &= (day >= 1) & (hour <= 23) & (minute_tens <= 5) & (second_tens <= 5)
+    # DATE no admite '00', y un día inexistente (30 de febrero) hace fallar decode_syslog en el camino general.
+    first_day, days = month_days(year)
+    month_index = np.maximum(month - 1, 0)
+    fast &= day <= days[month_index]
+
+    # Host: desde la posición 16 hasta el siguiente espacio, que debe ser exactamente un espacio.
+    host_start = block.starts + 16
+    host_end = block.next(WHITESPACE, np.where(fast, host_start, 0))
+    fast &= (host_end > host_start) & (block.bytes[host_end] == ord(' '))
+
+    # Etiqueta opcional: tramo sin espacios, '[' ni ':', seguido de ': ' o de '[pid]: '.
+    tag_start = host_end + 1
+    tag_end = block.next(TAG_END, tag_start)
+    after = block.bytes[np.minimum(tag_end[:, None] + np.arange(2), block.size)]
+    plain = (tag_end > tag_start) & (after[:, 0] == ord(':')) & (after[:, 1] == ord(' '))
+    # pid: hasta PID_DIGITS dígitos tras el corchete. Los pids más largos van por el camino general.
+    non_digit = block.window(tag_end + 1, PID_DIGITS + 1) - np.uint8(ord('0')) >= 10
+    pid_end = tag_end + 1 + np.argmax(non_digit, axis=1)
+    closing = block.bytes[np.minimum(pid_end[:, None] + np.arange(3), block.size)]
+    bracketed = (tag_end > tag_start) & (after[:, 0] == ord('[')) & (pid_end > tag_end + 1)
+    bracketed &= (closing[:, 0] == ord(']')) & (closing[:, 1] == ord(':')) & (closing[:, 2] == ord(' '))
+    fast &= (after[:, 0] != ord('[')) | non_digit.any(axis=1)
+    tagged = plain | bracketed
+    message_start = np.where(plain, tag_end + 2, np.where(bracketed, pid_end + 3, tag_start))
+    fast &= block.ascii(block.starts, np.where(fast, message_start, block.starts))
+
+    timestamp = (first_day[month_index] + day - 1) * 86400 + hour * 3600 + (minute_tens * 10 + minute_units) * 60
+    timestamp = (timestamp + second_tens * 10 + second_units) * NANOSECONDS
+    process_id = np.where(bracketed, block.number(tag_end + 1, np.where(bracketed, pid_end, tag_end + 1), PID_DIGITS),
+                          MISSING)
+
+    def vectorized(rows: np.ndarray) -> LogBatch:
+        message = block.strings([(message_start[rows], block.ends[rows])], errors)
+        host_name = block.strings([(host_start[rows], host_end[rows])], 'strict')
+        app_name = np.full(len(rows), None, dtype=object)
+        with_tag = rows[tagged[rows]]
+        app_name[tagged[rows]] = block.strings([(tag_start[with_tag], tag_end[with_tag])], 'strict')
+        return LogBatch.from_columns(timestamp[rows], message, host_name=host_name, app_name=app_name,
+                                     process_id=process_id[rows])
+
+    return by_runs(block, fast, vectorized, fallback)